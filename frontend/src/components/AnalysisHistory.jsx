@@ -7,6 +7,8 @@ const AnalysisHistory = () => {
   const [statistics, setStatistics] = useState(null)
   const [loading, setLoading] = useState(true)
   const [selectedAnalysis, setSelectedAnalysis] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     loadHistory()
@@ -18,6 +20,7 @@ const AnalysisHistory = () => {
       setLoading(true)
       const response = await apiEndpoints.getRecentHistory(20)
       setHistory(response.data.analyses || [])
+      setNextCursor(response.data.next_cursor || null)
     } catch (error) {
       handleApiError(error, 'Failed to load analysis history')
     } finally {
@@ -25,6 +28,20 @@ const AnalysisHistory = () => {
     }
   }
 
+  const loadMoreHistory = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const response = await apiEndpoints.getRecentHistory(20, nextCursor)
+      setHistory((previous) => [...previous, ...(response.data.analyses || [])])
+      setNextCursor(response.data.next_cursor || null)
+    } catch (error) {
+      handleApiError(error, 'Failed to load more history')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const loadStatistics = async () => {
     try {
       const response = await apiEndpoints.getAnalyticsStatistics()
@@ -36,7 +53,8 @@ const AnalysisHistory = () => {
 
   const viewAnalysis = async (analysisId) => {
     try {
-      const response = await apiEndpoints.getAnalysisById(analysisId)
+      // The details view only shows the summary and errors
+      const response = await apiEndpoints.getAnalysisById(analysisId, 'errors')
       setSelectedAnalysis(response.data.analysis)
     } catch (error) {
       handleApiError(error, 'Failed to load analysis details')
@@ -174,6 +192,17 @@ const AnalysisHistory = () => {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div className="px-6 py-4 border-t border-gray-200 text-center">
+                <button
+                  onClick={loadMoreHistory}
+                  disabled={loadingMore}
+                  className="text-sm text-blue-600 hover:text-blue-800 font-medium disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -40,6 +40,7 @@ export default function DataUpload() {
   const [showPlanModal, setShowPlanModal] = useState(false)
   const [plannedAgents, setPlannedAgents] = useState([]) // array of {name, display_name, description, ...}
   const [selectedAgentNames, setSelectedAgentNames] = useState([]) // array of names
+  const [planToken, setPlanToken] = useState(null) // lets /analyze-data reuse the plan
   const [showAgentTabs, setShowAgentTabs] = useState(false)
   const [analysisProgress, setAnalysisProgress] = useState(null)
   const [currentFile, setCurrentFile] = useState(null)
@@ -96,8 +97,10 @@ export default function DataUpload() {
         'workflow_started',
         'workflow_progress',
         'agent_started',
+        'agent_code_delta',
         'code_generated',
         'agent_completed',
+        'agent_summary',
         'agent_error',
         'workflow_error',
         'workflow_completed'
@@ -161,6 +164,14 @@ export default function DataUpload() {
             console.log(`Agent started: ${agentName}`, { runningAgents: newProgress.runningAgents })
             break
             
+          case 'agent_code_delta':
+            // Partial code streamed while the agent is still generating
+            newProgress.agentCode = { ...(newProgress.agentCode || {}) }
+            newProgress.agentCode[lastMessage.agent_name] =
+              (newProgress.agentCode[lastMessage.agent_name] || '') + (lastMessage.delta || '')
+            newProgress.message = `Writing code for ${lastMessage.agent_name.replace(/_/g, ' ')}...`
+            break
+            
           case 'code_generated':
             newProgress.progress = lastMessage.progress || newProgress.progress
             newProgress.message = lastMessage.message || newProgress.message
@@ -210,6 +221,22 @@ export default function DataUpload() {
             console.log(`Agent completed: ${completedAgentName}`, result, { remainingRunning: newProgress.runningAgents })
             break
             
+          case 'agent_summary':
+            // Batched explanations arrive after the agent completed
+            newProgress.completedAgents = (newProgress.completedAgents || []).map(a =>
+              a.agent_name === lastMessage.agent_name
+                ? {
+                    ...a,
+                    execution_result: {
+                      ...(a.execution_result || {}),
+                      ui_summary: lastMessage.ui_summary,
+                      next_insights: lastMessage.next_insights
+                    }
+                  }
+                : a
+            )
+            break
+            
           case 'agent_error':
             const errorAgentName = lastMessage.agent_name
             const errorResult = {
@@ -465,6 +492,7 @@ export default function DataUpload() {
       }
       setPlannedAgents(agentInfos)
       setSelectedAgentNames(agentNames)
+      setPlanToken(planResponse?.data?.plan_token || null)
       setShowPlanModal(true)
       setIsAnalyzing(false) // Stop spinner when modal is shown so user can interact
     } catch (error) {
@@ -590,7 +618,8 @@ export default function DataUpload() {
           console.log('Analysis progress:', progressEvent)
         },
         selectedAgentNames,
-        abortControllerRef.current?.signal
+        abortControllerRef.current?.signal,
+        planToken
       )
 
       console.log('Analysis API response:', response)
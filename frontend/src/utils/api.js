@@ -113,13 +113,16 @@ export const apiEndpoints = {
   },
   
   // AI Analysis endpoints
-  analyzeData: (file, question, onUploadProgress, selectedAgents = null, signal = null) => {
+  analyzeData: (file, question, onUploadProgress, selectedAgents = null, signal = null, planToken = null) => {
     const formData = new FormData()
     formData.append('file', file)
     formData.append('question', question)
     if (selectedAgents && Array.isArray(selectedAgents) && selectedAgents.length > 0) {
       formData.append('selected_agents', JSON.stringify(selectedAgents))
     }
+    if (planToken) {
+      formData.append('plan_token', planToken)
+    }
     
     const config = {
       headers: {
@@ -179,14 +182,16 @@ export const apiEndpoints = {
 
   // ========== NEW: History & Analytics Endpoints ==========
 
-  // Get recent analysis history
-  getRecentHistory: (limit = 10) => {
-    return api.get('/history/recent', { params: { limit } })
+  // Get recent analysis history (summaries; pass next_cursor to get the next page)
+  getRecentHistory: (limit = 10, cursor = null) => {
+    const params = { limit }
+    if (cursor) params.cursor = cursor
+    return api.get('/history/recent', { params })
   },
 
-  // Get specific analysis by ID
-  getAnalysisById: (analysisId) => {
-    return api.get(`/history/${analysisId}`)
+  // Get specific analysis by ID (fields: e.g. 'errors', 'report', 'agent_results,artifacts')
+  getAnalysisById: (analysisId, fields = null) => {
+    return api.get(`/history/${analysisId}`, fields ? { params: { fields } } : undefined)
   },
 
   // Get analytics statistics
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Offline workflow benchmark
+
+Runs the full LangGraph workflow (agent selection, code generation, sandbox
+execution, explanations, report) against a data file. Claude traffic goes
+through the record/replay transport, so once a session has been recorded it
+can be replayed with no network access or API key.
+
+Usage:
+    # 1. Record once (needs ANTHROPIC_API_KEY)
+    python benchmark_workflow.py --mode record --file data.csv --question "What drives revenue?"
+
+    # 2. Replay offline, with simulated latency
+    python benchmark_workflow.py --mode replay --file data.csv --question "What drives revenue?" \\
+        --runs 5 --latency "normal:1500,300"
+
+Environment Variables:
+    LLM_FIXTURE_DIR - Fixture directory (default: ./llm_fixtures, overridden by --fixtures)
+
+Notes:
+    The LLM response cache is disabled and no database session is used, so every
+    run really generates, parses and executes code. Recording and replay must use
+    the same data, question, model and config.yaml, otherwise requests won't match.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis workflow with recorded Claude responses")
+    parser.add_argument("--file", required=True, help="CSV or Excel file to analyze")
+    parser.add_argument("--question", required=True, help="Analysis question")
+    parser.add_argument("--mode", choices=["record", "replay", "live"], default="replay")
+    parser.add_argument("--fixtures", default=None, help="Fixture directory (default: LLM_FIXTURE_DIR)")
+    parser.add_argument("--latency", default="recorded",
+                        help="Replay latency: none, recorded, fixed:<ms>, uniform:<min>,<max>, normal:<mean>,<std>, scale:<factor>")
+    parser.add_argument("--runs", type=int, default=1, help="Number of runs")
+    parser.add_argument("--agents", default="", help="Comma-separated agents (skips selection)")
+    parser.add_argument("--output", default="", help="Write the timings as JSON to this file")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Settings are read at import time, so set them before importing the app"""
+    os.environ["LLM_TRANSPORT_MODE"] = args.mode
+    os.environ["LLM_REPLAY_LATENCY"] = args.latency
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["AGENT_MOCK"] = "false"
+    if args.fixtures:
+        os.environ["LLM_FIXTURE_DIR"] = args.fixtures
+
+
+async def run_benchmark(args):
+    # Add parent directory to path for imports
+    sys.path.insert(0, str(Path(__file__).parent))
+
+    from services.http_client import close_http_client, get_http_client
+    from services.langgraph_workflow import LangGraphMultiAgentWorkflow
+    from services.llm_transport import ReplayTransport
+    from services.token_budget import get_token_usage_tracker
+
+    file_path = Path(args.file)
+    file_content = file_path.read_bytes()
+    agents = [a.strip() for a in args.agents.split(",") if a.strip()] or None
+
+    workflow = LangGraphMultiAgentWorkflow()
+    runs = []
+    for run_index in range(args.runs):
+        started = time.perf_counter()
+        result = await workflow.run_analysis(
+            file_content, file_path.name, args.question, selected_agents=agents,
+            analysis_id=f"benchmark-{run_index + 1}",
+        )
+        elapsed = time.perf_counter() - started
+        agent_results = result.get("agent_results") or {}
+        runs.append({
+            "run": run_index + 1,
+            "seconds": round(elapsed, 3),
+            "success": result.get("success", False),
+            "agents": len(agent_results),
+            "failed_agents": [name for name, r in agent_results.items() if not r.get("success")],
+        })
+        print(f"Run {run_index + 1}/{args.runs}: {elapsed:.2f}s, "
+              f"{len(agent_results)} agents, success={result.get('success', False)}")
+
+    transport = get_http_client()._transport
+    summary = {
+        "mode": args.mode,
+        "latency": args.latency if args.mode == "replay" else None,
+        "runs": runs,
+        "token_usage": get_token_usage_tracker().stats()["total"],
+    }
+    durations = [r["seconds"] for r in runs]
+    summary["seconds"] = {
+        "min": min(durations),
+        "median": round(statistics.median(durations), 3),
+        "max": max(durations),
+        "stdev": round(statistics.stdev(durations), 3) if len(durations) > 1 else 0.0,
+    }
+    if isinstance(transport, ReplayTransport):
+        summary["replay"] = {"hits": transport.hits, "loose_hits": transport.loose_hits, "misses": transport.misses}
+
+    await close_http_client()
+    return summary
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    summary = asyncio.run(run_benchmark(args))
+
+    print("\n" + "=" * 60)
+    print(json.dumps(summary["seconds"], indent=2))
+    if "replay" in summary:
+        print(f"Replay fixtures: {summary['replay']['hits']} hits, {summary['replay']['misses']} misses")
+        if summary["replay"]["misses"]:
+            print("Some requests had no fixture; record again with the same inputs and config")
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2))
+        print(f"Timings written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
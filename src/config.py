@@ -43,6 +43,24 @@ class Settings(BaseSettings):
     CLAUDE_MODEL: str = os.getenv("CLAUDE_MODEL", "claude-haiku-4-5-20251001")
     CLAUDE_MAX_TOKENS: int = int(os.getenv("CLAUDE_MAX_TOKENS", "32000"))
     CLAUDE_TEMPERATURE: float = float(os.getenv("CLAUDE_TEMPERATURE", "0.1"))
+
+    # Stream code generation (SSE) and start execution as soon as the code block closes
+    CLAUDE_STREAMING: bool = os.getenv("CLAUDE_STREAMING", "true").lower() in ["true", "1", "yes"]
+
+    # Mark the shared dataset context as a prompt-cache breakpoint
+    CLAUDE_PROMPT_CACHING: bool = os.getenv("CLAUDE_PROMPT_CACHING", "true").lower() in ["true", "1", "yes"]
+    # Seed for the sampled rows in data samples (same file -> same sample -> same cached prompt prefix)
+    DATA_SAMPLE_SEED: int = int(os.getenv("DATA_SAMPLE_SEED", "42"))
+
+    # Shared Claude HTTP client (connection pool reused across calls)
+    CLAUDE_HTTP2: bool = os.getenv("CLAUDE_HTTP2", "true").lower() in ["true", "1", "yes"]
+    CLAUDE_MAX_CONNECTIONS: int = int(os.getenv("CLAUDE_MAX_CONNECTIONS", "20"))
+    CLAUDE_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("CLAUDE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    CLAUDE_KEEPALIVE_EXPIRY: float = float(os.getenv("CLAUDE_KEEPALIVE_EXPIRY", "60"))
+    CLAUDE_CONNECT_TIMEOUT: float = float(os.getenv("CLAUDE_CONNECT_TIMEOUT", "10"))
+    CLAUDE_READ_TIMEOUT: float = float(os.getenv("CLAUDE_READ_TIMEOUT", "120"))
+    CLAUDE_WRITE_TIMEOUT: float = float(os.getenv("CLAUDE_WRITE_TIMEOUT", "30"))
+    CLAUDE_POOL_TIMEOUT: float = float(os.getenv("CLAUDE_POOL_TIMEOUT", "30"))
     
     # Mock Configuration
     AGENT_MOCK: bool = os.getenv("AGENT_MOCK", "false").lower() in ["true", "1", "yes"]
@@ -51,7 +69,93 @@ class Settings(BaseSettings):
     # Cache controls
     CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() in ["true", "1", "yes"]
     AGENT_CACHE_ENABLED: bool = os.getenv("AGENT_CACHE_ENABLED", "true").lower() in ["true", "1", "yes"]
-    
+
+    # Data fingerprint used in cache keys: xxh3 (needs xxhash), blake3 (needs blake3), blake2b or sha256
+    DATA_HASH_ALGORITHM: str = os.getenv("DATA_HASH_ALGORITHM", "xxh3")
+
+    # Process pool for CPU-bound parsing/profiling (0 workers = run in threads)
+    COMPUTE_POOL_WORKERS: int = int(os.getenv("COMPUTE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    COMPUTE_POOL_MAX_PENDING: int = int(os.getenv("COMPUTE_POOL_MAX_PENDING", "16"))
+
+    # Claude response cache (memory LRU + SQLite), keyed by model, temperature and full prompt
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ["true", "1", "yes"]
+    LLM_CACHE_MEMORY_MB: int = int(os.getenv("LLM_CACHE_MEMORY_MB", "64"))
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")  # "" = memory only
+    LLM_CACHE_TTL_HOURS: float = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+
+    # In-process tier in front of the cached_analyses / agent_cached_results tables (decoded results, byte budgets)
+    RESULT_CACHE_MEMORY_ENABLED: bool = os.getenv("RESULT_CACHE_MEMORY_ENABLED", "true").lower() in ["true", "1", "yes"]
+    RESULT_CACHE_MEMORY_MB: int = int(os.getenv("RESULT_CACHE_MEMORY_MB", "128"))
+    AGENT_RESULT_CACHE_MEMORY_MB: int = int(os.getenv("AGENT_RESULT_CACHE_MEMORY_MB", "64"))
+
+    # Write-behind telemetry: agent executions, agent performance and cache access counts are buffered and flushed in batches
+    TELEMETRY_WRITE_BEHIND: bool = os.getenv("TELEMETRY_WRITE_BEHIND", "true").lower() in ["true", "1", "yes"]
+    TELEMETRY_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", "2"))
+    TELEMETRY_MAX_PENDING: int = int(os.getenv("TELEMETRY_MAX_PENDING", "5000"))
+    TELEMETRY_MAX_FLUSH_RETRIES: int = int(os.getenv("TELEMETRY_MAX_FLUSH_RETRIES", "5"))
+
+    # Cache table maintenance: background expiry plus LRU/LFU eviction once a table exceeds its byte budget (0 = no cap)
+    CACHE_SWEEPER_ENABLED: bool = os.getenv("CACHE_SWEEPER_ENABLED", "true").lower() in ["true", "1", "yes"]
+    CACHE_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("CACHE_SWEEP_INTERVAL_SECONDS", "600"))
+    CACHE_ANALYSIS_MAX_MB: int = int(os.getenv("CACHE_ANALYSIS_MAX_MB", "512"))
+    CACHE_AGENT_MAX_MB: int = int(os.getenv("CACHE_AGENT_MAX_MB", "512"))
+    CACHE_EVICTION_POLICY: str = os.getenv("CACHE_EVICTION_POLICY", "lru")  # lru or lfu
+    CACHE_EVICTION_LOW_WATERMARK: float = float(os.getenv("CACHE_EVICTION_LOW_WATERMARK", "0.9"))
+
+    # Payload store: large result JSON saved once per distinct content, compressed (zstd, or zlib without zstandard)
+    PAYLOAD_STORE_ENABLED: bool = os.getenv("PAYLOAD_STORE_ENABLED", "true").lower() in ["true", "1", "yes"]
+    PAYLOAD_COMPRESSION_LEVEL: int = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "3"))
+    PAYLOAD_INLINE_MAX_BYTES: int = int(os.getenv("PAYLOAD_INLINE_MAX_BYTES", "1024"))  # smaller values stay inline
+
+    # Database thread pool: blocking SQLAlchemy calls of async code run here, off the event loop
+    DB_EXECUTOR_THREADS: int = int(os.getenv("DB_EXECUTOR_THREADS", "8"))
+    DB_SLOW_CALL_MS: int = int(os.getenv("DB_SLOW_CALL_MS", "500"))
+
+    # SQLite maintenance (pragmas are set in models/database.py): periodic WAL checkpoint and optional VACUUM (0 = off)
+    SQLITE_MAINTENANCE_ENABLED: bool = os.getenv("SQLITE_MAINTENANCE_ENABLED", "true").lower() in ["true", "1", "yes"]
+    SQLITE_CHECKPOINT_INTERVAL_SECONDS: float = float(os.getenv("SQLITE_CHECKPOINT_INTERVAL_SECONDS", "300"))
+    SQLITE_CHECKPOINT_MODE: str = os.getenv("SQLITE_CHECKPOINT_MODE", "TRUNCATE")
+    SQLITE_VACUUM_INTERVAL_HOURS: float = float(os.getenv("SQLITE_VACUUM_INTERVAL_HOURS", "0"))
+
+    # Agent latency histograms: bucket counts per agent, phase and time window (p50/p95/p99 in /analytics)
+    LATENCY_WINDOW_MINUTES: int = int(os.getenv("LATENCY_WINDOW_MINUTES", "60"))
+    LATENCY_RETENTION_DAYS: int = int(os.getenv("LATENCY_RETENTION_DAYS", "30"))
+
+    # Dashboard counters: /analytics/statistics read from incrementally maintained counters, reconciled periodically
+    STATS_COUNTERS_ENABLED: bool = os.getenv("STATS_COUNTERS_ENABLED", "true").lower() in ["true", "1", "yes"]
+    STATS_DAILY_ROLLUP: bool = os.getenv("STATS_DAILY_ROLLUP", "true").lower() in ["true", "1", "yes"]
+    STATS_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+    # Outbound Claude call scheduler (adaptive concurrency, rate-limit headers, priorities)
+    LLM_SCHEDULER_ENABLED: bool = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() in ["true", "1", "yes"]
+    LLM_INITIAL_CONCURRENCY: int = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+    LLM_MIN_CONCURRENCY: int = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_RETRY_BASE_SECONDS: float = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+    LLM_RETRY_MAX_SECONDS: float = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+
+    # Claude transport: live, record (save exchanges to LLM_FIXTURE_DIR) or replay (answer from fixtures, no network)
+    LLM_TRANSPORT_MODE: str = os.getenv("LLM_TRANSPORT_MODE", "live")
+    LLM_FIXTURE_DIR: str = os.getenv("LLM_FIXTURE_DIR", "./llm_fixtures")
+    # Replay latency: none, recorded, fixed:<ms>, uniform:<min>,<max>, normal:<mean>,<std>, scale:<factor>
+    LLM_REPLAY_LATENCY: str = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+    LLM_REPLAY_SEED: int = int(os.getenv("LLM_REPLAY_SEED", "42"))
+
+    # Agent selection cache (schema fingerprint + normalized question + agent catalogue) and plan tokens
+    SELECTION_CACHE_ENABLED: bool = os.getenv("SELECTION_CACHE_ENABLED", "true").lower() in ["true", "1", "yes"]
+    SELECTION_CACHE_TTL_HOURS: float = float(os.getenv("SELECTION_CACHE_TTL_HOURS", "24"))
+    SELECTION_CACHE_MAX_ENTRIES: int = int(os.getenv("SELECTION_CACHE_MAX_ENTRIES", "1000"))
+    PLAN_TOKEN_TTL_MINUTES: float = float(os.getenv("PLAN_TOKEN_TTL_MINUTES", "30"))
+
+    # Library of generated code that ran successfully, reused on data with the same schema
+    CODE_LIBRARY_ENABLED: bool = os.getenv("CODE_LIBRARY_ENABLED", "true").lower() in ["true", "1", "yes"]
+    # Stop reusing a script after this many failures in a row
+    CODE_LIBRARY_MAX_CONSECUTIVE_FAILURES: int = int(os.getenv("CODE_LIBRARY_MAX_CONSECUTIVE_FAILURES", "2"))
+
+    # agents/config.yaml hot reload (checked at most once per interval)
+    CONFIG_HOT_RELOAD: bool = os.getenv("CONFIG_HOT_RELOAD", "false").lower() in ["true", "1", "yes"]
+    CONFIG_RELOAD_CHECK_SECONDS: float = float(os.getenv("CONFIG_RELOAD_CHECK_SECONDS", "2.0"))
+
     # Rate limiting (requests per time window)
     RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "false").lower() in ["true", "1", "yes"]
     RATE_LIMIT_MAX_REQUESTS: int = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "10"))
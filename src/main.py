@@ -1,9 +1,9 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, status, WebSocket, WebSocketDisconnect, Depends, Request
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, status, WebSocket, WebSocketDisconnect, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
-from typing import Optional
+from typing import Optional, Dict, Any, List
 import logging
 from datetime import datetime
 from io import BytesIO
@@ -13,15 +13,32 @@ from sqlalchemy.orm import Session
 
 from config import settings
 from services.s3_service import S3Service
-from services.agent_service import AgentService
+from services.service_registry import get_config, get_agent_service, get_database_service
 from services.langgraph_workflow import LangGraphMultiAgentWorkflow
 from services.langgraph_websocket import LangGraphWebSocketManager
-from services.database_service import DatabaseService
+from services.run_context import RunContext, cancel_run
+from services.compute_pool import get_compute_pool
+from services.db_executor import get_db_executor, run_db
+from services.http_client import start_http_client, close_http_client
+from services.llm_cache import get_llm_cache
+from services.token_budget import get_token_usage_tracker
+from services.llm_scheduler import get_llm_scheduler
+from services.selection_cache import get_selection_cache
+from services.result_cache import get_result_memory_cache
+from services.telemetry_writer import get_telemetry_writer
+from services.cache_maintenance import get_cache_sweeper
+from services.payload_store import get_payload_store
+from services.sqlite_maintenance import get_sqlite_maintenance
+from services.dashboard_counters import get_dashboard_counters
+from services.latency_histogram import PHASES, PHASE_TOTAL
+from services.single_flight import ProgressFanout, get_analysis_flights
 from utils.validators import validate_data_file
 from utils.data_processor import clean_nan_values
+from utils.fingerprint import read_upload_with_fingerprint
 
 # Import database models and initialization
-from models import init_db, get_db
+from models import Analysis, init_db
+from models.database import SessionLocal
 
 # Import rate limiter
 try:
@@ -112,10 +129,11 @@ async def log_requests(request, call_next):
 
 # Initialize services
 s3_service = S3Service()
-agent_service = AgentService()
-db_service = DatabaseService()
+agent_service = get_agent_service()
+db_service = get_database_service()
+analysis_flights = get_analysis_flights()
 
-# Initialize LangGraph workflow manager (workflows will be created per request)
+# LangGraph workflow (compiled once below, after the WebSocket manager exists)
 langgraph_workflow = None
 langgraph_websocket_manager = None
 
@@ -130,6 +148,29 @@ async def startup_event():
         logger.error(f"Failed to initialize database: {e}")
         # Don't fail startup - database is optional for basic functionality
 
+    try:
+        await get_compute_pool().start()
+    except Exception as e:
+        logger.error(f"Failed to start compute pool: {e}")
+
+    await start_http_client()
+
+    telemetry_writer = get_telemetry_writer()
+    if telemetry_writer:
+        await telemetry_writer.start()
+
+    cache_sweeper = get_cache_sweeper()
+    if cache_sweeper:
+        await cache_sweeper.start()
+
+    sqlite_maintenance = get_sqlite_maintenance()
+    if sqlite_maintenance:
+        await sqlite_maintenance.start()
+
+    dashboard_counters = get_dashboard_counters()
+    if dashboard_counters:
+        await dashboard_counters.start()
+
 # Graceful shutdown
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -144,7 +185,31 @@ async def shutdown_event():
                 except Exception:
                     pass
         
-        # Close database connections
+        # Close pooled Claude API connections
+        await close_http_client()
+
+        # Stop compute pool workers
+        get_compute_pool().shutdown()
+
+        cache_sweeper = get_cache_sweeper()
+        if cache_sweeper:
+            await cache_sweeper.stop()
+
+        sqlite_maintenance = get_sqlite_maintenance()
+        if sqlite_maintenance:
+            await sqlite_maintenance.stop()
+
+        dashboard_counters = get_dashboard_counters()
+        if dashboard_counters:
+            await dashboard_counters.stop()
+
+        # Write buffered telemetry before the engine goes away
+        telemetry_writer = get_telemetry_writer()
+        if telemetry_writer:
+            await telemetry_writer.stop()
+
+        # Let queued database calls finish, then close database connections
+        get_db_executor().shutdown()
         from models.database import engine
         engine.dispose()
         
@@ -195,9 +260,12 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-# Initialize LangGraph WebSocket manager (workflow instances created per-request)
+# Initialize LangGraph WebSocket manager
 langgraph_websocket_manager = LangGraphWebSocketManager(manager)
 
+# Compile the workflow graph once; per-run state travels in the run config
+langgraph_workflow = LangGraphMultiAgentWorkflow(langgraph_websocket_manager)
+
 
 @app.get("/")
 async def root():
@@ -376,13 +444,42 @@ async def list_files(folder: Optional[str] = None):
         )
 
 
+def _record_cached_analysis(
+    db: Session,
+    filename: str,
+    user_question: str,
+    selected_agents: List[str],
+    cache_key: str,
+    result: Dict[str, Any]
+) -> Analysis:
+    """Create the analysis record of a cache hit and store the cached results on it (runs on the DB executor)"""
+    analysis_record = db_service.create_analysis(
+        db=db,
+        filename=filename,
+        user_question=user_question,
+        selected_agents=selected_agents,
+        cache_key=cache_key
+    )
+    analysis_record.is_cached = True
+    analysis_record.status = "cached"
+    db_service.save_analysis_results(
+        db=db,
+        analysis_id=analysis_record.id,
+        data_sample=result.get("data_sample", {}),
+        agent_results=result.get("agent_results", {}),
+        report=result.get("report", {}),
+        errors=result.get("errors", [])
+    )
+    return analysis_record
+
+
 @app.post("/analyze-data")
 async def analyze_data(
     file: UploadFile = File(...),
     question: str = Form(...),
     selected_agents: Optional[str] = Form(None),
     bypass_cache: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    plan_token: Optional[str] = Form(None)
 ):
     """
     Analyze uploaded data using AI agents based on user question
@@ -392,6 +489,7 @@ async def analyze_data(
         file: Data file to analyze (CSV, XLSX, or XLS)
         question: User's analysis question/request
         selected_agents: Optional JSON string of selected agent names
+        plan_token: Optional token from /plan-analysis; its agents are used when selected_agents is not given
 
     Returns:
         Complete analysis results with agent outputs and report
@@ -404,9 +502,9 @@ async def analyze_data(
         if not question or question.strip() == "":
             raise ValueError("Analysis question is required")
 
-        # Read file content
+        # Read file content, fingerprinting it in the same pass
         await file.seek(0)
-        file_content = await file.read()
+        file_content, fingerprint = await read_upload_with_fingerprint(file, settings.DATA_HASH_ALGORITHM)
 
         if not file_content:
             raise ValueError("File is empty")
@@ -432,28 +530,32 @@ async def analyze_data(
             except Exception as e:
                 logger.warning(f"Failed to parse selected_agents JSON: {e}, raw value: {selected_agents}")
                 selected_agents_list = None
-        else:
-            logger.info("No selected_agents provided in request, will use smart selection")
-
         # ========== CACHING LOGIC ==========
-        # Compute data hash
-        data_hash = db_service.generate_data_hash(file_content)
+        # Data hash computed while reading the upload
+        data_hash = fingerprint.data_hash
+
+        if not selected_agents_list and plan_token:
+            selection_cache = get_selection_cache()
+            if selection_cache is not None:
+                selected_agents_list = selection_cache.resolve_plan_token(
+                    plan_token, data_hash, question.strip(), get_config().agent_catalog_signature
+                )
+                if selected_agents_list:
+                    logger.info(f"Using agents from plan token: {selected_agents_list}")
+
+        if not selected_agents_list:
+            logger.info("No selected_agents provided in request, will use smart selection")
         # Parse bypass flag and global setting
         bypass = False
         if bypass_cache is not None:
             bypass = str(bypass_cache).lower() in ["true", "1", "yes"]
+        # An explicit bypass also skips LLM response cache lookups for this run
+        bypass_requested = bypass
         if not settings.CACHE_ENABLED:
             bypass = True
 
         # Build execution config signature to separate caches when plan changes
-        exec_signature = ""
-        try:
-            from services.claude_service import ClaudeService as _CS
-            _tmp = _CS()
-            import yaml as _yaml, hashlib as _hashlib
-            exec_signature = _hashlib.sha256(_yaml.safe_dump(_tmp.execution_config).encode()).hexdigest() if _tmp.execution_config else ""
-        except Exception:
-            exec_signature = ""
+        exec_signature = get_config().execution_signature
 
         cache_key = None
         if not bypass:
@@ -463,7 +565,7 @@ async def analyze_data(
                 cache_key = db_service.generate_cache_key(data_hash, question.strip())
 
             # Check cache first
-            cached_result = db_service.get_cached_analysis(db, cache_key)
+            cached_result = await run_db(db_service.get_cached_analysis, cache_key)
             if cached_result:
                 logger.info(f"✅ CACHE HIT - Returning cached result (saved ~{cached_result.time_saved_ms}ms)")
                 result = cached_result.cached_result
@@ -478,22 +580,13 @@ async def analyze_data(
                 if not selected_agents_list:
                     selected_agents_list = result.get("selected_agents", [])
 
-                analysis_record = db_service.create_analysis(
-                    db=db,
+                analysis_record = await run_db(
+                    _record_cached_analysis,
                     filename=file.filename,
                     user_question=question.strip(),
                     selected_agents=selected_agents_list,
-                    cache_key=cache_key
-                )
-                analysis_record.is_cached = True
-                analysis_record.status = "cached"
-                db_service.save_analysis_results(
-                    db=db,
-                    analysis_id=analysis_record.id,
-                    data_sample=result.get("data_sample", {}),
-                    agent_results=result.get("agent_results", {}),
-                    report=result.get("report", {}),
-                    errors=result.get("errors", [])
+                    cache_key=cache_key,
+                    result=result
                 )
 
                 # Emit cached result via WebSocket so frontend can display it
@@ -556,12 +649,10 @@ async def analyze_data(
 
                 return clean_nan_values(result)
 
-        # ========== NEW ANALYSIS ==========
-        logger.info(f"❌ CACHE MISS - Running new analysis")
-
-        # Create analysis record in database
-        analysis_record = db_service.create_analysis(
-            db=db,
+        # Create analysis record in database (a request that attaches to an
+        # identical in-flight run still gets its own record)
+        analysis_record = await run_db(
+            db_service.create_analysis,
             filename=file.filename,
             user_question=question.strip(),
             selected_agents=selected_agents_list or [],
@@ -569,66 +660,118 @@ async def analyze_data(
         )
 
         # Update status to running
-        db_service.update_analysis_status(db, analysis_record.id, "running")
-
-        # Create a new workflow instance per request to avoid cross-request state
-        local_workflow = LangGraphMultiAgentWorkflow(langgraph_websocket_manager)
-        # Use LangGraph workflow for analysis (workflow_started emitted inside workflow)
-        analysis_result = await local_workflow.run_analysis(
-            file_content=file_content,
-            filename=file.filename,
-            user_question=question.strip(),
-            selected_agents=selected_agents_list,
-            analysis_id=analysis_record.id,  # Pass for tracking
-            db_session=db  # Pass for agent tracking
-        )
-
-        # Add validation metadata
-        analysis_result["file_validation"] = validation_result
-        analysis_result["is_cached"] = False
-        analysis_result["analysis_id"] = analysis_record.id
+        await run_db(db_service.update_analysis_status, analysis_record.id, "running")
+
+        # ========== SINGLE-FLIGHT ==========
+        # An identical analysis is already running: attach to it instead of starting another run.
+        # Nothing is awaited between this check and analysis_flights.do() registering the
+        # leader below, so two identical requests can never both start a run.
+        inflight = analysis_flights.get(cache_key) if cache_key else None
+        if inflight:
+            logger.info(f"🔗 IN-FLIGHT HIT - Attaching to running analysis {inflight.context.leader_id}")
+            await inflight.context.attach(analysis_record.id)
+
+            shared_result = await inflight.wait()
+
+            result = dict(shared_result)
+            result["file_validation"] = validation_result
+            result["is_cached"] = False
+            result["analysis_id"] = analysis_record.id
+            result["coalesced_with"] = inflight.context.leader_id
+            await run_db(
+                db_service.save_analysis_results,
+                analysis_id=analysis_record.id,
+                data_sample=result.get("data_sample", {}),
+                agent_results=result.get("agent_results", {}),
+                report=result.get("report", {}),
+                errors=[]
+            )
+            if result.get("cancelled"):
+                await run_db(db_service.update_analysis_status, analysis_record.id, "cancelled")
+            return result
 
-        # Clean any NaN values to ensure JSON serializability
-        cleaned_result = clean_nan_values(analysis_result)
+        # ========== NEW ANALYSIS ==========
+        logger.info(f"❌ CACHE MISS - Running new analysis")
 
-        # Save results to database
-        db_service.save_analysis_results(
-            db=db,
+        # Progress goes to this request and to any identical request that attaches while it runs
+        progress_fanout = ProgressFanout(langgraph_websocket_manager, analysis_record.id)
+        run_context = RunContext(
             analysis_id=analysis_record.id,
-            data_sample=cleaned_result.get("data_sample", {}),
-            agent_results=cleaned_result.get("agent_results", {}),
-            report=cleaned_result.get("report", {}),
-            errors=[]
+            session_factory=SessionLocal,  # Each agent task opens its own session
+            progress_sink=progress_fanout,
+            fingerprint=fingerprint,
+            bypass_cache=bypass_requested
         )
 
-        # Save to cache for future use
-        execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
-        if settings.CACHE_ENABLED:
-            final_cache_key = cache_key or db_service.generate_analysis_cache_key(
-                data_hash,
-                question.strip(),
-                cleaned_result.get("selected_agents"),
-                exec_signature
-            )
-            db_service.save_to_cache(
-                db=db,
-                cache_key=final_cache_key,
-                data_hash=data_hash,
+        async def run_and_store() -> Dict[str, Any]:
+            # Use the shared LangGraph workflow (workflow_started emitted inside workflow)
+            analysis_result = await langgraph_workflow.run_analysis(
+                file_content=file_content,
+                filename=file.filename,
                 user_question=question.strip(),
+                selected_agents=selected_agents_list,
+                run_context=run_context
+            )
+
+            # Add validation metadata
+            analysis_result["file_validation"] = validation_result
+            analysis_result["is_cached"] = False
+            analysis_result["analysis_id"] = analysis_record.id
+
+            # Clean any NaN values to ensure JSON serializability
+            cleaned_result = clean_nan_values(analysis_result)
+
+            # Save results to database
+            await run_db(
+                db_service.save_analysis_results,
                 analysis_id=analysis_record.id,
-                result=cleaned_result,
-                ttl_hours=24,
-                execution_time_ms=int(execution_time)
+                data_sample=cleaned_result.get("data_sample", {}),
+                agent_results=cleaned_result.get("agent_results", {}),
+                report=cleaned_result.get("report", {}),
+                errors=[]
             )
 
-        logger.info(f"✅ Analysis completed for: {file.filename} in {execution_time:.0f}ms")
+            execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            if cleaned_result.get("cancelled"):
+                # Partial results are kept on the record but never cached
+                await run_db(db_service.update_analysis_status, analysis_record.id, "cancelled")
+                logger.info(f"Analysis {analysis_record.id} cancelled after {execution_time:.0f}ms")
+                return cleaned_result
+
+            # Save to cache for future use (inside the flight, so no request can
+            # miss both the in-flight run and the cache entry)
+            if settings.CACHE_ENABLED:
+                final_cache_key = cache_key or db_service.generate_analysis_cache_key(
+                    data_hash,
+                    question.strip(),
+                    cleaned_result.get("selected_agents"),
+                    exec_signature
+                )
+                await run_db(
+                    db_service.save_to_cache,
+                    cache_key=final_cache_key,
+                    data_hash=data_hash,
+                    user_question=question.strip(),
+                    analysis_id=analysis_record.id,
+                    result=cleaned_result,
+                    ttl_hours=24,
+                    execution_time_ms=int(execution_time)
+                )
+
+            logger.info(f"✅ Analysis completed for: {file.filename} in {execution_time:.0f}ms")
+            return cleaned_result
+
+        if cache_key:
+            cleaned_result, _ = await analysis_flights.do(cache_key, run_and_store, context=progress_fanout)
+        else:
+            cleaned_result = await run_and_store()
 
         return cleaned_result
 
     except ValueError as ve:
         logger.error(f"Validation error in analyze_data: {str(ve)}")
         if analysis_record:
-            db_service.update_analysis_status(db, analysis_record.id, "failed")
+            await run_db(db_service.update_analysis_status, analysis_record.id, "failed")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(ve)
@@ -636,7 +779,7 @@ async def analyze_data(
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}")
         if analysis_record:
-            db_service.update_analysis_status(db, analysis_record.id, "failed")
+            await run_db(db_service.update_analysis_status, analysis_record.id, "failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Analysis failed: {str(e)}"
@@ -649,14 +792,15 @@ async def plan_analysis(
     question: str = Form(...)
 ):
     """
-    Returns the data sample and the list of selected agents (in order) for preview.
+    Returns the data sample and the list of selected agents (in order) for preview,
+    plus a plan_token that /analyze-data accepts in place of selected_agents.
     """
     try:
         if not question or question.strip() == "":
             raise ValueError("Analysis question is required")
 
         await file.seek(0)
-        file_content = await file.read()
+        file_content, fingerprint = await read_upload_with_fingerprint(file, settings.DATA_HASH_ALGORITHM)
         if not file_content:
             raise ValueError("File is empty")
 
@@ -669,6 +813,14 @@ async def plan_analysis(
             filename=file.filename,
             user_question=question.strip()
         )
+
+        # Let the following /analyze-data call reuse this plan
+        selection_cache = get_selection_cache()
+        if plan.get("success") and plan.get("selected_agents") and selection_cache is not None:
+            plan["plan_token"] = selection_cache.issue_plan_token(
+                fingerprint.data_hash, question.strip(), plan["selected_agents"],
+                get_config().agent_catalog_signature
+            )
         return clean_nan_values(plan)
     except ValueError as ve:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
@@ -707,7 +859,7 @@ async def preview_data(
         from utils.data_processor import DataProcessor
         data_processor = DataProcessor()
         
-        preview_data = data_processor.read_file_sample(
+        preview_data = await data_processor.read_file_sample_async(
             file_content, file.filename, sample_rows=20
         )
         
@@ -741,8 +893,7 @@ async def preview_data(
 
 @app.post("/cancel-analysis")
 async def cancel_analysis(
-    request: CancelAnalysisRequest,
-    db: Session = Depends(get_db)
+    request: CancelAnalysisRequest
 ):
     """
     Cancel a running analysis
@@ -757,9 +908,12 @@ async def cancel_analysis(
         analysis_id = request.analysis_id
         
         logger.info(f"Cancelling analysis: {analysis_id}")
+
+        # Stop the in-flight run (if it is running in this process) before the next agent starts
+        run_found = cancel_run(analysis_id)
         
         # Update analysis status to cancelled
-        analysis_record = db_service.update_analysis_status(db, analysis_id, "cancelled")
+        analysis_record = await run_db(db_service.update_analysis_status, analysis_id, "cancelled")
         
         if not analysis_record:
             logger.warning(f"Analysis {analysis_id} not found")
@@ -786,7 +940,8 @@ async def cancel_analysis(
         return {
             "success": True,
             "message": "Analysis cancelled successfully",
-            "analysis_id": analysis_id
+            "analysis_id": analysis_id,
+            "run_stopped": run_found
         }
         
     except ValueError as ve:
@@ -840,24 +995,30 @@ async def get_available_agents():
 # ========== NEW ENDPOINTS FOR HISTORY & ANALYTICS ==========
 
 @app.get("/history/recent")
-async def get_recent_history(limit: int = 10, db: Session = Depends(get_db)):
+async def get_recent_history(limit: int = 10, cursor: Optional[str] = None):
     """
-    Get recent analysis history
+    Get recent analysis history (summaries only; results via /history/{analysis_id})
 
     Args:
-        limit: Number of recent analyses to return (default 10)
+        limit: Number of analyses per page (default 10, max 100)
+        cursor: next_cursor from the previous page
 
     Returns:
-        List of recent analyses
+        Page of analysis summaries and the cursor of the next page (null on the last page)
     """
     try:
-        analyses = db_service.get_recent_analyses(db, limit=limit)
+        analyses, next_cursor = await run_db(
+            db_service.get_analysis_summaries, limit=max(1, min(limit, 100)), cursor=cursor
+        )
         return {
             "success": True,
             "count": len(analyses),
-            "analyses": [a.to_dict() for a in analyses],
+            "analyses": analyses,
+            "next_cursor": next_cursor,
             "timestamp": datetime.utcnow().isoformat()
         }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting recent history: {e}")
         raise HTTPException(
@@ -867,18 +1028,25 @@ async def get_recent_history(limit: int = 10, db: Session = Depends(get_db)):
 
 
 @app.get("/history/{analysis_id}")
-async def get_analysis_by_id(analysis_id: str, db: Session = Depends(get_db)):
+async def get_analysis_by_id(analysis_id: str, fields: Optional[str] = None):
     """
     Get a specific analysis by ID
 
     Args:
         analysis_id: Analysis ID
+        fields: Comma-separated fields to include besides the summary: data_sample,
+            agent_results, report, errors, artifacts ("summary" for none; default:
+            data_sample, agent_results, report and errors)
 
     Returns:
         Analysis details
     """
     try:
-        analysis = db_service.get_analysis(db, analysis_id)
+        if fields is None:
+            requested = list(Analysis.DETAIL_COLUMNS)
+        else:
+            requested = [f.strip() for f in fields.split(",") if f.strip() and f.strip() != "summary"]
+        analysis = await run_db(db_service.get_analysis_fields, analysis_id, requested)
         if not analysis:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -887,11 +1055,13 @@ async def get_analysis_by_id(analysis_id: str, db: Session = Depends(get_db)):
 
         return {
             "success": True,
-            "analysis": analysis.to_dict(),
+            "analysis": analysis,
             "timestamp": datetime.utcnow().isoformat()
         }
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting analysis {analysis_id}: {e}")
         raise HTTPException(
@@ -901,7 +1071,7 @@ async def get_analysis_by_id(analysis_id: str, db: Session = Depends(get_db)):
 
 
 @app.get("/analytics/statistics")
-async def get_analytics_statistics(db: Session = Depends(get_db)):
+async def get_analytics_statistics():
     """
     Get overall analytics and statistics
 
@@ -909,7 +1079,26 @@ async def get_analytics_statistics(db: Session = Depends(get_db)):
         Statistics about analyses, caching, and performance
     """
     try:
-        stats = db_service.get_analysis_statistics(db)
+        stats = await run_db(db_service.get_analysis_statistics)
+        llm_cache = get_llm_cache()
+        stats["llm_cache"] = await get_db_executor().call(llm_cache.stats) if llm_cache else {"enabled": False}
+        stats["token_usage"] = get_token_usage_tracker().stats()
+        stats["llm_scheduler"] = get_llm_scheduler().stats()
+        selection_cache = get_selection_cache()
+        stats["selection_cache"] = selection_cache.stats() if selection_cache else {"enabled": False}
+        result_cache = get_result_memory_cache()
+        stats["result_cache"] = result_cache.stats() if result_cache else {"enabled": False}
+        telemetry_writer = get_telemetry_writer()
+        stats["telemetry_writer"] = telemetry_writer.stats() if telemetry_writer else {"enabled": False}
+        cache_sweeper = get_cache_sweeper()
+        stats["cache_maintenance"] = cache_sweeper.stats() if cache_sweeper else {"enabled": False}
+        payload_store = get_payload_store()
+        stats["payload_store"] = await run_db(payload_store.stats) if payload_store else {"enabled": False}
+        stats["db_executor"] = get_db_executor().stats()
+        sqlite_maintenance = get_sqlite_maintenance()
+        stats["sqlite_maintenance"] = sqlite_maintenance.stats() if sqlite_maintenance else {"enabled": False}
+        dashboard_counters = get_dashboard_counters()
+        stats["dashboard_counters"] = dashboard_counters.stats() if dashboard_counters else {"enabled": False}
         return {
             "success": True,
             "statistics": stats,
@@ -923,20 +1112,60 @@ async def get_analytics_statistics(db: Session = Depends(get_db)):
         )
 
 
+@app.get("/analytics/daily")
+async def get_daily_statistics(days: int = 30):
+    """
+    Get the daily rollup of the dashboard counters
+
+    Args:
+        days: Number of most recent days with activity to return (at most 366)
+
+    Returns:
+        Net change of each counter per day, oldest first
+    """
+    dashboard_counters = get_dashboard_counters()
+    if dashboard_counters is None or not settings.STATS_DAILY_ROLLUP:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Daily statistics are disabled (STATS_COUNTERS_ENABLED / STATS_DAILY_ROLLUP)"
+        )
+    try:
+        daily = await run_db(dashboard_counters.daily, days=max(1, min(days, 366)))
+        return {
+            "success": True,
+            "count": len(daily),
+            "days": daily,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting daily statistics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get daily statistics: {str(e)}"
+        )
+
+
 @app.get("/analytics/agent-performance")
-async def get_agent_performance_stats(db: Session = Depends(get_db)):
+async def get_agent_performance_stats(window_hours: float = 24):
     """
     Get performance statistics for all agents
 
+    Args:
+        window_hours: Time window of the latency percentiles (0 = all retained history)
+
     Returns:
-        Performance metrics for each agent
+        Performance metrics for each agent, with p50/p95/p99 latency per phase
     """
     try:
-        performance = db_service.get_all_agent_performance(db)
+        performance = await run_db(db_service.get_all_agent_performance)
+        latency = await run_db(db_service.get_agent_latency, window_hours=max(0.0, window_hours))
         return {
             "success": True,
             "count": len(performance),
-            "agent_performance": [p.to_dict() for p in performance],
+            "window_hours": window_hours,
+            "agent_performance": [
+                {**p.to_dict(), "latency": latency.get(p.agent_name, {})} for p in performance
+            ],
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -947,8 +1176,57 @@ async def get_agent_performance_stats(db: Session = Depends(get_db)):
         )
 
 
+@app.get("/analytics/agent-latency")
+async def get_agent_latency_trend(
+    agent_name: Optional[str] = None,
+    phase: str = PHASE_TOTAL,
+    window_hours: float = 24,
+    step_minutes: int = 60
+):
+    """
+    Get the latency trend of an agent (or all agents) over time
+
+    Args:
+        agent_name: Agent name (all agents merged when omitted)
+        phase: total, code_generation, execution or explanation
+        window_hours: How far back to look (0 = all retained history)
+        step_minutes: Length of each point (multiple of LATENCY_WINDOW_MINUTES, at most 1440)
+
+    Returns:
+        One p50/p95/p99 summary per step, oldest first
+    """
+    if phase not in PHASES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown phase '{phase}' (expected one of: {', '.join(PHASES)})"
+        )
+    try:
+        step = max(settings.LATENCY_WINDOW_MINUTES, min(step_minutes, 1440))
+        trend = await run_db(
+            db_service.get_agent_latency_trend,
+            agent_name=agent_name,
+            phase=phase,
+            window_hours=max(0.0, window_hours),
+            step_minutes=step
+        )
+        return {
+            "success": True,
+            "agent_name": agent_name,
+            "phase": phase,
+            "step_minutes": step,
+            "trend": trend,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting agent latency trend: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get agent latency trend: {str(e)}"
+        )
+
+
 @app.delete("/cache/clear-expired")
-async def clear_expired_cache(db: Session = Depends(get_db)):
+async def clear_expired_cache():
     """
     Clear all expired cache entries
 
@@ -956,11 +1234,13 @@ async def clear_expired_cache(db: Session = Depends(get_db)):
         Number of cache entries cleared
     """
     try:
-        cleared_count = db_service.clear_expired_cache(db)
+        cleared_count = await run_db(db_service.clear_expired_cache)
+        agent_cleared_count = await run_db(db_service.clear_expired_agent_cache)
         return {
             "success": True,
             "cleared_count": cleared_count,
-            "message": f"Cleared {cleared_count} expired cache entries",
+            "agent_cleared_count": agent_cleared_count,
+            "message": f"Cleared {cleared_count} expired cache entries and {agent_cleared_count} expired agent results",
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
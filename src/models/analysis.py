@@ -2,7 +2,7 @@
 Analysis-related database models
 """
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, JSON, ForeignKey, Text, Index
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, DateTime, JSON, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -57,8 +57,35 @@ class Analysis(Base):
     __table_args__ = (
         Index('idx_user_created', 'user_id', 'created_at'),
         Index('idx_status_created', 'status', 'created_at'),
+        Index('idx_created_id', 'created_at', 'id'),  # keyset pagination of history
     )
 
+    # Columns needed to list analyses (everything except the large JSON results)
+    SUMMARY_COLUMNS = (
+        "id", "user_id", "filename", "user_question", "status", "selected_agents",
+        "created_at", "started_at", "completed_at", "execution_time_ms", "is_cached",
+    )
+
+    # Large columns that can be requested individually
+    DETAIL_COLUMNS = ("data_sample", "agent_results", "report", "errors")
+
+    def to_summary_dict(self):
+        """List view of the analysis (only SUMMARY_COLUMNS are read)"""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "filename": self.filename,
+            "user_question": self.user_question,
+            "status": self.status,
+            "selected_agents": self.selected_agents,
+            "agent_count": len(self.selected_agents or []),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "execution_time_ms": self.execution_time_ms,
+            "is_cached": self.is_cached,
+        }
+
     def to_dict(self):
         """Convert to dictionary for API responses"""
         return {
@@ -246,4 +273,102 @@ class AgentCachedResult(Base):
             "last_accessed": self.last_accessed.isoformat() if self.last_accessed else None,
             "access_count": self.access_count,
             "expires_at": self.expires_at.isoformat() if self.expires_at else None,
-        }
\ No newline at end of file
+        }
+
+class AgentCodeLibraryEntry(Base):
+    """Generated agent code that ran successfully, reusable on data with the same schema"""
+    __tablename__ = "agent_code_library"
+
+    # Primary key
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    # Library key (hash of agent + schema fingerprint + normalized question)
+    library_key = Column(String(64), nullable=False, unique=True, index=True)
+
+    # What the code was generated for
+    agent_name = Column(String(100), nullable=False, index=True)
+    schema_fingerprint = Column(String(64), nullable=False, index=True)
+    normalized_question = Column(Text, nullable=False)
+    source_analysis_id = Column(String(36), nullable=True)  # Analysis that generated the code
+
+    # The script
+    code = Column(Text, nullable=False)
+    description = Column(Text, nullable=True)
+
+    # Success history
+    success_count = Column(Integer, nullable=False, default=0)
+    failure_count = Column(Integer, nullable=False, default=0)
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    last_success_at = Column(DateTime, nullable=True)
+    last_failure_at = Column(DateTime, nullable=True)
+
+    # Metadata
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_used_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('idx_code_library_agent_schema', 'agent_name', 'schema_fingerprint'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "library_key": self.library_key,
+            "agent_name": self.agent_name,
+            "schema_fingerprint": self.schema_fingerprint,
+            "normalized_question": self.normalized_question,
+            "source_analysis_id": self.source_analysis_id,
+            "description": self.description,
+            "success_count": self.success_count,
+            "failure_count": self.failure_count,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success_at": self.last_success_at.isoformat() if self.last_success_at else None,
+            "last_failure_at": self.last_failure_at.isoformat() if self.last_failure_at else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "last_used_at": self.last_used_at.isoformat() if self.last_used_at else None,
+        }
+
+
+class PayloadBlob(Base):
+    """Compressed, content-addressed JSON payload referenced from result columns"""
+    __tablename__ = "payload_blobs"
+
+    # SHA-256 of the canonical JSON
+    content_hash = Column(String(64), primary_key=True)
+
+    # Compressed payload
+    codec = Column(String(10), nullable=False)  # zstd or zlib
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    stored_size = Column(Integer, nullable=False)
+
+    # Hashes of blobs referenced from inside this one (walked by garbage collection)
+    children = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped whenever a new row reuses the blob (garbage collection's grace period counts from here)
+    last_referenced_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class AgentLatencyBucket(Base):
+    """One latency histogram bucket per agent, phase and time window"""
+    __tablename__ = "agent_latency_buckets"
+
+    # Histogram coordinates (see services/latency_histogram.py for the bucket bounds)
+    agent_name = Column(String(100), primary_key=True)
+    phase = Column(String(30), primary_key=True)  # total, code_generation, execution, explanation
+    window_start = Column(DateTime, primary_key=True, index=True)
+    bucket = Column(Integer, primary_key=True)
+
+    # Durations counted in the bucket and their sum (for exact means)
+    count = Column(Integer, nullable=False, default=0)
+    total_ms = Column(BigInteger, nullable=False, default=0)
+
+
+class DashboardCounter(Base):
+    """Incrementally maintained dashboard statistic (all-time total or one day's net change)"""
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String(80), primary_key=True)  # e.g. analyses, analyses.status.completed, cache.hits
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD, or "total" for the all-time value
+    value = Column(BigInteger, nullable=False, default=0)
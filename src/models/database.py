@@ -27,6 +27,18 @@ MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
 POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
 POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))  # Recycle connections after 1 hour
 
+# SQLite profile: WAL, tuned pragmas, busy timeout and one in-process writer at a time
+SQLITE_PROFILE_ENABLED = os.getenv("SQLITE_PROFILE_ENABLED", "true").lower() in ["true", "1", "yes"]
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_SERIALIZE_WRITES = os.getenv("SQLITE_SERIALIZE_WRITES", "true").lower() in ["true", "1", "yes"]
+
+# Write gate of the SQLite engine (None for other databases or when writes are not serialised)
+sqlite_write_gate = None
+
 # Create engine with connection pooling
 if "sqlite" in DATABASE_URL:
     # SQLite doesn't support connection pooling
@@ -36,6 +48,18 @@ if "sqlite" in DATABASE_URL:
         echo=False,
         pool_pre_ping=True,
     )
+    if SQLITE_PROFILE_ENABLED:
+        from .sqlite_profile import apply_sqlite_profile
+
+        sqlite_write_gate = apply_sqlite_profile(
+            engine,
+            journal_mode=SQLITE_JOURNAL_MODE,
+            synchronous=SQLITE_SYNCHRONOUS,
+            busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS,
+            cache_size_mb=SQLITE_CACHE_SIZE_MB,
+            mmap_size_mb=SQLITE_MMAP_SIZE_MB,
+            serialize_writes=SQLITE_SERIALIZE_WRITES,
+        )
 else:
     # PostgreSQL and other databases with connection pooling
     engine = create_engine(
@@ -0,0 +1,157 @@
+"""
+SQLite production profile
+WAL journaling, tuned pragmas and a busy timeout on every connection, plus a
+process-wide write gate so concurrent analyses queue for the single SQLite
+writer instead of failing with "database is locked"
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statements that make pysqlite open a write transaction
+WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+# Connection info key marking a connection that holds the write gate
+GATE_KEY = "sqlite_write_gate"
+
+
+class SqliteWriteGate:
+    """
+    Serialises write transactions of one process
+
+    SQLite allows a single writer at a time. A connection takes the gate right
+    before its first INSERT/UPDATE/DELETE (where pysqlite begins the write
+    transaction) and gives it back when it returns to the pool, i.e. after the
+    commit or rollback. Reads never take the gate, so with WAL they run
+    concurrently with the writer. Writers of other processes are still
+    handled by SQLite's busy timeout.
+
+    The gate is a plain lock rather than an RLock: a session may move between
+    DB executor threads between calls.
+    """
+
+    def __init__(self, timeout_seconds: float = 5.0):
+        """
+        Initialize gate
+
+        Args:
+            timeout_seconds: Longest wait for the gate; after that the write proceeds
+                ungated and SQLite's own busy handling applies
+        """
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats_counters = {"acquired": 0, "contended": 0, "timeouts": 0, "wait_ms_total": 0, "wait_ms_max": 0}
+
+    def acquire(self, connection_info: Dict[str, Any]):
+        """Take the gate for a pooled connection, given its info dict (no-op if it already holds it)"""
+        if connection_info.get(GATE_KEY):
+            return
+        started = time.perf_counter()
+        contended = not self._lock.acquire(blocking=False)
+        acquired = not contended or self._lock.acquire(timeout=self.timeout_seconds)
+        waited_ms = int((time.perf_counter() - started) * 1000)
+        with self._stats_lock:
+            counters = self.stats_counters
+            if contended:
+                counters["contended"] += 1
+                counters["wait_ms_total"] += waited_ms
+                counters["wait_ms_max"] = max(counters["wait_ms_max"], waited_ms)
+            if acquired:
+                counters["acquired"] += 1
+            else:
+                counters["timeouts"] += 1
+        if acquired:
+            connection_info[GATE_KEY] = True
+        else:
+            logger.warning(f"SQLite write gate busy for {waited_ms}ms; writing without it")
+
+    def release(self, connection_info: Dict[str, Any]):
+        """Give the gate back if this connection holds it"""
+        if connection_info.pop(GATE_KEY, False):
+            self._lock.release()
+
+    def hold(self):
+        """Context manager holding the gate outside the pool (checkpoint, VACUUM)"""
+        return self._lock
+
+    def stats(self) -> Dict[str, Any]:
+        """Gate counters"""
+        with self._stats_lock:
+            return {**self.stats_counters, "held": self._lock.locked()}
+
+
+def apply_sqlite_profile(
+    engine: Engine,
+    journal_mode: str = "WAL",
+    synchronous: str = "NORMAL",
+    busy_timeout_ms: int = 5000,
+    cache_size_mb: int = 64,
+    mmap_size_mb: int = 256,
+    serialize_writes: bool = True,
+) -> Optional[SqliteWriteGate]:
+    """
+    Apply the profile to a SQLite engine
+
+    Args:
+        engine: Engine using the pysqlite driver
+        journal_mode: PRAGMA journal_mode (WAL lets readers run while a write is in progress)
+        synchronous: PRAGMA synchronous (NORMAL is durable across application crashes in WAL mode)
+        busy_timeout_ms: How long SQLite waits for a lock held by another connection
+        cache_size_mb: Page cache per connection
+        mmap_size_mb: Memory-mapped I/O size (0 disables)
+        serialize_writes: Queue in-process writers on a SqliteWriteGate
+
+    Returns:
+        The engine's SqliteWriteGate, or None when writes are not serialised
+    """
+    pragmas = [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA cache_size={-int(cache_size_mb * 1024)}",
+        f"PRAGMA mmap_size={int(mmap_size_mb * 1024 * 1024)}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    logger.info(
+        f"SQLite profile: journal_mode={journal_mode}, synchronous={synchronous}, "
+        f"busy_timeout={busy_timeout_ms}ms, cache={cache_size_mb}MB, mmap={mmap_size_mb}MB, "
+        f"serialized writes={'on' if serialize_writes else 'off'}"
+    )
+    if not serialize_writes:
+        return None
+
+    gate = SqliteWriteGate(timeout_seconds=busy_timeout_ms / 1000)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _gate_writes(conn, cursor, statement, parameters, context, executemany):
+        if WRITE_STATEMENT.match(statement):
+            gate.acquire(conn.connection.info)
+
+    @event.listens_for(engine.pool, "checkin")
+    def _release_on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            gate.release(connection_record.info)
+
+    @event.listens_for(engine.pool, "invalidate")
+    def _release_on_invalidate(dbapi_connection, connection_record, exception):
+        gate.release(connection_record.info)
+
+    return gate
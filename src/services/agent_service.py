@@ -2,9 +2,9 @@
 Agent management and execution service
 """
 
-import yaml
 import os
 import sys
+import hashlib
 import json
 import logging
 import asyncio
@@ -15,8 +15,11 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
-from services.claude_service import ClaudeService
+from services.service_registry import get_config, get_claude_service
+from services.claude_service import agent_prompt_signature
 from utils.data_processor import DataProcessor, clean_nan_values
+from services.explanations import load_structured_results
+from services.token_budget import CALL_CODE_GENERATION, CALL_REPORT
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -26,9 +29,19 @@ class AgentService:
     """Service for managing and executing analysis agents"""
     
     def __init__(self):
-        self.claude_service = ClaudeService()
+        self.claude_service = get_claude_service()
         self.data_processor = DataProcessor()
-        self.agents = self._load_agents()
+        self._config_version = get_config().version
+        self._agents = self._load_agents()
+    
+    @property
+    def agents(self) -> Dict[str, Any]:
+        """Loaded agent instances, re-overlaid when the config.yaml snapshot changes"""
+        snapshot = get_config()
+        if snapshot.version != self._config_version:
+            self._config_version = snapshot.version
+            self._apply_agent_configs(self._agents, snapshot.agent_configs)
+        return self._agents
         
     def _load_agents(self) -> Dict[str, Any]:
         """Dynamically load agent classes from individual files with centralized config"""
@@ -95,22 +108,18 @@ class AgentService:
                     # Instantiate the agent
                     agent_instance = agent_class()
                     
-                    # Overlay metadata from config.yaml if available
-                    if module_name in agent_configs:
-                        config = agent_configs[module_name]
-                        agent_instance.display_name = config.get('name', agent_instance.display_name)
-                        agent_instance.description = config.get('description', agent_instance.description)
-                        agent_instance.specialties = config.get('specialties', agent_instance.specialties)
-                        agent_instance.keywords = config.get('keywords', agent_instance.keywords)
-                        agent_instance.output_type = config.get('output_type', agent_instance.output_type)
-                        
-                        # logger.info(f"Applied config for agent: {agent_instance.name}")
-                    
+                    # Keep class defaults so a config reload can overlay from a clean base
+                    agent_instance._default_metadata = {
+                        attr: getattr(agent_instance, attr, None) for attr in self._CONFIG_OVERLAY_ATTRS.values()
+                    }
                     agents[agent_instance.name] = agent_instance
                     
                 except Exception as e:
                     logger.error(f"Failed to load agent {module_name}: {str(e)}")
             
+            # Overlay metadata from config.yaml if available
+            self._apply_agent_configs(agents, agent_configs)
+            
             logger.info(f"Loaded {len(agents)} analysis agents")
             return agents
             
@@ -118,16 +127,43 @@ class AgentService:
             logger.error(f"Error loading agents: {str(e)}")
             return {}
     
+    # config.yaml key -> agent attribute
+    _CONFIG_OVERLAY_ATTRS = {
+        'name': 'display_name',
+        'description': 'description',
+        'specialties': 'specialties',
+        'keywords': 'keywords',
+        'output_type': 'output_type',
+    }
+    
+    def _apply_agent_configs(self, agents: Dict[str, Any], agent_configs: Dict[str, Any]):
+        """Overlay display metadata from config.yaml onto loaded agent instances"""
+        for agent_name, agent_instance in agents.items():
+            defaults = getattr(agent_instance, '_default_metadata', {})
+            config = agent_configs.get(agent_name, {})
+            for config_key, attr in self._CONFIG_OVERLAY_ATTRS.items():
+                setattr(agent_instance, attr, config.get(config_key, defaults.get(attr)))
+    
     def _load_agent_configs(self) -> Dict[str, Any]:
-        """Load agent configurations from config.yaml"""
-        try:
-            config_path = Path(__file__).parent.parent / "agents" / "config.yaml"
-            with open(config_path, 'r', encoding='utf-8') as file:
-                config_data = yaml.safe_load(file)
-                return config_data.get('agents', {})
-        except Exception as e:
-            logger.error(f"Error loading agent configs: {str(e)}")
-            return {}
+        """Agent configurations from the shared config.yaml snapshot"""
+        return get_config().agent_configs
+
+    def agent_cache_version(self, agent_name: str) -> str:
+        """
+        Version of an agent's prompts and configuration, part of its result cache key
+
+        Changes when the agent's config.yaml entry (e.g. its prompt_version), the
+        claude_api, token_budget or explanation sections, or ClaudeService's code
+        generation and explanation prompt templates change.
+
+        Args:
+            agent_name: Agent name
+
+        Returns:
+            Short hex digest
+        """
+        signature = get_config().agent_signatures.get(agent_name, "")
+        return hashlib.sha256(f"{signature}:{agent_prompt_signature()}".encode()).hexdigest()[:16]
     
     async def analyze_request(self, file_content: bytes, filename: str, 
                             user_question: str, selected_agents: Optional[List[str]] = None,
@@ -145,7 +181,7 @@ class AgentService:
         """
         try:
             # Process data sample
-            data_sample = self.data_processor.read_file_sample(
+            data_sample = await self.data_processor.read_file_sample_async(
                 file_content, filename, sample_rows=5
             )
             
@@ -192,7 +228,7 @@ class AgentService:
         """Plan which agents to run and return data sample plus agent metadata without execution."""
         try:
             # Create data sample
-            data_sample = self.data_processor.read_file_sample(
+            data_sample = await self.data_processor.read_file_sample_async(
                 file_content, filename, sample_rows=5
             )
 
@@ -409,7 +445,7 @@ class AgentService:
             prompt = agent.get_analysis_prompt(data_sample, user_question)
             
             # Use Claude to generate the code
-            response = await self.claude_service._call_claude_api(prompt)
+            response = await self.claude_service._call_claude_api(prompt, call_type=CALL_CODE_GENERATION)
             
             # Parse the response
             code_result = self.claude_service._parse_code_generation_response(response)
@@ -539,6 +575,7 @@ class AgentService:
                 "error": result.get("error"),
                 "execution_time": result.get("execution_time"),
                 "output_files": output_files,
+                "structured_results": load_structured_results(temp_path),
                 "insights": code_result.get("insights", "")
             }
                 
@@ -1084,7 +1121,10 @@ except Exception as e:
             )
             
             # Use Claude to generate the report
-            report_content = await self.claude_service._call_claude_api(report_prompt)
+            report_content = await self.claude_service._call_claude_api(
+                report_prompt, prefix=self.claude_service.build_dataset_context(data_sample),
+                call_type=CALL_REPORT
+            )
             
             return {
                 "content": report_content,
@@ -0,0 +1,299 @@
+"""
+Cache maintenance
+Keeps the cached_analyses and agent_cached_results tables within byte budgets:
+a background sweeper removes expired rows and evicts by LRU or LFU once a
+table grows past its budget. The same pass drops latency histogram windows
+past their retention.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Text, case, cast, func
+from sqlalchemy.orm import Session
+
+from config import settings
+from services.dashboard_counters import count_removed_cache_rows
+from services.database_service import DatabaseService
+from services.latency_histogram import prune_latency_buckets
+from services.llm_cache import get_llm_cache
+from services.payload_store import REF_KEY, PayloadStore, get_payload_store, is_ref
+from services.result_cache import TIER_AGENT, TIER_ANALYSIS, get_result_memory_cache
+from services.telemetry_writer import CACHE_MODELS
+
+logger = logging.getLogger(__name__)
+
+POLICY_LRU = "lru"
+POLICY_LFU = "lfu"
+EVICTION_POLICIES = (POLICY_LRU, POLICY_LFU)
+
+# Rows deleted per DELETE statement
+DELETE_CHUNK = 200
+
+# Column text shorter than this may be a payload-store reference
+REF_TEXT_MAX = 256
+
+
+def _payload_column(model: Any):
+    return model.cached_result if model is CACHE_MODELS[TIER_ANALYSIS] else model.result
+
+
+class CacheSweeper:
+    """
+    Periodic expiry and size-based eviction for the result cache tables, plus
+    expiry of the Claude response cache
+
+    Row sizes are measured in the database (length of the serialized JSON,
+    or the compressed size of the payload-store blobs a row references), so
+    sweeping never loads the cached payloads. When a table exceeds its
+    budget, rows are evicted in policy order until it is back under
+    budget * low_watermark, which keeps the next few saves from triggering
+    another eviction straight away.
+
+    Usage:
+        sweeper = get_cache_sweeper()
+        await sweeper.start()
+        report = sweeper.sweep()
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        budgets: Dict[str, int],
+        policy: str = POLICY_LRU,
+        interval_seconds: float = 600,
+        low_watermark: float = 0.9,
+        latency_retention_days: int = 0,
+    ):
+        """
+        Initialize sweeper
+
+        Args:
+            session_factory: Creates the session used by each sweep
+            budgets: Byte budget per tier (TIER_ANALYSIS, TIER_AGENT); 0 disables eviction
+            policy: "lru" (oldest last_accessed first) or "lfu" (lowest access_count first)
+            interval_seconds: Seconds between background sweeps
+            low_watermark: Share of the budget to evict down to
+            latency_retention_days: Days of latency histograms to keep (0 keeps everything)
+        """
+        if policy not in EVICTION_POLICIES:
+            logger.warning(f"Unknown cache eviction policy '{policy}', using {POLICY_LRU}")
+            policy = POLICY_LRU
+        self.session_factory = session_factory
+        self.budgets = budgets
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self.low_watermark = low_watermark
+        self.latency_retention_days = latency_retention_days
+        self._sweep_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats_counters = {"sweeps": 0, "failed_sweeps": 0, "expired_removed": 0, "evicted": 0, "evicted_bytes": 0,
+                               "payload_blobs_deleted": 0, "latency_buckets_pruned": 0, "llm_responses_purged": 0}
+        self.last_sweep: Dict[str, Any] = {}
+
+    def _eviction_order(self, model: Any) -> List[Any]:
+        if self.policy == POLICY_LFU:
+            return [model.access_count.asc(), model.last_accessed.asc()]
+        return [model.last_accessed.asc(), model.access_count.asc()]
+
+    def _expire(self, db: Session, model: Any) -> List[str]:
+        """Delete expired rows; returns their cache keys"""
+        now = datetime.utcnow()
+        keys = [key for (key,) in db.query(model.cache_key).filter(model.expires_at < now).all()]
+        for start in range(0, len(keys), DELETE_CHUNK):
+            chunk = keys[start:start + DELETE_CHUNK]
+            count_removed_cache_rows(db, model, model.cache_key.in_(chunk))
+            db.query(model).filter(model.cache_key.in_(chunk)).delete(synchronize_session=False)
+        db.commit()
+        return keys
+
+    def _row_sizes(self, db: Session, model: Any) -> List[Tuple[str, int]]:
+        """
+        (cache_key, bytes) per row in eviction order
+
+        Inline rows count their JSON length; rows holding a payload-store
+        reference count the compressed blobs they reference.
+        """
+        text = cast(_payload_column(model), Text)
+        size = func.coalesce(func.length(text), 0)
+        rows = (
+            db.query(model.cache_key, size, case((size < REF_TEXT_MAX, text), else_=None))
+            .order_by(*self._eviction_order(model))
+            .all()
+        )
+        refs: Dict[str, str] = {}
+        for cache_key, _, small_text in rows:
+            if small_text:
+                try:
+                    value = json.loads(small_text)
+                except ValueError:
+                    continue
+                if is_ref(value):
+                    refs[cache_key] = value[REF_KEY]
+        blob_sizes = PayloadStore.stored_sizes(db, set(refs.values())) if refs else {}
+        return [
+            (cache_key, blob_sizes.get(refs[cache_key], row_size) if cache_key in refs else row_size)
+            for cache_key, row_size, _ in rows
+        ]
+
+    def _evict(self, db: Session, model: Any, budget: int) -> Dict[str, Any]:
+        """Evict rows in policy order while the table is over budget"""
+        rows = self._row_sizes(db, model)
+        total = sum(row_size for _, row_size in rows)
+        report = {"rows": len(rows), "bytes": total, "budget_bytes": budget, "evicted": 0, "evicted_bytes": 0, "evicted_keys": []}
+        if not budget or total <= budget:
+            return report
+
+        target = int(budget * self.low_watermark)
+        for cache_key, row_size in rows:
+            if total <= target:
+                break
+            report["evicted_keys"].append(cache_key)
+            report["evicted_bytes"] += row_size
+            total -= row_size
+        keys = report["evicted_keys"]
+        for start in range(0, len(keys), DELETE_CHUNK):
+            chunk = keys[start:start + DELETE_CHUNK]
+            count_removed_cache_rows(db, model, model.cache_key.in_(chunk))
+            db.query(model).filter(model.cache_key.in_(chunk)).delete(synchronize_session=False)
+        db.commit()
+        report.update(rows=len(rows) - len(keys), bytes=total, evicted=len(keys))
+        return report
+
+    def sweep(self) -> Dict[str, Any]:
+        """
+        Run one maintenance pass over both cache tables
+
+        Returns:
+            Per-table report (rows, bytes, budget_bytes, expired, evicted, evicted_bytes)
+            plus duration_ms; an "error" key if the sweep failed
+        """
+        with self._sweep_lock:
+            started = time.perf_counter()
+            # Access counts drive the eviction order, so write buffered hits first
+            DatabaseService.flush_telemetry()
+            memory = get_result_memory_cache()
+            report: Dict[str, Any] = {"policy": self.policy}
+            db = self.session_factory()
+            try:
+                for tier in (TIER_ANALYSIS, TIER_AGENT):
+                    model = CACHE_MODELS[tier]
+                    expired = self._expire(db, model)
+                    table = self._evict(db, model, self.budgets.get(tier, 0))
+                    removed = expired + table.pop("evicted_keys")
+                    if memory is not None:
+                        for cache_key in removed:
+                            memory.invalidate(tier, cache_key)
+                        memory.purge_expired(tier)
+                    table["expired"] = len(expired)
+                    report[model.__tablename__] = table
+                    self.stats_counters["expired_removed"] += len(expired)
+                    self.stats_counters["evicted"] += table["evicted"]
+                    self.stats_counters["evicted_bytes"] += table["evicted_bytes"]
+                # Blobs only referenced by the rows just removed
+                payload_store = get_payload_store()
+                if payload_store is not None:
+                    report["payload_blobs_deleted"] = payload_store.collect_garbage(db)
+                    self.stats_counters["payload_blobs_deleted"] += report["payload_blobs_deleted"]
+                # Claude response cache (its own SQLite file and memory tier)
+                llm_cache = get_llm_cache()
+                if llm_cache is not None:
+                    report["llm_responses_purged"] = llm_cache.purge_expired()
+                    self.stats_counters["llm_responses_purged"] += report["llm_responses_purged"]
+                if self.latency_retention_days:
+                    report["latency_buckets_pruned"] = prune_latency_buckets(db, self.latency_retention_days)
+                    db.commit()
+                    self.stats_counters["latency_buckets_pruned"] += report["latency_buckets_pruned"]
+                self.stats_counters["sweeps"] += 1
+            except Exception as e:
+                db.rollback()
+                self.stats_counters["failed_sweeps"] += 1
+                logger.error(f"Cache sweep failed: {e}")
+                report["error"] = str(e)
+            finally:
+                db.close()
+
+            report["duration_ms"] = int((time.perf_counter() - started) * 1000)
+            report["finished_at"] = datetime.utcnow().isoformat()
+            self.last_sweep = report
+            if "error" not in report:
+                logger.info(
+                    "Cache sweep: " + ", ".join(
+                        f"{name} {t['rows']} rows/{t['bytes']} bytes (-{t['expired']} expired, -{t['evicted']} evicted)"
+                        for name, t in report.items() if isinstance(t, dict)
+                    ) + f" in {report['duration_ms']}ms"
+                )
+            return report
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Cache sweeper loop error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def start(self):
+        """Start periodic sweeping (the first sweep runs immediately)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Cache sweeper started (every {self.interval_seconds}s, policy={self.policy})")
+
+    async def stop(self):
+        """Stop periodic sweeping"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, configuration and the last sweep's report"""
+        return {
+            **self.stats_counters,
+            "policy": self.policy,
+            "interval_seconds": self.interval_seconds,
+            "budgets_bytes": {CACHE_MODELS[tier].__tablename__: budget for tier, budget in self.budgets.items()},
+            "last_sweep": self.last_sweep,
+        }
+
+
+# Singleton instance
+_cache_sweeper: Optional[CacheSweeper] = None
+
+
+def get_cache_sweeper() -> Optional[CacheSweeper]:
+    """
+    Get or create the cache sweeper (None when CACHE_SWEEPER_ENABLED is off)
+
+    Returns:
+        CacheSweeper instance or None
+    """
+    global _cache_sweeper
+
+    if not settings.CACHE_SWEEPER_ENABLED:
+        return None
+
+    if _cache_sweeper is None:
+        from models.database import SessionLocal
+
+        _cache_sweeper = CacheSweeper(
+            session_factory=SessionLocal,
+            budgets={
+                TIER_ANALYSIS: settings.CACHE_ANALYSIS_MAX_MB * 1024 * 1024,
+                TIER_AGENT: settings.CACHE_AGENT_MAX_MB * 1024 * 1024,
+            },
+            policy=settings.CACHE_EVICTION_POLICY.lower(),
+            interval_seconds=settings.CACHE_SWEEP_INTERVAL_SECONDS,
+            low_watermark=settings.CACHE_EVICTION_LOW_WATERMARK,
+            latency_retention_days=settings.LATENCY_RETENTION_DAYS,
+        )
+
+    return _cache_sweeper
@@ -2,14 +2,28 @@
 Claude API integration service for agent selection and code generation
 """
 
+import hashlib
+import inspect
 import json
 import logging
+import re
 import yaml
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 import asyncio
-from pathlib import Path
-import httpx
 from config import settings
+from services.service_registry import get_config
+from services.http_client import get_http_client
+from services.code_stream import StreamingCodeExtractor, iter_sse_events
+from services.llm_cache import get_llm_cache, make_llm_cache_key
+from services.llm_transport import is_replay_mode
+from services.selection_cache import get_selection_cache, make_selection_key, schema_fingerprint
+from services.llm_scheduler import get_llm_scheduler, parse_retry_after, priority_for
+from services.token_budget import (
+    CALL_CODE_GENERATION, CALL_DEFAULT, CALL_EXPLANATION, CALL_EXPLANATION_BATCH, CALL_SELECTION,
+    build_previous_results_context, estimate_tokens, get_token_budget_config,
+    get_token_usage_tracker, max_tokens_for,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +36,24 @@ except ImportError:
     logger.warning("Circuit breaker not available, proceeding without it")
 
 
+# Prompt builders that shape an agent's generated code and explanations
+AGENT_PROMPT_BUILDERS = (
+    "build_dataset_context",
+    "_create_code_generation_prompt",
+    "_parse_code_generation_response",
+    "explain_execution",
+    "explain_executions_batch",
+)
+
+
+@lru_cache(maxsize=1)
+def agent_prompt_signature() -> str:
+    """Digest of the agent prompt templates (the builders' source), part of every agent result cache key"""
+    sources = [inspect.getsource(getattr(ClaudeService, name)) for name in AGENT_PROMPT_BUILDERS]
+    sources.append(inspect.getsource(build_previous_results_context))
+    return hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()
+
+
 class ClaudeService:
     """Service for interacting with Claude API"""
     
@@ -32,51 +64,23 @@ class ClaudeService:
         self.temperature = settings.CLAUDE_TEMPERATURE
         self.base_url = "https://api.anthropic.com/v1/messages"
         
-        # Load configurations dynamically (agents + execution plan)
-        self.agent_configs, self.execution_config = self._load_configs()
-        
         if not self.api_key:
             logger.warning("ANTHROPIC_API_KEY not found in environment variables")
     
-    def _load_configs(self) -> (Dict[str, Any], Dict[str, Any]):
-        """Load agent and execution configurations from config.yaml"""
-        try:
-            # Get the directory where this file is located
-            current_dir = Path(__file__).parent
-            project_root = current_dir.parent  # Go up one level from services/ to src/
-            
-            # Try multiple possible paths for the config file
-            possible_paths = [
-                project_root / "agents" / "config.yaml",  # src/agents/config.yaml
-                current_dir / "agents" / "config.yaml",   # services/agents/config.yaml
-                Path("agents/config.yaml"),               # agents/config.yaml (relative to cwd)
-                Path("src/agents/config.yaml"),           # src/agents/config.yaml (relative to cwd)
-            ]
-            
-            config_data = None
-            used_path = None
-            
-            for config_path in possible_paths:
-                try:
-                    if config_path.exists():
-                        with open(config_path, 'r', encoding='utf-8') as file:
-                            config_data = yaml.safe_load(file)
-                            used_path = str(config_path)
-                            break
-                except Exception as e:
-                    logger.debug(f"Failed to load from {config_path}: {e}")
-                    continue
-            
-            if config_data is None:
-                logger.error(f"Could not find config.yaml in any of these paths: {[str(p) for p in possible_paths]}")
-                return {}, {}
-            
-            agents_config = config_data.get('agents', {})
-            execution_config = config_data.get('execution', {})
-            return agents_config, execution_config
-        except Exception as e:
-            logger.error(f"Error loading agent configs: {str(e)}")
-            return {}, {}
+    @property
+    def agent_configs(self) -> Dict[str, Any]:
+        """Agent configurations from the shared config.yaml snapshot"""
+        return get_config().agent_configs
+    
+    @property
+    def execution_config(self) -> Dict[str, Any]:
+        """Execution plan from the shared config.yaml snapshot"""
+        return get_config().execution_config
+
+    @property
+    def token_budget(self) -> Dict[str, Any]:
+        """Token budgets from config.yaml (token_budget section)"""
+        return get_token_budget_config(get_config().raw, self.max_tokens)
     
     def _generate_agents_section(self) -> str:
         """Generate the agents section for the prompt dynamically from config"""
@@ -291,21 +295,39 @@ class ClaudeService:
         # Fallback to hardcoded defaults if config not available
         return ["data_quality_audit", "exploratory_data_analysis", "statistical_analysis"]
     
-    async def select_agents(self, data_sample: Dict[str, Any], user_question: str) -> List[str]:
+    async def select_agents(self, data_sample: Dict[str, Any], user_question: str,
+                            bypass_cache: bool = False) -> List[str]:
         """
         Use Claude to select appropriate agents based on data sample and user question
         
         Args:
             data_sample: Sample data from DataProcessor
             user_question: User's analysis question
+            bypass_cache: Skip the LLM response cache lookup
             
         Returns:
             List of selected agent names
         """
         try:
+            # Same schema + equivalent question + same agent catalogue -> same selection
+            selection_cache = get_selection_cache()
+            selection_key = None
+            if selection_cache is not None:
+                selection_key = make_selection_key(
+                    schema_fingerprint(data_sample), user_question,
+                    get_config().agent_catalog_signature, self.model
+                )
+                cached_agents = None if bypass_cache else selection_cache.get(selection_key)
+                if cached_agents:
+                    logger.info(f"Agent selection cache hit: {cached_agents}")
+                    return cached_agents
+
             prompt = self._create_agent_selection_prompt(data_sample, user_question)
             
-            response = await self._call_claude_api(prompt)
+            response = await self._call_claude_api(
+                prompt, prefix=self.build_dataset_context(data_sample), bypass_cache=bypass_cache,
+                call_type=CALL_SELECTION
+            )
             
             # Parse the JSON response to get agent names
             agent_names = self._parse_agent_selection_response(response)
@@ -317,6 +339,9 @@ class ClaudeService:
             
             logger.info(f"Selected agents: {agent_names}")
             logger.info(f"Execution order: {ordered_agents}")
+            # Don't cache the defaults the parser falls back to on an unparseable response
+            if selection_cache is not None and agent_names and agent_names != self._get_default_agents():
+                selection_cache.set(selection_key, ordered_agents)
             return ordered_agents
             
         except Exception as e:
@@ -326,7 +351,8 @@ class ClaudeService:
     
     async def generate_agent_code(self, agent_name: str, agent_config: Dict[str, Any],
                                 data_sample: Dict[str, Any], user_question: str,
-                                previous_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                                previous_results: Optional[Dict[str, Any]] = None,
+                                bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Generate Python code for a specific agent to execute
 
@@ -336,6 +362,7 @@ class ClaudeService:
             data_sample: Sample data
             user_question: User's question
             previous_results: Results from all previous agents in the workflow
+            bypass_cache: Skip the LLM response cache lookup
 
         Returns:
             Dict containing generated code and metadata
@@ -345,7 +372,10 @@ class ClaudeService:
                 agent_name, agent_config, data_sample, user_question, previous_results
             )
             
-            response = await self._call_claude_api(prompt)
+            response = await self._call_claude_api(
+                prompt, prefix=self.build_dataset_context(data_sample), bypass_cache=bypass_cache,
+                call_type=CALL_CODE_GENERATION
+            )
             
             # Parse the code generation response
             code_result = self._parse_code_generation_response(response)
@@ -372,51 +402,194 @@ class ClaudeService:
                 "description": "Failed to generate code"
             }
     
-    async def _call_claude_api(self, prompt: str) -> str:
-        """
-        Make API call to Claude with circuit breaker and retry logic
-        
-        Args:
-            prompt: The prompt to send to Claude
-            
-        Returns:
-            Claude's response text
-        """
-        if not self.api_key:
-            raise ValueError("ANTHROPIC_API_KEY not configured")
-        
-        headers = {
+    def _build_headers(self) -> Dict[str, str]:
+        """Request headers for the Messages API"""
+        return {
             "Content-Type": "application/json",
-            "x-api-key": self.api_key,
+            "x-api-key": self.api_key or "",
             "anthropic-version": "2023-06-01"
         }
-        
+
+    def _build_payload(self, prompt: str, stream: bool = False, prefix: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Request body for the Messages API
+
+        Args:
+            prompt: Per-call part of the prompt
+            stream: Request server-sent events
+            prefix: Stable part of the prompt sent first and marked as a cache breakpoint
+            max_tokens: Output token limit (defaults to CLAUDE_MAX_TOKENS)
+        """
+        if prefix:
+            prefix_block = {"type": "text", "text": prefix}
+            if settings.CLAUDE_PROMPT_CACHING:
+                prefix_block["cache_control"] = {"type": "ephemeral"}
+            content: Any = [prefix_block, {"type": "text", "text": prompt}]
+        else:
+            content = prompt
         payload = {
             "model": self.model,
-            "max_tokens": self.max_tokens,
+            "max_tokens": max_tokens or self.max_tokens,
             "temperature": self.temperature,
             "messages": [
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": content
                 }
             ]
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @staticmethod
+    def _log_cache_usage(usage: Optional[Dict[str, Any]]):
+        """Log prompt-cache reads/writes reported by the API"""
+        if not usage:
+            return
+        read = usage.get("cache_read_input_tokens") or 0
+        written = usage.get("cache_creation_input_tokens") or 0
+        if read or written:
+            logger.debug(f"Prompt cache: read={read} written={written} uncached={usage.get('input_tokens', 0)} input tokens")
+
+    @staticmethod
+    def _stable_json(value: Any) -> str:
+        """Deterministic JSON (sorted keys) so identical data always serializes to identical bytes"""
+        return json.dumps(value, indent=2, sort_keys=True, ensure_ascii=False, default=str)
+
+    def build_dataset_context(self, data_sample: Dict[str, Any]) -> str:
+        """
+        Stable dataset preamble shared by every prompt of an analysis
+
+        Sent as the first content block with a cache breakpoint, so selection,
+        code generation, explanations and the report all reuse the same cached
+        prefix. Must only depend on the data sample (never on the agent or call).
+
+        Args:
+            data_sample: Sample data from DataProcessor
+
+        Returns:
+            Prefix text
+        """
+        file_info = data_sample.get('file_info', {}) or {}
+        sample_rows = data_sample.get('sample_data', []) or []
+        return f"""You are assisting with the analysis of the dataset described below. Task-specific instructions follow after it.
+
+DATASET CONTEXT
+- File: {file_info.get('filename', 'unknown')}
+- Total rows: {data_sample.get('total_rows', 0):,}
+- Columns ({len(data_sample.get('columns', []))}): {', '.join(map(str, data_sample.get('columns', [])))}
+
+Data types:
+{self._stable_json(data_sample.get('data_types', {}))}
+
+Missing values:
+{self._stable_json(data_sample.get('missing_values', {}))}
+
+Sample data ({len(sample_rows)} rows):
+{self._stable_json(sample_rows)}
+"""
+
+    def _budget_call(self, call_type: str, prompt: str, prefix: Optional[str]) -> Tuple[int, int]:
+        """
+        Resolve max_tokens for a call and estimate its prompt size
+
+        Returns:
+            Tuple of (max_tokens, estimated_input_tokens)
+        """
+        budget = self.token_budget
+        max_tokens = max_tokens_for(budget, call_type)
+        estimated = estimate_tokens(prefix, budget["chars_per_token"]) + estimate_tokens(prompt, budget["chars_per_token"])
+        if estimated + max_tokens > budget["max_prompt_tokens"]:
+            logger.warning(
+                f"{call_type} prompt is ~{estimated} tokens (+{max_tokens} output), "
+                f"over the {budget['max_prompt_tokens']} token budget"
+            )
+        return max_tokens, estimated
+
+    async def _with_circuit_breaker(self, make_api_call):
+        """Run an API call through the circuit breaker when enabled"""
+        if CIRCUIT_BREAKER_AVAILABLE and settings.CIRCUIT_BREAKER_ENABLED:
+            try:
+                breaker = get_claude_circuit_breaker()
+                return await breaker.call(make_api_call)
+            except CircuitBreakerOpenError as e:
+                logger.error(f"Circuit breaker open: {e}")
+                raise Exception(f"Claude API service temporarily unavailable: {str(e)}")
+        else:
+            # No circuit breaker, just call directly
+            return await make_api_call()
+
+    async def _response_cache_lookup(self, prompt: str, prefix: Optional[str], bypass_cache: bool,
+                                     max_tokens: Optional[int] = None):
+        """
+        Check the LLM response cache
+
+        Returns:
+            Tuple of (cache, key, cached_text); cache is None when disabled, and
+            cached_text is None on a miss or when bypassing (the key is still
+            returned so the fresh response replaces the stored one)
+        """
+        cache = get_llm_cache()
+        if cache is None:
+            return None, None, None
+        key = make_llm_cache_key(self.model, self.temperature, max_tokens or self.max_tokens, prompt, prefix)
+        if bypass_cache:
+            cache.record_bypass()
+            return cache, key, None
+        return cache, key, await cache.aget(key)
+
+    async def _call_claude_api(self, prompt: str, prefix: Optional[str] = None,
+                               bypass_cache: bool = False, call_type: str = CALL_DEFAULT) -> str:
+        """
+        Make API call to Claude with circuit breaker and retry logic
+        
+        Args:
+            prompt: The prompt to send to Claude
+            prefix: Optional cacheable prefix (see build_dataset_context)
+            bypass_cache: Skip the LLM response cache lookup (the response is still stored)
+            call_type: Token budget to apply (token_budget.max_tokens in config.yaml)
+            
+        Returns:
+            Claude's response text
+        """
+        if not self.api_key and not is_replay_mode():
+            raise ValueError("ANTHROPIC_API_KEY not configured")
+        
+        max_tokens, estimated_tokens = self._budget_call(call_type, prompt, prefix)
+        cache, cache_key, cached = await self._response_cache_lookup(prompt, prefix, bypass_cache, max_tokens)
+        if cached is not None:
+            logger.debug("LLM response cache hit")
+            return cached
+
+        headers = self._build_headers()
+        payload = self._build_payload(prompt, prefix=prefix, max_tokens=max_tokens)
         
         # Wrap API call in circuit breaker if enabled
+        scheduler = get_llm_scheduler()
+        priority = priority_for(call_type)
+
         async def make_api_call():
-            # Simple retry with exponential backoff
+            # Retry with jittered backoff, honouring retry-after
             last_err: Optional[Exception] = None
             for attempt in range(3):
+                retry_after: Optional[float] = None
                 try:
-                    async with httpx.AsyncClient(timeout=60.0) as client:
-                        response = await client.post(
+                    async with scheduler.slot(priority, estimated_tokens):
+                        response = await get_http_client().post(
                             self.base_url,
                             headers=headers,
                             json=payload
                         )
+                        scheduler.on_response(response.status_code, response.headers)
                     if response.status_code == 200:
                         result = response.json()
+                        self._log_cache_usage(result.get("usage"))
+                        get_token_usage_tracker().record(
+                            call_type, result.get("usage"), max_tokens,
+                            estimated_tokens, result.get("stop_reason")
+                        )
                         text = result["content"][0]["text"]
                         if settings.SHOW_AGENT_RESPONSE:
                             try:
@@ -428,27 +601,204 @@ class ClaudeService:
                     else:
                         msg = f"Claude API error: {response.status_code} - {response.text[:300]}"
                         last_err = Exception(msg)
+                        retry_after = parse_retry_after(response.headers)
                         logger.warning(msg)
                 except Exception as e:
                     last_err = e
                     logger.warning(f"Claude API call failed (attempt {attempt+1}/3): {e}")
-                # Exponential backoff (only if not last attempt)
+                # Backoff (only if not last attempt)
                 if attempt < 2:  # Don't sleep after last attempt
-                    await asyncio.sleep(0.5 * (2 ** attempt))
+                    await asyncio.sleep(scheduler.retry_delay(attempt, retry_after))
             # If we reached here, all retries failed
             raise last_err if last_err else Exception("Claude API error: unknown")
         
-        # Apply circuit breaker if enabled
-        if CIRCUIT_BREAKER_AVAILABLE and settings.CIRCUIT_BREAKER_ENABLED:
-            try:
-                breaker = get_claude_circuit_breaker()
-                return await breaker.call(make_api_call)
-            except CircuitBreakerOpenError as e:
-                logger.error(f"Circuit breaker open: {e}")
-                raise Exception(f"Claude API service temporarily unavailable: {str(e)}")
-        else:
-            # No circuit breaker, just call directly
-            return await make_api_call()
+        text = await self._with_circuit_breaker(make_api_call)
+        if cache is not None:
+            await cache.aset(cache_key, text)
+        return text
+
+    async def _stream_claude_api(
+        self,
+        prompt: str,
+        on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+        prefix: Optional[str] = None,
+        bypass_cache: bool = False,
+        call_type: str = CALL_DEFAULT
+    ) -> str:
+        """
+        Make a streaming API call to Claude (server-sent events)
+
+        Attempts are retried only while nothing has been received yet; once
+        text has been delivered to on_text a failure is raised as-is.
+
+        Args:
+            prompt: The prompt to send to Claude
+            on_text: Async callback receiving each text delta as it arrives
+            prefix: Optional cacheable prefix (see build_dataset_context)
+            bypass_cache: Skip the LLM response cache lookup (the response is still stored)
+            call_type: Token budget to apply (token_budget.max_tokens in config.yaml)
+
+        Returns:
+            The complete response text
+        """
+        if not self.api_key and not is_replay_mode():
+            raise ValueError("ANTHROPIC_API_KEY not configured")
+
+        max_tokens, estimated_tokens = self._budget_call(call_type, prompt, prefix)
+        cache, cache_key, cached = await self._response_cache_lookup(prompt, prefix, bypass_cache, max_tokens)
+        if cached is not None:
+            # Replay the cached response as a single delta
+            if on_text:
+                await on_text(cached)
+            return cached
+
+        headers = self._build_headers()
+        payload = self._build_payload(prompt, stream=True, prefix=prefix, max_tokens=max_tokens)
+
+        scheduler = get_llm_scheduler()
+        priority = priority_for(call_type)
+
+        async def make_api_call():
+            last_err: Optional[Exception] = None
+            for attempt in range(3):
+                parts: List[str] = []
+                usage: Dict[str, Any] = {}
+                stop_reason: Optional[str] = None
+                retry_after: Optional[float] = None
+                try:
+                    async with scheduler.slot(priority, estimated_tokens), get_http_client().stream(
+                        "POST", self.base_url, headers=headers, json=payload
+                    ) as response:
+                        scheduler.on_response(response.status_code, response.headers)
+                        if response.status_code != 200:
+                            retry_after = parse_retry_after(response.headers)
+                            body = (await response.aread()).decode("utf-8", errors="replace")
+                            raise Exception(f"Claude API error: {response.status_code} - {body[:300]}")
+                        async for event in iter_sse_events(response.aiter_lines()):
+                            event_type = event.get("type")
+                            if event_type == "content_block_delta":
+                                delta = event.get("delta", {})
+                                if delta.get("type") == "text_delta" and delta.get("text"):
+                                    parts.append(delta["text"])
+                                    if on_text:
+                                        await on_text(delta["text"])
+                            elif event_type == "message_start":
+                                usage.update(event.get("message", {}).get("usage") or {})
+                                self._log_cache_usage(usage)
+                            elif event_type == "message_delta":
+                                # Cumulative output_tokens and the stop_reason arrive at the end
+                                usage.update(event.get("usage") or {})
+                                stop_reason = event.get("delta", {}).get("stop_reason") or stop_reason
+                            elif event_type == "error":
+                                error = event.get("error", {})
+                                if error.get("type") in ("overloaded_error", "rate_limit_error"):
+                                    scheduler.on_throttled()
+                                raise Exception(f"Claude API stream error: {error.get('type')} - {error.get('message')}")
+                            elif event_type == "message_stop":
+                                break
+                    text = "".join(parts)
+                    get_token_usage_tracker().record(call_type, usage, max_tokens, estimated_tokens, stop_reason)
+                    if settings.SHOW_AGENT_RESPONSE:
+                        logger.info(f"Claude streamed response (truncated):\n{text[:2000]}")
+                    return text
+                except Exception as e:
+                    if parts:
+                        # Partial output was already forwarded; retrying would duplicate it
+                        raise
+                    last_err = e
+                    logger.warning(f"Claude streaming call failed (attempt {attempt+1}/3): {e}")
+                if attempt < 2:
+                    await asyncio.sleep(scheduler.retry_delay(attempt, retry_after))
+            raise last_err if last_err else Exception("Claude API error: unknown")
+
+        text = await self._with_circuit_breaker(make_api_call)
+        if cache is not None:
+            await cache.aset(cache_key, text)
+        return text
+
+    async def stream_agent_code(
+        self,
+        agent_name: str,
+        agent_config: Dict[str, Any],
+        data_sample: Dict[str, Any],
+        user_question: str,
+        previous_results: Optional[Dict[str, Any]] = None,
+        on_code_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        bypass_cache: bool = False
+    ) -> Tuple[Dict[str, Any], Optional["asyncio.Task"]]:
+        """
+        Generate agent code with a streaming call, returning as soon as the code block closes
+
+        Args:
+            agent_name: Name of the agent
+            agent_config: Agent configuration from YAML
+            data_sample: Sample data
+            user_question: User's question
+            previous_results: Results from all previous agents in the workflow
+            on_code_delta: Async callback receiving partial code as it streams
+            bypass_cache: Skip the LLM response cache lookup
+
+        Returns:
+            Tuple of (code_result, tail_task). code_result has the code but may lack
+            the description; tail_task (if not None) resolves to the fully parsed
+            result once the rest of the response has arrived.
+        """
+        try:
+            prompt = self._create_code_generation_prompt(
+                agent_name, agent_config, data_sample, user_question, previous_results
+            )
+            prefix = self.build_dataset_context(data_sample)
+            extractor = StreamingCodeExtractor()
+            code_ready: asyncio.Future = asyncio.get_running_loop().create_future()
+
+            async def on_text(text: str):
+                code_delta = extractor.feed(text)
+                if code_delta and on_code_delta:
+                    try:
+                        await on_code_delta(code_delta)
+                    except Exception as cb_err:
+                        logger.debug(f"Code delta callback failed for {agent_name}: {cb_err}")
+                if extractor.code_complete and not code_ready.done():
+                    code_ready.set_result({
+                        "code": extractor.code or "print('No code generated')",
+                        "description": "",
+                        "outputs": [],
+                        "insights": "",
+                    })
+
+            async def consume() -> Dict[str, Any]:
+                try:
+                    response = await self._stream_claude_api(
+                        prompt, on_text, prefix=prefix, bypass_cache=bypass_cache,
+                        call_type=CALL_CODE_GENERATION
+                    )
+                except Exception as e:
+                    if not code_ready.done():
+                        code_ready.set_exception(e)
+                    raise
+                final = self._parse_code_generation_response(response)
+                if not code_ready.done():
+                    # No closing fence seen while streaming (e.g. legacy JSON output)
+                    code_ready.set_result(final)
+                return final
+
+            tail = asyncio.create_task(consume())
+            # Consume the tail's exception if nobody awaits it
+            tail.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+            code_result = await code_ready
+            if tail.done() and not tail.exception():
+                return tail.result(), None
+            return code_result, tail
+
+        except Exception as e:
+            logger.error(f"Error generating code for {agent_name}: {str(e)}")
+            return {
+                "error": str(e),
+                "agent_name": agent_name,
+                "code": "",
+                "description": "Failed to generate code"
+            }, None
 
     async def explain_execution(
         self,
@@ -457,10 +807,13 @@ class ClaudeService:
         data_sample: Dict[str, Any],
         code_snippet: str,
         execution_output: str,
-        output_files: List[Dict[str, Any]]
+        output_files: List[Dict[str, Any]],
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
         """Generate a concise UI summary and machine-passing insights from an agent's execution results.
 
+        An empty user_question leaves the question out of the prompt (data_only agents).
+
         Returns dict with keys: ui_summary (str), next_insights (dict)
         """
         try:
@@ -476,18 +829,13 @@ class ClaudeService:
                     "type": f.get("type"),
                     "size": f.get("size")
                 })
+            question_line = f'User question: "{user_question}"\n' if user_question else ""
 
             prompt = f"""
 You are an expert data analyst. Summarize the following agent execution for UI and for the next agent.
 
 Agent: {agent_name}
-User question: "{user_question}"
-
-Data overview:
-- File: {data_sample.get('file_info', {}).get('filename', 'unknown')}
-- Rows: {data_sample.get('total_rows', 0)}
-- Columns: {', '.join(map(str, data_sample.get('columns', [])[:20]))}
-
+{question_line}
 Code (snippet):
 ```
 {(code_snippet or '')[:800]}
@@ -511,13 +859,15 @@ next_insights:
 No other text.
 """
 
-            text = await self._call_claude_api(prompt)
+            text = await self._call_claude_api(
+                prompt, prefix=self.build_dataset_context(data_sample), bypass_cache=bypass_cache,
+                call_type=CALL_EXPLANATION
+            )
             if settings.SHOW_AGENT_RESPONSE:
                 logger.info(f"Explanator response (truncated):\n{text[:2000]}")
 
             # Extract YAML
-            import re as _re
-            m = _re.search(r"```yaml\s*([\s\S]*?)```", text, _re.IGNORECASE)
+            m = re.search(r"```yaml\s*([\s\S]*?)```", text, re.IGNORECASE)
             payload = {"ui_summary": "", "next_insights": {}}
             if m:
                 try:
@@ -536,6 +886,92 @@ No other text.
             logger.error(f"explain_execution failed: {e}")
             return {"ui_summary": "", "next_insights": {}}
     
+    async def explain_executions_batch(
+        self,
+        user_question: str,
+        data_sample: Dict[str, Any],
+        items: List[Dict[str, Any]],
+        bypass_cache: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """Explain several agent executions with a single Claude call.
+
+        Args:
+            user_question: User's analysis question (empty leaves it out of the prompt)
+            data_sample: Sample data (sent as the cached dataset prefix)
+            items: Dicts with agent_name, code_snippet, execution_output, output_files, structured_results
+            bypass_cache: Skip the LLM response cache lookup
+
+        Returns:
+            Dict mapping agent name to {ui_summary, next_insights}
+        """
+        if not items:
+            return {}
+
+        # Smaller per-agent budget than explain_execution so the batch stays compact
+        sections = []
+        for item in items:
+            files_preview = [
+                {"filename": f.get("filename"), "type": f.get("type")}
+                for f in (item.get("output_files") or [])[:5]
+            ]
+            structured = item.get("structured_results")
+            sections.append(f"""
+### Agent: {item['agent_name']}
+Code (snippet):
+```
+{(item.get('code_snippet') or '')[:600]}
+```
+Stdout/stderr (truncated):
+```
+{(item.get('execution_output') or '')[:2500]}
+```
+Structured results: {self._stable_json(structured)[:1500] if structured else 'none'}
+Generated files: {files_preview}
+""")
+
+        agent_names = [item["agent_name"] for item in items]
+        question_line = f'User question: "{user_question}"\n' if user_question else ""
+        prompt = f"""
+You are an expert data analyst. Summarize each of the following agent executions for UI and for later agents.
+
+{question_line}{''.join(sections)}
+OUTPUT FORMAT (STRICT):
+Return a single YAML block with one entry per agent ({', '.join(agent_names)}):
+```yaml
+<agent_name>:
+  ui_summary: |
+    # A concise textual summary (<= 8 bullets or short paragraphs) for end users
+  next_insights:
+    # A compact, machine-friendly dict of key findings/metrics to pass to subsequent agents
+```
+No other text.
+"""
+        text = await self._call_claude_api(
+            prompt, prefix=self.build_dataset_context(data_sample), bypass_cache=bypass_cache,
+            call_type=CALL_EXPLANATION_BATCH
+        )
+
+        m = re.search(r"```yaml\s*([\s\S]*?)```", text, re.IGNORECASE)
+        try:
+            parsed = yaml.safe_load(m.group(1) if m else text) or {}
+        except Exception as pe:
+            logger.warning(f"Failed to parse batched explanation YAML: {pe}")
+            return {}
+        if not isinstance(parsed, dict):
+            return {}
+
+        explanations: Dict[str, Dict[str, Any]] = {}
+        for agent_name in agent_names:
+            entry = parsed.get(agent_name)
+            if not isinstance(entry, dict):
+                continue
+            next_insights = entry.get("next_insights")
+            explanations[agent_name] = {
+                "ui_summary": entry.get("ui_summary", "") or "",
+                "next_insights": next_insights if isinstance(next_insights, dict) else {},
+            }
+        return explanations
+
     def _create_agent_selection_prompt(self, data_sample: Dict[str, Any], user_question: str) -> str:
         """Create prompt for agent selection"""
         
@@ -550,25 +986,11 @@ No other text.
         pattern_summary = self._format_pattern_summary(patterns)
         
         return f"""
-You are an expert data analyst tasked with selecting the most appropriate AI analysis agents for a specific data analysis request.
-
-**Data Overview:**
-- File: {data_sample['file_info']['filename']}
-- Total rows: {data_sample['total_rows']:,}
-- Columns: {len(data_sample['columns'])} ({', '.join(data_sample['columns'])})
+You are an expert data analyst tasked with selecting the most appropriate AI analysis agents for a specific data analysis request on the dataset above.
 
 **Data Patterns Detected:**
 {pattern_summary}
 
-**Sample Data (first {len(data_sample['sample_data'])} rows):**
-{json.dumps(data_sample['sample_data'], indent=2)}
-
-**Data Types:**
-{json.dumps(data_sample['data_types'], indent=2)}
-
-**Missing Values Summary:**
-{json.dumps(data_sample['missing_values'], indent=2)}
-
 **User's Analysis Request:**
 "{user_question}"
 
@@ -607,60 +1029,21 @@ Response (JSON array only):"""
     def _create_code_generation_prompt(self, agent_name: str, agent_config: Dict[str, Any],
                                      data_sample: Dict[str, Any], user_question: str,
                                      previous_results: Optional[Dict[str, Any]] = None) -> str:
-        """Create prompt for code generation with optional previous agent results"""
-
-        # Build previous results context if available
-        previous_context = ""
-        if previous_results and len(previous_results) > 0:
-            previous_context = "\n\nPREVIOUS AGENT RESULTS:\n"
-            previous_context += "The following agents have already processed this data. Use their findings to inform your analysis:\n\n"
-
-            for prev_agent_name, prev_result in previous_results.items():
-                previous_context += f"--- Agent: {prev_agent_name} ---\n"
-
-                # Include execution output
-                exec_result = prev_result.get('execution_result', {})
-                output = exec_result.get('output', '')
-                if output:
-                    previous_context += f"Output: {output[:1000]}\n"  # Limit to 1000 chars
-
-                # Include UI summary if available
-                ui_summary = exec_result.get('ui_summary', '')
-                if ui_summary:
-                    previous_context += f"Summary: {ui_summary[:500]}\n"  # Limit to 500 chars
-
-                # Include output files
-                output_files = exec_result.get('output_files', [])
-                if output_files:
-                    previous_context += f"Generated Files ({len(output_files)}):\n"
-                    for file_info in output_files[:5]:  # Limit to first 5 files
-                        previous_context += f"  - {file_info.get('filename', 'unknown')}: {file_info.get('type', 'unknown')}\n"
-
-                # Include insights if available
-                insights = exec_result.get('insights') or exec_result.get('next_insights', {})
-                if insights:
-                    previous_context += f"Key Insights: {json.dumps(insights, indent=2)[:500]}\n"
-
-                previous_context += "\n"
+        """Create prompt for code generation with optional previous agent results (no question section when empty)"""
+
+        # Previous results context, compressed to the token budget (oldest agents lose detail first)
+        budget = self.token_budget
+        previous_context = build_previous_results_context(
+            previous_results, budget["previous_results_tokens"], budget["chars_per_token"]
+        )
+        question_section = f'\n\nUser Question:\n"{user_question}"' if user_question else ""
 
         return f"""
-You are a Python data analysis expert. Generate complete, production-ready Python code for the following analysis task.
+You are a Python data analysis expert. Generate complete, production-ready Python code for the following analysis task on the dataset above.
 
 Agent: {agent_name}
 Description: {agent_config.get('description', '')}
-Specialties: {', '.join(agent_config.get('specialties', []))}
-
-Data Information:
-- File: {data_sample['file_info']['filename']}
-- Total rows: {data_sample['total_rows']:,}
-- Columns: {', '.join(data_sample['columns'])}
-- Data types: {json.dumps(data_sample['data_types'], indent=2)}
-
-Sample Data:
-{json.dumps(data_sample['sample_data'], indent=2)}
-
-User Question:
-"{user_question}"{previous_context}
+Specialties: {', '.join(agent_config.get('specialties', []))}{question_section}{previous_context}
 
 Requirements:
 1. Generate complete Python code that can be executed immediately
@@ -671,6 +1054,7 @@ Requirements:
 6. Add concise comments explaining the analysis
 7. Do not print excessive logs; focus on artifacts (files) and clear textual summary in stdout
 8. Build upon the previous agent results when relevant to create a coherent analysis pipeline
+9. Write your key findings to results.json as a JSON object with "summary" (short text), "metrics" (dict of key numbers) and "findings" (list of short strings)
 
 OUTPUT FORMAT (STRICT):
 Respond with EXACTLY two fenced blocks in this order and nothing else:
@@ -726,9 +1110,8 @@ No additional text before, between, or after the blocks.
         try:
             text = response.strip()
             # Try fenced python code
-            import re as _re
-            code_match = _re.search(r"```python\s*([\s\S]*?)```", text, _re.IGNORECASE)
-            meta_match = _re.search(r"```yaml\s*([\s\S]*?)```", text, _re.IGNORECASE)
+            code_match = re.search(r"```python\s*([\s\S]*?)```", text, re.IGNORECASE)
+            meta_match = re.search(r"```yaml\s*([\s\S]*?)```", text, re.IGNORECASE)
             if code_match:
                 code = code_match.group(1).strip()
                 description = ""
@@ -793,7 +1176,6 @@ No additional text before, between, or after the blocks.
     
     def _repair_json(self, json_str: str) -> str:
         """Attempt to repair common JSON issues with unescaped newlines"""
-        import re
         # Heuristic: specifically escape newlines inside the code field if present
         try:
             # Find the code field start
@@ -0,0 +1,117 @@
+"""
+Incremental parsing of streamed Claude responses
+Server-sent event decoding and early detection of the fenced python code block
+"""
+
+import json
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+OPEN_FENCE = re.compile(r"```python[ \t]*\r?\n?", re.IGNORECASE)
+CLOSE_FENCE = "```"
+
+
+async def iter_sse_events(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Decode a server-sent event stream into JSON payloads
+
+    Args:
+        lines: Async iterator of text lines (e.g. httpx Response.aiter_lines())
+
+    Yields:
+        Parsed JSON object of each event's data field
+    """
+    data_lines = []
+    async for line in lines:
+        if line == "":
+            if data_lines:
+                payload = "\n".join(data_lines)
+                data_lines = []
+                try:
+                    yield json.loads(payload)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed SSE payload: {payload[:200]}")
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+        # "event:", "id:" and ":" comment lines carry nothing the payload doesn't
+    if data_lines:
+        try:
+            yield json.loads("\n".join(data_lines))
+        except json.JSONDecodeError:
+            pass
+
+
+class StreamingCodeExtractor:
+    """
+    Extracts the ```python block from text as it streams in
+
+    feed() returns the newly visible part of the code (batched to at least
+    min_delta_chars, except for the last piece) and sets code_complete once
+    the closing fence arrives, so execution can start without waiting for the
+    rest of the response.
+
+    Usage:
+        extractor = StreamingCodeExtractor()
+        for text in deltas:
+            code_delta = extractor.feed(text)
+            if extractor.code_complete:
+                run(extractor.code)
+    """
+
+    def __init__(self, min_delta_chars: int = 200):
+        self.min_delta_chars = min_delta_chars
+        self.text = ""
+        self.code_complete = False
+        self._code_start: Optional[int] = None
+        self._code_end: Optional[int] = None
+        self._emitted = 0  # chars of code already returned as deltas
+
+    @property
+    def code(self) -> Optional[str]:
+        """The complete code block (stripped), once the closing fence has been seen"""
+        if not self.code_complete:
+            return None
+        return self.text[self._code_start:self._code_end].strip()
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add streamed text
+
+        Args:
+            chunk: Next piece of response text
+
+        Returns:
+            New code text to show (may be empty)
+        """
+        if self.code_complete or not chunk:
+            self.text += chunk or ""
+            return ""
+
+        self.text += chunk
+
+        if self._code_start is None:
+            match = OPEN_FENCE.search(self.text)
+            # Wait for the newline so "```python" split across chunks still matches fully
+            if not match or (match.end() == len(self.text) and not self.text.endswith("\n")):
+                return ""
+            self._code_start = match.end()
+
+        close = self.text.find(CLOSE_FENCE, self._code_start)
+        if close != -1:
+            self._code_end = close
+            self.code_complete = True
+            visible_end = close
+        else:
+            # Hold back a possible partial closing fence
+            visible_end = max(self._code_start, len(self.text) - (len(CLOSE_FENCE) - 1))
+
+        pending = visible_end - (self._code_start + self._emitted)
+        if pending <= 0 or (not self.code_complete and pending < self.min_delta_chars):
+            return ""
+        start = self._code_start + self._emitted
+        self._emitted += pending
+        return self.text[start:visible_end]
@@ -0,0 +1,141 @@
+"""
+Managed process pool for CPU-bound work (file parsing, profiling)
+Keeps pandas off the event loop so WebSocket progress and other requests stay responsive
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up() -> int:
+    """Import the heavy modules in a worker so the first real task doesn't pay for it"""
+    import pandas  # noqa: F401
+    return os.getpid()
+
+
+class ComputePool:
+    """
+    Process pool with async wrappers and bounded queueing
+
+    At most max_pending tasks are submitted to the pool at once; further
+    callers wait on the event loop (not in the pool queue) until a slot frees
+    up. Task functions must be module-level and return plain, JSON-ready
+    values (dicts/lists/scalars) so results are cheap to send back.
+
+    With workers=0 the pool runs tasks in the default thread executor instead
+    (useful on platforms where process pools are unavailable).
+
+    Usage:
+        pool = get_compute_pool()
+        sample = await pool.run(read_file_sample_task, content, filename, 5)
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16):
+        """
+        Initialize compute pool
+
+        Args:
+            workers: Number of worker processes (0 = run in threads)
+            max_pending: Maximum tasks submitted to the pool at once
+        """
+        self.workers = max(0, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "restarts": 0}
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers == 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info(f"Compute pool started with {self.workers} worker processes")
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def start(self):
+        """Start the worker processes ahead of the first request"""
+        executor = self._get_executor()
+        if executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(executor, _warm_up) for _ in range(self.workers)])
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) in a worker and await its result
+
+        Args:
+            fn: Module-level (picklable) function
+            *args: Picklable arguments
+
+        Returns:
+            The function's return value
+        """
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            self.stats["submitted"] += 1
+            try:
+                try:
+                    result = await loop.run_in_executor(self._get_executor(), fn, *args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM on a huge file); replace the pool and retry once
+                    logger.warning("Compute pool broken, restarting workers")
+                    self._restart()
+                    result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            self.stats["completed"] += 1
+            return result
+
+    def _restart(self):
+        old = self._executor
+        self._executor = None
+        self.stats["restarts"] += 1
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Compute pool stopped")
+
+
+# Singleton instance
+_compute_pool: Optional[ComputePool] = None
+
+
+def get_compute_pool() -> ComputePool:
+    """
+    Get or create the process-wide compute pool
+
+    Returns:
+        ComputePool instance
+    """
+    global _compute_pool
+
+    if _compute_pool is None:
+        _compute_pool = ComputePool(
+            workers=settings.COMPUTE_POOL_WORKERS,
+            max_pending=settings.COMPUTE_POOL_MAX_PENDING,
+        )
+
+    return _compute_pool
@@ -0,0 +1,407 @@
+"""
+Dashboard counters
+The /analytics/statistics figures (analysis counts by status, cached runs,
+execution time, cache entries/hits/time saved, code library runs) kept in a
+small counters table and updated in the same transaction as the rows they
+describe, so the dashboard reads a handful of rows instead of scanning
+analyses, cached_analyses and agent_code_library. A periodic single-query reconciliation corrects any drift.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import Integer, case, event, func, inspect, literal, null, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.analysis import AgentCodeLibraryEntry, Analysis, CachedAnalysis, DashboardCounter
+
+logger = logging.getLogger(__name__)
+
+# Counter names
+ANALYSES = "analyses"
+ANALYSES_CACHED = "analyses.cached"
+ANALYSES_TIMED = "analyses.timed"  # analyses with an execution_time_ms
+ANALYSES_TIME_MS = "analyses.time_ms"
+STATUS_PREFIX = "analyses.status."
+CACHE_ENTRIES = "cache.entries"
+CACHE_HITS = "cache.hits"
+CACHE_TIME_SAVED_MS = "cache.time_saved_ms"
+LIBRARY_ENTRIES = "library.entries"
+LIBRARY_SUCCESSES = "library.successes"
+LIBRARY_FAILURES = "library.failures"
+
+# day of the all-time rows
+TOTAL = "total"
+
+# INSERT ... ON CONFLICT DO UPDATE constructs by dialect
+DIALECT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def status_counter(status: Optional[str]) -> str:
+    """Counter name of an analysis status"""
+    return f"{STATUS_PREFIX}{status or 'unknown'}"
+
+
+def bump_counters(db: Any, deltas: Dict[str, int], daily: Optional[bool] = None, moment: Optional[datetime] = None):
+    """
+    Add deltas to the all-time counters (and today's row when daily rollups are on); no commit
+
+    Args:
+        db: Session or Connection
+        deltas: Counter name -> amount (zero amounts are skipped)
+        daily: Also update the day row (defaults to STATS_DAILY_ROLLUP)
+        moment: Time of the change (defaults to now)
+    """
+    deltas = {name: int(amount) for name, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    days = [TOTAL]
+    if settings.STATS_DAILY_ROLLUP if daily is None else daily:
+        days.append((moment or datetime.utcnow()).strftime("%Y-%m-%d"))
+    table = DashboardCounter.__table__
+    dialect = (db.get_bind() if isinstance(db, Session) else db).dialect.name
+    for name, amount in deltas.items():
+        for day in days:
+            if dialect in DIALECT_INSERTS:
+                statement = DIALECT_INSERTS[dialect](table).values(name=name, day=day, value=amount)
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=["name", "day"], set_={"value": table.c.value + statement.excluded.value}
+                ))
+                continue
+            updated = db.execute(
+                update(table).where(table.c.name == name, table.c.day == day).values(value=table.c.value + amount)
+            ).rowcount
+            if not updated:
+                db.execute(table.insert().values(name=name, day=day, value=amount))
+
+
+def _history(obj: Any, attribute: str):
+    """(old, new, changed) of a flushed attribute; old is None when it was never loaded"""
+    history = inspect(obj).attrs[attribute].history
+    if not history.has_changes():
+        return None, None, False
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new, True
+
+
+def _analysis_deltas(deltas: Dict[str, int], obj: Analysis, sign: int, changes_only: bool):
+    """Counter changes of a new (sign=1), deleted (sign=-1) or modified (changes_only) analysis"""
+    def add(name, amount):
+        deltas[name] = deltas.get(name, 0) + amount
+
+    if not changes_only:
+        add(ANALYSES, sign)
+        add(status_counter(obj.status or "pending"), sign)
+        add(ANALYSES_CACHED, sign if obj.is_cached else 0)
+        if obj.execution_time_ms is not None:
+            add(ANALYSES_TIMED, sign)
+            add(ANALYSES_TIME_MS, sign * obj.execution_time_ms)
+        return
+
+    old, new, changed = _history(obj, "status")
+    if changed and old != new:
+        if old is not None:
+            add(status_counter(old), -1)
+        add(status_counter(new), 1)
+    old, new, changed = _history(obj, "is_cached")
+    if changed and bool(old) != bool(new):
+        add(ANALYSES_CACHED, 1 if new else -1)
+    old, new, changed = _history(obj, "execution_time_ms")
+    if changed and old != new:
+        add(ANALYSES_TIMED, (new is not None) - (old is not None))
+        add(ANALYSES_TIME_MS, (new or 0) - (old or 0))
+
+
+def _cache_deltas(deltas: Dict[str, int], obj: CachedAnalysis, sign: int, changes_only: bool):
+    """Counter changes of a new, deleted or modified cache row"""
+    def add(name, amount):
+        deltas[name] = deltas.get(name, 0) + amount
+
+    if not changes_only:
+        add(CACHE_ENTRIES, sign)
+        add(CACHE_HITS, sign * (obj.access_count or 0))
+        add(CACHE_TIME_SAVED_MS, sign * (obj.time_saved_ms or 0))
+        return
+    for attribute, name in (("access_count", CACHE_HITS), ("time_saved_ms", CACHE_TIME_SAVED_MS)):
+        old, new, changed = _history(obj, attribute)
+        if changed and old is not None:
+            add(name, (new or 0) - old)
+
+
+def _library_deltas(deltas: Dict[str, int], obj: AgentCodeLibraryEntry, sign: int, changes_only: bool):
+    """Counter changes of a new, deleted or modified code library entry"""
+    def add(name, amount):
+        deltas[name] = deltas.get(name, 0) + amount
+
+    if not changes_only:
+        add(LIBRARY_ENTRIES, sign)
+        add(LIBRARY_SUCCESSES, sign * (obj.success_count or 0))
+        add(LIBRARY_FAILURES, sign * (obj.failure_count or 0))
+        return
+    for attribute, name in (("success_count", LIBRARY_SUCCESSES), ("failure_count", LIBRARY_FAILURES)):
+        old, new, changed = _history(obj, attribute)
+        if changed and old is not None:
+            add(name, (new or 0) - old)
+
+
+# Counted models -> their delta function
+DELTA_FUNCTIONS = (
+    (Analysis, _analysis_deltas),
+    (CachedAnalysis, _cache_deltas),
+    (AgentCodeLibraryEntry, _library_deltas),
+)
+
+
+def _after_flush(session: Session, flush_context: Any):
+    """Turn the flushed Analysis/CachedAnalysis/AgentCodeLibraryEntry changes into counter increments"""
+    deltas: Dict[str, int] = {}
+    for objects, sign, changes_only in ((session.new, 1, False), (session.dirty, 1, True), (session.deleted, -1, False)):
+        for obj in objects:
+            for model, add_deltas in DELTA_FUNCTIONS:
+                if isinstance(obj, model):
+                    add_deltas(deltas, obj, sign, changes_only)
+                    break
+    if deltas:
+        bump_counters(session.connection(), deltas)
+
+
+def install_counter_hooks():
+    """Maintain the counters on every ORM flush (idempotent)"""
+    if not counters_enabled():
+        event.listen(Session, "after_flush", _after_flush)
+
+
+def uninstall_counter_hooks():
+    """Stop maintaining the counters (idempotent)"""
+    if counters_enabled():
+        event.remove(Session, "after_flush", _after_flush)
+
+
+def counters_enabled() -> bool:
+    """Whether the counters are being maintained (the bulk-path helpers below are no-ops otherwise)"""
+    return event.contains(Session, "after_flush", _after_flush)
+
+
+def count_cache_hits(db: Any, model: Any, hits: int):
+    """Count hits written by a bulk access_count UPDATE (bulk statements skip the flush hook)"""
+    if model is CachedAnalysis and counters_enabled():
+        bump_counters(db, {CACHE_HITS: hits})
+
+
+def count_removed_cache_rows(db: Session, model: Any, *criteria: Any):
+    """
+    Decrement the cache counters for rows about to be bulk-deleted
+
+    Args:
+        db: Session of the DELETE
+        model: Cache model the DELETE targets (only CachedAnalysis is counted)
+        criteria: The DELETE's filter
+    """
+    if model is not CachedAnalysis or not counters_enabled():
+        return
+    entries, hits, saved = db.query(
+        func.count(CachedAnalysis.id),
+        func.coalesce(func.sum(CachedAnalysis.access_count), 0),
+        func.coalesce(func.sum(CachedAnalysis.time_saved_ms), 0),
+    ).filter(*criteria).one()
+    bump_counters(db, {CACHE_ENTRIES: -entries, CACHE_HITS: -hits, CACHE_TIME_SAVED_MS: -saved})
+
+
+class DashboardCounters:
+    """
+    Reads and reconciles the dashboard counters
+
+    Usage:
+        counters = get_dashboard_counters()
+        await counters.start()   # reconciles once, then every interval
+        totals = counters.totals(db)
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], reconcile_interval_seconds: float = 3600):
+        """
+        Initialize counters
+
+        Args:
+            session_factory: Creates the session used by reconciliation
+            reconcile_interval_seconds: Seconds between reconciliations (0 = only at start)
+        """
+        install_counter_hooks()
+        self.session_factory = session_factory
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.stats_counters = {"reconciliations": 0, "failed_reconciliations": 0, "corrected_counters": 0}
+        self.last_reconciliation: Dict[str, Any] = {}
+
+    @staticmethod
+    def totals(db: Session) -> Dict[str, int]:
+        """All-time counter values by name"""
+        rows = db.query(DashboardCounter.name, DashboardCounter.value).filter(DashboardCounter.day == TOTAL).all()
+        return {name: int(value) for name, value in rows}
+
+    @staticmethod
+    def daily(db: Session, days: int = 30) -> List[Dict[str, Any]]:
+        """
+        Net change of every counter per day, oldest first
+
+        Returns:
+            [{"day": "YYYY-MM-DD", "<counter>": value, ...}] for days with changes
+        """
+        rows = (
+            db.query(DashboardCounter.day, DashboardCounter.name, DashboardCounter.value)
+            .filter(DashboardCounter.day != TOTAL)
+            .order_by(DashboardCounter.day.desc())
+            .all()
+        )
+        by_day: Dict[str, Dict[str, Any]] = {}
+        for day, name, value in rows:
+            if day not in by_day and len(by_day) >= days:
+                break
+            by_day.setdefault(day, {"day": day})[name] = int(value)
+        return [by_day[day] for day in sorted(by_day)]
+
+    @staticmethod
+    def actual_totals(db: Session) -> Dict[str, int]:
+        """Counter values computed from the tables (one UNION ALL query)"""
+        analyses = select(
+            literal("analyses").label("source"),
+            Analysis.status.label("status"),
+            func.count().label("rows"),
+            func.coalesce(func.sum(case((Analysis.is_cached == True, 1), else_=0)), 0).label("cached"),  # noqa: E712
+            func.count(Analysis.execution_time_ms).label("timed"),
+            func.coalesce(func.sum(Analysis.execution_time_ms), 0).label("time_ms"),
+        ).group_by(Analysis.status)
+        cache = select(
+            literal("cache"),
+            null().cast(Analysis.status.type),
+            func.count(),
+            func.coalesce(func.sum(CachedAnalysis.access_count), 0),
+            literal(0, Integer),
+            func.coalesce(func.sum(CachedAnalysis.time_saved_ms), 0),
+        )
+        library = select(
+            literal("library"),
+            null().cast(Analysis.status.type),
+            func.count(),
+            func.coalesce(func.sum(AgentCodeLibraryEntry.success_count), 0),
+            literal(0, Integer),
+            func.coalesce(func.sum(AgentCodeLibraryEntry.failure_count), 0),
+        )
+        totals = {ANALYSES: 0, ANALYSES_CACHED: 0, ANALYSES_TIMED: 0, ANALYSES_TIME_MS: 0}
+        for source, status, rows, cached, timed, time_ms in db.execute(union_all(analyses, cache, library)).all():
+            if source == "cache":
+                totals.update({CACHE_ENTRIES: int(rows), CACHE_HITS: int(cached), CACHE_TIME_SAVED_MS: int(time_ms)})
+                continue
+            if source == "library":
+                totals.update({LIBRARY_ENTRIES: int(rows), LIBRARY_SUCCESSES: int(cached), LIBRARY_FAILURES: int(time_ms)})
+                continue
+            totals[ANALYSES] += rows
+            totals[status_counter(status)] = totals.get(status_counter(status), 0) + rows
+            totals[ANALYSES_CACHED] += int(cached)
+            totals[ANALYSES_TIMED] += int(timed)
+            totals[ANALYSES_TIME_MS] += int(time_ms)
+        return totals
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Correct the all-time counters to the table values
+
+        Corrections are applied as increments so updates committed meanwhile
+        are kept; day rows are left as recorded.
+
+        Returns:
+            Counter name -> correction applied (empty when nothing drifted)
+        """
+        db = self.session_factory()
+        try:
+            actual = self.actual_totals(db)
+            stored = self.totals(db)
+            drift = {
+                name: actual.get(name, 0) - stored.get(name, 0)
+                for name in set(actual) | set(stored)
+                if actual.get(name, 0) != stored.get(name, 0)
+            }
+            bump_counters(db, drift, daily=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self.stats_counters["failed_reconciliations"] += 1
+            logger.error(f"Dashboard counter reconciliation failed: {e}")
+            raise
+        finally:
+            db.close()
+
+        self.stats_counters["reconciliations"] += 1
+        self.stats_counters["corrected_counters"] += len(drift)
+        self.last_reconciliation = {"finished_at": datetime.utcnow().isoformat(), "corrections": drift}
+        if drift:
+            logger.info(f"Dashboard counters reconciled: {drift}")
+        return drift
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception as e:
+                logger.error(f"Dashboard counter loop error: {e}")
+            if not self.reconcile_interval_seconds:
+                return
+            await asyncio.sleep(self.reconcile_interval_seconds)
+
+    async def start(self):
+        """Reconcile now (counters of an existing database start from its tables), then periodically"""
+        install_counter_hooks()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop periodic reconciliation and counter maintenance"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        uninstall_counter_hooks()
+
+    def stats(self) -> Dict[str, Any]:
+        """Reconciliation counters and the last result"""
+        return {
+            **self.stats_counters,
+            "reconcile_interval_seconds": self.reconcile_interval_seconds,
+            "daily_rollup": settings.STATS_DAILY_ROLLUP,
+            "last_reconciliation": self.last_reconciliation,
+        }
+
+
+# Singleton instance
+_dashboard_counters: Optional[DashboardCounters] = None
+
+
+def get_dashboard_counters() -> Optional[DashboardCounters]:
+    """
+    Get or create the dashboard counters (None when STATS_COUNTERS_ENABLED is off)
+
+    Returns:
+        DashboardCounters instance or None
+    """
+    global _dashboard_counters
+
+    if not settings.STATS_COUNTERS_ENABLED:
+        return None
+
+    if _dashboard_counters is None:
+        from models.database import SessionLocal
+
+        _dashboard_counters = DashboardCounters(
+            session_factory=SessionLocal,
+            reconcile_interval_seconds=settings.STATS_RECONCILE_INTERVAL_SECONDS,
+        )
+
+    return _dashboard_counters
@@ -2,15 +2,30 @@
 Database service for managing analysis records, caching, and performance tracking
 """
 
+import base64
 import hashlib
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, desc, func, or_
 
 from models import Analysis, AgentExecution, AgentPerformance, CachedAnalysis
-from models.analysis import AgentCachedResult
+from models.analysis import AgentCachedResult, AgentCodeLibraryEntry
+from services.dashboard_counters import (
+    ANALYSES, ANALYSES_CACHED, ANALYSES_TIME_MS, ANALYSES_TIMED, CACHE_ENTRIES, CACHE_HITS, CACHE_TIME_SAVED_MS,
+    LIBRARY_ENTRIES, LIBRARY_FAILURES, LIBRARY_SUCCESSES, count_cache_hits, count_removed_cache_rows, get_dashboard_counters, status_counter,
+)
+from services.payload_store import get_payload_store, is_ref, resolve_payload
+from services.result_cache import TIER_AGENT, TIER_ANALYSIS, get_result_memory_cache
+from services.service_registry import CACHE_SCOPE_DATA_ONLY, CACHE_SCOPE_DATA_QUESTION, CACHE_SCOPE_NONE
+from config import settings
+from services.latency_histogram import (
+    PHASE_TOTAL, add_latency, apply_latency_deltas, load_histograms, summarize_by_agent, summarize_trend
+)
+from services.telemetry_writer import CACHE_MODELS, apply_performance_delta, get_telemetry_writer
+from utils.fingerprint import fingerprint_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +35,14 @@ class DatabaseService:
 
     @staticmethod
     def generate_data_hash(file_content: bytes) -> str:
-        """Generate SHA256 hash of file content"""
-        return hashlib.sha256(file_content).hexdigest()
+        """
+        Generate the content fingerprint used in cache keys
+
+        Prefer passing the fingerprint computed at upload time (RunContext.data_hash);
+        this re-hashes the full content.
+        """
+        from config import settings
+        return fingerprint_bytes(file_content, settings.DATA_HASH_ALGORITHM).data_hash
 
     @staticmethod
     def generate_cache_key(data_hash: str, user_question: str) -> str:
@@ -30,10 +51,37 @@ class DatabaseService:
         return hashlib.sha256(combined.encode()).hexdigest()
 
     @staticmethod
-    def generate_agent_cache_key(data_hash: str, user_question: str, agent_name: str) -> str:
-        from config import settings
+    def generate_agent_cache_key(
+        data_hash: str,
+        user_question: str,
+        agent_name: str,
+        cache_scope: str = CACHE_SCOPE_DATA_QUESTION,
+        agent_version: str = ""
+    ) -> Optional[str]:
+        """
+        Per-agent result cache key
+
+        Args:
+            data_hash: Fingerprint of the data file
+            user_question: The analysis question (ignored for the data_only scope)
+            agent_name: Agent name
+            cache_scope: data_only, data_question or none (see agents/config.yaml)
+            agent_version: Version of the agent's prompt and configuration
+
+        Returns:
+            Cache key, or None when the agent is never cached
+        """
+        if cache_scope == CACHE_SCOPE_NONE:
+            return None
         model = getattr(settings, 'CLAUDE_MODEL', 'unknown')
-        combined = f"{data_hash}:{user_question.strip().lower()}:{agent_name.strip().lower()}:{model}"
+        question = "" if cache_scope == CACHE_SCOPE_DATA_ONLY else user_question.strip().lower()
+        combined = f"{data_hash}:{cache_scope}:{question}:{agent_name.strip().lower()}:{model}:{agent_version}"
+        return hashlib.sha256(combined.encode()).hexdigest()
+
+    @staticmethod
+    def generate_code_library_key(agent_name: str, schema_fingerprint: str, normalized_question: str) -> str:
+        """Key of the code library entry for an agent, data schema and normalized question"""
+        combined = f"{agent_name.strip().lower()}:{schema_fingerprint}:{normalized_question}"
         return hashlib.sha256(combined.encode()).hexdigest()
 
     @staticmethod
@@ -116,9 +164,10 @@ class DatabaseService:
         try:
             analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
             if analysis:
+                store = get_payload_store()
                 analysis.data_sample = data_sample
-                analysis.agent_results = agent_results
-                analysis.report = report
+                analysis.agent_results = store.pack_agent_results(db, agent_results) if store else agent_results
+                analysis.report = store.pack_report(db, report) if store else report
                 analysis.errors = errors or []
                 analysis.status = "completed" if not errors else "completed_with_errors"
                 analysis.completed_at = datetime.utcnow()
@@ -127,6 +176,8 @@ class DatabaseService:
                     analysis.execution_time_ms = int(delta.total_seconds() * 1000)
                 db.commit()
                 db.refresh(analysis)
+                set_committed_value(analysis, "agent_results", agent_results)
+                set_committed_value(analysis, "report", report)
                 logger.info(f"Saved results for analysis: {analysis_id}")
                 return analysis
             return None
@@ -137,7 +188,10 @@ class DatabaseService:
 
     def get_analysis(self, db: Session, analysis_id: str) -> Optional[Analysis]:
         """Get analysis by ID"""
-        return db.query(Analysis).filter(Analysis.id == analysis_id).first()
+        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+        if analysis:
+            self.resolve_payloads(db, analysis, "agent_results", "report")
+        return analysis
 
     def get_recent_analyses(
         self, db: Session, limit: int = 10, user_id: Optional[str] = None
@@ -146,7 +200,119 @@ class DatabaseService:
         query = db.query(Analysis)
         if user_id:
             query = query.filter(Analysis.user_id == user_id)
-        return query.order_by(desc(Analysis.created_at)).limit(limit).all()
+        analyses = query.order_by(desc(Analysis.created_at)).limit(limit).all()
+        for analysis in analyses:
+            self.resolve_payloads(db, analysis, "agent_results", "report")
+        return analyses
+
+    # ========== History (projections) ==========
+
+    # Fields /history/{analysis_id} can return besides the summary
+    HISTORY_FIELDS = Analysis.DETAIL_COLUMNS + ("artifacts",)
+
+    @staticmethod
+    def encode_history_cursor(analysis: Analysis) -> str:
+        """Opaque keyset cursor pointing just after an analysis (created_at, id)"""
+        raw = f"{analysis.created_at.isoformat()}|{analysis.id}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_history_cursor(cursor: str) -> Tuple[datetime, str]:
+        """Inverse of encode_history_cursor; raises ValueError for malformed cursors"""
+        try:
+            created_at, analysis_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+            return datetime.fromisoformat(created_at), analysis_id
+        except Exception as e:
+            raise ValueError(f"Invalid history cursor: {cursor}") from e
+
+    def get_analysis_summaries(
+        self,
+        db: Session,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of analysis summaries, newest first
+
+        Only the summary columns are selected, and pages are found by keyset
+        (created_at, id) rather than OFFSET, so cost per page stays constant.
+
+        Args:
+            limit: Page size
+            cursor: next_cursor of the previous page
+            user_id: Optional user filter
+
+        Returns:
+            (summaries, next_cursor); next_cursor is None on the last page
+        """
+        query = db.query(Analysis).options(load_only(*[getattr(Analysis, c) for c in Analysis.SUMMARY_COLUMNS]))
+        if user_id:
+            query = query.filter(Analysis.user_id == user_id)
+        if cursor:
+            created_at, analysis_id = self.decode_history_cursor(cursor)
+            query = query.filter(or_(
+                Analysis.created_at < created_at,
+                and_(Analysis.created_at == created_at, Analysis.id < analysis_id),
+            ))
+        rows = query.order_by(desc(Analysis.created_at), desc(Analysis.id)).limit(limit + 1).all()
+        page = rows[:limit]
+        next_cursor = self.encode_history_cursor(page[-1]) if len(rows) > limit else None
+        return [analysis.to_summary_dict() for analysis in page], next_cursor
+
+    def get_analysis_fields(self, db: Session, analysis_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Summary of an analysis plus only the requested large fields
+
+        Args:
+            analysis_id: Analysis ID
+            fields: Any of HISTORY_FIELDS; "artifacts" lists the files generated
+                by each agent (with their content) without the rest of the results
+
+        Returns:
+            Dict, or None if the analysis does not exist
+        """
+        unknown = [field for field in fields if field not in self.HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(self.HISTORY_FIELDS)})")
+
+        columns = [field for field in Analysis.DETAIL_COLUMNS if field in fields]
+        if "artifacts" in fields and "agent_results" not in columns:
+            columns.append("agent_results")
+        analysis = (
+            db.query(Analysis)
+            .options(load_only(*[getattr(Analysis, c) for c in Analysis.SUMMARY_COLUMNS + tuple(columns)]))
+            .filter(Analysis.id == analysis_id)
+            .first()
+        )
+        if not analysis:
+            return None
+
+        self.resolve_payloads(db, analysis, *[c for c in columns if c in ("agent_results", "report")])
+        data = analysis.to_summary_dict()
+        for field in Analysis.DETAIL_COLUMNS:
+            if field in fields:
+                data[field] = getattr(analysis, field)
+        if "artifacts" in fields:
+            data["artifacts"] = [
+                dict(file_info, agent_name=agent_name)
+                for agent_name, result in (analysis.agent_results or {}).items()
+                for file_info in ((result or {}).get("execution_result") or {}).get("output_files") or []
+            ]
+        return data
+
+    @staticmethod
+    def resolve_payloads(db: Session, row: Any, *fields: str):
+        """
+        Replace payload-store references in the given columns with their content
+
+        The loaded value is set as the committed state, so the row is not marked
+        dirty and the reference is what stays in the database.
+        """
+        for field in fields:
+            value = getattr(row, field)
+            if is_ref(value):
+                set_committed_value(row, field, resolve_payload(db, value))
 
     def get_analyses_by_status(
         self, db: Session, status: str, limit: int = 100
@@ -165,7 +331,17 @@ class DatabaseService:
     def create_agent_execution(
         self, db: Session, analysis_id: str, agent_name: str
     ) -> AgentExecution:
-        """Create agent execution record"""
+        """
+        Create agent execution record
+
+        With the telemetry writer enabled the row is buffered and written by its
+        next flush; the returned (transient) record already carries its id.
+        """
+        writer = get_telemetry_writer()
+        if writer is not None:
+            execution_id, started_at = writer.record_execution_started(analysis_id, agent_name)
+            return AgentExecution(id=execution_id, analysis_id=analysis_id, agent_name=agent_name, started_at=started_at)
+
         try:
             execution = AgentExecution(analysis_id=analysis_id, agent_name=agent_name)
             db.add(execution)
@@ -186,7 +362,18 @@ class DatabaseService:
         output: str = None,
         error: str = None,
     ) -> Optional[AgentExecution]:
-        """Complete agent execution with results"""
+        """
+        Complete agent execution with results
+
+        Executions created through the telemetry writer are completed there
+        (together with the agent performance update) and None is returned.
+        """
+        writer = get_telemetry_writer()
+        if writer is not None and writer.record_execution_completed(
+            execution_id, success, code_result=code_result, output=output, error=error
+        ) is not None:
+            return None
+
         try:
             execution = (
                 db.query(AgentExecution).filter(AgentExecution.id == execution_id).first()
@@ -217,67 +404,94 @@ class DatabaseService:
     def _update_agent_performance(
         self, db: Session, agent_name: str, success: bool, execution_time_ms: int
     ):
-        """Update aggregate agent performance metrics"""
+        """Update aggregate agent performance metrics and the total latency histogram (atomic increments)"""
         try:
-            perf = (
-                db.query(AgentPerformance)
-                .filter(AgentPerformance.agent_name == agent_name)
-                .first()
-            )
+            execution_time_ms = execution_time_ms or 0
+            apply_performance_delta(db, agent_name, {
+                "runs": 1,
+                "successes": 1 if success else 0,
+                "failures": 0 if success else 1,
+                "time_total": execution_time_ms,
+                "min_time": execution_time_ms,
+                "max_time": execution_time_ms,
+            })
+            deltas = {}
+            add_latency(deltas, agent_name, PHASE_TOTAL, execution_time_ms, datetime.utcnow(), settings.LATENCY_WINDOW_MINUTES)
+            apply_latency_deltas(db, deltas)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to update agent performance: {e}")
+            db.rollback()
 
-            if not perf:
-                # Create new performance record
-                perf = AgentPerformance(
-                    agent_name=agent_name,
-                    total_runs=1,
-                    successful_runs=1 if success else 0,
-                    failed_runs=0 if success else 1,
-                    success_rate=1.0 if success else 0.0,
-                    avg_execution_time_ms=execution_time_ms,
-                    min_execution_time_ms=execution_time_ms,
-                    max_execution_time_ms=execution_time_ms,
-                )
-                db.add(perf)
-            else:
-                # Update existing performance record
-                perf.total_runs += 1
-                if success:
-                    perf.successful_runs += 1
-                else:
-                    perf.failed_runs += 1
-
-                perf.success_rate = perf.successful_runs / perf.total_runs
-
-                # Update timing statistics
-                if execution_time_ms:
-                    if perf.avg_execution_time_ms:
-                        # Calculate new average
-                        total_time = perf.avg_execution_time_ms * (perf.total_runs - 1)
-                        perf.avg_execution_time_ms = int(
-                            (total_time + execution_time_ms) / perf.total_runs
-                        )
-                    else:
-                        perf.avg_execution_time_ms = execution_time_ms
-
-                    if (
-                        not perf.min_execution_time_ms
-                        or execution_time_ms < perf.min_execution_time_ms
-                    ):
-                        perf.min_execution_time_ms = execution_time_ms
-
-                    if (
-                        not perf.max_execution_time_ms
-                        or execution_time_ms > perf.max_execution_time_ms
-                    ):
-                        perf.max_execution_time_ms = execution_time_ms
+    def record_agent_latencies(self, db: Session, agent_name: str, durations_ms: Dict[str, int]):
+        """
+        Count phase durations of one agent run in the latency histograms
+
+        Args:
+            db: Session (unused when the telemetry writer buffers the counts)
+            agent_name: Agent
+            durations_ms: Duration per phase (code_generation, execution, explanation)
+        """
+        writer = get_telemetry_writer()
+        if writer is not None:
+            for phase, duration_ms in durations_ms.items():
+                writer.record_latency(agent_name, phase, duration_ms)
+            return
 
+        try:
+            deltas = {}
+            now = datetime.utcnow()
+            for phase, duration_ms in durations_ms.items():
+                add_latency(deltas, agent_name, phase, duration_ms, now, settings.LATENCY_WINDOW_MINUTES)
+            apply_latency_deltas(db, deltas)
             db.commit()
         except Exception as e:
-            logger.error(f"Failed to update agent performance: {e}")
+            logger.error(f"Failed to record agent latencies: {e}")
             db.rollback()
 
+    def get_agent_latency(self, db: Session, window_hours: float = 24) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Latency percentiles per agent and phase
+
+        Args:
+            db: Session
+            window_hours: Only runs of the last window_hours (0 = everything retained)
+
+        Returns:
+            {agent_name: {phase: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}}
+        """
+        self.flush_telemetry()
+        since = datetime.utcnow() - timedelta(hours=window_hours) if window_hours else None
+        return summarize_by_agent(load_histograms(db, since=since))
+
+    def get_agent_latency_trend(
+        self,
+        db: Session,
+        agent_name: Optional[str] = None,
+        phase: str = PHASE_TOTAL,
+        window_hours: float = 24,
+        step_minutes: int = 60,
+    ) -> List[Dict[str, Any]]:
+        """
+        Latency percentiles per time step
+
+        Args:
+            db: Session
+            agent_name: Agent, or None for all agents merged
+            phase: Phase
+            window_hours: Only runs of the last window_hours (0 = everything retained)
+            step_minutes: Length of each step (a multiple of LATENCY_WINDOW_MINUTES, at most a day)
+
+        Returns:
+            [{window_start, count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}], oldest first
+        """
+        self.flush_telemetry()
+        since = datetime.utcnow() - timedelta(hours=window_hours) if window_hours else None
+        return summarize_trend(load_histograms(db, since=since, agent_name=agent_name, phase=phase), step_minutes)
+
     def get_agent_performance(self, db: Session, agent_name: str) -> Optional[AgentPerformance]:
         """Get performance metrics for an agent"""
+        self.flush_telemetry()
         return (
             db.query(AgentPerformance)
             .filter(AgentPerformance.agent_name == agent_name)
@@ -286,6 +500,7 @@ class DatabaseService:
 
     def get_all_agent_performance(self, db: Session) -> List[AgentPerformance]:
         """Get performance metrics for all agents"""
+        self.flush_telemetry()
         return db.query(AgentPerformance).order_by(desc(AgentPerformance.total_runs)).all()
 
     # ========== Caching ==========
@@ -293,7 +508,21 @@ class DatabaseService:
     def get_cached_analysis(
         self, db: Session, cache_key: str
     ) -> Optional[CachedAnalysis]:
-        """Get cached analysis result if available and not expired"""
+        """
+        Get cached analysis result if available and not expired
+
+        Served from the in-process tier when possible (a CachedResultEntry with the
+        same attributes, access counted in memory); otherwise from the database,
+        and the decoded result is kept in memory for the next hit.
+        """
+        memory = get_result_memory_cache()
+        if memory is not None:
+            entry = memory.get(TIER_ANALYSIS, cache_key)
+            if entry is not None:
+                self._record_cache_access(db, TIER_ANALYSIS, cache_key)
+                logger.info(f"Cache HIT (memory) for key: {cache_key[:16]}...")
+                return entry
+
         try:
             cached = (
                 db.query(CachedAnalysis)
@@ -310,11 +539,14 @@ class DatabaseService:
                     return None
 
                 # Update access statistics
-                cached.last_accessed = datetime.utcnow()
-                cached.access_count += 1
-                db.commit()
-                db.refresh(cached)
-
+                cached = self._touch_cache_row(db, TIER_ANALYSIS, cached)
+                self.resolve_payloads(db, cached, "cached_result")
+
+                if memory is not None:
+                    memory.put(
+                        TIER_ANALYSIS, cache_key, cached.cached_result, cached.created_at,
+                        cached.expires_at, cached.access_count, cached.time_saved_ms,
+                    )
                 logger.info(f"Cache HIT for key: {cache_key[:16]}...")
                 return cached
 
@@ -346,12 +578,13 @@ class DatabaseService:
 
             if existing:
                 # Update existing cache
-                existing.cached_result = result
+                existing.cached_result = self._pack_result(db, result)
                 existing.last_accessed = datetime.utcnow()
                 existing.access_count = 0  # Reset on update
                 existing.expires_at = datetime.utcnow() + timedelta(hours=ttl_hours)
                 db.commit()
                 db.refresh(existing)
+                self._remember_result(TIER_ANALYSIS, existing, result)
                 logger.info(f"Updated cache for key: {cache_key[:16]}...")
                 return existing
 
@@ -361,29 +594,34 @@ class DatabaseService:
                 data_hash=data_hash,
                 user_question=user_question,
                 analysis_id=analysis_id,
-                cached_result=result,
+                cached_result=self._pack_result(db, result),
                 expires_at=datetime.utcnow() + timedelta(hours=ttl_hours),
                 time_saved_ms=execution_time_ms,
             )
             db.add(cached)
             db.commit()
             db.refresh(cached)
+            self._remember_result(TIER_ANALYSIS, cached, result)
             logger.info(f"Saved to cache with key: {cache_key[:16]}...")
             return cached
         except Exception as e:
             logger.error(f"Failed to save to cache: {e}")
             db.rollback()
+            memory = get_result_memory_cache()
+            if memory is not None:
+                memory.invalidate(TIER_ANALYSIS, cache_key)
             return None
 
     def clear_expired_cache(self, db: Session) -> int:
         """Clear all expired cache entries"""
         try:
-            result = (
-                db.query(CachedAnalysis)
-                .filter(CachedAnalysis.expires_at < datetime.utcnow())
-                .delete()
-            )
+            expired = CachedAnalysis.expires_at < datetime.utcnow()
+            count_removed_cache_rows(db, CachedAnalysis, expired)
+            result = db.query(CachedAnalysis).filter(expired).delete()
             db.commit()
+            memory = get_result_memory_cache()
+            if memory is not None:
+                memory.purge_expired(TIER_ANALYSIS)
             logger.info(f"Cleared {result} expired cache entries")
             return result
         except Exception as e:
@@ -394,6 +632,13 @@ class DatabaseService:
     # ========== Per-Agent Caching ==========
 
     def get_agent_cached_result(self, db: Session, cache_key: str) -> Optional[AgentCachedResult]:
+        memory = get_result_memory_cache()
+        if memory is not None:
+            entry = memory.get(TIER_AGENT, cache_key)
+            if entry is not None:
+                self._record_cache_access(db, TIER_AGENT, cache_key)
+                return entry
+
         try:
             cached = db.query(AgentCachedResult).filter(AgentCachedResult.cache_key == cache_key).first()
             if cached:
@@ -401,10 +646,10 @@ class DatabaseService:
                     db.delete(cached)
                     db.commit()
                     return None
-                cached.last_accessed = datetime.utcnow()
-                cached.access_count += 1
-                db.commit()
-                db.refresh(cached)
+                cached = self._touch_cache_row(db, TIER_AGENT, cached)
+                self.resolve_payloads(db, cached, "result")
+                if memory is not None:
+                    memory.put(TIER_AGENT, cache_key, cached.result, cached.created_at, cached.expires_at, cached.access_count)
                 return cached
             return None
         except Exception as e:
@@ -424,28 +669,33 @@ class DatabaseService:
         try:
             existing = db.query(AgentCachedResult).filter(AgentCachedResult.cache_key == cache_key).first()
             if existing:
-                existing.result = result
+                existing.result = self._pack_agent_result(db, result)
                 existing.last_accessed = datetime.utcnow()
                 existing.access_count = 0
                 existing.expires_at = datetime.utcnow() + timedelta(hours=ttl_hours)
                 db.commit()
                 db.refresh(existing)
+                self._remember_result(TIER_AGENT, existing, result)
                 return existing
             cached = AgentCachedResult(
                 cache_key=cache_key,
                 data_hash=data_hash,
                 user_question=user_question,
                 agent_name=agent_name,
-                result=result,
+                result=self._pack_agent_result(db, result),
                 expires_at=datetime.utcnow() + timedelta(hours=ttl_hours)
             )
             db.add(cached)
             db.commit()
             db.refresh(cached)
+            self._remember_result(TIER_AGENT, cached, result)
             return cached
         except Exception as e:
             logger.error(f"Failed to save agent cached result: {e}")
             db.rollback()
+            memory = get_result_memory_cache()
+            if memory is not None:
+                memory.invalidate(TIER_AGENT, cache_key)
             return None
 
     def clear_expired_agent_cache(self, db: Session) -> int:
@@ -456,37 +706,212 @@ class DatabaseService:
                 .delete()
             )
             db.commit()
+            memory = get_result_memory_cache()
+            if memory is not None:
+                memory.purge_expired(TIER_AGENT)
             return result
         except Exception as e:
             logger.error(f"Failed to clear expired agent cache: {e}")
             db.rollback()
             return 0
 
+    @staticmethod
+    def _pack_result(db: Session, result: Dict[str, Any]) -> Any:
+        store = get_payload_store()
+        return store.pack_result(db, result) if store else result
+
+    @staticmethod
+    def _pack_agent_result(db: Session, result: Dict[str, Any]) -> Any:
+        store = get_payload_store()
+        return store.pack(db, result) if store else result
+
+    @staticmethod
+    def _remember_result(tier: str, row: Any, result: Dict[str, Any]):
+        """Write a freshly saved cache row through to the memory tier (and show the row its content, not the reference)"""
+        set_committed_value(row, "cached_result" if tier == TIER_ANALYSIS else "result", result)
+        memory = get_result_memory_cache()
+        if memory is not None:
+            memory.put(
+                tier, row.cache_key, result, row.created_at, row.expires_at,
+                row.access_count or 0, getattr(row, "time_saved_ms", 0) or 0,
+            )
+
+    @staticmethod
+    def _record_cache_access(db: Session, tier: str, cache_key: str):
+        """Count a cache hit: buffered by the telemetry writer, else an increment UPDATE"""
+        writer = get_telemetry_writer()
+        if writer is not None:
+            writer.record_cache_access(tier, cache_key)
+            return
+        model = CACHE_MODELS[tier]
+        try:
+            updated = db.query(model).filter(model.cache_key == cache_key).update(
+                {model.access_count: model.access_count + 1, model.last_accessed: datetime.utcnow()},
+                synchronize_session=False,
+            )
+            if updated:
+                count_cache_hits(db, model, updated)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to record cache access: {e}")
+            db.rollback()
+
+    def _touch_cache_row(self, db: Session, tier: str, cached: Any) -> Any:
+        """Count a database cache hit and return the row with its updated access statistics"""
+        if get_telemetry_writer() is None:
+            cached.last_accessed = datetime.utcnow()
+            cached.access_count += 1
+            db.commit()
+            db.refresh(cached)
+            return cached
+        self._record_cache_access(db, tier, cached.cache_key)
+        # Detach so the in-memory increment is never written by this session
+        db.expunge(cached)
+        cached.last_accessed = datetime.utcnow()
+        cached.access_count += 1
+        return cached
+
+    # ========== Code Library ==========
+
+    def get_library_code(
+        self,
+        db: Session,
+        library_key: str,
+        max_consecutive_failures: int = 2
+    ) -> Optional[AgentCodeLibraryEntry]:
+        """Library entry for a key, unless it has failed too often in a row"""
+        try:
+            entry = db.query(AgentCodeLibraryEntry).filter(AgentCodeLibraryEntry.library_key == library_key).first()
+            if entry is None or entry.consecutive_failures >= max_consecutive_failures:
+                return None
+            return entry
+        except Exception as e:
+            logger.error(f"Failed to get library code: {e}")
+            return None
+
+    def save_library_code(
+        self,
+        db: Session,
+        library_key: str,
+        agent_name: str,
+        schema_fingerprint: str,
+        normalized_question: str,
+        code: str,
+        description: Optional[str] = None,
+        analysis_id: Optional[str] = None,
+    ) -> Optional[AgentCodeLibraryEntry]:
+        """Store freshly generated code that just executed successfully (replaces the previous script)"""
+        try:
+            now = datetime.utcnow()
+            entry = db.query(AgentCodeLibraryEntry).filter(AgentCodeLibraryEntry.library_key == library_key).first()
+            if entry is None:
+                entry = AgentCodeLibraryEntry(
+                    library_key=library_key,
+                    agent_name=agent_name,
+                    schema_fingerprint=schema_fingerprint,
+                    normalized_question=normalized_question,
+                    success_count=0,
+                    failure_count=0,
+                )
+                db.add(entry)
+            elif entry.code != code:
+                # New script: its history starts over
+                entry.success_count = 0
+                entry.failure_count = 0
+            entry.code = code
+            entry.description = description
+            entry.source_analysis_id = analysis_id
+            entry.success_count += 1
+            entry.consecutive_failures = 0
+            entry.last_success_at = now
+            entry.last_used_at = now
+            db.commit()
+            db.refresh(entry)
+            return entry
+        except Exception as e:
+            logger.error(f"Failed to save library code: {e}")
+            db.rollback()
+            return None
+
+    def record_library_result(self, db: Session, library_key: str, success: bool):
+        """Update the success history after running library code"""
+        try:
+            entry = db.query(AgentCodeLibraryEntry).filter(AgentCodeLibraryEntry.library_key == library_key).first()
+            if entry is None:
+                return
+            now = datetime.utcnow()
+            entry.last_used_at = now
+            if success:
+                entry.success_count += 1
+                entry.consecutive_failures = 0
+                entry.last_success_at = now
+            else:
+                entry.failure_count += 1
+                entry.consecutive_failures += 1
+                entry.last_failure_at = now
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to record library result: {e}")
+            db.rollback()
+
     # ========== Statistics ==========
 
+    @staticmethod
+    def flush_telemetry() -> int:
+        """Write buffered telemetry now, so reports include the latest runs"""
+        writer = get_telemetry_writer()
+        return writer.flush() if writer is not None else 0
+
     def get_analysis_statistics(self, db: Session) -> Dict[str, Any]:
-        """Get overall analysis statistics"""
+        """
+        Get overall analysis statistics (from the dashboard counters when enabled)
+
+        Cache hits still buffered in the telemetry writer appear after its next flush.
+        """
         try:
-            total = db.query(Analysis).count()
-            completed = db.query(Analysis).filter(Analysis.status == "completed").count()
-            failed = db.query(Analysis).filter(Analysis.status == "failed").count()
-            cached = db.query(Analysis).filter(Analysis.is_cached == True).count()
-
-            # Average execution time
-            avg_time_result = db.query(
-                func.avg(Analysis.execution_time_ms)
-            ).filter(Analysis.execution_time_ms.isnot(None)).first()
-
-            avg_execution_time = int(avg_time_result[0]) if avg_time_result[0] else 0
-
-            # Cache statistics
-            cache_count = db.query(CachedAnalysis).count()
-            total_cache_hits = (
-                db.query(func.sum(CachedAnalysis.access_count)).scalar() or 0
-            )
-            total_time_saved = (
-                db.query(func.sum(CachedAnalysis.time_saved_ms)).scalar() or 0
-            )
+            counters = get_dashboard_counters()
+            if counters is not None:
+                totals = counters.totals(db)
+                total = totals.get(ANALYSES, 0)
+                completed = totals.get(status_counter("completed"), 0)
+                failed = totals.get(status_counter("failed"), 0)
+                cached = totals.get(ANALYSES_CACHED, 0)
+                timed = totals.get(ANALYSES_TIMED, 0)
+                avg_execution_time = int(totals.get(ANALYSES_TIME_MS, 0) / timed) if timed else 0
+                cache_count = totals.get(CACHE_ENTRIES, 0)
+                total_cache_hits = totals.get(CACHE_HITS, 0)
+                total_time_saved = totals.get(CACHE_TIME_SAVED_MS, 0)
+                library_entries = totals.get(LIBRARY_ENTRIES, 0)
+                library_successes = totals.get(LIBRARY_SUCCESSES, 0)
+                library_failures = totals.get(LIBRARY_FAILURES, 0)
+            else:
+                total = db.query(Analysis).count()
+                completed = db.query(Analysis).filter(Analysis.status == "completed").count()
+                failed = db.query(Analysis).filter(Analysis.status == "failed").count()
+                cached = db.query(Analysis).filter(Analysis.is_cached == True).count()
+
+                # Average execution time
+                avg_time_result = db.query(
+                    func.avg(Analysis.execution_time_ms)
+                ).filter(Analysis.execution_time_ms.isnot(None)).first()
+
+                avg_execution_time = int(avg_time_result[0]) if avg_time_result[0] else 0
+
+                # Cache statistics
+                cache_count = db.query(CachedAnalysis).count()
+                total_cache_hits = (
+                    db.query(func.sum(CachedAnalysis.access_count)).scalar() or 0
+                )
+                total_time_saved = (
+                    db.query(func.sum(CachedAnalysis.time_saved_ms)).scalar() or 0
+                )
+
+                # Code library statistics
+                library_entries, library_successes, library_failures = db.query(
+                    func.count(AgentCodeLibraryEntry.id),
+                    func.coalesce(func.sum(AgentCodeLibraryEntry.success_count), 0),
+                    func.coalesce(func.sum(AgentCodeLibraryEntry.failure_count), 0),
+                ).one()
 
             return {
                 "total_analyses": total,
@@ -499,6 +924,11 @@ class DatabaseService:
                 "total_cache_hits": total_cache_hits,
                 "total_time_saved_ms": total_time_saved,
                 "cache_hit_rate": (cached / total * 100) if total > 0 else 0,
+                "code_library": {
+                    "entries": library_entries,
+                    "successful_runs": int(library_successes),
+                    "failed_runs": int(library_failures),
+                },
             }
         except Exception as e:
             logger.error(f"Failed to get analysis statistics: {e}")
@@ -0,0 +1,199 @@
+"""
+Dedicated thread pool for database access
+Runs the synchronous SQLAlchemy service calls off the event loop so a slow
+query no longer stalls WebSocket progress and other requests
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseExecutor:
+    """
+    Thread pool that owns all blocking database work of async code
+
+    run() opens a session for the call inside the worker thread and closes it
+    afterwards, so concurrent requests and parallel agents never share one.
+    Sessions are created with expire_on_commit=False: the ORM objects a call
+    returns keep their loaded attributes and stay readable on the event loop
+    after the session is closed (relationships are not lazy-loaded).
+
+    run_in() is for a task that keeps its own session across several calls
+    (one agent execution): the session moves between worker threads but is
+    only ever used by one call at a time, which SQLAlchemy allows.
+
+    Usage:
+        executor = get_db_executor()
+        record = await executor.run(db_service.create_analysis, filename=..., ...)
+        cached = await executor.run_in(db, db_service.get_agent_cached_result, key)
+    """
+
+    def __init__(self, session_factory: Callable[..., Session], workers: int = 8, slow_call_ms: int = 500):
+        """
+        Initialize executor
+
+        Args:
+            session_factory: sessionmaker used by run()
+            workers: Number of database threads
+            slow_call_ms: Calls slower than this are logged as slow (0 disables)
+        """
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.slow_call_ms = slow_call_ms
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats_counters = {"calls": 0, "failed": 0, "slow_calls": 0, "in_flight": 0, "max_call_ms": 0, "total_call_ms": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+                logger.info(f"Database executor started with {self.workers} threads")
+            return self._executor
+
+    def _timed(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn in the current (worker) thread and record its duration"""
+        with self._lock:
+            self.stats_counters["in_flight"] += 1
+        started = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            with self._lock:
+                counters = self.stats_counters
+                counters["in_flight"] -= 1
+                counters["calls"] += 1
+                counters["total_call_ms"] += elapsed_ms
+                counters["max_call_ms"] = max(counters["max_call_ms"], elapsed_ms)
+                if failed:
+                    counters["failed"] += 1
+                if self.slow_call_ms and elapsed_ms >= self.slow_call_ms:
+                    counters["slow_calls"] += 1
+            if self.slow_call_ms and elapsed_ms >= self.slow_call_ms:
+                logger.warning(f"Slow database call {getattr(fn, '__qualname__', fn)} took {elapsed_ms}ms")
+
+    def _with_session(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        db = self.session_factory(expire_on_commit=False)
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    async def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) in a database thread and await its result
+
+        Args:
+            fn: Blocking function (it manages any session itself)
+
+        Returns:
+            The function's return value
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(self._timed, fn, *args, **kwargs)
+        )
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(db, *args, **kwargs) with a session of its own
+
+        Args:
+            fn: Function taking the session as its first argument (e.g. a DatabaseService method)
+
+        Returns:
+            The function's return value
+        """
+        return await self.call(self._with_session, fn, *args, **kwargs)
+
+    async def run_in(self, db: Session, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(db, *args, **kwargs) with a session owned by the calling task
+
+        Args:
+            db: Session the caller uses for nothing else while this call runs
+            fn: Function taking the session as its first argument
+
+        Returns:
+            The function's return value
+        """
+        return await self.call(fn, db, *args, **kwargs)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Schedule fn(*args, **kwargs) in a database thread without waiting for it
+
+        For synchronous callbacks running on the event loop; like call(), fn
+        manages any session itself.
+
+        Returns:
+            concurrent.futures.Future of the call
+        """
+        return self._get_executor().submit(self._timed, fn, *args, **kwargs)
+
+    def shutdown(self):
+        """Finish queued calls and stop the threads"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+            logger.info("Database executor stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters and timings"""
+        with self._lock:
+            counters = dict(self.stats_counters)
+        counters["avg_call_ms"] = round(counters["total_call_ms"] / counters["calls"], 1) if counters["calls"] else 0.0
+        counters["workers"] = self.workers
+        return counters
+
+
+# Singleton instance
+_db_executor: Optional[DatabaseExecutor] = None
+
+
+def get_db_executor() -> DatabaseExecutor:
+    """
+    Get or create the process-wide database executor
+
+    Returns:
+        DatabaseExecutor instance
+    """
+    global _db_executor
+
+    if _db_executor is None:
+        from models.database import SessionLocal
+
+        _db_executor = DatabaseExecutor(
+            session_factory=SessionLocal,
+            workers=settings.DB_EXECUTOR_THREADS,
+            slow_call_ms=settings.DB_SLOW_CALL_MS,
+        )
+
+    return _db_executor
+
+
+async def run_db(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run fn(db, *args, **kwargs) on the database executor with a session of its own
+
+    Returns:
+        The function's return value
+    """
+    return await get_db_executor().run(fn, *args, **kwargs)
@@ -0,0 +1,198 @@
+"""
+Execution explanations (ui_summary / next_insights) without a Claude call per agent
+Local extraction from the sandbox's results.json, and a batched explainer that runs off the critical path
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Explanation modes selectable in config.yaml (explanation.mode)
+MODE_PER_AGENT = "per_agent"
+MODE_BATCHED = "batched"
+MODE_LOCAL = "local"
+EXPLANATION_MODES = (MODE_PER_AGENT, MODE_BATCHED, MODE_LOCAL)
+
+# File the generated code writes its structured findings to
+RESULTS_FILENAME = "results.json"
+MAX_RESULTS_BYTES = 256 * 1024
+
+
+def get_explanation_config(raw_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read the explanation section of config.yaml
+
+    Args:
+        raw_config: Parsed config.yaml
+
+    Returns:
+        Dict with mode and batch_size (defaults keep one call per agent)
+    """
+    section = (raw_config or {}).get("explanation") or {}
+    mode = str(section.get("mode", MODE_PER_AGENT)).lower()
+    if mode not in EXPLANATION_MODES:
+        logger.warning(f"Unknown explanation mode '{mode}', using {MODE_PER_AGENT}")
+        mode = MODE_PER_AGENT
+    return {
+        "mode": mode,
+        "batch_size": max(1, int(section.get("batch_size", 4) or 4)),
+    }
+
+
+def load_structured_results(output_dir: Path) -> Optional[Dict[str, Any]]:
+    """Read results.json written by the agent code, if present and valid"""
+    path = Path(output_dir) / RESULTS_FILENAME
+    try:
+        if not path.is_file() or path.stat().st_size > MAX_RESULTS_BYTES:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {"results": data}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable {path}: {e}")
+        return None
+
+
+def extract_local_explanation(execution_result: Dict[str, Any], max_lines: int = 8) -> Dict[str, Any]:
+    """
+    Build ui_summary and next_insights deterministically from execution output
+
+    Prefers the structured results.json (summary / metrics / findings);
+    falls back to the last meaningful stdout lines for the summary.
+
+    Args:
+        execution_result: Result of AgentService._execute_agent_code
+        max_lines: Maximum summary bullets
+
+    Returns:
+        Dict with ui_summary (str) and next_insights (dict)
+    """
+    structured = execution_result.get("structured_results") or {}
+    next_insights = {k: v for k, v in structured.items() if k != "summary"}
+
+    summary = structured.get("summary")
+    if isinstance(summary, list):
+        summary = "\n".join(f"- {item}" for item in summary[:max_lines])
+    if not summary:
+        findings = structured.get("findings")
+        if isinstance(findings, list) and findings:
+            summary = "\n".join(f"- {item}" for item in findings[:max_lines])
+    if not summary:
+        lines = [
+            line.strip() for line in (execution_result.get("output") or "").splitlines()
+            if line.strip() and not set(line.strip()) <= set("=-*#_ ")
+        ]
+        summary = "\n".join(f"- {line[:200]}" for line in lines[-max_lines:])
+        if not execution_result.get("success", False) and execution_result.get("error"):
+            summary = f"Execution failed: {str(execution_result['error'])[:300]}"
+
+    return {"ui_summary": summary or "", "next_insights": next_insights}
+
+
+class BatchExplainer:
+    """
+    Collects completed agents and explains them in one Claude call per batch
+
+    Batches are flushed in background tasks once batch_size agents are
+    pending; drain() flushes the rest and waits, and should be called before
+    the report is generated. Agents are batched per prompt question, so
+    data_only agents (queued with an empty question) never share a prompt
+    that contains the question. Explanations are written into the agents'
+    execution_result dicts in place and announced with agent_summary events.
+    """
+
+    def __init__(self, claude_service, ctx, batch_size: int = 4, on_explained=None):
+        """
+        Initialize explainer
+
+        Args:
+            claude_service: ClaudeService used for explain_executions_batch
+            ctx: RunContext of the analysis (progress events, bypass flag)
+            batch_size: Agents per Claude call
+            on_explained: Optional callback(agent_name, result, explanation) after an agent is explained
+        """
+        self.claude_service = claude_service
+        self.ctx = ctx
+        self.batch_size = batch_size
+        self.on_explained = on_explained
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, agent_name: str, result: Dict[str, Any], user_question: str, data_sample: Dict[str, Any]):
+        """Queue a completed agent; starts a background flush when its batch is full"""
+        pending = self._pending.setdefault(user_question, [])
+        pending.append({
+            "agent_name": agent_name,
+            "result": result,
+            "user_question": user_question,
+            "data_sample": data_sample,
+        })
+        if len(pending) >= self.batch_size:
+            self._start_flush(user_question)
+
+    def _start_flush(self, user_question: Optional[str] = None):
+        """Flush the batch of one prompt question (every batch when None)"""
+        questions = list(self._pending) if user_question is None else [user_question]
+        for question in questions:
+            batch = self._pending.pop(question, [])
+            if batch:
+                self._tasks.append(asyncio.create_task(self._flush(batch)))
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        items = []
+        for item in batch:
+            execution_result = item["result"].get("execution_result", {})
+            items.append({
+                "agent_name": item["agent_name"],
+                "code_snippet": item["result"].get("code_result", {}).get("code", ""),
+                "execution_output": execution_result.get("output", ""),
+                "output_files": execution_result.get("output_files", []),
+                "structured_results": execution_result.get("structured_results"),
+            })
+        try:
+            explanations = await self.claude_service.explain_executions_batch(
+                user_question=batch[0]["user_question"],
+                data_sample=batch[0]["data_sample"],
+                items=items,
+                bypass_cache=self.ctx.bypass_cache,
+            )
+        except Exception as e:
+            logger.warning(f"Batched explanation failed for {[i['agent_name'] for i in batch]}: {e}")
+            return
+
+        for item in batch:
+            explanation = explanations.get(item["agent_name"])
+            if not explanation:
+                continue
+            execution_result = item["result"].setdefault("execution_result", {})
+            if explanation.get("ui_summary"):
+                execution_result["ui_summary"] = explanation["ui_summary"]
+            if isinstance(explanation.get("next_insights"), dict):
+                merged = dict(execution_result.get("next_insights") or {})
+                merged.update(explanation["next_insights"])
+                execution_result["next_insights"] = merged
+            if self.on_explained:
+                try:
+                    self.on_explained(item["agent_name"], item["result"], explanation)
+                except Exception as cb_err:
+                    logger.debug(f"Explanation callback failed for {item['agent_name']}: {cb_err}")
+            await self.ctx.send_progress({
+                "type": "agent_summary",
+                "workflow_id": self.ctx.workflow_id,
+                "agent_name": item["agent_name"],
+                "ui_summary": execution_result.get("ui_summary", ""),
+                "next_insights": execution_result.get("next_insights", {}),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+    async def drain(self):
+        """Flush pending agents and wait for every batch to finish"""
+        self._start_flush()
+        if self._tasks:
+            tasks, self._tasks = self._tasks, []
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,94 @@
+"""
+Shared HTTP client for the Claude API
+One long-lived connection pool per process (keep-alive, optional HTTP/2) instead of a client per call
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+from config import settings
+from services.llm_transport import wrap_transport
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    use_http2 = settings.CLAUDE_HTTP2 and HTTP2_AVAILABLE
+    if settings.CLAUDE_HTTP2 and not HTTP2_AVAILABLE:
+        logger.warning("CLAUDE_HTTP2 is enabled but h2 is not installed; using HTTP/1.1 keep-alive")
+
+    def live_transport() -> httpx.AsyncBaseTransport:
+        return httpx.AsyncHTTPTransport(
+            http2=use_http2,
+            limits=httpx.Limits(
+                max_connections=settings.CLAUDE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CLAUDE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.CLAUDE_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    client = httpx.AsyncClient(
+        transport=wrap_transport(live_transport),
+        timeout=httpx.Timeout(
+            connect=settings.CLAUDE_CONNECT_TIMEOUT,
+            read=settings.CLAUDE_READ_TIMEOUT,
+            write=settings.CLAUDE_WRITE_TIMEOUT,
+            pool=settings.CLAUDE_POOL_TIMEOUT,
+        ),
+    )
+    logger.info(
+        f"Created shared Claude HTTP client (http2={use_http2}, "
+        f"max_connections={settings.CLAUDE_MAX_CONNECTIONS})"
+    )
+    return client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get or create the shared async HTTP client
+
+    The client is bound to the event loop it was created on; if called from a
+    different loop (e.g. a script using asyncio.run more than once) a new
+    client is created for that loop.
+
+    Returns:
+        httpx.AsyncClient instance
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _build_client()
+        _client_loop = loop
+
+    return _client
+
+
+async def start_http_client():
+    """Create the shared client at application startup"""
+    get_http_client()
+
+
+async def close_http_client():
+    """Close the shared client and its pooled connections"""
+    global _client, _client_loop
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed shared Claude HTTP client")
+    _client = None
+    _client_loop = None
@@ -3,14 +3,29 @@ LangGraph Multi-Agent Workflow Implementation
 Complete implementation of the multi-agent framework using LangGraph
 """
 
-from typing import Dict, Any, List, Optional, TypedDict
+from typing import Dict, Any, List, Optional, Tuple, TypedDict, Callable
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
 import asyncio
+import copy
 import logging
 import json
+import time
 from datetime import datetime
 from config import settings
+from services.service_registry import (
+    CACHE_SCOPE_DATA_ONLY, get_config, get_claude_service, get_agent_service, get_database_service,
+)
+from services.selection_cache import normalize_question, schema_fingerprint
+from services.single_flight import get_agent_flights
+from services.db_executor import get_db_executor
+from services.latency_histogram import PHASE_CODE_GENERATION, PHASE_EXECUTION, PHASE_EXPLANATION
+from utils.fingerprint import fingerprint_bytes
+from services.explanations import (
+    BatchExplainer, MODE_BATCHED, MODE_PER_AGENT, extract_local_explanation, get_explanation_config
+)
+from services.run_context import RunContext, register_run, unregister_run
+from services.token_budget import CALL_REPORT
 
 logger = logging.getLogger(__name__)
 
@@ -47,20 +62,21 @@ class AnalysisState(TypedDict):
     
     # WebSocket callback for progress updates
     progress_callback: Optional[callable]
-    
-    # Non-serializable data stored separately
-    _db_session: Optional[Any]  # Private field that won't be serialized
 
 class LangGraphMultiAgentWorkflow:
     """LangGraph-based multi-agent workflow for data analysis"""
     
     def __init__(self, websocket_manager=None):
         self.websocket_manager = websocket_manager
-        self.checkpointer = MemorySaver()
+        # Compiled once and shared by all runs. Per-run state (DB sessions, analysis ID,
+        # cancellation, progress sink) travels in the run config, never on the instance.
         self.graph = self._build_graph()
-        # Store non-serializable session separately
-        self._current_db_session = None
-        self._current_analysis_id = None
+    
+    @staticmethod
+    def _run_context(config: Optional[RunnableConfig]) -> RunContext:
+        """Get the RunContext passed to graph.ainvoke through config['configurable']"""
+        context = ((config or {}).get("configurable") or {}).get("run_context")
+        return context if context is not None else RunContext()
         
     def _build_graph(self) -> StateGraph:
         """Build the complete multi-agent workflow graph"""
@@ -83,32 +99,37 @@ class LangGraphMultiAgentWorkflow:
         workflow.add_edge("dynamic_agent_executor", "report_generator")
         workflow.add_edge("report_generator", END)
         
-        return workflow.compile(checkpointer=self.checkpointer)
+        # No checkpointer: runs are never resumed, and checkpointing would snapshot
+        # the full state (including file_content) after every node
+        return workflow.compile()
     
-    async def _process_data_node(self, state: AnalysisState) -> AnalysisState:
+    async def _process_data_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Process the input data and create data sample"""
+        ctx = self._run_context(config)
         logger.info("Processing data...")
         
         # Send workflow started event (first node)
-        if self.websocket_manager:
-            await self.websocket_manager.send_workflow_started(
-                workflow_id=self._current_analysis_id or "",
-                filename=state.get("filename", ""),
-                user_question=state.get("user_question", "")
-            )
+        await ctx.send_progress({
+            "type": "workflow_started",
+            "workflow_id": ctx.workflow_id,
+            "filename": state.get("filename", ""),
+            "user_question": state.get("user_question", ""),
+            "progress": 0.0,
+            "timestamp": datetime.utcnow().isoformat()
+        })
         
         # Update progress
         state["progress"] = 10.0
         state["completed_steps"].append("data_processing")
         
         # Send progress update
-        await self._send_progress_update(state, "data_processing", "Processing data sample...")
+        await self._send_progress_update(ctx, state, "data_processing", "Processing data sample...")
         
         try:
             # Process the data using existing DataProcessor
             from utils.data_processor import DataProcessor
             processor = DataProcessor()
-            state["data_sample"] = processor.read_file_sample(
+            state["data_sample"] = await processor.read_file_sample_async(
                 state["file_content"], 
                 state["filename"], 
                 sample_rows=5
@@ -133,18 +154,19 @@ class LangGraphMultiAgentWorkflow:
         except Exception as e:
             logger.error(f"Data processing failed: {e}")
             state["errors"].append(f"Data processing: {str(e)}")
-            await self._send_error_update(state, "data_processing", str(e))
+            await self._send_error_update(ctx, state, "data_processing", str(e))
         
         return state
     
-    async def _select_agents_node(self, state: AnalysisState) -> AnalysisState:
+    async def _select_agents_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Select appropriate agents based on data and question"""
+        ctx = self._run_context(config)
         logger.info("Selecting agents...")
         
         state["progress"] = 20.0
         state["completed_steps"].append("agent_selection")
         
-        await self._send_progress_update(state, "agent_selection", "Selecting appropriate agents...")
+        await self._send_progress_update(ctx, state, "agent_selection", "Selecting appropriate agents...")
         
         try:
             # If agents were already provided, use them
@@ -156,11 +178,11 @@ class LangGraphMultiAgentWorkflow:
             else:
                 # Use Claude to select agents
                 logger.info("No agents provided, using Claude to select agents automatically")
-                from services.claude_service import ClaudeService
-                claude_service = ClaudeService()
+                claude_service = get_claude_service()
                 state["selected_agents"] = await claude_service.select_agents(
                     state["data_sample"], 
-                    state["user_question"]
+                    state["user_question"],
+                    bypass_cache=ctx.bypass_cache
                 )
                 logger.info(f"Claude selected agents: {state['selected_agents']}")
             
@@ -169,12 +191,13 @@ class LangGraphMultiAgentWorkflow:
             state["errors"].append(f"Agent selection: {str(e)}")
             # Fallback to default agents
             state["selected_agents"] = ["data_quality_audit", "exploratory_data_analysis", "data_visualization"]
-            await self._send_error_update(state, "agent_selection", str(e))
+            await self._send_error_update(ctx, state, "agent_selection", str(e))
         
         return state
     
-    async def _run_dynamic_agents_node(self, state: AnalysisState) -> AnalysisState:
+    async def _run_dynamic_agents_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Run selected agents with hybrid execution: sequential prerequisites then parallel batches"""
+        ctx = self._run_context(config)
         logger.info("Running dynamic agents (hybrid mode)...")
 
         selected_agents = state.get("selected_agents", [])
@@ -183,12 +206,8 @@ class LangGraphMultiAgentWorkflow:
             return state
 
         # Build staged execution from config.yaml if available
-        try:
-            from services.claude_service import ClaudeService
-            _cs = ClaudeService()
-            exec_cfg = _cs.execution_config or {}
-        except Exception:
-            exec_cfg = {}
+        config_snapshot = get_config()
+        exec_cfg = config_snapshot.execution_config or {}
 
         # Defaults if no config
         configured_stages = exec_cfg.get("stages", [])
@@ -197,7 +216,7 @@ class LangGraphMultiAgentWorkflow:
         # Helper to get agent stage tag
         def _agent_stage(a: str) -> str:
             try:
-                return _cs.agent_configs.get(a, {}).get('stage', '')
+                return config_snapshot.agent_configs.get(a, {}).get('stage', '')
             except Exception:
                 return ''
 
@@ -255,7 +274,7 @@ class LangGraphMultiAgentWorkflow:
                         "timestamp": datetime.utcnow().isoformat()
                     }
                     state["agent_results"][agent_name] = error_result
-                    await self._send_agent_error(state, agent_name, str(res))
+                    await self._send_agent_error(ctx, state, agent_name, str(res))
                 else:
                     state["agent_results"][agent_name] = res
                     state["completed_steps"].append(agent_name)
@@ -265,7 +284,7 @@ class LangGraphMultiAgentWorkflow:
                     )
                     if res.get("success") and insights:
                         state["shared_insights"][agent_name] = insights
-                    await self._send_agent_completed(state, agent_name, res)
+                    await self._send_agent_completed(ctx, state, agent_name, res)
                     logger.info(f"Completed agent {agent_name}: {res.get('success', False)}")
             except Exception as e:
                 logger.error(f"Error processing result for agent {agent_name}: {e}")
@@ -278,19 +297,23 @@ class LangGraphMultiAgentWorkflow:
 
             if not agents_in_stage:
                 continue
+            if ctx.cancel_token.cancelled:
+                break
 
             # Stage start progress update
-            await self._send_progress_update(state, stage_meta["name"], f"Starting stage: {stage_meta['name']}")
+            await self._send_progress_update(ctx, state, stage_meta["name"], f"Starting stage: {stage_meta['name']}")
 
             if not parallel:
                 # Sequential execution
                 for agent_name in agents_in_stage:
+                    if ctx.cancel_token.cancelled:
+                        break
                     state["current_agent"] = agent_name
-                    await self._send_agent_started(state, agent_name)
-                    res = await self._execute_agent(agent_name, state)
+                    await self._send_agent_started(ctx, state, agent_name)
+                    res = await self._execute_agent(agent_name, state, ctx)
                     await _apply_result(agent_name, res)
                     state["progress"] = min(100.0, state["progress"] + progress_per_agent)
-                    await self._send_progress_update(state, agent_name, f"Completed {agent_name}")
+                    await self._send_progress_update(ctx, state, agent_name, f"Completed {agent_name}")
                     if stop_on_failure and (isinstance(res, Exception) or not res.get("success", False)):
                         logger.warning(f"Stopping stage '{stage_meta['name']}' due to failure in {agent_name}")
                         break
@@ -298,15 +321,15 @@ class LangGraphMultiAgentWorkflow:
                 # Parallel with optional max_parallel limiting
                 idx = 0
                 n = len(agents_in_stage)
-                while idx < n:
+                while idx < n and not ctx.cancel_token.cancelled:
                     batch = agents_in_stage[idx: idx + max_parallel]
                     # Send agent_started for each agent in batch and update state
                     for agent_name in batch:
                         state["current_agent"] = agent_name  # Track the current agent
-                        await self._send_agent_started(state, agent_name)
+                        await self._send_agent_started(ctx, state, agent_name)
 
                     # Execute all agents in the batch in parallel
-                    tasks = [self._execute_agent(agent_name, state) for agent_name in batch]
+                    tasks = [self._execute_agent(agent_name, state, ctx) for agent_name in batch]
                     results = await asyncio.gather(*tasks, return_exceptions=True)
 
                     # Process results for each agent in the batch
@@ -320,7 +343,21 @@ class LangGraphMultiAgentWorkflow:
                 state["current_agent"] = None
 
             # Stage end progress update
-            await self._send_progress_update(state, stage_meta["name"], f"Completed stage: {stage_meta['name']}")
+            await self._send_progress_update(ctx, state, stage_meta["name"], f"Completed stage: {stage_meta['name']}")
+
+        if ctx.cancel_token.cancelled:
+            logger.info(f"Analysis {ctx.workflow_id} cancelled; skipping remaining agents")
+            state["errors"].append("Analysis cancelled")
+
+        # Wait for batched explanations so the report sees every summary
+        if ctx.explainer is not None:
+            await ctx.explainer.drain()
+            for agent_name, res in state["agent_results"].items():
+                next_insights = res.get("execution_result", {}).get("next_insights")
+                if isinstance(next_insights, dict) and next_insights:
+                    state["shared_insights"].setdefault(agent_name, {})
+                    if isinstance(state["shared_insights"][agent_name], dict):
+                        state["shared_insights"][agent_name].update(next_insights)
 
         # Finalize
         state["progress"] = max(state["progress"], 90.0)
@@ -328,13 +365,13 @@ class LangGraphMultiAgentWorkflow:
         logger.info("Completed staged execution from config")
         return state
 
-    async def _execute_agent_with_progress(self, agent_name: str, state: AnalysisState,
+    async def _execute_agent_with_progress(self, agent_name: str, state: AnalysisState, ctx: RunContext,
                                           index: int, total: int, base_progress: float,
                                           progress_per_agent: float) -> Dict[str, Any]:
         """Execute a single agent with progress tracking (for parallel execution)"""
         try:
             # Execute the agent
-            result = await self._execute_agent(agent_name, state)
+            result = await self._execute_agent(agent_name, state, ctx)
             return result
 
         except Exception as e:
@@ -346,17 +383,18 @@ class LangGraphMultiAgentWorkflow:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
-    async def _run_data_quality_node(self, state: AnalysisState) -> AnalysisState:
+    async def _run_data_quality_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Run data quality audit agent"""
+        ctx = self._run_context(config)
         logger.info("Running data quality audit...")
         
         state["progress"] = 30.0
         state["current_agent"] = "data_quality_audit"
         
-        await self._send_agent_started(state, "data_quality_audit")
+        await self._send_agent_started(ctx, state, "data_quality_audit")
         
         try:
-            result = await self._execute_agent("data_quality_audit", state)
+            result = await self._execute_agent("data_quality_audit", state, ctx)
             state["agent_results"]["data_quality_audit"] = result
             state["completed_steps"].append("data_quality_audit")
             
@@ -364,26 +402,27 @@ class LangGraphMultiAgentWorkflow:
             if result.get("success") and result.get("insights"):
                 state["shared_insights"]["data_quality"] = result["insights"]
             
-            await self._send_agent_completed(state, "data_quality_audit", result)
+            await self._send_agent_completed(ctx, state, "data_quality_audit", result)
             
         except Exception as e:
             logger.error(f"Data quality audit failed: {e}")
             state["errors"].append(f"Data quality audit: {str(e)}")
-            await self._send_agent_error(state, "data_quality_audit", str(e))
+            await self._send_agent_error(ctx, state, "data_quality_audit", str(e))
         
         return state
     
-    async def _run_exploratory_node(self, state: AnalysisState) -> AnalysisState:
+    async def _run_exploratory_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Run exploratory data analysis agent"""
+        ctx = self._run_context(config)
         logger.info("Running exploratory analysis...")
         
         state["progress"] = 50.0
         state["current_agent"] = "exploratory_data_analysis"
         
-        await self._send_agent_started(state, "exploratory_data_analysis")
+        await self._send_agent_started(ctx, state, "exploratory_data_analysis")
         
         try:
-            result = await self._execute_agent("exploratory_data_analysis", state)
+            result = await self._execute_agent("exploratory_data_analysis", state, ctx)
             state["agent_results"]["exploratory_data_analysis"] = result
             state["completed_steps"].append("exploratory_analysis")
             
@@ -391,12 +430,12 @@ class LangGraphMultiAgentWorkflow:
             if result.get("success") and result.get("insights"):
                 state["shared_insights"]["exploratory"] = result["insights"]
             
-            await self._send_agent_completed(state, "exploratory_data_analysis", result)
+            await self._send_agent_completed(ctx, state, "exploratory_data_analysis", result)
             
         except Exception as e:
             logger.error(f"Exploratory analysis failed: {e}")
             state["errors"].append(f"Exploratory analysis: {str(e)}")
-            await self._send_agent_error(state, "exploratory_data_analysis", str(e))
+            await self._send_agent_error(ctx, state, "exploratory_data_analysis", str(e))
         
         return state
     
@@ -433,17 +472,18 @@ class LangGraphMultiAgentWorkflow:
         else:
             return "specialized"
     
-    async def _run_statistical_node(self, state: AnalysisState) -> AnalysisState:
+    async def _run_statistical_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Run statistical analysis agent"""
+        ctx = self._run_context(config)
         logger.info("Running statistical analysis...")
         
         state["progress"] = 60.0
         state["current_agent"] = "statistical_analysis"
         
-        await self._send_agent_started(state, "statistical_analysis")
+        await self._send_agent_started(ctx, state, "statistical_analysis")
         
         try:
-            result = await self._execute_agent("statistical_analysis", state)
+            result = await self._execute_agent("statistical_analysis", state, ctx)
             state["agent_results"]["statistical_analysis"] = result
             state["completed_steps"].append("statistical_analysis")
             
@@ -451,26 +491,27 @@ class LangGraphMultiAgentWorkflow:
             if result.get("success") and result.get("insights"):
                 state["shared_insights"]["statistical"] = result["insights"]
             
-            await self._send_agent_completed(state, "statistical_analysis", result)
+            await self._send_agent_completed(ctx, state, "statistical_analysis", result)
             
         except Exception as e:
             logger.error(f"Statistical analysis failed: {e}")
             state["errors"].append(f"Statistical analysis: {str(e)}")
-            await self._send_agent_error(state, "statistical_analysis", str(e))
+            await self._send_agent_error(ctx, state, "statistical_analysis", str(e))
         
         return state
     
-    async def _run_visualization_node(self, state: AnalysisState) -> AnalysisState:
+    async def _run_visualization_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Run data visualization agent"""
+        ctx = self._run_context(config)
         logger.info("Running data visualization...")
         
         state["progress"] = 70.0
         state["current_agent"] = "data_visualization"
         
-        await self._send_agent_started(state, "data_visualization")
+        await self._send_agent_started(ctx, state, "data_visualization")
         
         try:
-            result = await self._execute_agent("data_visualization", state)
+            result = await self._execute_agent("data_visualization", state, ctx)
             state["agent_results"]["data_visualization"] = result
             state["completed_steps"].append("data_visualization")
             
@@ -478,17 +519,18 @@ class LangGraphMultiAgentWorkflow:
             if result.get("success") and result.get("insights"):
                 state["shared_insights"]["visualization"] = result["insights"]
             
-            await self._send_agent_completed(state, "data_visualization", result)
+            await self._send_agent_completed(ctx, state, "data_visualization", result)
             
         except Exception as e:
             logger.error(f"Data visualization failed: {e}")
             state["errors"].append(f"Data visualization: {str(e)}")
-            await self._send_agent_error(state, "data_visualization", str(e))
+            await self._send_agent_error(ctx, state, "data_visualization", str(e))
         
         return state
     
-    async def _run_specialized_node(self, state: AnalysisState) -> AnalysisState:
+    async def _run_specialized_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Run specialized analysis agents based on data characteristics"""
+        ctx = self._run_context(config)
         logger.info("Running specialized analysis...")
         
         state["progress"] = 80.0
@@ -499,10 +541,10 @@ class LangGraphMultiAgentWorkflow:
         for agent_name in specialized_agents:
             state["current_agent"] = agent_name
             
-            await self._send_agent_started(state, agent_name)
+            await self._send_agent_started(ctx, state, agent_name)
             
             try:
-                result = await self._execute_agent(agent_name, state)
+                result = await self._execute_agent(agent_name, state, ctx)
                 state["agent_results"][agent_name] = result
                 state["completed_steps"].append(agent_name)
                 
@@ -510,26 +552,29 @@ class LangGraphMultiAgentWorkflow:
                 if result.get("success") and result.get("insights"):
                     state["shared_insights"][agent_name] = result["insights"]
                 
-                await self._send_agent_completed(state, agent_name, result)
+                await self._send_agent_completed(ctx, state, agent_name, result)
                 
             except Exception as e:
                 logger.error(f"Specialized agent {agent_name} failed: {e}")
                 state["errors"].append(f"{agent_name}: {str(e)}")
-                await self._send_agent_error(state, agent_name, str(e))
+                await self._send_agent_error(ctx, state, agent_name, str(e))
         
         return state
     
-    async def _generate_report_node(self, state: AnalysisState) -> AnalysisState:
+    async def _generate_report_node(self, state: AnalysisState, config: RunnableConfig) -> AnalysisState:
         """Generate comprehensive final report"""
+        ctx = self._run_context(config)
         logger.info("Generating final report...")
 
         state["progress"] = 100.0
         state["current_agent"] = None
         state["completed_steps"].append("report_generation")
 
-        await self._send_progress_update(state, "report_generation", "Generating comprehensive report...")
+        await self._send_progress_update(ctx, state, "report_generation", "Generating comprehensive report...")
 
         try:
+            if ctx.cancel_token.cancelled:
+                raise RuntimeError("Analysis cancelled before report generation")
             # Generate comprehensive report from all agent results
             report = await self._create_comprehensive_report(state)
             state["final_report"] = report
@@ -554,44 +599,46 @@ class LangGraphMultiAgentWorkflow:
                 "generated_at": datetime.utcnow().isoformat(),
                 "timestamp": datetime.utcnow().isoformat()
             }
-            await self._send_error_update(state, "report_generation", str(e))
+            await self._send_error_update(ctx, state, "report_generation", str(e))
 
         # Always send workflow completed, even if report generation failed
-        await self._send_workflow_completed(state)
+        await self._send_workflow_completed(ctx, state)
 
         return state
     
-    async def _execute_agent(self, agent_name: str, state: AnalysisState) -> Dict[str, Any]:
+    async def _execute_agent(self, agent_name: str, state: AnalysisState, ctx: RunContext) -> Dict[str, Any]:
         """Execute a specific agent with access to shared state"""
         agent_execution_id = None
-        start_time = datetime.utcnow()
+        agent_cache_key = None
+        data_hash = None
+        db_service = get_database_service()
+        db_executor = get_db_executor()
+        # Session per agent task: parallel agents must never share a session. Its
+        # calls run on the DB executor so queries never block the event loop.
+        db = self._agent_session(ctx)
         
         try:
             # Per-agent cache check (if DB tracking available)
-            if self._current_db_session:
-                from services.database_service import DatabaseService
-                db_service = DatabaseService()
-                data_hash = db_service.generate_data_hash(state["file_content"])
-                agent_cache_key = db_service.generate_agent_cache_key(data_hash, state["user_question"], agent_name)
-                cached = db_service.get_agent_cached_result(self._current_db_session, agent_cache_key)
+            if db:
+                data_hash = ctx.data_hash
+                agent_cache_key = self._agent_cache_key(data_hash, state["user_question"], agent_name)
+            if agent_cache_key:
+                cached = await db_executor.run_in(db, db_service.get_agent_cached_result, agent_cache_key)
                 if cached and cached.result:
                     logger.info(f"Agent cache HIT for {agent_name}")
                     return cached.result
 
             # Create agent execution record if DB tracking is enabled
-            if self._current_analysis_id and self._current_db_session:
-                from services.database_service import DatabaseService
-                db_service = DatabaseService()
-                agent_execution = db_service.create_agent_execution(
-                    db=self._current_db_session,
-                    analysis_id=self._current_analysis_id,
+            if ctx.analysis_id and db:
+                agent_execution = await db_executor.run_in(
+                    db,
+                    db_service.create_agent_execution,
+                    analysis_id=ctx.analysis_id,
                     agent_name=agent_name
                 )
                 agent_execution_id = agent_execution.id
             
-            # Import and use existing agent service
-            from services.agent_service import AgentService
-            agent_service = AgentService()
+            agent_service = get_agent_service()
             
             # Get agent instance
             agent = agent_service.agents.get(agent_name)
@@ -602,100 +649,39 @@ class LangGraphMultiAgentWorkflow:
             if settings.AGENT_MOCK and agent_name != "agent_selector":
                 logger.info(f"Using mock execution for agent: {agent_name}")
                 return await self._mock_agent_execution(agent_name, agent, state)
-            
-            # Generate code for this agent
-            from services.claude_service import ClaudeService
-            claude_service = ClaudeService()
-            
-            # Load agent config
-            agent_config = claude_service.agent_configs.get(agent_name, {})
-            if not agent_config:
-                raise ValueError(f"Config for agent {agent_name} not found")
-            
-            # Collect previous agent results to pass to current agent
-            previous_results = {}
-            for completed_agent in state.get("completed_steps", []):
-                if completed_agent in state.get("agent_results", {}):
-                    previous_results[completed_agent] = state["agent_results"][completed_agent]
 
-            # Generate code with access to previous results
-            code_result = await claude_service.generate_agent_code(
-                agent_name, agent_config, state["data_sample"], state["user_question"],
-                previous_results=previous_results
-            )
-            
-            # Execute the code
-            execution_result = await agent_service._execute_agent_code(
-                agent_name, code_result, state["file_content"], state["data_sample"]
-            )
-            
-            # Combine results
-            result = {
-                "agent_name": agent_name,
-                "agent_info": {
-                    "display_name": agent.display_name,
-                    "description": agent.description,
-                    "specialties": agent.specialties
-                },
-                "code_result": code_result,
-                "execution_result": execution_result,
-                "timestamp": datetime.utcnow().isoformat(),
-                "success": execution_result.get("success", False)
-            }
-
-            # Generate explanation (ui_summary + next_insights) for UI and chaining
-            try:
-                from services.claude_service import ClaudeService
-                claude = ClaudeService()
-                explanation = await claude.explain_execution(
-                    agent_name=agent_name,
-                    user_question=state["user_question"],
-                    data_sample=state.get("data_sample", {}),
-                    code_snippet=code_result.get("code", ""),
-                    execution_output=execution_result.get("output", ""),
-                    output_files=execution_result.get("output_files", [])
+            # Identical agent work (same data, question and agent) already running in
+            # another analysis: wait for its result instead of generating code again
+            if agent_cache_key:
+                result, shared = await get_agent_flights().do(
+                    agent_cache_key,
+                    lambda: self._generate_and_run_agent(agent_name, agent, state, ctx, db, data_hash, agent_cache_key)
                 )
-                result["execution_result"]["ui_summary"] = explanation.get("ui_summary", "")
-                result["execution_result"]["next_insights"] = explanation.get("next_insights", {})
-                # Merge next_insights into shared_insights for downstream agents
-                if explanation.get("next_insights"):
-                    try:
-                        state["shared_insights"].setdefault(agent_name, {})
-                        if isinstance(explanation["next_insights"], dict):
-                            state["shared_insights"][agent_name].update(explanation["next_insights"])
-                    except Exception:
-                        pass
-            except Exception as ex:
-                logger.warning(f"Explanation generation failed for {agent_name}: {ex}")
+                if shared:
+                    logger.info(f"Reused in-flight execution of {agent_name}")
+                    # The leader keeps writing explanations into its result's nested dicts
+                    result = copy.deepcopy(result)
+            else:
+                result = await self._generate_and_run_agent(agent_name, agent, state, ctx, db, data_hash, agent_cache_key)
 
-            # Save per-agent cache (only if DB tracking available)
-            if self._current_db_session:
+            # Merge next_insights into shared_insights for downstream agents
+            next_insights = result.get("execution_result", {}).get("next_insights")
+            if next_insights and isinstance(next_insights, dict):
                 try:
-                    from services.database_service import DatabaseService
-                    db_service = DatabaseService()
-                    data_hash = db_service.generate_data_hash(state["file_content"])
-                    agent_cache_key = db_service.generate_agent_cache_key(data_hash, state["user_question"], agent_name)
-                    db_service.save_agent_cached_result(
-                        db=self._current_db_session,
-                        cache_key=agent_cache_key,
-                        data_hash=data_hash,
-                        user_question=state["user_question"],
-                        agent_name=agent_name,
-                        result=result,
-                        ttl_hours=24
-                    )
-                except Exception as ce:
-                    logger.warning(f"Failed to save agent cache for {agent_name}: {ce}")
+                    state["shared_insights"].setdefault(agent_name, {})
+                    state["shared_insights"][agent_name].update(next_insights)
+                except Exception:
+                    pass
             
             # Complete agent execution record
-            if agent_execution_id and self._current_db_session:
-                from services.database_service import DatabaseService
-                db_service = DatabaseService()
-                db_service.complete_agent_execution(
-                    db=self._current_db_session,
+            if agent_execution_id and db:
+                execution_result = result.get("execution_result", {})
+                await db_executor.run_in(
+                    db,
+                    db_service.complete_agent_execution,
                     execution_id=agent_execution_id,
                     success=result["success"],
-                    code_result=code_result,
+                    code_result=result.get("code_result"),
                     output=execution_result.get("output"),
                     error=execution_result.get("error")
                 )
@@ -706,12 +692,11 @@ class LangGraphMultiAgentWorkflow:
             logger.error(f"Error executing agent {agent_name}: {str(e)}")
 
             # Record error in DB if tracking enabled
-            if agent_execution_id and self._current_db_session:
+            if agent_execution_id and db:
                 try:
-                    from services.database_service import DatabaseService
-                    db_service = DatabaseService()
-                    db_service.complete_agent_execution(
-                        db=self._current_db_session,
+                    await db_executor.run_in(
+                        db,
+                        db_service.complete_agent_execution,
                         execution_id=agent_execution_id,
                         success=False,
                         error=str(e)
@@ -737,7 +722,308 @@ class LangGraphMultiAgentWorkflow:
                 },
                 "timestamp": datetime.utcnow().isoformat()
             }
+        finally:
+            if db is not None:
+                await db_executor.call(db.close)
+
+    async def _generate_and_run_agent(
+        self,
+        agent_name: str,
+        agent: Any,
+        state: AnalysisState,
+        ctx: RunContext,
+        db: Any,
+        data_hash: Optional[str],
+        agent_cache_key: Optional[str]
+    ) -> Dict[str, Any]:
+        """Generate (or reuse from the code library), execute and explain an agent's code, then save it to the agent cache"""
+        claude_service = get_claude_service()
+        
+        # Load agent config
+        agent_config = claude_service.agent_configs.get(agent_name, {})
+        if not agent_config:
+            raise ValueError(f"Config for agent {agent_name} not found")
+        
+        # Collect previous agent results to pass to current agent
+        previous_results = {}
+        for completed_agent in state.get("completed_steps", []):
+            if completed_agent in state.get("agent_results", {}):
+                previous_results[completed_agent] = state["agent_results"][completed_agent]
+        prompt_question, previous_results = self._prompt_inputs(agent_name, state["user_question"], previous_results)
+
+        # Phase durations for the latency histograms
+        durations_ms: Dict[str, int] = {}
+
+        # Reuse a script that already worked on data with the same schema
+        library_key, code_result, execution_result = None, None, None
+        if db is not None and settings.CODE_LIBRARY_ENABLED:
+            library_key, code_result, execution_result = await self._run_library_code(
+                agent_name, state, ctx, db, durations_ms
+            )
+        if execution_result is None:
+            code_result, execution_result = await self._generate_and_execute_code(
+                agent_name, agent_config, state, ctx, previous_results, durations_ms, user_question=prompt_question
+            )
+            if library_key and execution_result.get("success") and code_result.get("code"):
+                await get_db_executor().run_in(
+                    db,
+                    get_database_service().save_library_code,
+                    library_key=library_key,
+                    agent_name=agent_name,
+                    schema_fingerprint=schema_fingerprint(state["data_sample"]),
+                    normalized_question=normalize_question(state["user_question"]),
+                    code=code_result["code"],
+                    description=code_result.get("description"),
+                    analysis_id=ctx.analysis_id,
+                )
+        
+        # Combine results
+        result = {
+            "agent_name": agent_name,
+            "agent_info": {
+                "display_name": agent.display_name,
+                "description": agent.description,
+                "specialties": agent.specialties
+            },
+            "code_result": code_result,
+            "execution_result": execution_result,
+            "timestamp": datetime.utcnow().isoformat(),
+            "success": execution_result.get("success", False)
+        }
+
+        # Explanation (ui_summary + next_insights) for UI and chaining. The local
+        # extraction from results.json/stdout is free and always applied first.
+        local_explanation = extract_local_explanation(execution_result)
+        result["execution_result"]["ui_summary"] = local_explanation["ui_summary"]
+        result["execution_result"]["next_insights"] = local_explanation["next_insights"]
+
+        explanation_mode = get_explanation_config(get_config().raw)["mode"]
+        if explanation_mode == MODE_PER_AGENT:
+            explain_started = time.perf_counter()
+            try:
+                explanation = await claude_service.explain_execution(
+                    agent_name=agent_name,
+                    user_question=prompt_question,
+                    data_sample=state.get("data_sample", {}),
+                    code_snippet=code_result.get("code", ""),
+                    execution_output=execution_result.get("output", ""),
+                    output_files=execution_result.get("output_files", []),
+                    bypass_cache=ctx.bypass_cache
+                )
+                if explanation.get("ui_summary"):
+                    result["execution_result"]["ui_summary"] = explanation["ui_summary"]
+                if explanation.get("next_insights"):
+                    result["execution_result"]["next_insights"] = {
+                        **local_explanation["next_insights"], **explanation["next_insights"]
+                    }
+            except Exception as ex:
+                logger.warning(f"Explanation generation failed for {agent_name}: {ex}")
+            durations_ms[PHASE_EXPLANATION] = int((time.perf_counter() - explain_started) * 1000)
+        elif explanation_mode == MODE_BATCHED and ctx.explainer is not None and execution_result.get("success"):
+            # Explained later together with other agents, off the critical path
+            ctx.explainer.add(agent_name, result, prompt_question, state.get("data_sample", {}))
+
+        if db is not None and durations_ms:
+            try:
+                await get_db_executor().run_in(db, get_database_service().record_agent_latencies, agent_name, durations_ms)
+            except Exception as le:
+                logger.warning(f"Failed to record latencies for {agent_name}: {le}")
+
+        # Save per-agent cache (only if DB tracking available)
+        if db and agent_cache_key:
+            try:
+                await get_db_executor().run_in(
+                    db,
+                    get_database_service().save_agent_cached_result,
+                    cache_key=agent_cache_key,
+                    data_hash=data_hash,
+                    user_question=state["user_question"],
+                    agent_name=agent_name,
+                    result=result,
+                    ttl_hours=24
+                )
+            except Exception as ce:
+                logger.warning(f"Failed to save agent cache for {agent_name}: {ce}")
+
+        return result
     
+    async def _generate_and_execute_code(
+        self,
+        agent_name: str,
+        agent_config: Dict[str, Any],
+        state: AnalysisState,
+        ctx: RunContext,
+        previous_results: Dict[str, Any],
+        durations_ms: Optional[Dict[str, int]] = None,
+        user_question: Optional[str] = None
+    ):
+        """
+        Generate an agent's code with Claude and execute it; returns (code_result, execution_result)
+
+        The code generation and execution times are stored in durations_ms when given.
+        user_question overrides the run's question in the prompt ("" leaves it out).
+        """
+        if durations_ms is None:
+            durations_ms = {}
+        if user_question is None:
+            user_question = state["user_question"]
+        claude_service = get_claude_service()
+        agent_service = get_agent_service()
+
+        # Generate code with access to previous results
+        started = time.perf_counter()
+        description_task = None
+        if settings.CLAUDE_STREAMING:
+            async def send_code_delta(delta: str):
+                await ctx.send_progress({
+                    "type": "agent_code_delta",
+                    "workflow_id": ctx.workflow_id,
+                    "agent_name": agent_name,
+                    "delta": delta,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+
+            # Returns as soon as the code block closes; the YAML description keeps streaming
+            code_result, description_task = await claude_service.stream_agent_code(
+                agent_name, agent_config, state["data_sample"], user_question,
+                previous_results=previous_results, on_code_delta=send_code_delta,
+                bypass_cache=ctx.bypass_cache
+            )
+        else:
+            code_result = await claude_service.generate_agent_code(
+                agent_name, agent_config, state["data_sample"], user_question,
+                previous_results=previous_results, bypass_cache=ctx.bypass_cache
+            )
+        
+        durations_ms[PHASE_CODE_GENERATION] = int((time.perf_counter() - started) * 1000)
+
+        # Execute the code
+        started = time.perf_counter()
+        execution_result = await agent_service._execute_agent_code(
+            agent_name, code_result, state["file_content"], state["data_sample"]
+        )
+        durations_ms[PHASE_EXECUTION] = int((time.perf_counter() - started) * 1000)
+
+        # Pick up the description from the rest of the streamed response
+        if description_task is not None:
+            try:
+                full_result = await description_task
+                code_result["description"] = full_result.get("description", "")
+            except Exception as de:
+                logger.warning(f"Failed to read streamed description for {agent_name}: {de}")
+
+        return code_result, execution_result
+
+    async def _run_library_code(
+        self, agent_name: str, state: AnalysisState, ctx: RunContext, db: Any,
+        durations_ms: Optional[Dict[str, int]] = None
+    ):
+        """
+        Execute the code library's script for this agent, schema and question, if any
+
+        A successful run's execution time is stored in durations_ms when given.
+
+        Returns:
+            Tuple of (library_key, code_result, execution_result). The results are
+            None when there is no usable script or it failed on this data (the
+            failure is recorded and the caller generates new code).
+        """
+        db_service = get_database_service()
+        library_key = db_service.generate_code_library_key(
+            agent_name, schema_fingerprint(state["data_sample"]), normalize_question(state["user_question"])
+        )
+        if ctx.bypass_cache:
+            return library_key, None, None
+
+        entry = await get_db_executor().run_in(
+            db, db_service.get_library_code, library_key, settings.CODE_LIBRARY_MAX_CONSECUTIVE_FAILURES
+        )
+        if entry is None:
+            return library_key, None, None
+
+        logger.info(f"Reusing library code for {agent_name} (succeeded {entry.success_count}x on this schema)")
+        code_result = {
+            "code": entry.code,
+            "description": entry.description or "",
+            "outputs": [],
+            "insights": "",
+            "from_library": True,
+        }
+        started = time.perf_counter()
+        execution_result = await get_agent_service()._execute_agent_code(
+            agent_name, code_result, state["file_content"], state["data_sample"]
+        )
+        success = execution_result.get("success", False)
+        if success and durations_ms is not None:
+            durations_ms[PHASE_EXECUTION] = int((time.perf_counter() - started) * 1000)
+        await get_db_executor().run_in(db, db_service.record_library_result, library_key, success)
+        if not success:
+            logger.info(f"Library code for {agent_name} failed on this data; generating new code")
+            return library_key, None, None
+        return library_key, code_result, execution_result
+    
+    @staticmethod
+    def _agent_session(ctx: RunContext) -> Any:
+        """
+        New session for one agent task, or None without DB tracking
+
+        Objects stay loaded after commit (expire_on_commit=False, as in
+        DatabaseExecutor), so reading records returned by run_in on the event
+        loop never triggers a refresh query there.
+        """
+        return ctx.session_factory(expire_on_commit=False) if ctx.session_factory else None
+
+    @staticmethod
+    def _prompt_inputs(
+        agent_name: str, user_question: str, previous_results: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Question and previous results an agent's prompts may use under its cache_scope
+
+        A data_only agent's result is reused for other questions, so its prompts
+        get neither the question ("") nor the results of question-dependent agents.
+        """
+        config = get_config()
+        if config.cache_scope(agent_name) != CACHE_SCOPE_DATA_ONLY:
+            return user_question, previous_results
+        return "", {
+            name: result for name, result in previous_results.items()
+            if config.cache_scope(name) == CACHE_SCOPE_DATA_ONLY
+        }
+
+    @staticmethod
+    def _agent_cache_key(data_hash: str, user_question: str, agent_name: str) -> Optional[str]:
+        """Result cache key of an agent under its config.yaml cache_scope (None when it is never cached)"""
+        return get_database_service().generate_agent_cache_key(
+            data_hash,
+            user_question,
+            agent_name,
+            cache_scope=get_config().cache_scope(agent_name),
+            agent_version=get_agent_service().agent_cache_version(agent_name),
+        )
+
+    def _refresh_agent_cache(self, ctx: RunContext, user_question: str, agent_name: str, result: Dict[str, Any]):
+        """Re-save an agent's cached result after a late (batched) explanation (runs on the DB executor)"""
+        cache_key = self._agent_cache_key(ctx.data_hash, user_question, agent_name) if ctx.data_hash else None
+        if not ctx.session_factory or not cache_key:
+            return
+        db_service = get_database_service()
+        db = self._agent_session(ctx)
+        try:
+            db_service.save_agent_cached_result(
+                db=db,
+                cache_key=cache_key,
+                data_hash=ctx.data_hash,
+                user_question=user_question,
+                agent_name=agent_name,
+                result=result,
+                ttl_hours=24
+            )
+        except Exception as e:
+            logger.warning(f"Failed to refresh agent cache for {agent_name}: {e}")
+        finally:
+            db.close()
+
     async def _mock_agent_execution(self, agent_name: str, agent: Any, state: AnalysisState) -> Dict[str, Any]:
         """
         Mock agent execution that returns sample text with 3-second delay
@@ -840,8 +1126,7 @@ class LangGraphMultiAgentWorkflow:
     async def _create_comprehensive_report(self, state: AnalysisState) -> Dict[str, Any]:
         """Create comprehensive report from all agent results and shared insights using Claude API"""
         try:
-            from services.claude_service import ClaudeService
-            claude_service = ClaudeService()
+            claude_service = get_claude_service()
             
             # Prepare data sample for report generation
             data_sample = state.get("data_sample", {})
@@ -868,7 +1153,10 @@ class LangGraphMultiAgentWorkflow:
             )
             
             # Use Claude to generate the report
-            report_content = await claude_service._call_claude_api(report_prompt)
+            report_content = await claude_service._call_claude_api(
+                report_prompt, prefix=claude_service.build_dataset_context(data_sample),
+                call_type=CALL_REPORT
+            )
             
             # Extract key insights and recommendations
             key_insights = self._extract_key_insights(agent_results_list)
@@ -1003,88 +1291,82 @@ Focus on answering the user's original question and providing actionable insight
         return recommendations
     
     # WebSocket progress update methods
-    async def _send_progress_update(self, state: AnalysisState, step: str, message: str):
+    async def _send_progress_update(self, ctx: RunContext, state: AnalysisState, step: str, message: str):
         """Send workflow progress update"""
-        if self.websocket_manager:
-            await self.websocket_manager.send_progress({
-                "type": "workflow_progress",
-                "step": step,
-                "progress": state["progress"],
-                "message": message,
-                "completed_steps": state["completed_steps"],
-                "current_agent": state.get("current_agent"),
-                "workflow_id": self._current_analysis_id or ""
-            })
+        await ctx.send_progress({
+            "type": "workflow_progress",
+            "step": step,
+            "progress": state["progress"],
+            "message": message,
+            "completed_steps": state["completed_steps"],
+            "current_agent": state.get("current_agent"),
+            "workflow_id": ctx.workflow_id
+        })
     
-    async def _send_agent_started(self, state: AnalysisState, agent_name: str):
+    async def _send_agent_started(self, ctx: RunContext, state: AnalysisState, agent_name: str):
         """Send agent started notification"""
-        if self.websocket_manager:
-            await self.websocket_manager.send_progress({
-                "type": "agent_started",
-                "agent_name": agent_name,
-                "progress": state["progress"],
-                "workflow_id": self._current_analysis_id or ""
-            })
+        await ctx.send_progress({
+            "type": "agent_started",
+            "agent_name": agent_name,
+            "progress": state["progress"],
+            "workflow_id": ctx.workflow_id
+        })
     
-    async def _send_agent_completed(self, state: AnalysisState, agent_name: str, result: Dict[str, Any]):
+    async def _send_agent_completed(self, ctx: RunContext, state: AnalysisState, agent_name: str, result: Dict[str, Any]):
         """Send agent completed notification"""
-        if self.websocket_manager:
-            await self.websocket_manager.send_progress({
-                "type": "agent_completed",
-                "agent_name": agent_name,
-                "progress": state["progress"],
-                "result": result,
-                "success": result.get("success", False),
-                "workflow_id": self._current_analysis_id or ""
-            })
+        await ctx.send_progress({
+            "type": "agent_completed",
+            "agent_name": agent_name,
+            "progress": state["progress"],
+            "result": result,
+            "success": result.get("success", False),
+            "workflow_id": ctx.workflow_id
+        })
     
-    async def _send_agent_error(self, state: AnalysisState, agent_name: str, error: str):
+    async def _send_agent_error(self, ctx: RunContext, state: AnalysisState, agent_name: str, error: str):
         """Send agent error notification"""
-        if self.websocket_manager:
-            await self.websocket_manager.send_progress({
-                "type": "agent_error",
-                "agent_name": agent_name,
-                "error": error,
-                "progress": state["progress"],
-                "workflow_id": self._current_analysis_id or ""
-            })
+        await ctx.send_progress({
+            "type": "agent_error",
+            "agent_name": agent_name,
+            "error": error,
+            "progress": state["progress"],
+            "workflow_id": ctx.workflow_id
+        })
     
-    async def _send_error_update(self, state: AnalysisState, step: str, error: str):
+    async def _send_error_update(self, ctx: RunContext, state: AnalysisState, step: str, error: str):
         """Send workflow error update"""
-        if self.websocket_manager:
-            await self.websocket_manager.send_progress({
-                "type": "workflow_error",
-                "step": step,
-                "error": error,
-                "progress": state["progress"],
-                "workflow_id": self._current_analysis_id or ""
-            })
+        await ctx.send_progress({
+            "type": "workflow_error",
+            "step": step,
+            "error": error,
+            "progress": state["progress"],
+            "workflow_id": ctx.workflow_id
+        })
     
-    async def _send_workflow_completed(self, state: AnalysisState):
+    async def _send_workflow_completed(self, ctx: RunContext, state: AnalysisState):
         """Send workflow completed notification"""
-        if self.websocket_manager:
-            # Ensure final_report always exists - create minimal one if missing
-            final_report = state.get("final_report")
-            if not final_report:
-                final_report = {
-                    "content": "Analysis completed but report generation was not completed",
-                    "summary": "Analysis completed",
-                    "user_question": state.get("user_question", ""),
-                    "data_overview": state.get("data_sample", {}),
-                    "agents_executed": state.get("selected_agents", []),
-                    "success": state.get("success", False),
-                    "errors": state.get("errors", []),
-                    "generated_at": datetime.utcnow().isoformat(),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            
-            await self.websocket_manager.send_progress({
-                "type": "workflow_completed",
-                "progress": 100.0,
-                "success": state["success"],
-                "final_report": final_report,
-                "workflow_id": self._current_analysis_id or ""
-            })
+        # Ensure final_report always exists - create minimal one if missing
+        final_report = state.get("final_report")
+        if not final_report:
+            final_report = {
+                "content": "Analysis completed but report generation was not completed",
+                "summary": "Analysis completed",
+                "user_question": state.get("user_question", ""),
+                "data_overview": state.get("data_sample", {}),
+                "agents_executed": state.get("selected_agents", []),
+                "success": state.get("success", False),
+                "errors": state.get("errors", []),
+                "generated_at": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        
+        await ctx.send_progress({
+            "type": "workflow_completed",
+            "progress": 100.0,
+            "success": state["success"],
+            "final_report": final_report,
+            "workflow_id": ctx.workflow_id
+        })
     
     async def run_analysis(
         self,
@@ -1093,15 +1375,38 @@ Focus on answering the user's original question and providing actionable insight
         user_question: str,
         selected_agents: Optional[List[str]] = None,
         analysis_id: Optional[str] = None,
-        db_session: Optional[Any] = None
+        session_factory: Optional[Callable[[], Any]] = None,
+        run_context: Optional[RunContext] = None
     ) -> Dict[str, Any]:
-        """Run the complete multi-agent analysis workflow with database tracking"""
+        """Run the complete multi-agent analysis workflow with database tracking
 
-        # Store non-serializable session in class attributes
-        self._current_db_session = db_session
-        self._current_analysis_id = analysis_id
+        Safe to call concurrently on one shared workflow instance: everything
+        run-specific lives in the RunContext passed through the run config.
+
+        Args:
+            file_content: Raw file content
+            filename: Original filename
+            user_question: User's analysis question
+            selected_agents: Optional pre-selected agent names
+            analysis_id: Analysis record ID (used as the WebSocket workflow_id)
+            session_factory: Callable returning a new DB session; each agent task opens its own
+            run_context: Pre-built context (takes precedence over analysis_id/session_factory)
+        """
+        ctx = run_context or RunContext(analysis_id=analysis_id, session_factory=session_factory)
+        if ctx.progress_sink is None:
+            ctx.progress_sink = self.websocket_manager
+        if ctx.fingerprint is None:
+            # Hash once per run; every agent cache key reuses it
+            ctx.fingerprint = fingerprint_bytes(file_content, settings.DATA_HASH_ALGORITHM)
+        explanation_config = get_explanation_config(get_config().raw)
+        if ctx.explainer is None and explanation_config["mode"] == MODE_BATCHED:
+            ctx.explainer = BatchExplainer(
+                get_claude_service(), ctx, batch_size=explanation_config["batch_size"],
+                on_explained=lambda agent_name, result, _: get_db_executor().submit(
+                    self._refresh_agent_cache, ctx, user_question, agent_name, result
+                )
+            )
         
-        # Initialize state (without db_session - not serializable)
         # Preserve selected_agents if provided, otherwise use empty list
         agents_list = selected_agents if selected_agents and isinstance(selected_agents, list) else []
         if agents_list:
@@ -1124,22 +1429,26 @@ Focus on answering the user's original question and providing actionable insight
             shared_insights={},
             final_report=None,
             success=False,
-            analysis_id=analysis_id,
-            progress_callback=None,
-            _db_session=None  # Not used, just to satisfy TypedDict
+            analysis_id=ctx.analysis_id,
+            progress_callback=None
         )
 
-        # Run the workflow with configuration
-        config = {"configurable": {"thread_id": f"analysis_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"}}
-        final_state = await self.graph.ainvoke(initial_state, config=config)
+        # Run the workflow with the per-run context in the config
+        config = {"configurable": {"run_context": ctx}}
+        register_run(ctx)
+        try:
+            final_state = await self.graph.ainvoke(initial_state, config=config)
+        finally:
+            unregister_run(ctx)
 
         # Return in the expected format
         return {
             "success": final_state["success"],
+            "cancelled": ctx.cancel_token.cancelled,
             "timestamp": datetime.utcnow().isoformat(),
             "data_sample": final_state["data_sample"],
             "user_question": final_state["user_question"],
             "selected_agents": final_state["selected_agents"],
             "agent_results": final_state["agent_results"],
             "report": final_state["final_report"]
-        }
\ No newline at end of file
+        }
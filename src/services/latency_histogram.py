@@ -0,0 +1,207 @@
+"""
+Agent latency histograms
+Durations are counted in fixed log-scale buckets per agent, phase and time
+window. Buckets with the same bounds merge by adding counts, so percentiles
+over any set of agents, phases or windows come from one summed histogram.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.analysis import AgentLatencyBucket
+
+# Phases of an agent run
+PHASE_TOTAL = "total"
+PHASE_CODE_GENERATION = "code_generation"
+PHASE_EXECUTION = "execution"
+PHASE_EXPLANATION = "explanation"
+PHASES = (PHASE_TOTAL, PHASE_CODE_GENERATION, PHASE_EXECUTION, PHASE_EXPLANATION)
+
+# Bucket i holds durations in (GROWTH**(i-1), GROWTH**i] ms, i.e. ~19% wide,
+# so a percentile read from a bucket bound is within ~19% of the true value
+GROWTH = 2 ** 0.25
+
+# INSERT ... ON CONFLICT DO UPDATE constructs by dialect
+DIALECT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+# (agent_name, phase, window_start, bucket) -> (count, total_ms)
+LatencyDeltas = Dict[Tuple[str, str, datetime, int], Tuple[int, int]]
+
+
+def bucket_index(duration_ms: float) -> int:
+    """Bucket of a duration (bucket 0 holds everything up to 1ms)"""
+    if duration_ms <= 1:
+        return 0
+    return math.ceil(math.log(duration_ms, GROWTH) - 1e-9)
+
+
+def bucket_upper_ms(index: int) -> float:
+    """Upper bound of a bucket in ms"""
+    return GROWTH ** index
+
+
+def window_start(moment: datetime, window_minutes: int) -> datetime:
+    """Start of the time window containing moment (windows are aligned to midnight UTC)"""
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    minutes = int((moment - day).total_seconds() // 60)
+    return day + timedelta(minutes=minutes - minutes % max(1, window_minutes))
+
+
+class LatencyHistogram:
+    """
+    Mergeable latency histogram
+
+    Usage:
+        histogram = LatencyHistogram()
+        histogram.record(1250)
+        histogram.summary()  # count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0
+
+    def add(self, bucket: int, count: int, total_ms: int = 0):
+        """Add count durations (summing to total_ms) to a bucket"""
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += count
+        self.total_ms += total_ms
+
+    def record(self, duration_ms: int):
+        """Count one duration"""
+        self.add(bucket_index(duration_ms), 1, duration_ms)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add another histogram's counts to this one"""
+        for bucket, count in other.counts.items():
+            self.add(bucket, count)
+        self.total_ms += other.total_ms
+        return self
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the p-th percentile
+
+        Args:
+            p: Percentile in [0, 100]
+
+        Returns:
+            Duration in ms, or None for an empty histogram
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return round(bucket_upper_ms(bucket), 1)
+        return round(bucket_upper_ms(max(self.counts)), 1)
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, exact mean and p50/p95/p99/max (bucket upper bounds)"""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.percentile(100),
+        }
+
+
+def add_latency(deltas: LatencyDeltas, agent_name: str, phase: str, duration_ms: int, moment: datetime, window_minutes: int):
+    """Accumulate one duration into a deltas map (see apply_latency_deltas)"""
+    key = (agent_name, phase, window_start(moment, window_minutes), bucket_index(duration_ms))
+    count, total = deltas.get(key, (0, 0))
+    deltas[key] = (count + 1, total + int(duration_ms))
+
+
+def apply_latency_deltas(db: Session, deltas: LatencyDeltas):
+    """
+    Add bucket counts to agent_latency_buckets with atomic increments (no commit)
+
+    SQLite and PostgreSQL use a single INSERT ... ON CONFLICT DO UPDATE per
+    bucket; other databases increment first and insert the missing rows.
+    """
+    if not deltas:
+        return
+    table = AgentLatencyBucket.__table__
+    rows = [
+        {"agent_name": agent_name, "phase": phase, "window_start": start, "bucket": bucket, "count": count, "total_ms": total}
+        for (agent_name, phase, start, bucket), (count, total) in deltas.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect in DIALECT_INSERTS:
+        for row in rows:
+            statement = DIALECT_INSERTS[dialect](table).values(**row)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["agent_name", "phase", "window_start", "bucket"],
+                set_={"count": table.c.count + statement.excluded.count,
+                      "total_ms": table.c.total_ms + statement.excluded.total_ms},
+            ))
+        return
+    for row in rows:
+        updated = db.execute(
+            update(table)
+            .where(table.c.agent_name == row["agent_name"], table.c.phase == row["phase"],
+                   table.c.window_start == row["window_start"], table.c.bucket == row["bucket"])
+            .values(count=table.c.count + row["count"], total_ms=table.c.total_ms + row["total_ms"])
+        ).rowcount
+        if not updated:
+            db.execute(table.insert().values(**row))
+
+
+def load_histograms(
+    db: Session,
+    since: Optional[datetime] = None,
+    agent_name: Optional[str] = None,
+    phase: Optional[str] = None,
+) -> Iterable[Tuple[str, str, datetime, int, int, int]]:
+    """Bucket rows (agent_name, phase, window_start, bucket, count, total_ms), oldest window first"""
+    query = db.query(
+        AgentLatencyBucket.agent_name, AgentLatencyBucket.phase, AgentLatencyBucket.window_start,
+        AgentLatencyBucket.bucket, AgentLatencyBucket.count, AgentLatencyBucket.total_ms,
+    )
+    if since is not None:
+        query = query.filter(AgentLatencyBucket.window_start >= since)
+    if agent_name is not None:
+        query = query.filter(AgentLatencyBucket.agent_name == agent_name)
+    if phase is not None:
+        query = query.filter(AgentLatencyBucket.phase == phase)
+    return query.order_by(AgentLatencyBucket.window_start).all()
+
+
+def summarize_by_agent(rows: Iterable[Tuple[str, str, datetime, int, int, int]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Merge bucket rows into {agent_name: {phase: summary}}"""
+    histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+    for agent_name, phase, _, bucket, count, total_ms in rows:
+        histograms.setdefault((agent_name, phase), LatencyHistogram()).add(bucket, count, total_ms)
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for (agent_name, phase), histogram in histograms.items():
+        result.setdefault(agent_name, {})[phase] = histogram.summary()
+    return result
+
+
+def summarize_trend(rows: Iterable[Tuple[str, str, datetime, int, int, int]], step_minutes: int) -> List[Dict[str, Any]]:
+    """Merge bucket rows into one summary per step_minutes window, oldest first"""
+    histograms: Dict[datetime, LatencyHistogram] = {}
+    for _, _, start, bucket, count, total_ms in rows:
+        histograms.setdefault(window_start(start, step_minutes), LatencyHistogram()).add(bucket, count, total_ms)
+    return [
+        {"window_start": start.isoformat(), **histograms[start].summary()}
+        for start in sorted(histograms)
+    ]
+
+
+def prune_latency_buckets(db: Session, retention_days: int) -> int:
+    """Delete windows older than retention_days; returns deleted rows (no commit)"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return db.query(AgentLatencyBucket).filter(AgentLatencyBucket.window_start < cutoff).delete(synchronize_session=False)
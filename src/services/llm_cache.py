@@ -0,0 +1,249 @@
+"""
+Content-addressed cache for Claude API responses
+Memory LRU tier (byte budget) in front of a persistent SQLite tier with TTL
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import settings
+from services.db_executor import get_db_executor
+from services.memory_cache import ByteLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def make_llm_cache_key(model: str, temperature: float, max_tokens: int, prompt: str, prefix: Optional[str] = None) -> str:
+    """
+    Hash of everything that determines a response
+
+    Args:
+        model: Model name
+        temperature: Sampling temperature
+        max_tokens: Output token limit (a lower limit can truncate the response)
+        prompt: Per-call prompt text
+        prefix: Cacheable prompt prefix, if any
+
+    Returns:
+        SHA-256 hex digest
+    """
+    material = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "prefix": prefix or "",
+            "prompt": prompt,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier response cache
+
+    Lookups check the in-process LRU first, then SQLite (promoting hits into
+    memory). Writes go to both tiers. Both tiers honour the TTL: expired
+    entries are ignored on read and removed by purge_expired(), which the
+    cache sweeper calls. Async callers use aget/aset, which run the disk tier
+    on the DB executor so SQLite I/O never blocks the event loop.
+    """
+
+    def __init__(self, db_path: str, memory_bytes: int, ttl_seconds: float):
+        """
+        Initialize cache
+
+        Args:
+            db_path: SQLite file for the persistent tier ("" disables it)
+            memory_bytes: Byte budget for the memory tier
+            ttl_seconds: Lifetime of entries in both tiers
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        # key -> (response, expires_at)
+        self.memory = ByteLRUCache(max_bytes=memory_bytes)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.stats_counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "bypassed": 0, "expired": 0}
+        if db_path:
+            self._open()
+
+    def _open(self):
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_expires ON llm_responses (expires_at)")
+        except Exception as e:
+            logger.error(f"LLM response cache disk tier unavailable ({self.db_path}): {e}")
+            self._conn = None
+
+    def _remember(self, key: str, response: str, expires_at: float):
+        self.memory.set(key, (response, expires_at), size=len(response.encode("utf-8", errors="ignore")))
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        response, expires_at = entry
+        if expires_at <= time.time():
+            self.memory.delete(key)
+            self.stats_counters["expired"] += 1
+            return None
+        self.stats_counters["memory_hits"] += 1
+        return response
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        """Disk-tier lookup (blocking); promotes a hit into memory"""
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, expires_at FROM llm_responses WHERE key = ? AND expires_at > ?",
+                    (key, time.time()),
+                ).fetchone()
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        self.stats_counters["disk_hits"] += 1
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def _disk_set(self, key: str, response: str, now: float):
+        """Disk-tier write (blocking)"""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, response, len(response.encode("utf-8", errors="ignore")), now, now + self.ttl_seconds),
+                )
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response or None (blocking; async code uses aget)"""
+        value = self._memory_get(key)
+        if value is None:
+            value = self._disk_get(key)
+        if value is None:
+            self.stats_counters["misses"] += 1
+        return value
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Return a cached response or None, reading the disk tier on the DB executor"""
+        value = self._memory_get(key)
+        if value is None and self._conn is not None:
+            value = await get_db_executor().call(self._disk_get, key)
+        if value is None:
+            self.stats_counters["misses"] += 1
+        return value
+
+    def set(self, key: str, response: str):
+        """Store a response in both tiers (blocking; async code uses aset)"""
+        if not response:
+            return
+        now = time.time()
+        self._remember(key, response, now + self.ttl_seconds)
+        self.stats_counters["writes"] += 1
+        self._disk_set(key, response, now)
+
+    async def aset(self, key: str, response: str):
+        """Store a response in both tiers, writing the disk tier on the DB executor"""
+        if not response:
+            return
+        now = time.time()
+        self._remember(key, response, now + self.ttl_seconds)
+        self.stats_counters["writes"] += 1
+        if self._conn is not None:
+            await get_db_executor().call(self._disk_set, key, response, now)
+
+    def record_bypass(self):
+        """Count a call that skipped the cache on request"""
+        self.stats_counters["bypassed"] += 1
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from both tiers; returns the number of disk rows removed"""
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self.memory.items() if expires_at <= now]
+        for key in expired:
+            self.memory.delete(key)
+        self.stats_counters["expired"] += len(expired)
+        if self._conn is None:
+            return 0
+        try:
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+            return cursor.rowcount or 0
+        except Exception as e:
+            logger.warning(f"LLM cache purge failed: {e}")
+            return 0
+
+    def clear(self):
+        """Drop all entries from both tiers"""
+        self.memory.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM llm_responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for both tiers"""
+        counters = dict(self.stats_counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        counters["hit_rate"] = round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 4) if lookups else 0.0
+        counters["memory"] = self.memory.stats()
+        if self._conn is not None:
+            try:
+                with self._lock:
+                    entries, size = self._conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses WHERE expires_at > ?",
+                        (time.time(),),
+                    ).fetchone()
+                counters["disk"] = {"entries": entries, "bytes": size, "path": self.db_path}
+            except Exception as e:
+                counters["disk"] = {"error": str(e)}
+        return counters
+
+
+# Singleton instance
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Get or create the LLM response cache (None when LLM_CACHE_ENABLED is off)
+
+    Returns:
+        LLMResponseCache instance or None
+    """
+    global _llm_cache
+
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            db_path=settings.LLM_CACHE_PATH,
+            memory_bytes=settings.LLM_CACHE_MEMORY_MB * 1024 * 1024,
+            ttl_seconds=settings.LLM_CACHE_TTL_HOURS * 3600,
+        )
+        logger.info(f"LLM response cache enabled (memory={settings.LLM_CACHE_MEMORY_MB}MB, disk={settings.LLM_CACHE_PATH or 'off'})")
+
+    return _llm_cache
@@ -0,0 +1,355 @@
+"""
+Process-wide scheduler for outbound Claude API calls
+Adaptive concurrency (AIMD), rate-limit header tracking, retry-after aware
+backoff with jitter, and priority for interactive calls over background ones
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from config import settings
+from services.token_budget import CALL_CODE_GENERATION, CALL_SELECTION
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+INTERACTIVE_CALL_TYPES = {CALL_SELECTION, CALL_CODE_GENERATION}
+
+# Responses that mean "slow down" (429 rate limited, 529 overloaded)
+THROTTLE_STATUSES = {429, 529}
+
+# Pause used when an allowance is exhausted but no reset time was sent
+DEFAULT_RESET_SECONDS = 1.0
+
+
+def priority_for(call_type: str) -> int:
+    """Scheduling priority of a call type (see token_budget call types)"""
+    return PRIORITY_INTERACTIVE if call_type in INTERACTIVE_CALL_TYPES else PRIORITY_BACKGROUND
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds from a retry-after header (delta-seconds form), or None"""
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until an RFC 3339 reset timestamp (anthropic-ratelimit-*-reset)"""
+    if not value:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """
+    Bounds concurrent Claude calls and paces them against the API's limits
+
+    - Concurrency limit grows by ~1 per limit's worth of successful calls and
+      is cut by decrease_factor on a 429/529 (at most once per cooldown).
+    - Remaining request/token allowance from the anthropic-ratelimit-* headers
+      is tracked; when exhausted, new calls wait for the reset time.
+    - retry-after pauses every caller, not just the one that got the 429.
+    - Waiters are served by priority, then arrival order.
+
+    Usage:
+        scheduler = get_llm_scheduler()
+        async with scheduler.slot(priority_for("selection"), estimated_tokens=1200):
+            response = await client.post(...)
+            scheduler.on_response(response.status_code, response.headers)
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 2.0,
+        retry_base: float = 0.5,
+        retry_max: float = 30.0,
+        enabled: bool = True,
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            initial_limit: Starting concurrency limit
+            min_limit: Lowest limit after decreases
+            max_limit: Highest limit after increases
+            decrease_factor: Multiplier applied on throttling
+            decrease_cooldown: Seconds during which further throttles don't decrease again
+            retry_base: Base delay for exponential backoff
+            retry_max: Cap for backoff delays
+            enabled: When False, slot() does not limit or queue calls
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.enabled = enabled
+
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []  # (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._paused_until = 0.0  # time.monotonic()
+        self._last_decrease = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Allowance from the latest response headers (None = unknown)
+        self.requests_remaining: Optional[int] = None
+        self.tokens_remaining: Optional[int] = None
+        self._requests_reset_at = 0.0
+        self._tokens_reset_at = 0.0
+
+        self.stats_counters = {"calls": 0, "queued": 0, "throttled": 0, "increases": 0, "decreases": 0}
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def _wait_time(self, estimated_tokens: int) -> float:
+        """Seconds until a call of this size may start (0 = now)"""
+        now = time.monotonic()
+        if self.requests_remaining is not None and now >= self._requests_reset_at:
+            self.requests_remaining = None
+        if self.tokens_remaining is not None and now >= self._tokens_reset_at:
+            self.tokens_remaining = None
+
+        wait = self._paused_until - now
+        if self.requests_remaining is not None and self.requests_remaining <= 0:
+            wait = max(wait, self._requests_reset_at - now)
+        if self.tokens_remaining is not None and self.tokens_remaining < estimated_tokens:
+            wait = max(wait, self._tokens_reset_at - now)
+        return max(0.0, wait)
+
+    def _can_start(self, estimated_tokens: int) -> bool:
+        return self._in_flight < int(self.limit) and self._wait_time(estimated_tokens) == 0
+
+    def _start(self, estimated_tokens: int):
+        self._in_flight += 1
+        self.stats_counters["calls"] += 1
+        # Spend the allowance optimistically until the next headers arrive
+        if self.requests_remaining is not None:
+            self.requests_remaining -= 1
+        if self.tokens_remaining is not None:
+            self.tokens_remaining -= estimated_tokens
+
+    def _dispatch(self):
+        """Start queued calls while slots and allowance are available"""
+        while self._waiters:
+            priority, seq, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= int(self.limit):
+                return
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                # Paused: try again when the pause or allowance window ends
+                loop = asyncio.get_running_loop()
+                if self._wakeup is None or self._wakeup_loop is not loop:
+                    self._wakeup = loop.call_later(wait, self._on_wakeup)
+                    self._wakeup_loop = loop
+                return
+            heapq.heappop(self._waiters)
+            self._start(tokens)
+            future.set_result(True)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND, estimated_tokens: int = 0):
+        """Wait for a slot (pair with release())"""
+        if not self.enabled:
+            self.stats_counters["calls"] += 1
+            return
+        if not self._waiters and self._can_start(estimated_tokens):
+            self._start(estimated_tokens)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), estimated_tokens, future))
+        self.stats_counters["queued"] += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation landed
+                self.release()
+            raise
+
+    def release(self):
+        """Free a slot taken by acquire()"""
+        if not self.enabled:
+            return
+        self._in_flight = max(0, self._in_flight - 1)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_BACKGROUND, estimated_tokens: int = 0):
+        """Hold a slot for the duration of one HTTP attempt"""
+        await self.acquire(priority, estimated_tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """Record the remaining allowance sent with a response"""
+        if not headers:
+            return
+        now = time.monotonic()
+
+        requests_remaining = _parse_int(headers.get("anthropic-ratelimit-requests-remaining"))
+        if requests_remaining is not None:
+            self.requests_remaining = requests_remaining
+            reset = _parse_reset(headers.get("anthropic-ratelimit-requests-reset"))
+            self._requests_reset_at = now + (reset if reset is not None else DEFAULT_RESET_SECONDS)
+
+        # Input-token limits are the ones prompts run into; older responses only send "tokens"
+        for name in ("input-tokens", "tokens"):
+            tokens_remaining = _parse_int(headers.get(f"anthropic-ratelimit-{name}-remaining"))
+            if tokens_remaining is not None:
+                self.tokens_remaining = tokens_remaining
+                reset = _parse_reset(headers.get(f"anthropic-ratelimit-{name}-reset"))
+                self._tokens_reset_at = now + (reset if reset is not None else DEFAULT_RESET_SECONDS)
+                break
+
+    def on_success(self):
+        """Additive increase: about +1 slot per limit's worth of successful calls"""
+        if self.limit < self.max_limit:
+            before = int(self.limit)
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            if int(self.limit) > before:
+                self.stats_counters["increases"] += 1
+                self._dispatch_soon()
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease and a shared pause on 429/529"""
+        self.stats_counters["throttled"] += 1
+        now = time.monotonic()
+        if now - self._last_decrease >= self.decrease_cooldown:
+            previous = self.limit
+            self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+            self._last_decrease = now
+            self.stats_counters["decreases"] += 1
+            logger.warning(f"Claude API throttled; concurrency limit {previous:.1f} -> {self.limit:.1f}")
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    def on_response(self, status_code: int, headers: Optional[Mapping[str, str]] = None):
+        """
+        Feed back a response's status and headers
+
+        Args:
+            status_code: HTTP status
+            headers: Response headers
+        """
+        self.update_from_headers(headers)
+        if status_code in THROTTLE_STATUSES:
+            self.on_throttled(parse_retry_after(headers))
+        elif 200 <= status_code < 300:
+            self.on_success()
+
+    def _dispatch_soon(self):
+        try:
+            asyncio.get_running_loop().call_soon(self._dispatch)
+        except RuntimeError:
+            pass
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before retry number attempt+1
+
+        Uses retry-after when the server sent one (plus up to 10% jitter so
+        callers don't retry in lockstep); otherwise full-jitter exponential
+        backoff capped at retry_max.
+        """
+        if retry_after is not None:
+            return min(self.retry_max, retry_after) * (1.0 + random.uniform(0.0, 0.1))
+        return random.uniform(0.0, min(self.retry_max, self.retry_base * (2 ** attempt)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, queue and allowance"""
+        stats = dict(self.stats_counters)
+        stats.update({
+            "enabled": self.enabled,
+            "limit": round(self.limit, 2),
+            "in_flight": self._in_flight,
+            "waiting": sum(1 for waiter in self._waiters if not waiter[3].done()),
+            "requests_remaining": self.requests_remaining,
+            "tokens_remaining": self.tokens_remaining,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        })
+        return stats
+
+
+# Singleton instance
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """
+    Get or create the process-wide LLM scheduler
+
+    Returns:
+        LLMScheduler instance
+    """
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            initial_limit=settings.LLM_INITIAL_CONCURRENCY,
+            min_limit=settings.LLM_MIN_CONCURRENCY,
+            max_limit=settings.LLM_MAX_CONCURRENCY,
+            retry_base=settings.LLM_RETRY_BASE_SECONDS,
+            retry_max=settings.LLM_RETRY_MAX_SECONDS,
+            enabled=settings.LLM_SCHEDULER_ENABLED,
+        )
+        logger.info(
+            f"LLM scheduler {'enabled' if settings.LLM_SCHEDULER_ENABLED else 'disabled'} "
+            f"(concurrency {settings.LLM_INITIAL_CONCURRENCY}, "
+            f"range {settings.LLM_MIN_CONCURRENCY}-{settings.LLM_MAX_CONCURRENCY})"
+        )
+
+    return _scheduler
@@ -0,0 +1,338 @@
+"""
+Record/replay transport for Claude API traffic
+Plugs into the shared httpx client so recorded sessions can be replayed
+offline (no network, no API key) with optional simulated latency
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+TRANSPORT_MODES = (MODE_LIVE, MODE_RECORD, MODE_REPLAY)
+
+# Response headers worth keeping in fixtures (rate-limit state drives the scheduler)
+RECORDED_HEADER_PREFIXES = ("content-type", "anthropic-ratelimit-", "retry-after", "request-id")
+
+# Share of the total latency spent before the first byte when a fixture has no timing
+DEFAULT_TTFB_SHARE = 0.2
+
+
+def fixture_key(request_body: bytes) -> str:
+    """
+    Key of a request in the fixture directory
+
+    Hash of the canonical JSON body (model, max_tokens, temperature, messages,
+    stream). Headers are deliberately excluded so fixtures never depend on
+    (or contain) the API key.
+    """
+    try:
+        canonical = json.dumps(json.loads(request_body), sort_keys=True, ensure_ascii=False)
+    except (ValueError, UnicodeDecodeError):
+        canonical = request_body.decode("utf-8", errors="replace")
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def loose_fixture_key(request_body: bytes) -> str:
+    """
+    Fallback key with every digit run masked
+
+    Prompts of later agents embed earlier agents' stdout, which can contain
+    timestamps, temp directory names and timings that differ between runs.
+    """
+    text = request_body.decode("utf-8", errors="replace")
+    return fixture_key(re.sub(r"\d+", "#", text).encode("utf-8"))
+
+
+class LatencyModel:
+    """
+    Simulated response latency for replayed calls
+
+    Spec strings (milliseconds):
+        none                 no delay
+        recorded             the timing captured when recording (default)
+        fixed:<ms>           constant total latency
+        uniform:<min>,<max>  uniformly distributed total latency
+        normal:<mean>,<std>  normally distributed total latency (clamped at 0)
+        scale:<factor>       recorded timing multiplied by factor
+    """
+
+    def __init__(self, spec: str = "recorded", seed: Optional[int] = None):
+        self.spec = (spec or "recorded").strip().lower()
+        self.kind, _, args = self.spec.partition(":")
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        self._rng = random.Random(seed)
+        if self.kind not in ("none", "recorded", "fixed", "uniform", "normal", "scale"):
+            raise ValueError(f"Unknown latency spec: {spec}")
+
+    def sample(self, recorded: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Latency for one replayed response
+
+        Args:
+            recorded: Fixture timing ({"ttfb_ms", "total_ms"}, possibly empty)
+
+        Returns:
+            Dict with ttfb and total in seconds
+        """
+        recorded_total = float(recorded.get("total_ms") or 0.0)
+        recorded_ttfb = float(recorded.get("ttfb_ms") or 0.0)
+        share = (recorded_ttfb / recorded_total) if recorded_total else DEFAULT_TTFB_SHARE
+
+        if self.kind == "none":
+            total = 0.0
+        elif self.kind == "recorded":
+            total = recorded_total
+        elif self.kind == "scale":
+            total = recorded_total * (self.args[0] if self.args else 1.0)
+        elif self.kind == "fixed":
+            total = self.args[0]
+        elif self.kind == "uniform":
+            total = self._rng.uniform(self.args[0], self.args[1])
+        else:  # normal
+            total = max(0.0, self._rng.gauss(self.args[0], self.args[1]))
+
+        return {"ttfb": total * share / 1000.0, "total": total / 1000.0}
+
+
+class _PacedStream(httpx.AsyncByteStream):
+    """Replays a recorded body in chunks spread over the simulated latency"""
+
+    def __init__(self, chunks: List[bytes], chunk_delay: float):
+        self._chunks = chunks
+        self._chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for index, chunk in enumerate(self._chunks):
+            if index and self._chunk_delay > 0:
+                await asyncio.sleep(self._chunk_delay)
+            yield chunk
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes a live body through while keeping a copy; saves the fixture on close"""
+
+    def __init__(self, inner: httpx.AsyncByteStream, started: float,
+                 on_close: Callable[[bytes, Optional[float]], None]):
+        self._inner = inner
+        self._on_close = on_close
+        self._chunks: List[bytes] = []
+        self._started = started
+        self._first_byte: Optional[float] = None
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            if self._first_byte is None:
+                self._first_byte = time.perf_counter()
+            self._chunks.append(chunk)
+            yield chunk
+
+    async def aclose(self):
+        await self._inner.aclose()
+        ttfb_ms = (self._first_byte - self._started) * 1000.0 if self._first_byte else None
+        self._on_close(b"".join(self._chunks), ttfb_ms)
+
+
+def _split_events(body: bytes) -> List[bytes]:
+    """Split an SSE body at event boundaries (whole body if it isn't one)"""
+    parts = body.split(b"\n\n")
+    if len(parts) <= 1:
+        return [body]
+    return [part + b"\n\n" for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Sends requests through a live transport and writes each successful exchange to the fixture directory"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, fixture_dir: str):
+        """
+        Initialize transport
+
+        Args:
+            inner: Live transport that performs the requests
+            fixture_dir: Directory for <key>.json fixtures (created if missing)
+        """
+        self.inner = inner
+        self.fixture_dir = Path(fixture_dir)
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request_body = await request.aread()
+        # Fixtures store the body as text, so ask for it uncompressed
+        request.headers["accept-encoding"] = "identity"
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+
+        def save(body: bytes, ttfb_ms: Optional[float]):
+            if response.status_code != 200:
+                # Keep the successful retry, not the 429/5xx before it
+                return
+            total_ms = (time.perf_counter() - started) * 1000.0
+            fixture = {
+                "key": fixture_key(request_body),
+                "loose_key": loose_fixture_key(request_body),
+                "request": json.loads(request_body or b"{}"),
+                "status_code": response.status_code,
+                "headers": {
+                    name: value for name, value in response.headers.items()
+                    if name.lower().startswith(RECORDED_HEADER_PREFIXES)
+                },
+                "body": body.decode("utf-8", errors="replace"),
+                "timing": {"ttfb_ms": round(ttfb_ms if ttfb_ms is not None else total_ms, 1), "total_ms": round(total_ms, 1)},
+                "recorded_at": time.time(),
+            }
+            path = self.fixture_dir / f"{fixture['key']}.json"
+            try:
+                path.write_text(json.dumps(fixture, indent=2, ensure_ascii=False), encoding="utf-8")
+                self.recorded += 1
+                logger.debug(f"Recorded Claude exchange to {path}")
+            except Exception as e:
+                logger.warning(f"Failed to record Claude exchange to {path}: {e}")
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, started, save),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers requests from recorded fixtures without any network access
+
+    Requests are matched on the exact body first, then on the digit-masked
+    loose key. A request with no fixture gets a 404 with a replay_miss error
+    body (and is counted in misses), so the pipeline's normal error handling
+    applies.
+    """
+
+    def __init__(self, fixture_dir: str, latency: Optional[LatencyModel] = None):
+        """
+        Initialize transport
+
+        Args:
+            fixture_dir: Directory of <key>.json fixtures
+            latency: Simulated latency (defaults to the recorded timing)
+        """
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = latency or LatencyModel("recorded")
+        self.hits = 0
+        self.loose_hits = 0
+        self.misses = 0
+        self._loose_index: Optional[Dict[str, Path]] = None
+
+    def _build_loose_index(self) -> Dict[str, Path]:
+        index: Dict[str, Path] = {}
+        for path in sorted(self.fixture_dir.glob("*.json")):
+            try:
+                loose_key = json.loads(path.read_text(encoding="utf-8")).get("loose_key")
+            except Exception:
+                continue
+            if loose_key:
+                index.setdefault(loose_key, path)
+        return index
+
+    def _load(self, path: Path) -> Optional[Dict[str, Any]]:
+        if not path.is_file():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Unreadable fixture {path}: {e}")
+            return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request_body = await request.aread()
+        key = fixture_key(request_body)
+        fixture = self._load(self.fixture_dir / f"{key}.json")
+        if fixture is None:
+            if self._loose_index is None:
+                self._loose_index = self._build_loose_index()
+            loose_path = self._loose_index.get(loose_fixture_key(request_body))
+            fixture = self._load(loose_path) if loose_path else None
+            if fixture is not None:
+                self.loose_hits += 1
+        if fixture is None:
+            self.misses += 1
+            logger.warning(f"No recorded Claude response for request {key[:12]} in {self.fixture_dir}")
+            return httpx.Response(
+                status_code=404,
+                json={"type": "error", "error": {"type": "replay_miss", "message": f"No fixture for request {key}"}},
+                request=request,
+            )
+
+        self.hits += 1
+        timing = self.latency.sample(fixture.get("timing") or {})
+        if timing["ttfb"] > 0:
+            await asyncio.sleep(timing["ttfb"])
+
+        body = (fixture.get("body") or "").encode("utf-8")
+        chunks = _split_events(body)
+        streaming_time = max(0.0, timing["total"] - timing["ttfb"])
+        chunk_delay = streaming_time / (len(chunks) - 1) if len(chunks) > 1 else 0.0
+        if len(chunks) == 1 and streaming_time > 0:
+            await asyncio.sleep(streaming_time)
+
+        return httpx.Response(
+            status_code=int(fixture.get("status_code", 200)),
+            headers=fixture.get("headers") or {},
+            stream=_PacedStream(chunks, chunk_delay),
+            request=request,
+        )
+
+
+def get_transport_mode() -> str:
+    """Configured LLM_TRANSPORT_MODE (live if unknown)"""
+    mode = (settings.LLM_TRANSPORT_MODE or MODE_LIVE).lower()
+    if mode not in TRANSPORT_MODES:
+        logger.warning(f"Unknown LLM_TRANSPORT_MODE '{mode}', using {MODE_LIVE}")
+        return MODE_LIVE
+    return mode
+
+
+def is_replay_mode() -> bool:
+    """True when Claude calls are answered from fixtures"""
+    return get_transport_mode() == MODE_REPLAY
+
+
+def wrap_transport(live: Callable[[], httpx.AsyncBaseTransport]) -> httpx.AsyncBaseTransport:
+    """
+    Transport for the shared Claude client according to LLM_TRANSPORT_MODE
+
+    Args:
+        live: Factory for the real network transport (not called in replay mode)
+
+    Returns:
+        The live transport, a RecordingTransport around it, or a ReplayTransport
+    """
+    mode = get_transport_mode()
+    if mode == MODE_REPLAY:
+        logger.info(f"Replaying Claude responses from {settings.LLM_FIXTURE_DIR} (latency={settings.LLM_REPLAY_LATENCY})")
+        return ReplayTransport(
+            settings.LLM_FIXTURE_DIR,
+            LatencyModel(settings.LLM_REPLAY_LATENCY, seed=settings.LLM_REPLAY_SEED),
+        )
+    if mode == MODE_RECORD:
+        logger.info(f"Recording Claude exchanges to {settings.LLM_FIXTURE_DIR}")
+        return RecordingTransport(live(), settings.LLM_FIXTURE_DIR)
+    return live()
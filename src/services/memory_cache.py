@@ -0,0 +1,125 @@
+"""
+In-process LRU cache bounded by total bytes
+Shared building block for the LLM response cache and other hot-path caches
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", errors="ignore"))
+    return sys.getsizeof(value)
+
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU cache that evicts least-recently-used entries once the
+    total size of stored values exceeds max_bytes.
+
+    Usage:
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        cache.set("key", "value")
+        value = cache.get("key")
+    """
+
+    def __init__(self, max_bytes: int, max_entries: Optional[int] = None):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Budget for the sum of value sizes
+            max_entries: Optional cap on the number of entries
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value (marking it recently used) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, size: Optional[int] = None) -> bool:
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to store
+            size: Size in bytes (estimated if omitted)
+
+        Returns:
+            False if the value alone exceeds the budget and was not stored
+        """
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (
+                self._bytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def delete(self, key: str):
+        """Remove a key if present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Snapshot of (key, value) pairs, least recently used first (does not count as access)"""
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current usage"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,369 @@
+"""
+Content-addressed payload store
+Saves large JSON results (agent results, reports, cached analyses) once per
+distinct content, compressed, and leaves a small reference in the row
+"""
+
+import hashlib
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import Text, cast, func, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.analysis import AgentCachedResult, Analysis, CachedAnalysis, PayloadBlob
+from services.memory_cache import ByteLRUCache
+
+logger = logging.getLogger(__name__)
+
+# zstd compresses better and several times faster than zlib (pip install zstandard)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+
+# Reference left in a JSON column (or inside another blob) in place of the payload
+REF_KEY = "$payload"
+
+# INSERT ... ON CONFLICT DO NOTHING constructs by dialect
+DIALECT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+# Columns that may hold references (roots for garbage collection)
+REFERENCE_COLUMNS = [
+    Analysis.agent_results,
+    Analysis.report,
+    CachedAnalysis.cached_result,
+    AgentCachedResult.result,
+]
+
+
+def is_ref(value: Any) -> bool:
+    """True if a column value is a payload reference"""
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(REF_KEY), str)
+
+
+def content_hash(serialized: bytes) -> str:
+    return hashlib.sha256(serialized).hexdigest()
+
+
+def _serialize(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class PayloadStore:
+    """
+    Stores JSON values in payload_blobs and resolves references to them
+
+    Composite results are split so shared parts are stored once: an analysis'
+    agent_results map holds one reference per agent (the same blobs the
+    per-agent cache rows point to), and the report and cached result point
+    to that map instead of embedding it. Values smaller than min_bytes stay
+    inline. Rows written before the store existed (inline JSON) read as-is.
+
+    Usage:
+        store = get_payload_store()
+        analysis.agent_results = store.pack_agent_results(db, agent_results)
+        agent_results = store.resolve(db, analysis.agent_results)
+    """
+
+    def __init__(self, level: int = 3, min_bytes: int = 1024, cache_bytes: int = 32 * 1024 * 1024):
+        """
+        Initialize store
+
+        Args:
+            level: Compression level (zstd 1-22, zlib 1-9)
+            min_bytes: Serialized size below which values are kept inline
+            cache_bytes: Budget for remembering decompressed blobs (JSON text)
+        """
+        self.codec = CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB
+        self.level = level if ZSTD_AVAILABLE else max(1, min(level * 2, 9))
+        self.min_bytes = min_bytes
+        # Decompressed JSON text by hash (immutable, so safe to share; parsed per read)
+        self._texts = ByteLRUCache(max_bytes=cache_bytes)
+        self.stats_counters = {"blobs_written": 0, "dedup_hits": 0, "raw_bytes": 0, "stored_bytes": 0, "blobs_read": 0}
+
+    # ---------- Codec ----------
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, self.level)
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("Payload was stored with zstd but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    # ---------- Writing ----------
+
+    def pack(self, db: Session, value: Any, children: Optional[Iterable[str]] = None) -> Any:
+        """
+        Store a value and return a reference to it (or the value, if small)
+
+        Writes within the caller's transaction: the blob commits (or rolls
+        back) together with the referencing row.
+
+        Args:
+            db: Session the referencing row is written with
+            value: JSON-serializable value
+            children: Hashes referenced from inside value (for garbage collection)
+        """
+        if value is None:
+            return None
+        serialized = _serialize(value)
+        if len(serialized) < self.min_bytes and not children:
+            return value
+
+        digest = content_hash(serialized)
+        now = datetime.utcnow()
+        # Reusing a blob renews its grace period, so a collection that found it
+        # unreferenced just before this row was written leaves it alone
+        reused = db.execute(
+            update(PayloadBlob).where(PayloadBlob.content_hash == digest).values(last_referenced_at=now)
+        ).rowcount
+        if reused:
+            self.stats_counters["dedup_hits"] += 1
+        else:
+            compressed = self._compress(serialized)
+            row = {
+                "content_hash": digest,
+                "codec": self.codec,
+                "data": compressed,
+                "raw_size": len(serialized),
+                "stored_size": len(compressed),
+                "children": sorted(set(children)) if children else None,
+                "created_at": now,
+                "last_referenced_at": now,
+            }
+            dialect = db.get_bind().dialect.name
+            if dialect in DIALECT_INSERTS:
+                # Another session may write the same content concurrently; it is identical, so skip it
+                db.execute(DIALECT_INSERTS[dialect](PayloadBlob).values(**row).on_conflict_do_nothing())
+            else:
+                db.add(PayloadBlob(**row))
+                db.flush()
+            self.stats_counters["blobs_written"] += 1
+            self.stats_counters["raw_bytes"] += len(serialized)
+            self.stats_counters["stored_bytes"] += len(compressed)
+        return {REF_KEY: digest}
+
+    def pack_agent_results(self, db: Session, agent_results: Optional[Dict[str, Any]]) -> Any:
+        """Store each agent's result separately, then the map of references"""
+        if not isinstance(agent_results, dict):
+            return self.pack(db, agent_results)
+        refs = {name: self.pack(db, result) for name, result in agent_results.items()}
+        return self.pack(db, refs, children=[r[REF_KEY] for r in refs.values() if is_ref(r)])
+
+    def pack_report(self, db: Session, report: Optional[Dict[str, Any]]) -> Any:
+        """Store a report, sharing its embedded agent_results with the analysis row"""
+        return self._pack_with_parts(db, report, {"agent_results": self.pack_agent_results})
+
+    def pack_result(self, db: Session, result: Optional[Dict[str, Any]]) -> Any:
+        """Store a full analysis result (as cached in cached_analyses)"""
+        return self._pack_with_parts(db, result, {"agent_results": self.pack_agent_results, "report": self.pack_report})
+
+    def _pack_with_parts(self, db: Session, value: Any, parts: Dict[str, Any]) -> Any:
+        if not isinstance(value, dict):
+            return self.pack(db, value)
+        packed = dict(value)
+        for key, pack_part in parts.items():
+            if key in packed:
+                packed[key] = pack_part(db, packed[key])
+        children = [packed[key][REF_KEY] for key in parts if is_ref(packed.get(key))]
+        return self.pack(db, packed, children=children)
+
+    # ---------- Reading ----------
+
+    def _load_texts(self, db: Session, digests: Set[str]) -> Dict[str, str]:
+        texts: Dict[str, str] = {}
+        missing = []
+        for digest in digests:
+            text = self._texts.get(digest)
+            if text is None:
+                missing.append(digest)
+            else:
+                texts[digest] = text
+        if missing:
+            rows = db.query(PayloadBlob.content_hash, PayloadBlob.codec, PayloadBlob.data).filter(
+                PayloadBlob.content_hash.in_(missing)
+            ).all()
+            for digest, codec, data in rows:
+                text = self._decompress(codec, data).decode("utf-8")
+                self._texts.set(digest, text)
+                texts[digest] = text
+            self.stats_counters["blobs_read"] += len(rows)
+        return texts
+
+    def resolve(self, db: Session, value: Any) -> Any:
+        """
+        Expand a reference (and references nested in the top-level values of the
+        payloads it points to) back into the original value
+
+        Blobs are fetched one level at a time with a single query per level.
+        Missing blobs resolve to None (logged).
+        """
+        if not is_ref(value):
+            return value
+        holder = {"value": value}
+        pending = [(holder, "value")]
+        while pending:
+            refs = {container[key][REF_KEY] for container, key in pending}
+            texts = self._load_texts(db, refs)
+            next_pending = []
+            for container, key in pending:
+                digest = container[key][REF_KEY]
+                text = texts.get(digest)
+                if text is None:
+                    logger.error(f"Payload blob {digest[:12]} is missing")
+                    container[key] = None
+                    continue
+                resolved = json.loads(text)
+                container[key] = resolved
+                if isinstance(resolved, dict):
+                    next_pending.extend((resolved, k) for k, v in resolved.items() if is_ref(v))
+            pending = next_pending
+        return holder["value"]
+
+    # ---------- Maintenance ----------
+
+    @staticmethod
+    def stored_sizes(db: Session, roots: Iterable[str]) -> Dict[str, int]:
+        """
+        Compressed bytes attributable to each root blob (the blob plus everything it references)
+
+        Blobs shared between roots count towards each of them.
+        """
+        roots = list(roots)
+        info: Dict[str, Any] = {}
+        frontier = set(roots)
+        while frontier:
+            rows = db.query(PayloadBlob.content_hash, PayloadBlob.stored_size, PayloadBlob.children).filter(
+                PayloadBlob.content_hash.in_(list(frontier))
+            ).all()
+            frontier = set()
+            for digest, stored_size, children in rows:
+                info[digest] = (stored_size, children or [])
+                frontier.update(child for child in children or [] if child not in info)
+
+        def closure_size(root: str) -> int:
+            total, seen, stack = 0, set(), [root]
+            while stack:
+                digest = stack.pop()
+                if digest in seen or digest not in info:
+                    continue
+                seen.add(digest)
+                stored_size, children = info[digest]
+                total += stored_size
+                stack.extend(children)
+            return total
+
+        return {root: closure_size(root) for root in roots}
+
+    def collect_garbage(self, db: Session, grace_minutes: float = 60) -> int:
+        """
+        Delete blobs no row references any more
+
+        Marks from the reference columns (only rows whose JSON is a reference are
+        read), follows children, and deletes unmarked blobs not referenced within
+        the grace period (so blobs of rows still being written are kept). The
+        DELETE re-checks last_referenced_at, so a blob reused after marking
+        survives.
+
+        Returns:
+            Number of blobs deleted
+        """
+        marked: Set[str] = set()
+        for column in REFERENCE_COLUMNS:
+            rows = db.query(column).filter(cast(column, Text).like('{"' + REF_KEY + '"%')).all()
+            marked.update(value[REF_KEY] for (value,) in rows if is_ref(value))
+
+        frontier = list(marked)
+        while frontier:
+            children_rows = db.query(PayloadBlob.children).filter(
+                PayloadBlob.content_hash.in_(frontier), PayloadBlob.children.isnot(None)
+            ).all()
+            frontier = []
+            for (children,) in children_rows:
+                for child in children or []:
+                    if child not in marked:
+                        marked.add(child)
+                        frontier.append(child)
+
+        cutoff = datetime.utcnow() - timedelta(minutes=grace_minutes)
+        candidates = [
+            digest for (digest,) in db.query(PayloadBlob.content_hash).filter(
+                PayloadBlob.last_referenced_at < cutoff
+            ).all()
+            if digest not in marked
+        ]
+        deleted = 0
+        for start in range(0, len(candidates), 200):
+            chunk = candidates[start:start + 200]
+            deleted += db.query(PayloadBlob).filter(
+                PayloadBlob.content_hash.in_(chunk), PayloadBlob.last_referenced_at < cutoff
+            ).delete(synchronize_session=False)
+            for digest in chunk:
+                self._texts.delete(digest)
+        db.commit()
+        if deleted:
+            logger.info(f"Payload store: deleted {deleted} unreferenced blobs")
+        return deleted
+
+    def stats(self, db: Optional[Session] = None) -> Dict[str, Any]:
+        """Write/dedup counters (and table totals when a session is given)"""
+        stats: Dict[str, Any] = dict(self.stats_counters, codec=self.codec, level=self.level)
+        if db is not None:
+            blobs, raw, stored = db.query(
+                func.count(PayloadBlob.content_hash),
+                func.coalesce(func.sum(PayloadBlob.raw_size), 0),
+                func.coalesce(func.sum(PayloadBlob.stored_size), 0),
+            ).one()
+            stats.update(blobs=blobs, total_raw_bytes=int(raw), total_stored_bytes=int(stored),
+                         compression_ratio=round(raw / stored, 2) if stored else 0.0)
+        return stats
+
+
+# Singleton instance
+_payload_store: Optional[PayloadStore] = None
+
+
+def get_payload_store() -> Optional[PayloadStore]:
+    """
+    Get or create the payload store (None when PAYLOAD_STORE_ENABLED is off)
+
+    Returns:
+        PayloadStore instance or None
+    """
+    global _payload_store
+
+    if not settings.PAYLOAD_STORE_ENABLED:
+        return None
+
+    if _payload_store is None:
+        _payload_store = PayloadStore(
+            level=settings.PAYLOAD_COMPRESSION_LEVEL,
+            min_bytes=settings.PAYLOAD_INLINE_MAX_BYTES,
+        )
+
+    return _payload_store
+
+
+def resolve_payload(db: Session, value: Any) -> Any:
+    """Resolve a possibly-referenced column value (works with the store disabled too)"""
+    if not is_ref(value):
+        return value
+    store = _payload_store or PayloadStore()
+    return store.resolve(db, value)
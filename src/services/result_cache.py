@@ -0,0 +1,205 @@
+"""
+In-process tier for cached analysis and per-agent results
+Holds decoded results in byte-bounded LRUs in front of the cached_analyses and
+agent_cached_results tables, so hot cache hits skip the database entirely
+"""
+
+import copy
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import settings
+from services.memory_cache import ByteLRUCache
+
+logger = logging.getLogger(__name__)
+
+TIER_ANALYSIS = "analysis"
+TIER_AGENT = "agent"
+
+
+@dataclass
+class CachedResultEntry:
+    """
+    Decoded cache row held in memory
+
+    Exposes the attributes callers read from CachedAnalysis (cached_result,
+    created_at, access_count, time_saved_ms) and AgentCachedResult (result).
+    """
+
+    cache_key: str
+    payload: Dict[str, Any]
+    created_at: datetime
+    expires_at: Optional[datetime]
+    access_count: int = 0
+    time_saved_ms: int = 0
+    last_accessed: Optional[datetime] = None
+    size: int = field(default=0, repr=False)
+
+    @property
+    def cached_result(self) -> Dict[str, Any]:
+        return self.payload
+
+    @property
+    def result(self) -> Dict[str, Any]:
+        return self.payload
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return self.expires_at is not None and self.expires_at < (now or datetime.utcnow())
+
+    def detached(self) -> "CachedResultEntry":
+        """Copy whose payload callers may modify without touching the cached one"""
+        return CachedResultEntry(
+            cache_key=self.cache_key,
+            payload=copy.deepcopy(self.payload),
+            created_at=self.created_at,
+            expires_at=self.expires_at,
+            access_count=self.access_count,
+            time_saved_ms=self.time_saved_ms,
+            last_accessed=self.last_accessed,
+            size=self.size,
+        )
+
+
+def payload_size(payload: Any) -> int:
+    """Serialized size of a result, used as its weight in the byte budget"""
+    try:
+        return len(json.dumps(payload, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ResultMemoryCache:
+    """
+    Memory tier shared by DatabaseService
+
+    Coherence rules: entries are written through on save, filled on database
+    hits, dropped when the database row is deleted or expires, and never
+    outlive the row's expires_at. Access counts are tracked per entry for
+    display; DatabaseService persists them.
+
+    Usage:
+        cache = get_result_memory_cache()
+        entry = cache.get(TIER_AGENT, key)
+        cache.put(TIER_AGENT, key, payload, created_at, expires_at)
+    """
+
+    def __init__(self, analysis_bytes: int, agent_bytes: int):
+        """
+        Initialize cache
+
+        Args:
+            analysis_bytes: Byte budget for full analysis results
+            agent_bytes: Byte budget for per-agent results
+        """
+        self._tiers = {
+            TIER_ANALYSIS: ByteLRUCache(max_bytes=analysis_bytes),
+            TIER_AGENT: ByteLRUCache(max_bytes=agent_bytes),
+        }
+        self._lock = threading.Lock()
+        self.expired = 0
+
+    def get(self, tier: str, cache_key: str) -> Optional[CachedResultEntry]:
+        """
+        Look up a result and count the access
+
+        Returns:
+            Detached copy of the entry, or None (missing or expired)
+        """
+        cache = self._tiers[tier]
+        entry: Optional[CachedResultEntry] = cache.get(cache_key)
+        if entry is None:
+            return None
+        now = datetime.utcnow()
+        if entry.is_expired(now):
+            cache.delete(cache_key)
+            self.expired += 1
+            return None
+        with self._lock:
+            entry.access_count += 1
+            entry.last_accessed = now
+        return entry.detached()
+
+    def put(
+        self,
+        tier: str,
+        cache_key: str,
+        payload: Dict[str, Any],
+        created_at: Optional[datetime],
+        expires_at: Optional[datetime],
+        access_count: int = 0,
+        time_saved_ms: int = 0,
+    ) -> bool:
+        """
+        Store a decoded result (a copy, so later changes by the caller don't leak in)
+
+        Returns:
+            False when the entry is already expired or larger than the tier budget
+        """
+        if payload is None:
+            return False
+        entry = CachedResultEntry(
+            cache_key=cache_key,
+            payload=copy.deepcopy(payload),
+            created_at=created_at or datetime.utcnow(),
+            expires_at=expires_at,
+            access_count=access_count or 0,
+            time_saved_ms=time_saved_ms or 0,
+        )
+        if entry.is_expired():
+            return False
+        entry.size = payload_size(entry.payload) + 256
+        return self._tiers[tier].set(cache_key, entry, size=entry.size)
+
+    def invalidate(self, tier: str, cache_key: str):
+        """Drop one entry (its database row changed or was removed)"""
+        self._tiers[tier].delete(cache_key)
+
+    def purge_expired(self, tier: str) -> int:
+        """Drop expired entries of a tier; returns the number removed"""
+        cache = self._tiers[tier]
+        now = datetime.utcnow()
+        expired = [key for key, entry in cache.items() if entry.is_expired(now)]
+        for key in expired:
+            cache.delete(key)
+        self.expired += len(expired)
+        return len(expired)
+
+    def clear(self):
+        """Drop everything"""
+        for cache in self._tiers.values():
+            cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier hit/miss/eviction counters and usage"""
+        stats: Dict[str, Any] = {tier: cache.stats() for tier, cache in self._tiers.items()}
+        stats["expired"] = self.expired
+        return stats
+
+
+# Singleton instance
+_result_memory_cache: Optional[ResultMemoryCache] = None
+
+
+def get_result_memory_cache() -> Optional[ResultMemoryCache]:
+    """
+    Get or create the result memory tier (None when RESULT_CACHE_MEMORY_ENABLED is off)
+
+    Returns:
+        ResultMemoryCache instance or None
+    """
+    global _result_memory_cache
+
+    if not settings.RESULT_CACHE_MEMORY_ENABLED:
+        return None
+
+    if _result_memory_cache is None:
+        _result_memory_cache = ResultMemoryCache(
+            analysis_bytes=settings.RESULT_CACHE_MEMORY_MB * 1024 * 1024,
+            agent_bytes=settings.AGENT_RESULT_CACHE_MEMORY_MB * 1024 * 1024,
+        )
+
+    return _result_memory_cache
@@ -0,0 +1,100 @@
+"""
+Per-run context for workflow executions
+Carries everything a single analysis run needs that must not live on the shared workflow object
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from utils.fingerprint import ContentFingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """Cooperative cancellation flag checked by the workflow between agents"""
+
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self):
+        """Request cancellation of the run"""
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+
+@dataclass
+class RunContext:
+    """
+    Non-serializable, per-run state passed to workflow nodes through the run config
+
+    Attributes:
+        analysis_id: Database ID of the analysis (also used as the WebSocket workflow_id)
+        session_factory: sessionmaker (called with session options) returning a new SQLAlchemy
+            session; each agent task opens its own
+        cancel_token: Cancellation flag shared with the /cancel-analysis endpoint
+        progress_sink: Object with an async send_progress(message) method
+        fingerprint: Content fingerprint computed once at ingestion and reused by cache keys
+        bypass_cache: Skip cache lookups for this run (fresh results still refresh the caches)
+        explainer: BatchExplainer when config.yaml selects batched explanations
+    """
+    analysis_id: Optional[str] = None
+    session_factory: Optional[Callable[[], Any]] = None
+    cancel_token: CancellationToken = field(default_factory=CancellationToken)
+    progress_sink: Optional[Any] = None
+    fingerprint: Optional[ContentFingerprint] = None
+    bypass_cache: bool = False
+    explainer: Optional[Any] = None
+
+    @property
+    def workflow_id(self) -> str:
+        return self.analysis_id or ""
+
+    @property
+    def data_hash(self) -> Optional[str]:
+        return self.fingerprint.data_hash if self.fingerprint else None
+
+    async def send_progress(self, message: Dict[str, Any]):
+        """Forward a progress message to the run's sink, if any"""
+        if self.progress_sink:
+            await self.progress_sink.send_progress(message)
+
+
+# Active runs by analysis ID (used for cancellation)
+_active_runs: Dict[str, RunContext] = {}
+
+
+def register_run(context: RunContext):
+    """Track a run so it can be cancelled by analysis ID"""
+    if context.analysis_id:
+        _active_runs[context.analysis_id] = context
+
+
+def unregister_run(context: RunContext):
+    """Stop tracking a finished run"""
+    if context.analysis_id and _active_runs.get(context.analysis_id) is context:
+        del _active_runs[context.analysis_id]
+
+
+def get_run(analysis_id: str) -> Optional[RunContext]:
+    """Get the context of an in-flight run"""
+    return _active_runs.get(analysis_id)
+
+
+def cancel_run(analysis_id: str) -> bool:
+    """
+    Request cancellation of an in-flight run
+
+    Returns:
+        True if a running analysis was found and flagged
+    """
+    context = _active_runs.get(analysis_id)
+    if not context:
+        return False
+    context.cancel_token.cancel()
+    logger.info(f"Cancellation requested for analysis {analysis_id}")
+    return True
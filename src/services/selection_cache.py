@@ -0,0 +1,205 @@
+"""
+Agent selection cache and plan tokens
+Reuses agent selections across uploads with the same schema and an equivalent
+question, and lets /analyze-data pick up the agents chosen by /plan-analysis
+"""
+
+import hashlib
+import json
+import logging
+import re
+import secrets
+import time
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from services.memory_cache import ByteLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Words that don't change which agents a question needs
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those",
+    "my", "our", "your", "me", "us", "we", "i", "you", "please", "can", "could", "would",
+    "should", "will", "do", "does", "did", "what", "which", "how", "show", "tell", "give",
+    "about", "data", "dataset", "file",
+}
+
+
+def schema_fingerprint(data_sample: Dict[str, Any]) -> str:
+    """
+    Hash of the sorted (column name, dtype) pairs of a data sample
+
+    Row counts and values are ignored, so every export in the same format
+    shares one fingerprint.
+    """
+    data_types = data_sample.get("data_types") or {}
+    columns = data_sample.get("columns") or list(data_types.keys())
+    pairs = sorted((str(column), str(data_types.get(column, ""))) for column in columns)
+    digest = hashlib.sha256(json.dumps(pairs, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"schema:{digest[:32]}"
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and stop words, collapse whitespace (word order is kept)"""
+    words = re.findall(r"[\w%$€£-]+", (question or "").lower())
+    return " ".join(word for word in words if word not in STOP_WORDS)
+
+
+def make_selection_key(schema: str, question: str, catalog_signature: str, model: str) -> str:
+    """
+    Cache key of an agent selection
+
+    Args:
+        schema: schema_fingerprint() of the data sample
+        question: User question (normalized here)
+        catalog_signature: ConfigSnapshot.agent_catalog_signature
+        model: Claude model making the selection
+
+    Returns:
+        SHA-256 hex digest
+    """
+    material = json.dumps(
+        {
+            "schema": schema,
+            "question": normalize_question(question),
+            "catalog": catalog_signature,
+            "model": model,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class SelectionCache:
+    """
+    In-process cache of agent selections plus short-lived plan tokens
+
+    Usage:
+        cache = get_selection_cache()
+        agents = cache.get(key)
+        cache.set(key, ["data_quality_audit", "exploratory_data_analysis"])
+        token = cache.issue_plan_token(data_hash, question, agents, catalog_signature)
+        agents = cache.resolve_plan_token(token, data_hash, question, catalog_signature)
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, plan_token_ttl_seconds: float):
+        """
+        Initialize cache
+
+        Args:
+            ttl_seconds: Lifetime of cached selections
+            max_entries: Maximum cached selections (and outstanding plan tokens)
+            plan_token_ttl_seconds: Lifetime of plan tokens
+        """
+        self.ttl_seconds = ttl_seconds
+        self.plan_token_ttl_seconds = plan_token_ttl_seconds
+        # Entries are tiny; the byte budget only guards against pathological configs
+        self._selections = ByteLRUCache(max_bytes=16 * 1024 * 1024, max_entries=max_entries)
+        self._plans = ByteLRUCache(max_bytes=16 * 1024 * 1024, max_entries=max_entries)
+        self.stats_counters = {"hits": 0, "misses": 0, "stores": 0, "plans_issued": 0, "plans_used": 0, "plans_rejected": 0}
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Cached agent list for a selection key, or None"""
+        entry = self._selections.get(key)
+        if entry is None or entry["expires_at"] <= time.time():
+            if entry is not None:
+                self._selections.delete(key)
+            self.stats_counters["misses"] += 1
+            return None
+        self.stats_counters["hits"] += 1
+        return list(entry["agents"])
+
+    def set(self, key: str, agents: List[str]):
+        """Store an agent selection"""
+        if not agents:
+            return
+        self._selections.set(key, {"agents": list(agents), "expires_at": time.time() + self.ttl_seconds}, size=256 + 64 * len(agents))
+        self.stats_counters["stores"] += 1
+
+    def issue_plan_token(self, data_hash: str, question: str, agents: List[str], catalog_signature: str) -> str:
+        """
+        Remember a plan so a following /analyze-data call can reuse it
+
+        Args:
+            data_hash: Fingerprint of the planned upload
+            question: Planned question
+            agents: Selected agents, in execution order
+            catalog_signature: Agent catalogue the plan was made with
+
+        Returns:
+            Opaque token
+        """
+        token = secrets.token_urlsafe(18)
+        self._plans.set(token, {
+            "data_hash": data_hash,
+            "question": normalize_question(question),
+            "agents": list(agents),
+            "catalog": catalog_signature,
+            "expires_at": time.time() + self.plan_token_ttl_seconds,
+        }, size=512 + 64 * len(agents))
+        self.stats_counters["plans_issued"] += 1
+        return token
+
+    def resolve_plan_token(self, token: str, data_hash: str, question: str, catalog_signature: str) -> Optional[List[str]]:
+        """
+        Agents of a plan, if the token is valid for this upload, question and catalogue
+
+        Returns:
+            Agent list, or None (unknown/expired token, or anything changed since planning)
+        """
+        plan = self._plans.get(token) if token else None
+        if plan is None:
+            return None
+        if (
+            plan["expires_at"] <= time.time()
+            or plan["data_hash"] != data_hash
+            or plan["question"] != normalize_question(question)
+            or plan["catalog"] != catalog_signature
+        ):
+            self.stats_counters["plans_rejected"] += 1
+            logger.info("Plan token does not match this request; selecting agents again")
+            return None
+        self.stats_counters["plans_used"] += 1
+        return list(plan["agents"])
+
+    def clear(self):
+        """Drop all selections and plan tokens"""
+        self._selections.clear()
+        self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes"""
+        stats = dict(self.stats_counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["entries"] = len(self._selections)
+        stats["plan_tokens"] = len(self._plans)
+        return stats
+
+
+# Singleton instance
+_selection_cache: Optional[SelectionCache] = None
+
+
+def get_selection_cache() -> Optional[SelectionCache]:
+    """
+    Get or create the agent selection cache (None when SELECTION_CACHE_ENABLED is off)
+
+    Returns:
+        SelectionCache instance or None
+    """
+    global _selection_cache
+
+    if not settings.SELECTION_CACHE_ENABLED:
+        return None
+
+    if _selection_cache is None:
+        _selection_cache = SelectionCache(
+            ttl_seconds=settings.SELECTION_CACHE_TTL_HOURS * 3600,
+            max_entries=settings.SELECTION_CACHE_MAX_ENTRIES,
+            plan_token_ttl_seconds=settings.PLAN_TOKEN_TTL_MINUTES * 60,
+        )
+
+    return _selection_cache
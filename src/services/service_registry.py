@@ -0,0 +1,282 @@
+"""
+Process-wide service registry
+Shares service instances and an immutable snapshot of agents/config.yaml across requests
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import yaml
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-agent result cache scopes (agents.<name>.cache_scope in config.yaml)
+CACHE_SCOPE_DATA_ONLY = "data_only"          # same file -> same result, whatever the question
+CACHE_SCOPE_DATA_QUESTION = "data_question"  # same file and question
+CACHE_SCOPE_NONE = "none"                    # never cached
+CACHE_SCOPES = (CACHE_SCOPE_DATA_ONLY, CACHE_SCOPE_DATA_QUESTION, CACHE_SCOPE_NONE)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Parsed contents of agents/config.yaml at a point in time.
+
+    Snapshots are shared by every service in the process and must be treated
+    as read-only. A reload never mutates a snapshot; it builds a new one and
+    swaps the registry reference.
+    """
+    agent_configs: Dict[str, Any] = field(default_factory=dict)
+    execution_config: Dict[str, Any] = field(default_factory=dict)
+    raw: Dict[str, Any] = field(default_factory=dict)
+    path: Optional[str] = None
+    mtime: float = 0.0
+    version: int = 0
+    execution_signature: str = ""
+    agent_catalog_signature: str = ""
+    agent_cache_scopes: Dict[str, str] = field(default_factory=dict)
+    agent_signatures: Dict[str, str] = field(default_factory=dict)
+    default_cache_scope: str = CACHE_SCOPE_DATA_QUESTION
+    loaded_at: float = 0.0
+
+    def cache_scope(self, agent_name: str) -> str:
+        """Result cache scope of an agent (the default scope for agents not in config.yaml)"""
+        return self.agent_cache_scopes.get(agent_name, self.default_cache_scope)
+
+
+def _candidate_config_paths() -> List[Path]:
+    """Possible locations of agents/config.yaml, in lookup order"""
+    services_dir = Path(__file__).parent
+    project_root = services_dir.parent  # Go up one level from services/ to src/
+    return [
+        project_root / "agents" / "config.yaml",  # src/agents/config.yaml
+        services_dir / "agents" / "config.yaml",  # services/agents/config.yaml
+        Path("agents/config.yaml"),               # agents/config.yaml (relative to cwd)
+        Path("src/agents/config.yaml"),           # src/agents/config.yaml (relative to cwd)
+    ]
+
+
+def find_config_path() -> Optional[Path]:
+    """Return the first existing config.yaml path, or None"""
+    for config_path in _candidate_config_paths():
+        try:
+            if config_path.exists():
+                return config_path
+        except Exception as e:
+            logger.debug(f"Failed to stat {config_path}: {e}")
+    return None
+
+
+def normalize_cache_scope(value: Any, default: str = CACHE_SCOPE_DATA_QUESTION) -> str:
+    """Canonical cache scope ("data-only", "data+question", ... accepted); default for missing or unknown values"""
+    if value is None:
+        return default
+    if value is False:
+        return CACHE_SCOPE_NONE
+    scope = str(value).strip().lower().replace("-", "_").replace("+", "_").replace(" ", "_")
+    if scope not in CACHE_SCOPES:
+        logger.warning(f"Unknown cache_scope '{value}' in config.yaml, using '{default}'")
+        return default
+    return scope
+
+
+def load_config_snapshot(version: int = 1) -> ConfigSnapshot:
+    """Read and parse config.yaml into a new snapshot (empty snapshot on failure)"""
+    config_path = find_config_path()
+    if config_path is None:
+        logger.error(f"Could not find config.yaml in any of these paths: {[str(p) for p in _candidate_config_paths()]}")
+        return ConfigSnapshot(version=version, loaded_at=time.time())
+
+    try:
+        mtime = os.path.getmtime(config_path)
+        with open(config_path, 'r', encoding='utf-8') as file:
+            config_data = yaml.safe_load(file) or {}
+    except Exception as e:
+        logger.error(f"Error loading agent configs from {config_path}: {str(e)}")
+        return ConfigSnapshot(path=str(config_path), version=version, loaded_at=time.time())
+
+    execution_config = config_data.get('execution', {}) or {}
+    execution_signature = (
+        hashlib.sha256(yaml.safe_dump(execution_config).encode()).hexdigest()
+        if execution_config else ""
+    )
+    # Everything agent selection depends on besides the data and the question
+    agent_catalog_signature = hashlib.sha256(
+        yaml.safe_dump({
+            "agents": config_data.get('agents', {}) or {},
+            "agent_selection": config_data.get('agent_selection', {}) or {},
+        }).encode()
+    ).hexdigest()
+
+    agent_configs = config_data.get('agents', {}) or {}
+    default_cache_scope = normalize_cache_scope((config_data.get('agent_cache', {}) or {}).get('default_scope'))
+    agent_cache_scopes = {
+        name: normalize_cache_scope((entry or {}).get('cache_scope'), default_cache_scope)
+        for name, entry in agent_configs.items()
+    }
+    # Everything an agent's result depends on in config.yaml besides the data and the question:
+    # its own entry (including prompt_version), the Claude call settings, the prompt budgets
+    # and how explanations are produced
+    shared_sections = {
+        section: config_data.get(section, {}) or {}
+        for section in ("claude_api", "token_budget", "explanation")
+    }
+    agent_signatures = {
+        name: hashlib.sha256(yaml.safe_dump({"agent": entry or {}, **shared_sections}).encode()).hexdigest()
+        for name, entry in agent_configs.items()
+    }
+
+    return ConfigSnapshot(
+        agent_configs=agent_configs,
+        execution_config=execution_config,
+        raw=config_data,
+        path=str(config_path),
+        mtime=mtime,
+        version=version,
+        execution_signature=execution_signature,
+        agent_catalog_signature=agent_catalog_signature,
+        agent_cache_scopes=agent_cache_scopes,
+        agent_signatures=agent_signatures,
+        default_cache_scope=default_cache_scope,
+        loaded_at=time.time(),
+    )
+
+
+class ServiceRegistry:
+    """
+    Holds the current config snapshot and lazily-created shared services.
+
+    Usage:
+        registry = get_registry()
+        snapshot = registry.config()
+        claude = registry.claude_service()
+    """
+
+    def __init__(self, hot_reload: bool = False, check_interval: float = 2.0):
+        """
+        Initialize registry
+
+        Args:
+            hot_reload: Re-read config.yaml when its modification time changes
+            check_interval: Minimum seconds between modification time checks
+        """
+        self.hot_reload = hot_reload
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._snapshot: ConfigSnapshot = load_config_snapshot(version=1)
+        self._last_check = time.monotonic()
+        self._claude_service = None
+        self._agent_service = None
+        self._database_service = None
+
+    def config(self) -> ConfigSnapshot:
+        """Return the current config snapshot, reloading first if hot reload detects a change"""
+        if self.hot_reload:
+            now = time.monotonic()
+            if now - self._last_check >= self.check_interval:
+                self._last_check = now
+                self._reload_if_changed()
+        return self._snapshot
+
+    def reload(self) -> ConfigSnapshot:
+        """Force a reload of config.yaml and atomically swap the snapshot"""
+        with self._lock:
+            new_snapshot = load_config_snapshot(version=self._snapshot.version + 1)
+            self._snapshot = new_snapshot
+            logger.info(f"Loaded config.yaml snapshot v{new_snapshot.version} from {new_snapshot.path}")
+            return new_snapshot
+
+    def _reload_if_changed(self):
+        current = self._snapshot
+        config_path = current.path or find_config_path()
+        if not config_path:
+            return
+        try:
+            mtime = os.path.getmtime(config_path)
+        except OSError:
+            return
+        if mtime != current.mtime:
+            with self._lock:
+                # Another thread may have swapped while we waited for the lock
+                if self._snapshot is current:
+                    self.reload()
+
+    def claude_service(self):
+        """Shared ClaudeService instance"""
+        if self._claude_service is None:
+            with self._lock:
+                if self._claude_service is None:
+                    from services.claude_service import ClaudeService
+                    self._claude_service = ClaudeService()
+        return self._claude_service
+
+    def agent_service(self):
+        """Shared AgentService instance"""
+        if self._agent_service is None:
+            with self._lock:
+                if self._agent_service is None:
+                    from services.agent_service import AgentService
+                    self._agent_service = AgentService()
+        return self._agent_service
+
+    def database_service(self):
+        """Shared DatabaseService instance"""
+        if self._database_service is None:
+            with self._lock:
+                if self._database_service is None:
+                    from services.database_service import DatabaseService
+                    self._database_service = DatabaseService()
+        return self._database_service
+
+
+# Singleton instance
+_registry: Optional[ServiceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ServiceRegistry:
+    """
+    Get or create the process-wide service registry
+
+    Returns:
+        ServiceRegistry instance
+    """
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry(
+                    hot_reload=settings.CONFIG_HOT_RELOAD,
+                    check_interval=settings.CONFIG_RELOAD_CHECK_SECONDS,
+                )
+
+    return _registry
+
+
+def get_config() -> ConfigSnapshot:
+    """Current config.yaml snapshot"""
+    return get_registry().config()
+
+
+def get_claude_service():
+    """Shared ClaudeService instance"""
+    return get_registry().claude_service()
+
+
+def get_agent_service():
+    """Shared AgentService instance"""
+    return get_registry().agent_service()
+
+
+def get_database_service():
+    """Shared DatabaseService instance"""
+    return get_registry().database_service()
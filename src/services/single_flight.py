@@ -0,0 +1,171 @@
+"""
+Single-flight coalescing of identical in-flight work
+Concurrent callers with the same key share one execution instead of each starting their own
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightCall:
+    """A running call that later callers with the same key can attach to"""
+
+    def __init__(self, key: str, context: Any = None):
+        self.key = key
+        self.context = context
+        self.followers = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def wait(self) -> Any:
+        """Wait for the leader's result (shielded so a cancelled follower never cancels the leader)"""
+        self.followers += 1
+        return await asyncio.shield(self.future)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is running (followers) wait for the same result. The key is
+    released as soon as the leader finishes, so later callers start fresh
+    (and should find the result in the regular cache instead).
+
+    Usage:
+        flights = SingleFlight("analysis")
+        result, shared = await flights.do(cache_key, lambda: run_analysis(...))
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._calls: Dict[str, InFlightCall] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def get(self, key: str) -> Optional[InFlightCall]:
+        """Return the in-flight call for a key, if any"""
+        return self._calls.get(key)
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        context: Any = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument coroutine factory, only called by the leader
+            context: Optional object exposed to followers via InFlightCall.context
+
+        Returns:
+            Tuple of (result, shared) where shared is True for followers
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.stats["followers"] += 1
+            logger.info(f"Single-flight [{self.name}]: joining in-flight call {key[:12]}")
+            return await call.wait(), True
+
+        call = InFlightCall(key, context)
+        self._calls[key] = call
+        self.stats["leaders"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.future.cancel()
+            raise
+        except Exception as e:
+            call.future.set_exception(e)
+            # Mark the exception as retrieved when nobody joined
+            call.future.exception()
+            raise
+        else:
+            call.future.set_result(result)
+            return result, False
+        finally:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of keys currently running"""
+        return len(self._calls)
+
+
+class ProgressFanout:
+    """
+    Progress sink for a leader run that also delivers every event to attached followers.
+
+    Followers have their own analysis IDs, so forwarded events are re-tagged
+    with the follower's workflow_id. Events sent before a follower attached are
+    replayed on attach so its progress view starts from the beginning.
+    """
+
+    def __init__(self, sink: Any, leader_id: str):
+        self.sink = sink
+        self.leader_id = leader_id
+        self._followers: List[str] = []
+        self._history: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _retag(message: Dict[str, Any], workflow_id: str) -> Dict[str, Any]:
+        if "workflow_id" not in message:
+            return message
+        retagged = dict(message)
+        retagged["workflow_id"] = workflow_id
+        return retagged
+
+    async def send_progress(self, message: Dict[str, Any]):
+        """Send an event for the leader and every attached follower"""
+        self._history.append(message)
+        if self.sink:
+            await self.sink.send_progress(message)
+            for follower_id in list(self._followers):
+                await self.sink.send_progress(self._retag(message, follower_id))
+
+    async def attach(self, follower_id: str):
+        """Start forwarding events to a follower, replaying what it missed"""
+        missed = list(self._history)
+        self._followers.append(follower_id)
+        if self.sink:
+            for message in missed:
+                await self.sink.send_progress(self._retag(message, follower_id))
+
+
+# Singleton instances
+_analysis_flights: Optional[SingleFlight] = None
+_agent_flights: Optional[SingleFlight] = None
+
+
+def get_analysis_flights() -> SingleFlight:
+    """
+    Get or create the single-flight group for whole analyses (keyed by analysis cache key)
+
+    Returns:
+        SingleFlight instance
+    """
+    global _analysis_flights
+
+    if _analysis_flights is None:
+        _analysis_flights = SingleFlight("analysis")
+
+    return _analysis_flights
+
+
+def get_agent_flights() -> SingleFlight:
+    """
+    Get or create the single-flight group for agent executions (keyed by agent cache key)
+
+    Returns:
+        SingleFlight instance
+    """
+    global _agent_flights
+
+    if _agent_flights is None:
+        _agent_flights = SingleFlight("agent")
+
+    return _agent_flights
@@ -0,0 +1,197 @@
+"""
+SQLite maintenance
+Periodic WAL checkpoints (keep the -wal file from growing without bound) and
+optional VACUUM (return pages freed by cache eviction to the filesystem)
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+class SqliteMaintenance:
+    """
+    Background wal_checkpoint and VACUUM for a SQLite engine
+
+    Both run while holding the engine's write gate (when it has one) so
+    in-process writers queue behind them instead of hitting SQLITE_BUSY.
+
+    Usage:
+        maintenance = get_sqlite_maintenance()
+        await maintenance.start()
+        result = maintenance.checkpoint()
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        write_gate: Any = None,
+        checkpoint_interval_seconds: float = 300,
+        checkpoint_mode: str = "TRUNCATE",
+        vacuum_interval_hours: float = 0,
+    ):
+        """
+        Initialize maintenance
+
+        Args:
+            engine: SQLite engine
+            write_gate: The engine's SqliteWriteGate, if writes are serialised
+            checkpoint_interval_seconds: Seconds between checkpoints (0 disables)
+            checkpoint_mode: PASSIVE, FULL, RESTART or TRUNCATE
+            vacuum_interval_hours: Hours between VACUUMs (0 disables)
+        """
+        checkpoint_mode = checkpoint_mode.upper()
+        if checkpoint_mode not in CHECKPOINT_MODES:
+            logger.warning(f"Unknown wal_checkpoint mode '{checkpoint_mode}', using TRUNCATE")
+            checkpoint_mode = "TRUNCATE"
+        self.engine = engine
+        self.write_gate = write_gate
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        self.checkpoint_mode = checkpoint_mode
+        self.vacuum_interval_hours = vacuum_interval_hours
+        self._tasks = []
+        self.stats_counters = {"checkpoints": 0, "vacuums": 0, "failures": 0}
+        self.last_checkpoint: Dict[str, Any] = {}
+        self.last_vacuum: Dict[str, Any] = {}
+
+    def _exclusive(self):
+        return self.write_gate.hold() if self.write_gate is not None else nullcontext()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Copy WAL frames back into the database file
+
+        Returns:
+            busy (1 if the checkpoint could not complete), wal_pages, checkpointed_pages, duration_ms
+        """
+        started = time.perf_counter()
+        with self._exclusive():
+            with self.engine.connect() as conn:
+                busy, wal_pages, checkpointed = conn.exec_driver_sql(
+                    f"PRAGMA wal_checkpoint({self.checkpoint_mode})"
+                ).one()
+        result = {
+            "busy": busy,
+            "wal_pages": wal_pages,
+            "checkpointed_pages": checkpointed,
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        self.stats_counters["checkpoints"] += 1
+        self.last_checkpoint = result
+        return result
+
+    def vacuum(self) -> Dict[str, Any]:
+        """
+        Rebuild the database file, releasing free pages
+
+        Returns:
+            Page counts before and after, duration_ms
+        """
+        started = time.perf_counter()
+        with self._exclusive():
+            # VACUUM cannot run inside a transaction
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                pages_before = conn.execute(text("PRAGMA page_count")).scalar()
+                conn.execute(text("VACUUM"))
+                pages_after = conn.execute(text("PRAGMA page_count")).scalar()
+        result = {
+            "pages_before": pages_before,
+            "pages_after": pages_after,
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        self.stats_counters["vacuums"] += 1
+        self.last_vacuum = result
+        logger.info(f"SQLite VACUUM: {pages_before} -> {pages_after} pages in {result['duration_ms']}ms")
+        return result
+
+    async def _every(self, seconds: float, job):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await asyncio.to_thread(job)
+            except Exception as e:
+                self.stats_counters["failures"] += 1
+                logger.error(f"SQLite {job.__name__} failed: {e}")
+
+    async def start(self):
+        """Start the periodic jobs that have an interval"""
+        if any(not task.done() for task in self._tasks):
+            return
+        self._tasks = []
+        if self.checkpoint_interval_seconds:
+            self._tasks.append(asyncio.create_task(self._every(self.checkpoint_interval_seconds, self.checkpoint)))
+        if self.vacuum_interval_hours:
+            self._tasks.append(asyncio.create_task(self._every(self.vacuum_interval_hours * 3600, self.vacuum)))
+        logger.info(
+            f"SQLite maintenance started (checkpoint every {self.checkpoint_interval_seconds or '-'}s, "
+            f"vacuum every {self.vacuum_interval_hours or '-'}h)"
+        )
+
+    async def stop(self):
+        """Stop the periodic jobs"""
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, configuration, last results and write gate counters"""
+        return {
+            **self.stats_counters,
+            "checkpoint_interval_seconds": self.checkpoint_interval_seconds,
+            "checkpoint_mode": self.checkpoint_mode,
+            "vacuum_interval_hours": self.vacuum_interval_hours,
+            "last_checkpoint": self.last_checkpoint,
+            "last_vacuum": self.last_vacuum,
+            "write_gate": self.write_gate.stats() if self.write_gate is not None else {"enabled": False},
+        }
+
+
+# Singleton instance
+_sqlite_maintenance: Optional[SqliteMaintenance] = None
+
+
+def get_sqlite_maintenance() -> Optional[SqliteMaintenance]:
+    """
+    Get or create SQLite maintenance (None for other databases or when
+    SQLITE_MAINTENANCE_ENABLED is off)
+
+    Returns:
+        SqliteMaintenance instance or None
+    """
+    global _sqlite_maintenance
+
+    if not settings.SQLITE_MAINTENANCE_ENABLED:
+        return None
+
+    if _sqlite_maintenance is None:
+        from models import database
+
+        if database.engine.dialect.name != "sqlite":
+            return None
+        _sqlite_maintenance = SqliteMaintenance(
+            engine=database.engine,
+            write_gate=database.sqlite_write_gate,
+            checkpoint_interval_seconds=settings.SQLITE_CHECKPOINT_INTERVAL_SECONDS,
+            checkpoint_mode=settings.SQLITE_CHECKPOINT_MODE,
+            vacuum_interval_hours=settings.SQLITE_VACUUM_INTERVAL_HOURS,
+        )
+
+    return _sqlite_maintenance
@@ -0,0 +1,420 @@
+"""
+Write-behind telemetry writer
+Buffers agent execution records, agent performance aggregates, latency
+histogram counts and cache access counts in memory and writes them in periodic
+batches, so the request path no longer commits (and waits on the database
+write lock) for every event
+"""
+
+import asyncio
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import Integer, case, cast, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.analysis import AgentCachedResult, AgentExecution, AgentPerformance, CachedAnalysis
+from services.dashboard_counters import count_cache_hits
+from services.latency_histogram import PHASE_TOTAL, LatencyDeltas, add_latency, apply_latency_deltas
+from services.result_cache import TIER_AGENT, TIER_ANALYSIS
+
+logger = logging.getLogger(__name__)
+
+# Cache tables by result_cache tier name
+CACHE_MODELS = {TIER_ANALYSIS: CachedAnalysis, TIER_AGENT: AgentCachedResult}
+
+
+def _empty_performance() -> Dict[str, Any]:
+    return {"runs": 0, "successes": 0, "failures": 0, "time_total": 0, "min_time": None, "max_time": None}
+
+
+def apply_performance_delta(db: Session, agent_name: str, delta: Dict[str, Any]):
+    """
+    Increment one agent's aggregate row, creating it on first use (no commit)
+
+    Args:
+        db: Session
+        agent_name: Agent
+        delta: runs, successes, failures, time_total, min_time and max_time of the new runs
+    """
+    runs = delta["runs"]
+    perf = AgentPerformance.__table__.c
+    # All SET expressions see the row as it was before the UPDATE
+    values = {
+        "total_runs": perf.total_runs + runs,
+        "successful_runs": perf.successful_runs + delta["successes"],
+        "failed_runs": perf.failed_runs + delta["failures"],
+        "success_rate": (perf.successful_runs + delta["successes"]) * 1.0 / (perf.total_runs + runs),
+        # Rounded rather than truncated, so the running mean does not drift downwards
+        "avg_execution_time_ms": cast(func.round(
+            (case((perf.avg_execution_time_ms.is_(None), 0), else_=perf.avg_execution_time_ms) * perf.total_runs
+             + delta["time_total"]) * 1.0 / (perf.total_runs + runs)
+        ), Integer),
+        "min_execution_time_ms": case(
+            ((perf.min_execution_time_ms.is_(None)) | (perf.min_execution_time_ms > delta["min_time"]), delta["min_time"]),
+            else_=perf.min_execution_time_ms,
+        ),
+        "max_execution_time_ms": case(
+            ((perf.max_execution_time_ms.is_(None)) | (perf.max_execution_time_ms < delta["max_time"]), delta["max_time"]),
+            else_=perf.max_execution_time_ms,
+        ),
+        "last_updated": datetime.utcnow(),
+    }
+    statement = update(AgentPerformance).where(perf.agent_name == agent_name).values(values)
+    if db.execute(statement).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(AgentPerformance).values(
+                id=str(uuid.uuid4()),
+                agent_name=agent_name,
+                total_runs=runs,
+                successful_runs=delta["successes"],
+                failed_runs=delta["failures"],
+                success_rate=delta["successes"] / runs,
+                avg_execution_time_ms=round(delta["time_total"] / runs),
+                min_execution_time_ms=delta["min_time"],
+                max_execution_time_ms=delta["max_time"],
+                last_updated=datetime.utcnow(),
+            ))
+    except IntegrityError:
+        # Another process created the row in the meantime
+        db.execute(statement)
+
+
+class TelemetryWriter:
+    """
+    Accumulates telemetry and flushes it with batched INSERTs and increment UPDATEs
+
+    - Agent executions: one INSERT per execution (started and completed fields
+      merged when both happen between flushes), bulk UPDATEs for executions
+      completed after their row was written.
+    - Agent performance: per-agent deltas applied with a single increment UPDATE
+      (rows are created on first use), so concurrent writers never lose runs.
+    - Latency histograms: bucket counts per agent, phase and window, applied
+      as count + n (upserts).
+    - Cache access: hit counts per cache key, applied as access_count + n.
+
+    The buffer is bounded: once max_pending items are waiting, the recording
+    call flushes inline (backpressure rather than dropping telemetry). A failed
+    flush puts its batch back into the buffer and the next flush retries it;
+    a batch is only dropped after max_retries consecutive failures, or when
+    putting it back would exceed max_pending.
+
+    Usage:
+        writer = get_telemetry_writer()
+        await writer.start()
+        execution_id, started_at = writer.record_execution_started(analysis_id, "eda")
+        writer.record_execution_completed(execution_id, success=True)
+        await writer.stop()  # final flush
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        flush_interval: float = 2.0,
+        max_pending: int = 5000,
+        latency_window_minutes: int = 60,
+        max_retries: int = 5,
+    ):
+        """
+        Initialize writer
+
+        Args:
+            session_factory: Creates the session used by each flush
+            flush_interval: Seconds between background flushes
+            max_pending: Buffered items that trigger an inline flush
+            latency_window_minutes: Time window of the latency histograms
+            max_retries: Consecutive failed flushes after which the pending batch is dropped
+        """
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.latency_window_minutes = latency_window_minutes
+        self.max_retries = max_retries
+        self._consecutive_failures = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Executions not written yet (id -> row), completions of written ones (id -> changes)
+        self._new_executions: Dict[str, Dict[str, Any]] = {}
+        self._completions: Dict[str, Dict[str, Any]] = {}
+        # Executions started but not completed: id -> (agent_name, started_at)
+        self._running: Dict[str, Tuple[str, datetime]] = {}
+        self._performance: Dict[str, Dict[str, Any]] = {}
+        self._latency: LatencyDeltas = {}
+        self._cache_hits: Dict[Tuple[str, str], Tuple[int, datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats_counters = {
+            "flushes": 0, "inline_flushes": 0, "failed_flushes": 0, "dropped_items": 0,
+            "executions_written": 0, "completions_written": 0,
+            "performance_updates": 0, "latency_bucket_updates": 0, "cache_access_updates": 0,
+        }
+
+    # ---------- Recording ----------
+
+    def record_execution_started(self, analysis_id: str, agent_name: str) -> Tuple[str, datetime]:
+        """
+        Buffer a new agent execution
+
+        Returns:
+            (execution_id, started_at) of the row that will be written
+        """
+        execution_id = str(uuid.uuid4())
+        started_at = datetime.utcnow()
+        with self._lock:
+            self._new_executions[execution_id] = {
+                "id": execution_id,
+                "analysis_id": analysis_id,
+                "agent_name": agent_name,
+                "started_at": started_at,
+                "success": False,
+            }
+            self._running[execution_id] = (agent_name, started_at)
+        self._apply_backpressure()
+        return execution_id, started_at
+
+    def record_execution_completed(
+        self,
+        execution_id: str,
+        success: bool,
+        code_result: Optional[Dict[str, Any]] = None,
+        output: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Buffer the completion of an execution started through this writer
+
+        Returns:
+            Execution time in ms, or None if the execution is unknown here
+            (the caller should then complete it directly)
+        """
+        completed_at = datetime.utcnow()
+        with self._lock:
+            running = self._running.pop(execution_id, None)
+            if running is None:
+                return None
+            agent_name, started_at = running
+            execution_time_ms = int((completed_at - started_at).total_seconds() * 1000)
+            changes = {
+                "completed_at": completed_at,
+                "success": success,
+                "code_result": code_result,
+                "output": output,
+                "error": error,
+                "execution_time_ms": execution_time_ms,
+            }
+            if execution_id in self._new_executions:
+                self._new_executions[execution_id].update(changes)
+            else:
+                self._completions[execution_id] = dict(changes, id=execution_id)
+
+            perf = self._performance.setdefault(agent_name, _empty_performance())
+            perf["runs"] += 1
+            perf["successes" if success else "failures"] += 1
+            perf["time_total"] += execution_time_ms
+            perf["min_time"] = execution_time_ms if perf["min_time"] is None else min(perf["min_time"], execution_time_ms)
+            perf["max_time"] = execution_time_ms if perf["max_time"] is None else max(perf["max_time"], execution_time_ms)
+            add_latency(self._latency, agent_name, PHASE_TOTAL, execution_time_ms, completed_at, self.latency_window_minutes)
+        self._apply_backpressure()
+        return execution_time_ms
+
+    def record_latency(self, agent_name: str, phase: str, duration_ms: int):
+        """Buffer one duration for an agent phase's latency histogram"""
+        with self._lock:
+            add_latency(self._latency, agent_name, phase, duration_ms, datetime.utcnow(), self.latency_window_minutes)
+        self._apply_backpressure()
+
+    def record_cache_access(self, cache: str, cache_key: str, hits: int = 1):
+        """Buffer access_count/last_accessed updates for a cache row (cache is TIER_ANALYSIS or TIER_AGENT)"""
+        now = datetime.utcnow()
+        with self._lock:
+            pending, _ = self._cache_hits.get((cache, cache_key), (0, now))
+            self._cache_hits[(cache, cache_key)] = (pending + hits, now)
+        self._apply_backpressure()
+
+    def pending(self) -> int:
+        """Number of buffered items"""
+        return (len(self._new_executions) + len(self._completions) + len(self._performance)
+                + len(self._latency) + len(self._cache_hits))
+
+    def _apply_backpressure(self):
+        if self.pending() >= self.max_pending:
+            self.stats_counters["inline_flushes"] += 1
+            self.flush()
+
+    # ---------- Flushing ----------
+
+    def _restore(
+        self,
+        new_executions: Dict[str, Dict[str, Any]],
+        completions: Dict[str, Dict[str, Any]],
+        performance: Dict[str, Dict[str, Any]],
+        latency: LatencyDeltas,
+        cache_hits: Dict[Tuple[str, str], Tuple[int, datetime]],
+    ) -> bool:
+        """
+        Merge a batch that failed to flush back into the buffer (called with _lock held)
+
+        Returns:
+            False if the batch was not put back because the buffer would exceed max_pending
+        """
+        batch = len(new_executions) + len(completions) + len(performance) + len(latency) + len(cache_hits)
+        if self.pending() + batch > self.max_pending:
+            return False
+        for execution_id, row in new_executions.items():
+            # Completed after the batch was taken: merge the completion into the unwritten row
+            row.update({k: v for k, v in self._completions.pop(execution_id, {}).items() if k != "id"})
+            self._new_executions[execution_id] = row
+        for execution_id, changes in completions.items():
+            self._completions.setdefault(execution_id, changes)
+        for agent_name, delta in performance.items():
+            perf = self._performance.setdefault(agent_name, _empty_performance())
+            for key in ("runs", "successes", "failures", "time_total"):
+                perf[key] += delta[key]
+            for key, pick in (("min_time", min), ("max_time", max)):
+                if delta[key] is not None:
+                    perf[key] = delta[key] if perf[key] is None else pick(perf[key], delta[key])
+        for key, (count, total) in latency.items():
+            pending_count, pending_total = self._latency.get(key, (0, 0))
+            self._latency[key] = (pending_count + count, pending_total + total)
+        for key, (hits, last_accessed) in cache_hits.items():
+            pending_hits, pending_accessed = self._cache_hits.get(key, (0, last_accessed))
+            self._cache_hits[key] = (pending_hits + hits, max(pending_accessed, last_accessed))
+        return True
+
+    def flush(self) -> int:
+        """
+        Write everything buffered so far in one transaction
+
+        Returns:
+            Number of buffered items written (0 if nothing was pending or the flush failed)
+        """
+        with self._flush_lock:
+            with self._lock:
+                new_executions, self._new_executions = self._new_executions, {}
+                completions, self._completions = self._completions, {}
+                performance, self._performance = self._performance, {}
+                latency, self._latency = self._latency, {}
+                cache_hits, self._cache_hits = self._cache_hits, {}
+            total = len(new_executions) + len(completions) + len(performance) + len(latency) + len(cache_hits)
+            if not total:
+                return 0
+
+            db = self.session_factory()
+            try:
+                if new_executions:
+                    db.execute(insert(AgentExecution), list(new_executions.values()))
+                if completions:
+                    db.execute(update(AgentExecution), list(completions.values()))
+                for agent_name, delta in performance.items():
+                    apply_performance_delta(db, agent_name, delta)
+                apply_latency_deltas(db, latency)
+                for (cache, cache_key), (hits, last_accessed) in cache_hits.items():
+                    model = CACHE_MODELS[cache]
+                    updated = db.execute(
+                        update(model)
+                        .where(model.cache_key == cache_key)
+                        .values(access_count=model.access_count + hits, last_accessed=last_accessed)
+                    ).rowcount
+                    if updated:
+                        count_cache_hits(db, model, hits)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.stats_counters["failed_flushes"] += 1
+                self._consecutive_failures += 1
+                restored = False
+                if self._consecutive_failures < self.max_retries:
+                    with self._lock:
+                        restored = self._restore(new_executions, completions, performance, latency, cache_hits)
+                if restored:
+                    logger.warning(
+                        f"Telemetry flush failed ({self._consecutive_failures}/{self.max_retries}), "
+                        f"keeping {total} buffered items for the next flush: {e}"
+                    )
+                else:
+                    self._consecutive_failures = 0
+                    self.stats_counters["dropped_items"] += total
+                    logger.error(f"Telemetry flush failed, dropped {total} buffered items: {e}")
+                return 0
+            finally:
+                db.close()
+
+            self._consecutive_failures = 0
+            self.stats_counters["flushes"] += 1
+            self.stats_counters["executions_written"] += len(new_executions)
+            self.stats_counters["completions_written"] += len(completions)
+            self.stats_counters["performance_updates"] += len(performance)
+            self.stats_counters["latency_bucket_updates"] += len(latency)
+            self.stats_counters["cache_access_updates"] += len(cache_hits)
+            logger.debug(f"Telemetry flush wrote {total} items")
+            return total
+
+    # ---------- Lifecycle ----------
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Telemetry writer loop error: {e}")
+
+    async def start(self):
+        """Start the periodic background flush"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Telemetry writer started (flush every {self.flush_interval}s, max {self.max_pending} pending)")
+
+    async def stop(self):
+        """Stop the background flush and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        """Flush counters and current buffer size"""
+        stats = dict(self.stats_counters)
+        stats["pending"] = self.pending()
+        stats["running_executions"] = len(self._running)
+        return stats
+
+
+# Singleton instance
+_telemetry_writer: Optional[TelemetryWriter] = None
+
+
+def get_telemetry_writer() -> Optional[TelemetryWriter]:
+    """
+    Get or create the telemetry writer (None when TELEMETRY_WRITE_BEHIND is off)
+
+    Returns:
+        TelemetryWriter instance or None
+    """
+    global _telemetry_writer
+
+    if not settings.TELEMETRY_WRITE_BEHIND:
+        return None
+
+    if _telemetry_writer is None:
+        from models.database import SessionLocal
+
+        _telemetry_writer = TelemetryWriter(
+            session_factory=SessionLocal,
+            flush_interval=settings.TELEMETRY_FLUSH_INTERVAL_SECONDS,
+            max_pending=settings.TELEMETRY_MAX_PENDING,
+            latency_window_minutes=settings.LATENCY_WINDOW_MINUTES,
+            max_retries=settings.TELEMETRY_MAX_FLUSH_RETRIES,
+        )
+
+    return _telemetry_writer
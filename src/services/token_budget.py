@@ -0,0 +1,258 @@
+"""
+Token budgets for Claude calls
+Local prompt-size estimates, per-call-type max_tokens from config.yaml,
+priority-based compression of previous agent results, and usage accounting
+"""
+
+import json
+import logging
+import math
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Call types used by ClaudeService (token_budget.max_tokens keys in config.yaml)
+CALL_SELECTION = "selection"
+CALL_CODE_GENERATION = "code_generation"
+CALL_EXPLANATION = "explanation"
+CALL_EXPLANATION_BATCH = "explanation_batch"
+CALL_REPORT = "report"
+CALL_DEFAULT = "default"
+
+DEFAULT_MAX_TOKENS = {
+    CALL_SELECTION: 1024,
+    CALL_CODE_GENERATION: 8192,
+    CALL_EXPLANATION: 1536,
+    CALL_EXPLANATION_BATCH: 4096,
+    CALL_REPORT: 8192,
+}
+
+DEFAULT_CHARS_PER_TOKEN = 3.5
+DEFAULT_PREVIOUS_RESULTS_TOKENS = 6000
+DEFAULT_MAX_PROMPT_TOKENS = 150000
+
+# Detail levels for one previous agent, from full to name-only.
+# Each level: (output chars, summary chars, insights chars, files listed)
+DETAIL_LEVELS = [
+    (1000, 500, 500, 5),
+    (0, 500, 500, 5),
+    (0, 300, 300, 3),
+    (0, 200, 0, 0),
+    (0, 0, 0, 0),
+]
+
+
+def get_token_budget_config(raw_config: Dict[str, Any], fallback_max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Read the token_budget section of config.yaml
+
+    Args:
+        raw_config: Parsed config.yaml
+        fallback_max_tokens: max_tokens for call types not listed (CLAUDE_MAX_TOKENS)
+
+    Returns:
+        Dict with max_tokens (per call type), default_max_tokens, previous_results_tokens,
+        max_prompt_tokens and chars_per_token
+    """
+    section = (raw_config or {}).get("token_budget") or {}
+    max_tokens = dict(DEFAULT_MAX_TOKENS)
+    for call_type, value in (section.get("max_tokens") or {}).items():
+        try:
+            max_tokens[str(call_type)] = max(1, int(value))
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid token_budget.max_tokens.{call_type}: {value!r}")
+
+    return {
+        "max_tokens": max_tokens,
+        "default_max_tokens": int(max_tokens.get(CALL_DEFAULT) or fallback_max_tokens or 4096),
+        "previous_results_tokens": int(section.get("previous_results_tokens", DEFAULT_PREVIOUS_RESULTS_TOKENS)),
+        "max_prompt_tokens": int(section.get("max_prompt_tokens", DEFAULT_MAX_PROMPT_TOKENS)),
+        "chars_per_token": float(section.get("chars_per_token", DEFAULT_CHARS_PER_TOKEN) or DEFAULT_CHARS_PER_TOKEN),
+    }
+
+
+def max_tokens_for(budget_config: Dict[str, Any], call_type: str) -> int:
+    """Output token limit for a call type"""
+    return budget_config["max_tokens"].get(call_type) or budget_config["default_max_tokens"]
+
+
+def estimate_tokens(text: Optional[str], chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    """
+    Rough token count without calling the API
+
+    Deliberately conservative (Claude averages a little under 4 characters per
+    token on English prose and fewer on JSON/code).
+    """
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / chars_per_token))
+
+
+def _format_previous_agent(agent_name: str, result: Dict[str, Any], level: int) -> str:
+    output_chars, summary_chars, insights_chars, max_files = DETAIL_LEVELS[level]
+    exec_result = (result or {}).get("execution_result", {}) or {}
+    section = f"--- Agent: {agent_name} ---\n"
+
+    output = exec_result.get("output", "")
+    if output and output_chars:
+        section += f"Output: {output[:output_chars]}\n"
+
+    ui_summary = exec_result.get("ui_summary", "")
+    if ui_summary and summary_chars:
+        section += f"Summary: {ui_summary[:summary_chars]}\n"
+
+    output_files = exec_result.get("output_files", [])
+    if output_files and max_files:
+        section += f"Generated Files ({len(output_files)}):\n"
+        for file_info in output_files[:max_files]:
+            section += f"  - {file_info.get('filename', 'unknown')}: {file_info.get('type', 'unknown')}\n"
+
+    insights = exec_result.get("insights") or exec_result.get("next_insights", {})
+    if insights and insights_chars:
+        section += f"Key Insights: {json.dumps(insights, indent=2, default=str)[:insights_chars]}\n"
+
+    if level == len(DETAIL_LEVELS) - 1:
+        status = "succeeded" if exec_result.get("success", result.get("success", True)) else "failed"
+        section += f"(details omitted, {status})\n"
+
+    return section + "\n"
+
+
+def build_previous_results_context(
+    previous_results: Optional[Dict[str, Any]],
+    budget_tokens: int,
+    chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+) -> str:
+    """
+    Previous-agent section of the code generation prompt, fitted to a token budget
+
+    Every agent starts at full detail. While over budget, the least compressed
+    agent is stepped down one level (raw output first, then trimmed
+    summary/insights, then a one-line summary, then name only), taking the
+    oldest agent on ties, so the most recent results keep the most detail.
+
+    Args:
+        previous_results: Ordered mapping of agent name to result
+        budget_tokens: Token budget for the whole section
+        chars_per_token: Estimate ratio (see estimate_tokens)
+
+    Returns:
+        Context text (empty when there are no previous results)
+    """
+    if not previous_results:
+        return ""
+
+    header = (
+        "\n\nPREVIOUS AGENT RESULTS:\n"
+        "The following agents have already processed this data. Use their findings to inform your analysis:\n\n"
+    )
+    names: List[str] = list(previous_results.keys())
+    levels = [0] * len(names)
+    sections = [_format_previous_agent(name, previous_results[name], 0) for name in names]
+
+    def total_tokens() -> int:
+        return estimate_tokens(header + "".join(sections), chars_per_token)
+
+    last_level = len(DETAIL_LEVELS) - 1
+    while total_tokens() > budget_tokens:
+        # Least compressed agent; ties go to the oldest
+        candidates = [i for i, level in enumerate(levels) if level < last_level]
+        if not candidates:
+            break
+        index = min(candidates, key=lambda i: (levels[i], i))
+        levels[index] += 1
+        sections[index] = _format_previous_agent(names[index], previous_results[names[index]], levels[index])
+
+    if any(levels):
+        logger.info(
+            f"Compressed previous results for {len(names)} agents to ~{total_tokens()} tokens "
+            f"(budget {budget_tokens}, levels {dict(zip(names, levels))})"
+        )
+    return header + "".join(sections)
+
+
+class TokenUsageTracker:
+    """
+    Accumulates token usage reported by the Messages API, per call type
+
+    Records input, output and prompt-cache tokens, the local input estimate
+    (to check the estimator) and how often a response hit max_tokens.
+    """
+
+    FIELDS = (
+        "calls", "input_tokens", "output_tokens", "cache_read_input_tokens",
+        "cache_creation_input_tokens", "estimated_input_tokens", "max_tokens_requested",
+        "truncated",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_type: Dict[str, Dict[str, int]] = {}
+
+    def record(
+        self,
+        call_type: str,
+        usage: Optional[Dict[str, Any]],
+        max_tokens: int,
+        estimated_input_tokens: int = 0,
+        stop_reason: Optional[str] = None,
+    ):
+        """
+        Add one API response
+
+        Args:
+            call_type: Call type the request was budgeted as
+            usage: The response's usage object (may be partial for streams)
+            max_tokens: max_tokens sent with the request
+            estimated_input_tokens: Local prompt estimate
+            stop_reason: The response's stop_reason
+        """
+        usage = usage or {}
+        truncated = stop_reason == "max_tokens"
+        if truncated:
+            logger.warning(f"Claude response for {call_type} hit max_tokens={max_tokens}; output was truncated")
+        with self._lock:
+            counters = self._by_type.setdefault(call_type, {field: 0 for field in self.FIELDS})
+            counters["calls"] += 1
+            counters["input_tokens"] += int(usage.get("input_tokens") or 0)
+            counters["output_tokens"] += int(usage.get("output_tokens") or 0)
+            counters["cache_read_input_tokens"] += int(usage.get("cache_read_input_tokens") or 0)
+            counters["cache_creation_input_tokens"] += int(usage.get("cache_creation_input_tokens") or 0)
+            counters["estimated_input_tokens"] += int(estimated_input_tokens or 0)
+            counters["max_tokens_requested"] += int(max_tokens or 0)
+            counters["truncated"] += 1 if truncated else 0
+
+    def reset(self):
+        """Clear all counters"""
+        with self._lock:
+            self._by_type.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-call-type totals plus an overall total"""
+        with self._lock:
+            by_type = {call_type: dict(counters) for call_type, counters in self._by_type.items()}
+        total = {field: sum(c[field] for c in by_type.values()) for field in self.FIELDS}
+        for counters in list(by_type.values()) + [total]:
+            calls = counters["calls"]
+            counters["avg_output_tokens"] = round(counters["output_tokens"] / calls, 1) if calls else 0.0
+        return {"by_call_type": by_type, "total": total}
+
+
+# Singleton instance
+_usage_tracker: Optional[TokenUsageTracker] = None
+
+
+def get_token_usage_tracker() -> TokenUsageTracker:
+    """
+    Get or create the process-wide token usage tracker
+
+    Returns:
+        TokenUsageTracker instance
+    """
+    global _usage_tracker
+
+    if _usage_tracker is None:
+        _usage_tracker = TokenUsageTracker()
+
+    return _usage_tracker
@@ -9,6 +9,7 @@ from typing import Dict, Any, List, Optional, Union
 from io import BytesIO
 import logging
 from pathlib import Path
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -88,7 +89,7 @@ class DataProcessor:
                 if len(remaining_df) > 0:
                     # Get random sample from remaining rows
                     n_random = min(sample_rows - 1, len(remaining_df))
-                    random_sample = remaining_df.sample(n=n_random, random_state=None)  # None = truly random each time
+                    random_sample = remaining_df.sample(n=n_random, random_state=settings.DATA_SAMPLE_SEED)  # Seeded so prompts stay byte-identical
                     sample_df = pd.concat([first_row_df, random_sample]).reset_index(drop=True)
                 else:
                     sample_df = first_row_df
@@ -122,6 +123,21 @@ class DataProcessor:
             logger.error(f"Error processing file {filename}: {str(e)}")
             raise ValueError(f"Failed to process file: {str(e)}")
     
+    async def read_file_sample_async(self, file_content: bytes, filename: str, sample_rows: int = 3) -> Dict[str, Any]:
+        """
+        Same as read_file_sample, but parsed in the compute pool so the event loop stays free
+
+        Args:
+            file_content: Raw file content as bytes
+            filename: Original filename to determine file type
+            sample_rows: Number of rows to sample (default: 3)
+
+        Returns:
+            Dict containing sample data, columns info, and basic statistics
+        """
+        from services.compute_pool import get_compute_pool
+        return await get_compute_pool().run(read_file_sample_task, file_content, filename, sample_rows)
+
     def _analyze_data_structure(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
         Analyze the structure and basic statistics of the dataframe
@@ -234,6 +250,11 @@ class DataProcessor:
         return suggestions
 
 
+def read_file_sample_task(file_content: bytes, filename: str, sample_rows: int = 3) -> Dict[str, Any]:
+    """Compute pool entry point for DataProcessor.read_file_sample (returns plain JSON-ready values)"""
+    return DataProcessor().read_file_sample(file_content, filename, sample_rows=sample_rows)
+
+
 def create_sample_prompt(data_sample: Dict[str, Any], user_question: str) -> str:
     """
     Create a prompt for the Claude API that includes data sample and user question
@@ -0,0 +1,157 @@
+"""
+Content fingerprinting for uploaded data files
+Computes the data hash once, in a single streaming pass, for reuse by every cache key builder
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+# Optional fast hashes (fall back to hashlib.blake2b when unavailable)
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+# Bytes fed to the hashers per update
+CHUNK_SIZE = 1024 * 1024
+
+# Digest size in bytes for every algorithm (keeps "<algo>:<hex>" within the 64-char hash columns)
+DIGEST_BYTES = 16
+
+
+@dataclass(frozen=True)
+class ContentFingerprint:
+    """
+    Fingerprint of a file's content
+
+    Attributes:
+        data_hash: "<algorithm>:<hex digest>" used in cache keys
+        algorithm: Hash algorithm that produced data_hash
+        size: Content length in bytes
+    """
+    data_hash: str
+    algorithm: str
+    size: int
+
+
+def resolve_algorithm(preferred: str) -> str:
+    """Return the preferred algorithm if its library is installed, otherwise the best available one"""
+    preferred = (preferred or "").lower()
+    if preferred == "xxh3" and XXHASH_AVAILABLE:
+        return "xxh3"
+    if preferred == "blake3" and BLAKE3_AVAILABLE:
+        return "blake3"
+    if preferred in ("blake2b", "sha256"):
+        return preferred
+    if XXHASH_AVAILABLE:
+        return "xxh3"
+    if BLAKE3_AVAILABLE:
+        return "blake3"
+    return "blake2b"
+
+
+def _new_hasher(algorithm: str):
+    if algorithm == "xxh3":
+        return xxhash.xxh3_128()
+    if algorithm == "blake3":
+        return blake3.blake3()
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    return hashlib.blake2b(digest_size=DIGEST_BYTES)
+
+
+def _hexdigest(hasher, algorithm: str) -> str:
+    if algorithm == "blake3":
+        return hasher.hexdigest(length=DIGEST_BYTES)
+    return hasher.hexdigest()[:DIGEST_BYTES * 2]
+
+
+class StreamingFingerprinter:
+    """
+    Incrementally hashes content as it is read
+
+    Usage:
+        fingerprinter = StreamingFingerprinter("xxh3")
+        for chunk in chunks:
+            fingerprinter.update(chunk)
+        fingerprint = fingerprinter.finalize()
+    """
+
+    def __init__(self, algorithm: str = "xxh3"):
+        self.algorithm = resolve_algorithm(algorithm)
+        self._hasher = _new_hasher(self.algorithm)
+        self._size = 0
+
+    def update(self, chunk: bytes):
+        """Feed the next chunk of content"""
+        if not chunk:
+            return
+        self._hasher.update(chunk)
+        self._size += len(chunk)
+
+    def finalize(self) -> ContentFingerprint:
+        """Return the fingerprint of everything fed so far"""
+        return ContentFingerprint(
+            data_hash=f"{self.algorithm}:{_hexdigest(self._hasher, self.algorithm)}",
+            algorithm=self.algorithm,
+            size=self._size,
+        )
+
+
+def fingerprint_bytes(
+    content: Union[bytes, bytearray, memoryview],
+    algorithm: str = "xxh3"
+) -> ContentFingerprint:
+    """
+    Fingerprint in-memory content
+
+    Args:
+        content: Content to hash
+        algorithm: Preferred algorithm (xxh3, blake3, blake2b or sha256)
+
+    Returns:
+        ContentFingerprint
+    """
+    fingerprinter = StreamingFingerprinter(algorithm)
+    view = memoryview(content)
+    for offset in range(0, len(view), CHUNK_SIZE):
+        fingerprinter.update(view[offset:offset + CHUNK_SIZE])
+    return fingerprinter.finalize()
+
+
+async def read_upload_with_fingerprint(
+    upload,
+    algorithm: str = "xxh3"
+) -> tuple:
+    """
+    Read an UploadFile in chunks, hashing each chunk as it arrives
+
+    Args:
+        upload: FastAPI UploadFile (or any object with async read(size))
+        algorithm: Preferred algorithm (xxh3, blake3, blake2b or sha256)
+
+    Returns:
+        Tuple of (content bytes, ContentFingerprint)
+    """
+    fingerprinter = StreamingFingerprinter(algorithm)
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        fingerprinter.update(chunk)
+        buffer.extend(chunk)
+    fingerprint = fingerprinter.finalize()
+    logger.debug(f"Fingerprinted {fingerprint.size} bytes with {fingerprint.algorithm}")
+    return bytes(buffer), fingerprint
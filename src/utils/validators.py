@@ -130,7 +130,14 @@ async def _validate_csv_content(file: UploadFile) -> Dict[str, Any]:
     
     if not content:
         raise ValueError("File is empty")
-    
+
+    # Parse in the compute pool so large files don't block the event loop
+    from services.compute_pool import get_compute_pool
+    return await get_compute_pool().run(_parse_csv_content, content)
+
+
+def _parse_csv_content(content: bytes) -> Dict[str, Any]:
+    """Parse CSV bytes and return validation metadata (runs in a compute pool worker)"""
     # Try different encodings
     text_content = None
     encoding = 'unknown'
@@ -177,10 +184,10 @@ async def _validate_csv_content(file: UploadFile) -> Dict[str, Any]:
         
     except Exception as e:
         # Fallback to basic CSV validation
-        return await _validate_csv_basic(text_content, encoding)
+        return _validate_csv_basic(text_content, encoding)
 
 
-async def _validate_csv_basic(text_content: str, encoding: str) -> Dict[str, Any]:
+def _validate_csv_basic(text_content: str, encoding: str) -> Dict[str, Any]:
     """Basic CSV validation fallback"""
     try:
         # Use csv.Sniffer for dialect detection
@@ -238,7 +245,14 @@ async def _validate_excel_content(file: UploadFile) -> Dict[str, Any]:
     
     if not content:
         raise ValueError("File is empty")
-    
+
+    # Parse in the compute pool so large files don't block the event loop
+    from services.compute_pool import get_compute_pool
+    return await get_compute_pool().run(_parse_excel_content, content, file.filename or "")
+
+
+def _parse_excel_content(content: bytes, filename: str) -> Dict[str, Any]:
+    """Parse Excel bytes and return validation metadata (runs in a compute pool worker)"""
     try:
         # Create BytesIO from content
         bytes_buffer = BytesIO(content)
@@ -262,7 +276,7 @@ async def _validate_excel_content(file: UploadFile) -> Dict[str, Any]:
         # Try to get all sheet names
         bytes_buffer.seek(0)
         try:
-            if file.filename.lower().endswith('.xlsx'):
+            if filename.lower().endswith('.xlsx'):
                 excel_file = pd.ExcelFile(bytes_buffer, engine='openpyxl')
             else:
                 excel_file = pd.ExcelFile(bytes_buffer, engine='xlrd')
@@ -0,0 +1,42 @@
+"""
+Shared fixtures
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.database import Base
+from models import analysis  # noqa: F401  (registers the tables)
+from services.dashboard_counters import DashboardCounters, uninstall_counter_hooks
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory bound to a fresh in-memory database with all tables (one connection, any thread)"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    """Session on the session_factory database"""
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def counters(session_factory):
+    """Dashboard counters on the session_factory database (their flush hook is removed afterwards)"""
+    yield DashboardCounters(session_factory, reconcile_interval_seconds=0)
+    uninstall_counter_hooks()
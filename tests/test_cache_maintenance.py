@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for cache table expiry and size-based eviction
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import AgentCachedResult, CachedAnalysis
+from services import cache_maintenance
+from services.cache_maintenance import CacheSweeper
+from services.llm_cache import LLMResponseCache
+from services.result_cache import TIER_AGENT, TIER_ANALYSIS
+
+
+@pytest.fixture(autouse=True)
+def _no_llm_cache(monkeypatch):
+    monkeypatch.setattr(cache_maintenance, "get_llm_cache", lambda: None)
+
+
+def _add_analysis(db, key, size, last_accessed, access_count=0, expires_at=None):
+    db.add(CachedAnalysis(
+        cache_key=key, data_hash="h", user_question="q", analysis_id="a",
+        cached_result={"blob": "x" * size}, last_accessed=last_accessed,
+        access_count=access_count, expires_at=expires_at or datetime.utcnow() + timedelta(hours=1),
+    ))
+
+
+def test_expired_rows_are_removed_from_both_tables(session_factory, db):
+    past = datetime.utcnow() - timedelta(minutes=1)
+    _add_analysis(db, "old", 10, past, expires_at=past)
+    _add_analysis(db, "new", 10, past)
+    db.add(AgentCachedResult(cache_key="agent-old", data_hash="h", user_question="q", agent_name="eda",
+                             result={}, expires_at=past))
+    db.commit()
+
+    report = CacheSweeper(session_factory, budgets={}).sweep()
+    assert report["cached_analyses"]["expired"] == 1
+    assert report["agent_cached_results"]["expired"] == 1
+    assert [row.cache_key for row in db.query(CachedAnalysis).all()] == ["new"]
+
+
+def test_lru_evicts_least_recently_used_down_to_watermark(session_factory, db):
+    now = datetime.utcnow()
+    for index in range(5):
+        _add_analysis(db, f"k{index}", 1000, now - timedelta(minutes=10 - index))
+    db.commit()
+
+    sweeper = CacheSweeper(session_factory, budgets={TIER_ANALYSIS: 3000, TIER_AGENT: 0}, low_watermark=0.9)
+    report = sweeper.sweep()["cached_analyses"]
+    assert report["evicted"] == 3 and report["bytes"] <= 3000 * 0.9
+    assert sorted(row.cache_key for row in db.query(CachedAnalysis).all()) == ["k3", "k4"]
+    assert sweeper.stats()["evicted"] == 3
+
+
+def test_lfu_evicts_least_frequently_used(session_factory, db):
+    now = datetime.utcnow()
+    _add_analysis(db, "popular-old", 1000, now - timedelta(hours=1), access_count=50)
+    _add_analysis(db, "rare-new", 1000, now, access_count=1)
+    db.commit()
+
+    CacheSweeper(session_factory, budgets={TIER_ANALYSIS: 1500}, policy="lfu").sweep()
+    assert [row.cache_key for row in db.query(CachedAnalysis).all()] == ["popular-old"]
+
+
+def test_sweep_purges_expired_llm_responses(session_factory, tmp_path, monkeypatch):
+    llm_cache = LLMResponseCache(str(tmp_path / "llm.db"), memory_bytes=1024, ttl_seconds=-1)
+    llm_cache.set("stale", "response")
+    monkeypatch.setattr(cache_maintenance, "get_llm_cache", lambda: llm_cache)
+
+    sweeper = CacheSweeper(session_factory, budgets={})
+    assert sweeper.sweep()["llm_responses_purged"] == 1
+    assert len(llm_cache.memory) == 0 and sweeper.stats()["llm_responses_purged"] == 1
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the generated-code library (keyed by agent, schema fingerprint and question)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from config import settings
+from models.analysis import AgentCodeLibraryEntry
+from services import database_service as database_service_module
+from services import langgraph_workflow
+from services.database_service import DatabaseService
+from services.langgraph_workflow import LangGraphMultiAgentWorkflow
+from services.run_context import RunContext
+from services.selection_cache import normalize_question
+from utils.fingerprint import fingerprint_bytes
+
+
+def test_library_key_uses_normalized_question():
+    key = DatabaseService.generate_code_library_key("eda", "schema:abc", normalize_question("What drives revenue?"))
+    assert key == DatabaseService.generate_code_library_key("EDA", "schema:abc", normalize_question("what drives  revenue"))
+    assert key != DatabaseService.generate_code_library_key("eda", "schema:def", normalize_question("what drives revenue"))
+
+
+def test_success_history_and_retirement(counters, db, monkeypatch):
+    monkeypatch.setattr(database_service_module, "get_dashboard_counters", lambda: counters)
+    service = DatabaseService()
+    key = service.generate_code_library_key("eda", "schema:abc", "drives revenue")
+    assert service.get_library_code(db, key) is None
+
+    service.save_library_code(db, key, "eda", "schema:abc", "drives revenue", "print(1)", "desc", "analysis-1")
+    service.record_library_result(db, key, success=True)
+    entry = service.get_library_code(db, key)
+    assert entry.code == "print(1)" and entry.success_count == 2
+
+    service.record_library_result(db, key, success=False)
+    assert service.get_library_code(db, key, max_consecutive_failures=2) is not None
+    service.record_library_result(db, key, success=False)
+    assert service.get_library_code(db, key, max_consecutive_failures=2) is None
+
+    # Regenerated code replaces the script and resets its history
+    entry = service.save_library_code(db, key, "eda", "schema:abc", "drives revenue", "print(2)")
+    assert (entry.code, entry.success_count, entry.failure_count, entry.consecutive_failures) == ("print(2)", 1, 0, 0)
+    assert service.get_analysis_statistics(db)["code_library"]["entries"] == 1
+
+
+class _StubClaude:
+    agent_configs = {"churn_prediction": {"name": "Churn"}}
+
+    def __init__(self):
+        self.generated = 0
+
+    async def generate_agent_code(self, agent_name, agent_config, data_sample, user_question, **kwargs):
+        self.generated += 1
+        return {"code": "print('churn')", "description": "churn script"}
+
+
+class _StubAgent:
+    display_name = "Churn"
+    description = "Churn prediction"
+    specialties = []
+
+
+class _StubAgents:
+    agents = {"churn_prediction": _StubAgent()}
+
+    def __init__(self):
+        self.executed = []
+
+    async def _execute_agent_code(self, agent_name, code_result, file_content, data_sample):
+        self.executed.append(code_result["code"])
+        return {"success": True, "output": "ok", "output_files": []}
+
+    def agent_cache_version(self, agent_name):
+        return "v1"
+
+
+def test_workflow_reuses_library_code_on_a_new_file_with_the_same_schema(session_factory, db, monkeypatch):
+    claude, agents = _StubClaude(), _StubAgents()
+    monkeypatch.setattr(langgraph_workflow, "get_claude_service", lambda: claude)
+    monkeypatch.setattr(langgraph_workflow, "get_agent_service", lambda: agents)
+    monkeypatch.setattr(settings, "CLAUDE_STREAMING", False)
+    monkeypatch.setattr(settings, "AGENT_MOCK", False)
+    monkeypatch.setattr(settings, "CODE_LIBRARY_ENABLED", True)
+    workflow = LangGraphMultiAgentWorkflow()
+    sample = {"columns": ["customer", "churned"], "data_types": {"customer": "object", "churned": "bool"}}
+
+    async def run(content):
+        state = {
+            "file_content": content, "user_question": "Who churns?", "data_sample": sample,
+            "completed_steps": [], "agent_results": {}, "shared_insights": {},
+        }
+        ctx = RunContext(session_factory=session_factory, fingerprint=fingerprint_bytes(content))
+        return await workflow._execute_agent("churn_prediction", state, ctx)
+
+    first = asyncio.run(run(b"customer,churned\na,1\n"))
+    second = asyncio.run(run(b"customer,churned\nb,0\n"))
+    assert first["success"] and second["success"], (first.get("error"), second.get("error"))
+    assert claude.generated == 1 and agents.executed == ["print('churn')"] * 2
+    assert second["code_result"]["from_library"]
+    entry = db.query(AgentCodeLibraryEntry).one()
+    assert (entry.agent_name, entry.success_count) == ("churn_prediction", 2)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for streamed response parsing and early code fence detection
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.code_stream import StreamingCodeExtractor, iter_sse_events
+
+RESPONSE = (
+    "Here is the analysis.\n"
+    "```python\n"
+    "import pandas as pd\n"
+    "df = pd.read_csv('data.csv')\n"
+    "print(df.describe())\n"
+    "```\n"
+    "```yaml\n"
+    "description: Summary statistics\n"
+    "```\n"
+)
+
+
+def test_code_completes_before_yaml_tail():
+    extractor = StreamingCodeExtractor(min_delta_chars=10)
+    deltas = []
+    complete_at = None
+    for i in range(0, len(RESPONSE), 7):
+        deltas.append(extractor.feed(RESPONSE[i:i + 7]))
+        if extractor.code_complete and complete_at is None:
+            complete_at = i + 7
+
+    assert extractor.code == "import pandas as pd\ndf = pd.read_csv('data.csv')\nprint(df.describe())"
+    assert complete_at < RESPONSE.index("```yaml")
+    # Deltas reassemble the code block exactly, without the fences
+    assert "".join(deltas).strip() == extractor.code
+    assert "```" not in "".join(deltas)
+
+
+def test_sse_events_are_decoded():
+    lines = [
+        "event: content_block_delta",
+        'data: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}}',
+        "",
+        ": ping",
+        "event: message_stop",
+        'data: {"type": "message_stop"}',
+        "",
+    ]
+
+    async def collect():
+        async def gen():
+            for line in lines:
+                yield line
+        return [event async for event in iter_sse_events(gen())]
+
+    events = asyncio.run(collect())
+    assert [e["type"] for e in events] == ["content_block_delta", "message_stop"]
+    assert events[0]["delta"]["text"] == "Hi"
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for the CPU-bound compute pool
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.compute_pool import ComputePool
+from utils.data_processor import read_file_sample_task
+from utils.validators import _parse_csv_content
+
+CSV = b"id,amount,region\n" + b"".join(f"{i},{i * 1.5},r{i % 3}\n".encode() for i in range(200))
+
+
+def test_parsing_runs_in_worker_processes():
+    async def scenario():
+        pool = ComputePool(workers=2, max_pending=2)
+        try:
+            await pool.start()
+            return await asyncio.gather(
+                pool.run(read_file_sample_task, CSV, "sales.csv", 5),
+                pool.run(_parse_csv_content, CSV),
+                pool.run(read_file_sample_task, CSV, "sales.csv", 5),
+            ), pool.stats
+        finally:
+            pool.shutdown()
+
+    (sample, validation, _), stats = asyncio.run(scenario())
+    assert sample["total_rows"] == 200
+    assert sample["columns"] == ["id", "amount", "region"]
+    assert validation["columns"] == 3
+    assert stats["completed"] == 3
+
+
+def test_thread_mode_when_no_workers():
+    pool = ComputePool(workers=0)
+    sample = asyncio.run(pool.run(read_file_sample_task, CSV, "sales.csv", 3))
+    assert len(sample["sample_data"]) == 3
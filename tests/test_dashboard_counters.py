@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the incrementally maintained dashboard counters
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import event
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import CachedAnalysis, DashboardCounter
+from services import database_service as database_service_module
+from services.dashboard_counters import (
+    ANALYSES, CACHE_ENTRIES, CACHE_HITS, LIBRARY_ENTRIES, LIBRARY_FAILURES, LIBRARY_SUCCESSES, TOTAL,
+    bump_counters, counters_enabled, status_counter,
+)
+from services.database_service import DatabaseService
+from services.telemetry_writer import TelemetryWriter
+
+
+def _run_workload(db, service):
+    first = service.create_analysis(db, filename="a.csv", user_question="q", selected_agents=["eda"])
+    second = service.create_analysis(db, filename="b.csv", user_question="q", selected_agents=["eda"])
+    service.create_analysis(db, filename="c.csv", user_question="q", selected_agents=["eda"])
+    service.update_analysis_status(db, first.id, "running")
+    service.save_analysis_results(db, first.id, {}, {"eda": {"ok": True}}, {"summary": "done"})
+    service.update_analysis_status(db, second.id, "failed")
+    service.save_to_cache(db, "key-1", "hash", "q", first.id, {"ok": True}, execution_time_ms=900)
+    service.save_to_cache(db, "key-2", "hash", "q", second.id, {"ok": True}, execution_time_ms=400, ttl_hours=-1)
+    service.save_library_code(db, "lib-1", "eda", "schema", "q", "print(1)")
+    service.record_library_result(db, "lib-1", True)
+    service.record_library_result(db, "lib-1", False)
+
+
+def test_counters_follow_status_changes_and_cache_hits(counters, db, monkeypatch):
+    monkeypatch.setattr(database_service_module, "get_telemetry_writer", lambda: None)
+    service = DatabaseService()
+    _run_workload(db, service)
+    cached = db.query(CachedAnalysis).filter(CachedAnalysis.cache_key == "key-1").one()
+    service._touch_cache_row(db, "analysis", cached)
+    service._record_cache_access(db, "analysis", "key-1")
+    assert service.clear_expired_cache(db) == 1
+
+    totals, actual = counters.totals(db), counters.actual_totals(db)
+    assert all(totals.get(name, 0) == actual.get(name, 0) for name in set(totals) | set(actual))
+    assert totals[ANALYSES] == 3 and totals[status_counter("completed")] == 1
+    assert totals[status_counter("running")] == 0 and totals[status_counter("pending")] == 1
+    assert (totals[CACHE_ENTRIES], totals[CACHE_HITS]) == (1, 2)
+    assert (totals[LIBRARY_ENTRIES], totals[LIBRARY_SUCCESSES], totals[LIBRARY_FAILURES]) == (1, 2, 1)
+    assert counters.reconcile() == {}
+
+
+def test_statistics_from_counters_match_the_table_scan(counters, db, monkeypatch):
+    monkeypatch.setattr(database_service_module, "get_telemetry_writer", lambda: None)
+    service = DatabaseService()
+    _run_workload(db, service)
+
+    monkeypatch.setattr(database_service_module, "get_dashboard_counters", lambda: counters)
+    from_counters = service.get_analysis_statistics(db)
+    monkeypatch.setattr(database_service_module, "get_dashboard_counters", lambda: None)
+    assert from_counters == service.get_analysis_statistics(db)
+    assert from_counters["total_analyses"] == 3 and from_counters["failed_analyses"] == 1
+    assert from_counters["code_library"] == {"entries": 1, "successful_runs": 2, "failed_runs": 1}
+
+
+def test_counter_statistics_read_only_the_counters_table(counters, db, monkeypatch):
+    monkeypatch.setattr(database_service_module, "get_dashboard_counters", lambda: counters)
+    flushes = []
+    monkeypatch.setattr(DatabaseService, "flush_telemetry", staticmethod(lambda: flushes.append(1) or 0))
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    DatabaseService().get_analysis_statistics(db)
+    assert not flushes
+    assert len(statements) == 1 and "dashboard_counters" in statements[0]
+
+
+def test_buffered_cache_hits_are_counted_on_flush(session_factory, counters, db):
+    DatabaseService().save_to_cache(db, "key-1", "hash", "q", "analysis-1", {"ok": True})
+    writer = TelemetryWriter(session_factory)
+    writer.record_cache_access("analysis", "key-1")
+    writer.record_cache_access("analysis", "key-1")
+    writer.record_cache_access("analysis", "missing")
+    writer.flush()
+    assert counters.totals(session_factory())[CACHE_HITS] == 2
+
+
+def test_reconcile_corrects_drift_with_one_increment_per_counter(session_factory, counters, db):
+    DatabaseService().create_analysis(db, filename="a.csv", user_question="q", selected_agents=["eda"])
+    bump_counters(db, {ANALYSES: 5, "analyses.status.stale": 2}, daily=False)
+    db.commit()
+
+    assert counters.reconcile() == {ANALYSES: -5, "analyses.status.stale": -2}
+    totals = counters.totals(session_factory())
+    assert totals[ANALYSES] == 1 and totals["analyses.status.stale"] == 0
+    assert counters.stats()["corrected_counters"] == 2
+
+
+def test_daily_rollup_keeps_one_row_per_day(counters, db):
+    today = datetime.utcnow()
+    bump_counters(db, {ANALYSES: 2}, daily=True, moment=today - timedelta(days=1))
+    bump_counters(db, {ANALYSES: 3}, daily=True, moment=today)
+    bump_counters(db, {ANALYSES: 1}, daily=True, moment=today)
+    db.commit()
+
+    assert db.query(DashboardCounter).filter(DashboardCounter.day == TOTAL).one().value == 6
+    daily = counters.daily(db, days=30)
+    assert [row[ANALYSES] for row in daily] == [2, 4]
+    assert daily[-1]["day"] == today.strftime("%Y-%m-%d")
+    assert counters.daily(db, days=1) == daily[-1:]
+
+
+def test_stop_removes_the_flush_hook(counters, db):
+    assert counters_enabled()
+    asyncio.run(counters.stop())
+    assert not counters_enabled()
+    DatabaseService().create_analysis(db, filename="a.csv", user_question="q", selected_agents=["eda"])
+    assert db.query(DashboardCounter).count() == 0
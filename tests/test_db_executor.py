@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the database thread pool
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import inspect
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.database_service import DatabaseService
+from services.db_executor import DatabaseExecutor
+from services.langgraph_workflow import LangGraphMultiAgentWorkflow
+from services.run_context import RunContext
+
+
+def test_run_gives_each_call_its_own_session_off_the_loop(session_factory):
+    executor = DatabaseExecutor(session_factory, workers=4)
+    seen = []
+
+    def probe(db):
+        seen.append((db, threading.current_thread().name))
+        return True
+
+    async def scenario():
+        return await asyncio.gather(*[executor.run(probe) for _ in range(3)])
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert len({id(session) for session, _ in seen}) == 3
+    assert all(name.startswith("db") for _, name in seen)
+    executor.shutdown()
+
+
+def test_returned_records_stay_readable_after_the_session_closes(session_factory):
+    executor = DatabaseExecutor(session_factory, workers=4)
+    service = DatabaseService()
+
+    async def scenario():
+        record = await executor.run(service.create_analysis, filename="f.csv", user_question="q", selected_agents=["eda"])
+        updated = await executor.run(service.update_analysis_status, record.id, "running")
+        return record, updated
+
+    record, updated = asyncio.run(scenario())
+    assert record.filename == "f.csv" and updated.status == "running" and updated.started_at is not None
+    executor.shutdown()
+
+
+def test_slow_calls_do_not_block_the_event_loop(session_factory):
+    executor = DatabaseExecutor(session_factory, workers=4, slow_call_ms=100)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await executor.call(time.sleep, 0.3)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+    stats = executor.stats()
+    assert stats["calls"] == 1 and stats["slow_calls"] == 1 and stats["in_flight"] == 0
+    executor.shutdown()
+
+
+def test_run_in_reuses_the_callers_session(session_factory):
+    executor = DatabaseExecutor(session_factory, workers=4)
+    db = executor.session_factory()
+
+    async def scenario():
+        return await executor.run_in(db, lambda session, value: (session, value), 7)
+
+    assert asyncio.run(scenario()) == (db, 7)
+    db.close()
+    executor.shutdown()
+
+
+def test_agent_sessions_stay_loaded_after_commits_in_run_in(session_factory):
+    executor = DatabaseExecutor(session_factory, workers=2)
+    db = LangGraphMultiAgentWorkflow._agent_session(RunContext(session_factory=session_factory))
+    service = DatabaseService()
+
+    async def scenario():
+        first = await executor.run_in(db, service.create_analysis, filename="a.csv", user_question="q", selected_agents=["eda"])
+        second = await executor.run_in(db, service.create_analysis, filename="b.csv", user_question="q", selected_agents=["eda"])
+        await executor.run_in(db, service.update_analysis_status, second.id, "running")
+        return first
+
+    first = asyncio.run(scenario())
+    # Later commits on the agent's session leave earlier rows loaded
+    assert not {"id", "filename", "status"} & inspect(first).expired_attributes
+    assert first.status == "pending"
+    db.close()
+    executor.shutdown()
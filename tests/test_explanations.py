@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for local and batched execution explanations
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.explanations import (
+    BatchExplainer, extract_local_explanation, get_explanation_config, load_structured_results
+)
+from services.run_context import RunContext
+
+
+class FakeClaude:
+    def __init__(self):
+        self.calls = []
+        self.questions = []
+
+    async def explain_executions_batch(self, user_question, data_sample, items, bypass_cache=False):
+        self.calls.append([item["agent_name"] for item in items])
+        self.questions.append(user_question)
+        return {
+            item["agent_name"]: {"ui_summary": f"summary of {item['agent_name']}", "next_insights": {"ok": True}}
+            for item in items
+        }
+
+
+def test_local_explanation_prefers_results_json(tmp_path):
+    (tmp_path / "results.json").write_text(json.dumps({
+        "summary": "Revenue grew 12%",
+        "metrics": {"growth": 0.12},
+    }))
+    execution_result = {"success": True, "output": "noise\n", "structured_results": load_structured_results(tmp_path)}
+    explanation = extract_local_explanation(execution_result)
+    assert explanation["ui_summary"] == "Revenue grew 12%"
+    assert explanation["next_insights"] == {"metrics": {"growth": 0.12}}
+
+
+def test_local_explanation_falls_back_to_stdout():
+    explanation = extract_local_explanation({"success": True, "output": "=====\nRows: 10\nMean: 4.2\n"})
+    assert explanation["ui_summary"] == "- Rows: 10\n- Mean: 4.2"
+    assert explanation["next_insights"] == {}
+
+
+def test_batches_share_one_call_per_batch():
+    async def scenario():
+        claude = FakeClaude()
+        sent = []
+
+        class Sink:
+            async def send_progress(self, message):
+                sent.append(message)
+
+        explainer = BatchExplainer(claude, RunContext(analysis_id="a1", progress_sink=Sink()), batch_size=2)
+        results = {name: {"execution_result": {"output": "x"}} for name in ["a", "b", "c"]}
+        for name, result in results.items():
+            explainer.add(name, result, "question", {})
+        await explainer.drain()
+        return claude.calls, results, sent
+
+    calls, results, sent = asyncio.run(scenario())
+    assert calls == [["a", "b"], ["c"]]
+    assert results["c"]["execution_result"]["ui_summary"] == "summary of c"
+    assert [m["agent_name"] for m in sent if m["type"] == "agent_summary"] == ["a", "b", "c"]
+
+
+def test_agents_are_batched_per_prompt_question():
+    async def scenario():
+        claude = FakeClaude()
+        explainer = BatchExplainer(claude, RunContext(analysis_id="a1"), batch_size=2)
+        # data_only agents are queued without the question
+        for name, question in (("cleaning", ""), ("churn", "question"), ("audit", ""), ("cohorts", "question")):
+            explainer.add(name, {"execution_result": {"output": "x"}}, question, {})
+        await explainer.drain()
+        return claude
+
+    claude = asyncio.run(scenario())
+    assert sorted(zip(claude.questions, claude.calls)) == [("", ["cleaning", "audit"]), ("question", ["churn", "cohorts"])]
+
+
+def test_unknown_mode_falls_back_to_per_agent():
+    assert get_explanation_config({"explanation": {"mode": "bogus"}})["mode"] == "per_agent"
+    assert get_explanation_config({})["mode"] == "per_agent"
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming content fingerprints
+"""
+
+import asyncio
+import io
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from utils.fingerprint import CHUNK_SIZE, DIGEST_BYTES, fingerprint_bytes, read_upload_with_fingerprint
+
+
+class FakeUpload:
+    def __init__(self, content: bytes):
+        self._buffer = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+def test_streamed_fingerprint_matches_in_memory():
+    content = b"a,b,c\n" * (CHUNK_SIZE // 3)
+    data, streamed = asyncio.run(read_upload_with_fingerprint(FakeUpload(content), "xxh3"))
+
+    assert data == content
+    assert streamed == fingerprint_bytes(content, "xxh3")
+    assert streamed.size == len(content)
+    assert streamed.data_hash.startswith(f"{streamed.algorithm}:")
+    assert len(streamed.data_hash) <= 64
+
+
+def test_fingerprint_distinguishes_content():
+    assert fingerprint_bytes(b"x,y\n1,2\n").data_hash != fingerprint_bytes(b"x,y\n1,3\n").data_hash
+    assert fingerprint_bytes(b"same", "blake2b").data_hash == fingerprint_bytes(b"same", "blake2b").data_hash
+
+
+def test_every_algorithm_fits_the_hash_columns():
+    for algorithm in ("xxh3", "blake3", "blake2b", "sha256"):
+        fingerprint = fingerprint_bytes(b"a,b\n1,2\n", algorithm)
+        algorithm_name, digest = fingerprint.data_hash.split(":")
+        assert algorithm_name == fingerprint.algorithm and len(digest) == DIGEST_BYTES * 2
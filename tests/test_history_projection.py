@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for history summaries, keyset pagination and field selection
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import Analysis
+from services.database_service import DatabaseService
+
+
+def _add_rows(db, count):
+    base = datetime(2026, 1, 1)
+    for index in range(count):
+        db.add(Analysis(
+            id=f"id-{index:02d}",
+            filename=f"file{index}.csv",
+            user_question="q",
+            status="completed",
+            selected_agents=["eda"],
+            # Pairs share a timestamp so the id tie-breaker is exercised
+            created_at=base + timedelta(minutes=index // 2),
+            agent_results={"eda": {"execution_result": {"output_files": [{"filename": "plot.png", "content": "aGk="}]}}},
+            report={"title": f"Report {index}"},
+            errors=[],
+        ))
+    db.commit()
+    db.expunge_all()
+
+
+def test_keyset_pages_cover_every_row_once_newest_first(db):
+    _add_rows(db, 7)
+    service = DatabaseService()
+    seen, cursor = [], None
+    while True:
+        page, cursor = service.get_analysis_summaries(db, limit=3, cursor=cursor)
+        seen.extend(item["id"] for item in page)
+        if cursor is None:
+            break
+    assert seen == [f"id-{index:02d}" for index in reversed(range(7))]
+
+
+def test_summaries_do_not_select_result_columns(db):
+    _add_rows(db, 2)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    page, _ = DatabaseService().get_analysis_summaries(db, limit=10)
+    assert "agent_results" not in page[0] and page[0]["agent_count"] == 1
+    assert not any("agent_results" in sql or "report" in sql for sql in statements)
+
+
+def test_field_selection_and_artifacts(db):
+    _add_rows(db, 1)
+    service = DatabaseService()
+    data = service.get_analysis_fields(db, "id-00", ["report"])
+    assert data["report"] == {"title": "Report 0"} and "agent_results" not in data
+
+    data = service.get_analysis_fields(db, "id-00", ["artifacts"])
+    assert data["artifacts"] == [{"filename": "plot.png", "content": "aGk=", "agent_name": "eda"}]
+    assert "agent_results" not in data
+
+    with pytest.raises(ValueError):
+        service.get_analysis_fields(db, "id-00", ["secrets"])
+    with pytest.raises(ValueError):
+        service.get_analysis_summaries(db, cursor="not-a-cursor")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for agent latency histograms and percentiles
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import AgentLatencyBucket, AgentPerformance
+from services import database_service as database_service_module
+from services.database_service import DatabaseService
+from services.latency_histogram import (
+    GROWTH, PHASE_EXECUTION, PHASE_TOTAL, LatencyHistogram, add_latency, apply_latency_deltas,
+    load_histograms, summarize_by_agent, window_start,
+)
+from services.telemetry_writer import TelemetryWriter
+
+
+def test_percentiles_are_within_one_bucket():
+    histogram = LatencyHistogram()
+    for duration in range(1, 1001):
+        histogram.record(duration)
+    summary = histogram.summary()
+    assert summary["count"] == 1000 and summary["mean_ms"] == 500.5
+    for key, exact in (("p50_ms", 500), ("p95_ms", 950), ("p99_ms", 990)):
+        assert exact <= summary[key] <= exact * GROWTH
+
+
+def test_merged_histograms_equal_one_histogram_of_all_samples():
+    left, right, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for duration in (5, 80, 1200, 30000):
+        left.record(duration)
+        combined.record(duration)
+    for duration in (7, 7, 950):
+        right.record(duration)
+        combined.record(duration)
+    assert left.merge(right).summary() == combined.summary()
+
+
+def test_window_start_aligns_to_the_window():
+    assert window_start(datetime(2026, 3, 1, 14, 47, 12), 60) == datetime(2026, 3, 1, 14, 0)
+    assert window_start(datetime(2026, 3, 1, 14, 47, 12), 15) == datetime(2026, 3, 1, 14, 45)
+
+
+def test_bucket_rows_are_incremented_not_overwritten(db):
+    now = datetime.utcnow()
+    for _ in range(2):
+        deltas = {}
+        add_latency(deltas, "eda", PHASE_EXECUTION, 100, now, 60)
+        add_latency(deltas, "eda", PHASE_EXECUTION, 101, now, 60)
+        apply_latency_deltas(db, deltas)
+        db.commit()
+    row = db.query(AgentLatencyBucket).one()
+    assert (row.count, row.total_ms) == (4, 402)
+    assert summarize_by_agent(load_histograms(db))["eda"][PHASE_EXECUTION]["count"] == 4
+
+
+def test_direct_path_updates_performance_and_total_histogram(db, monkeypatch):
+    monkeypatch.setattr(database_service_module, "get_telemetry_writer", lambda: None)
+    service = DatabaseService()
+    for duration, success in ((100, True), (101, True), (400, False)):
+        service._update_agent_performance(db, "eda", success, duration)
+    service.record_agent_latencies(db, "eda", {PHASE_EXECUTION: 40})
+
+    perf = db.query(AgentPerformance).one()
+    assert (perf.total_runs, perf.failed_runs) == (3, 1)
+    # The stored average is rounded per update; the histogram keeps the exact mean
+    assert abs(perf.avg_execution_time_ms - 200.3) <= 1
+    assert (perf.min_execution_time_ms, perf.max_execution_time_ms) == (100, 400)
+
+    latency = service.get_agent_latency(db)["eda"]
+    assert latency[PHASE_TOTAL]["count"] == 3 and latency[PHASE_TOTAL]["mean_ms"] == 200.3
+    assert latency[PHASE_EXECUTION]["p50_ms"] >= 40
+    trend = service.get_agent_latency_trend(db, "eda", PHASE_TOTAL, step_minutes=60)
+    assert len(trend) == 1 and trend[0]["count"] == 3
+
+
+def test_writer_buffers_phase_latencies(session_factory, db):
+    writer = TelemetryWriter(session_factory, latency_window_minutes=60)
+    writer.record_latency("eda", PHASE_EXECUTION, 250)
+    writer.record_latency("eda", PHASE_EXECUTION, 250)
+    assert writer.flush() == 1
+    row = db.query(AgentLatencyBucket).one()
+    assert (row.agent_name, row.phase, row.count, row.total_ms) == ("eda", PHASE_EXECUTION, 2, 500)
+    assert row.window_start <= datetime.utcnow() < row.window_start + timedelta(hours=1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the byte-budgeted LRU and the two-tier LLM response cache
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.llm_cache import LLMResponseCache, make_llm_cache_key
+from services.memory_cache import ByteLRUCache
+
+
+def test_lru_evicts_by_bytes():
+    cache = ByteLRUCache(max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    assert cache.get("a") == "12345"  # "a" is now most recently used
+    cache.set("c", "123")
+    assert "b" not in cache
+    assert cache.get("a") == "12345" and cache.get("c") == "123"
+    assert cache.stats()["evictions"] == 1
+    assert not cache.set("huge", "x" * 11)
+
+
+def test_disk_tier_survives_restart_and_expires(tmp_path):
+    db_path = str(tmp_path / "llm.db")
+    key = make_llm_cache_key("model", 0.1, 1000, "prompt", prefix="context")
+    assert key != make_llm_cache_key("model", 0.2, 1000, "prompt", prefix="context")
+
+    first = LLMResponseCache(db_path, memory_bytes=1024, ttl_seconds=60)
+    assert first.get(key) is None
+    first.set(key, "response")
+
+    second = LLMResponseCache(db_path, memory_bytes=1024, ttl_seconds=60)
+    assert second.get(key) == "response"
+    assert second.get(key) == "response"
+    stats = second.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+
+    expired = LLMResponseCache(db_path, memory_bytes=1024, ttl_seconds=-1)
+    expired.set(key, "stale")
+    expired.memory.clear()
+    assert expired.get(key) is None
+    assert expired.purge_expired() == 1
+
+
+def test_memory_tier_honours_the_ttl(tmp_path):
+    cache = LLMResponseCache("", memory_bytes=1024, ttl_seconds=0.05)
+    cache.set("key", "response")
+    assert cache.get("key") == "response"
+    time.sleep(0.1)
+    assert cache.get("key") is None
+    assert "key" not in cache.memory and cache.stats()["expired"] == 1
+
+
+def test_async_access_reads_and_writes_the_disk_tier(tmp_path):
+    db_path = str(tmp_path / "llm.db")
+
+    async def scenario():
+        writer = LLMResponseCache(db_path, memory_bytes=1024, ttl_seconds=60)
+        await writer.aset("key", "response")
+        reader = LLMResponseCache(db_path, memory_bytes=1024, ttl_seconds=60)
+        return await reader.aget("key"), await reader.aget("missing"), reader.stats()
+
+    value, missing, stats = asyncio.run(scenario())
+    assert (value, missing) == ("response", None)
+    assert stats["disk_hits"] == 1 and stats["misses"] == 1
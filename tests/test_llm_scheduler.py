@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive LLM call scheduler
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.llm_scheduler import (
+    LLMScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, parse_retry_after, priority_for,
+)
+
+
+def test_limit_bounds_concurrency():
+    scheduler = LLMScheduler(initial_limit=2, max_limit=2)
+    active = 0
+    peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with scheduler.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_interactive_calls_are_served_first():
+    scheduler = LLMScheduler(initial_limit=1, max_limit=1)
+    order = []
+
+    async def call(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def main():
+        await scheduler.acquire()  # occupy the only slot so everything queues
+        tasks = [asyncio.create_task(call("report", PRIORITY_BACKGROUND))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("selection", PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["selection", "report"]
+    assert priority_for("code_generation") == PRIORITY_INTERACTIVE
+    assert priority_for("report") == PRIORITY_BACKGROUND
+
+
+def test_aimd_and_retry_after():
+    scheduler = LLMScheduler(initial_limit=4, min_limit=1, max_limit=8)
+    scheduler.on_response(429, {"retry-after": "0.05"})
+    assert scheduler.limit == 2
+    assert scheduler.stats()["paused_for_seconds"] > 0
+    # A second 429 inside the cooldown doesn't halve again
+    scheduler.on_response(429, {})
+    assert scheduler.limit == 2
+    for _ in range(10):
+        scheduler.on_response(200, {})
+    assert scheduler.limit > 3
+
+    delay = scheduler.retry_delay(0, retry_after=2.0)
+    assert 2.0 <= delay <= 2.2
+    assert 0.0 <= scheduler.retry_delay(3) <= 4.0
+    assert parse_retry_after({"retry-after": "bogus"}) is None
+
+
+def test_exhausted_allowance_waits_for_reset():
+    scheduler = LLMScheduler(initial_limit=4)
+    reset = (datetime.now(timezone.utc) + timedelta(seconds=0.1)).isoformat()
+    scheduler.on_response(200, {
+        "anthropic-ratelimit-requests-remaining": "0",
+        "anthropic-ratelimit-requests-reset": reset,
+    })
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        async with scheduler.slot():
+            pass
+        return loop.time() - start
+
+    waited = asyncio.run(main())
+    assert waited >= 0.05
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the record/replay Claude transport
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.code_stream import iter_sse_events
+from services.llm_transport import LatencyModel, RecordingTransport, ReplayTransport
+
+URL = "https://api.anthropic.com/v1/messages"
+SSE_BODY = (
+    'event: content_block_delta\ndata: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hel"}}\n\n'
+    'event: content_block_delta\ndata: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "lo"}}\n\n'
+    'event: message_stop\ndata: {"type": "message_stop"}\n\n'
+)
+
+
+def _live_handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body.get("stream"):
+        return httpx.Response(200, text=SSE_BODY, headers={"content-type": "text/event-stream"})
+    return httpx.Response(200, json={"content": [{"type": "text", "text": body["messages"][0]["content"].upper()}]},
+                          headers={"anthropic-ratelimit-requests-remaining": "49"})
+
+
+def test_record_then_replay_offline(tmp_path):
+    async def main():
+        recorder = RecordingTransport(httpx.MockTransport(_live_handler), str(tmp_path))
+        async with httpx.AsyncClient(transport=recorder) as client:
+            recorded = await client.post(URL, json={"messages": [{"role": "user", "content": "hi"}]},
+                                         headers={"x-api-key": "secret"})
+            async with client.stream("POST", URL, json={"stream": True, "messages": []}) as response:
+                await response.aread()
+        assert recorder.recorded == 2
+        assert "secret" not in "".join(p.read_text() for p in tmp_path.glob("*.json"))
+
+        replay = ReplayTransport(str(tmp_path), LatencyModel("none"))
+        async with httpx.AsyncClient(transport=replay) as client:
+            replayed = await client.post(URL, json={"messages": [{"role": "user", "content": "hi"}]})
+            texts = []
+            async with client.stream("POST", URL, json={"stream": True, "messages": []}) as response:
+                async for event in iter_sse_events(response.aiter_lines()):
+                    if event["type"] == "content_block_delta":
+                        texts.append(event["delta"]["text"])
+            missing = await client.post(URL, json={"messages": [{"role": "user", "content": "other"}]})
+        return recorded, replayed, texts, missing, replay
+
+    recorded, replayed, texts, missing, replay = asyncio.run(main())
+    assert replayed.json() == recorded.json() == {"content": [{"type": "text", "text": "HI"}]}
+    assert replayed.headers["anthropic-ratelimit-requests-remaining"] == "49"
+    assert "".join(texts) == "Hello"
+    assert missing.status_code == 404
+    assert (replay.hits, replay.misses) == (2, 1)
+
+
+def test_loose_match_ignores_digits(tmp_path):
+    async def main():
+        recorder = RecordingTransport(httpx.MockTransport(_live_handler), str(tmp_path))
+        async with httpx.AsyncClient(transport=recorder) as client:
+            await client.post(URL, json={"messages": [{"role": "user", "content": "run_20250101_120000 took 3.2s"}]})
+        replay = ReplayTransport(str(tmp_path), LatencyModel("none"))
+        async with httpx.AsyncClient(transport=replay) as client:
+            response = await client.post(URL, json={"messages": [{"role": "user", "content": "run_20260202_090000 took 4.7s"}]})
+        return response, replay
+
+    response, replay = asyncio.run(main())
+    assert response.status_code == 200
+    assert replay.loose_hits == 1
+
+
+def test_latency_models():
+    timing = {"ttfb_ms": 200, "total_ms": 1000}
+    assert LatencyModel("none").sample(timing) == {"ttfb": 0.0, "total": 0.0}
+    assert LatencyModel("recorded").sample(timing) == {"ttfb": 0.2, "total": 1.0}
+    assert LatencyModel("scale:0.5").sample(timing)["total"] == 0.5
+    assert LatencyModel("fixed:300").sample({})["total"] == 0.3
+    samples = [LatencyModel("uniform:100,200", seed=1).sample(timing)["total"] for _ in range(5)]
+    assert all(0.1 <= s <= 0.2 for s in samples)
+    # Same seed, same sequence
+    a, b = LatencyModel("normal:500,100", seed=7), LatencyModel("normal:500,100", seed=7)
+    assert [a.sample(timing) for _ in range(3)] == [b.sample(timing) for _ in range(3)]
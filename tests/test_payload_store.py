@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the compressed, content-addressed payload store
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import Analysis, PayloadBlob
+from services import payload_store as payload_store_module
+from services.database_service import DatabaseService
+from services.payload_store import PayloadStore, is_ref
+
+
+def _agent_results():
+    return {
+        "eda": {"success": True, "execution_result": {"output": "summary " * 300}},
+        "quality": {"success": True, "execution_result": {"output": "missing values " * 300}},
+    }
+
+
+def test_shared_parts_are_stored_once_and_resolve_back(db):
+    store = PayloadStore(min_bytes=256)
+    agent_results = _agent_results()
+    report = {"title": "Report", "agent_results": agent_results}
+
+    agent_ref = store.pack_agent_results(db, agent_results)
+    report_ref = store.pack_report(db, report)
+    result_ref = store.pack_result(db, {"agent_results": agent_results, "report": report, "success": True})
+    single_ref = store.pack(db, agent_results["eda"])
+    db.commit()
+
+    # two agents + agent map + report + result; the per-agent blob is reused
+    assert db.query(PayloadBlob).count() == 5
+    assert all(is_ref(ref) for ref in (agent_ref, report_ref, result_ref, single_ref))
+    assert store.resolve(db, report_ref) == report
+    assert store.resolve(db, result_ref)["report"]["agent_results"]["quality"] == agent_results["quality"]
+    assert store.resolve(db, single_ref) == agent_results["eda"]
+
+    raw, stored = db.query(PayloadBlob.raw_size, PayloadBlob.stored_size).filter(
+        PayloadBlob.content_hash == single_ref["$payload"]
+    ).one()
+    assert stored < raw
+
+
+def test_small_values_stay_inline(db):
+    store = PayloadStore(min_bytes=1024)
+    assert store.pack(db, {"success": True}) == {"success": True}
+    assert db.query(PayloadBlob).count() == 0
+
+
+def test_database_service_reads_through_references(db, monkeypatch):
+    monkeypatch.setattr(payload_store_module, "_payload_store", PayloadStore(min_bytes=256))
+    monkeypatch.setattr(payload_store_module.settings, "PAYLOAD_STORE_ENABLED", True)
+    service = DatabaseService()
+    record = Analysis(filename="f.csv", user_question="q", selected_agents=["eda"])
+    db.add(record)
+    db.commit()
+
+    agent_results = _agent_results()
+    service.save_analysis_results(db, record.id, {}, agent_results, {"agent_results": agent_results})
+    db.expire_all()
+    raw = db.query(Analysis.agent_results).filter(Analysis.id == record.id).scalar()
+    assert is_ref(raw)
+    assert service.get_analysis(db, record.id).to_dict()["report"]["agent_results"] == agent_results
+
+
+def test_garbage_collection_keeps_referenced_blobs(db):
+    store = PayloadStore(min_bytes=256)
+    agent_results = _agent_results()
+    db.add(Analysis(filename="f.csv", user_question="q", agent_results=store.pack_agent_results(db, agent_results)))
+    store.pack(db, {"orphan": "x" * 1000})
+    db.commit()
+    db.query(PayloadBlob).update({PayloadBlob.last_referenced_at: datetime.utcnow() - timedelta(days=1)})
+    db.commit()
+
+    assert store.collect_garbage(db) == 1
+    assert db.query(PayloadBlob).count() == 3
+
+
+def test_reused_blobs_get_a_new_grace_period(db):
+    store = PayloadStore(min_bytes=256)
+    agent_result = _agent_results()["eda"]
+    ref = store.pack(db, agent_result)
+    db.commit()
+    # Its last referencing row was swept long ago...
+    db.query(PayloadBlob).update({PayloadBlob.last_referenced_at: datetime.utcnow() - timedelta(days=1)})
+    db.commit()
+
+    # ...and a new row reuses it before that row is committed
+    assert store.pack(db, agent_result) == ref
+    assert store.stats_counters["dedup_hits"] == 1
+    assert store.collect_garbage(db) == 0
+    assert store.resolve(db, ref) == agent_result
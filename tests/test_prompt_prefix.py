@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for the cacheable dataset prompt prefix
+"""
+
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.claude_service import ClaudeService
+from utils.data_processor import DataProcessor
+
+CSV = b"id,amount,region\n" + b"".join(f"{i},{i * 1.5},r{i % 3}\n".encode() for i in range(50))
+
+
+def test_dataset_context_is_byte_identical_across_samples():
+    service = ClaudeService()
+    processor = DataProcessor()
+    first = service.build_dataset_context(processor.read_file_sample(CSV, "sales.csv", sample_rows=5))
+    second = service.build_dataset_context(processor.read_file_sample(CSV, "sales.csv", sample_rows=5))
+    assert first == second
+
+
+def test_prefix_is_sent_as_cache_breakpoint():
+    service = ClaudeService()
+    payload = service._build_payload("Which agents?", prefix="DATASET CONTEXT")
+    content = payload["messages"][0]["content"]
+    assert content[0]["text"] == "DATASET CONTEXT"
+    assert content[0]["cache_control"] == {"type": "ephemeral"}
+    assert content[1] == {"type": "text", "text": "Which agents?"}
+    # Calls without a prefix keep the plain string form
+    assert service._build_payload("hi")["messages"][0]["content"] == "hi"
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process tier in front of the analysis and agent result caches
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import AgentCachedResult, CachedAnalysis
+from services import result_cache
+from services.database_service import DatabaseService
+from services.result_cache import TIER_AGENT, ResultMemoryCache
+
+
+def _fresh_memory_tier(monkeypatch, max_bytes=1024 * 1024):
+    memory = ResultMemoryCache(analysis_bytes=max_bytes, agent_bytes=max_bytes)
+    monkeypatch.setattr(result_cache, "_result_memory_cache", memory)
+    monkeypatch.setattr(result_cache.settings, "RESULT_CACHE_MEMORY_ENABLED", True)
+    # Access counts go straight to the database (no write-behind buffering)
+    monkeypatch.setattr(result_cache.settings, "TELEMETRY_WRITE_BEHIND", False)
+    return memory
+
+
+def test_hot_hit_skips_database_and_is_detached(db, monkeypatch):
+    memory = _fresh_memory_tier(monkeypatch)
+    service = DatabaseService()
+    service.save_to_cache(db, "k1", "hash", "q", "analysis-1", {"report": {"title": "t"}}, execution_time_ms=500)
+
+    # Remove the row behind the cache's back: a memory hit must not need it
+    db.query(CachedAnalysis).delete()
+    db.commit()
+    hit = service.get_cached_analysis(db, "k1")
+    assert hit.cached_result == {"report": {"title": "t"}}
+    assert hit.time_saved_ms == 500 and hit.access_count == 1
+
+    hit.cached_result["is_cached"] = True
+    assert "is_cached" not in service.get_cached_analysis(db, "k1").cached_result
+    assert memory.stats()["analysis"]["hits"] == 2
+
+
+def test_database_hit_fills_memory_and_access_is_persisted(db, monkeypatch):
+    memory = _fresh_memory_tier(monkeypatch)
+    service = DatabaseService()
+    service.save_agent_cached_result(db, "a1", "hash", "q", "eda", {"success": True})
+    memory.clear()
+
+    assert service.get_agent_cached_result(db, "a1").result == {"success": True}
+    assert service.get_agent_cached_result(db, "a1").result == {"success": True}
+    assert memory.stats()[TIER_AGENT]["hits"] == 1
+
+    row = db.query(AgentCachedResult).filter(AgentCachedResult.cache_key == "a1").one()
+    assert row.access_count == 2
+
+
+def test_entries_never_outlive_expires_at():
+    memory = ResultMemoryCache(analysis_bytes=1024, agent_bytes=1024)
+    now = datetime.utcnow()
+    assert not memory.put(TIER_AGENT, "old", {"x": 1}, now, now - timedelta(seconds=1))
+    memory.put(TIER_AGENT, "soon", {"x": 1}, now, now + timedelta(hours=1))
+    memory._tiers[TIER_AGENT].get("soon").expires_at = now - timedelta(seconds=1)
+    assert memory.get(TIER_AGENT, "soon") is None
+    assert memory.stats()["expired"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    memory = ResultMemoryCache(analysis_bytes=1024, agent_bytes=1024)
+    expires = datetime.utcnow() + timedelta(hours=1)
+    for index in range(4):
+        memory.put(TIER_AGENT, f"k{index}", {"blob": "x" * 200}, None, expires)
+    stats = memory.stats()[TIER_AGENT]
+    assert stats["bytes"] <= 1024 and stats["evictions"] >= 1
+    assert memory.get(TIER_AGENT, "k0") is None
+    assert memory.get(TIER_AGENT, "k3") is not None
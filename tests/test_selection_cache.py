@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the agent selection cache and plan tokens
+"""
+
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.selection_cache import (
+    SelectionCache, make_selection_key, normalize_question, schema_fingerprint,
+)
+
+
+def _sample(columns, rows=100):
+    return {
+        "columns": list(columns),
+        "data_types": dict(columns),
+        "total_rows": rows,
+        "sample_data": [{"x": rows}],
+    }
+
+
+def test_schema_fingerprint_ignores_order_and_values():
+    a = _sample({"revenue": "float64", "region": "object"}, rows=10)
+    b = _sample({"region": "object", "revenue": "float64"}, rows=5000)
+    c = _sample({"region": "object", "revenue": "int64"})
+    assert schema_fingerprint(a) == schema_fingerprint(b)
+    assert schema_fingerprint(a) != schema_fingerprint(c)
+
+
+def test_normalized_questions_share_a_key():
+    assert normalize_question("  What drives   REVENUE in the data? ") == "drives revenue"
+    schema = schema_fingerprint(_sample({"revenue": "float64"}))
+    key = make_selection_key(schema, "What drives revenue?", "catalog-1", "model")
+    assert key == make_selection_key(schema, "what drives revenue", "catalog-1", "model")
+    assert key != make_selection_key(schema, "What drives revenue?", "catalog-2", "model")
+    assert key != make_selection_key(schema, "Forecast revenue", "catalog-1", "model")
+
+
+def test_selection_round_trip_and_expiry():
+    cache = SelectionCache(ttl_seconds=3600, max_entries=10, plan_token_ttl_seconds=60)
+    cache.set("k", ["data_quality_audit", "exploratory_data_analysis"])
+    assert cache.get("k") == ["data_quality_audit", "exploratory_data_analysis"]
+    assert cache.get("missing") is None
+
+    expired = SelectionCache(ttl_seconds=-1, max_entries=10, plan_token_ttl_seconds=60)
+    expired.set("k", ["eda"])
+    assert expired.get("k") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_plan_token_must_match_upload_question_and_catalog():
+    cache = SelectionCache(ttl_seconds=3600, max_entries=10, plan_token_ttl_seconds=60)
+    token = cache.issue_plan_token("xxh3:abc", "What drives revenue?", ["eda"], "catalog-1")
+    assert cache.resolve_plan_token(token, "xxh3:abc", "what drives revenue", "catalog-1") == ["eda"]
+    assert cache.resolve_plan_token(token, "xxh3:other", "what drives revenue", "catalog-1") is None
+    assert cache.resolve_plan_token(token, "xxh3:abc", "forecast churn", "catalog-1") is None
+    assert cache.resolve_plan_token(token, "xxh3:abc", "what drives revenue", "catalog-2") is None
+    assert cache.resolve_plan_token("unknown", "xxh3:abc", "what drives revenue", "catalog-1") is None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide service registry and config.yaml snapshots
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services import service_registry
+from services.service_registry import ServiceRegistry
+
+
+def _write_config(path: Path, max_parallel: int):
+    path.write_text(
+        "agents:\n"
+        "  data_cleaning:\n"
+        "    name: \"Data Cleaning\"\n"
+        "execution:\n"
+        f"  max_parallel: {max_parallel}\n",
+        encoding="utf-8",
+    )
+
+
+def test_hot_reload_swaps_snapshot(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.yaml"
+    _write_config(config_path, 1)
+    monkeypatch.setattr(service_registry, "find_config_path", lambda: config_path)
+
+    registry = ServiceRegistry(hot_reload=True, check_interval=0)
+    first = registry.config()
+    assert first.execution_config["max_parallel"] == 1
+    assert first.execution_signature
+
+    # Unchanged file keeps the same snapshot object
+    assert registry.config() is first
+
+    _write_config(config_path, 4)
+    os.utime(config_path, (first.mtime + 10, first.mtime + 10))
+
+    second = registry.config()
+    assert second is not first
+    assert second.version == first.version + 1
+    assert second.execution_config["max_parallel"] == 4
+    assert second.execution_signature != first.execution_signature
+    # The old snapshot is never mutated
+    assert first.execution_config["max_parallel"] == 1
+
+
+def test_services_are_shared():
+    registry = ServiceRegistry()
+    assert registry.claude_service() is registry.claude_service()
+    assert registry.database_service() is registry.database_service()
+    agent_service = registry.agent_service()
+    assert agent_service is registry.agent_service()
+    assert agent_service.claude_service is service_registry.get_claude_service()
+
+
+def test_agent_cache_scopes_and_versions(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "agents:\n"
+        "  data_cleaning:\n"
+        "    cache_scope: \"data-only\"\n"
+        "  churn_prediction:\n"
+        "    cache_scope: \"none\"\n"
+        "  cohort_analysis:\n"
+        "    name: \"Cohorts\"\n"
+        "agent_cache:\n"
+        "  default_scope: \"data+question\"\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(service_registry, "find_config_path", lambda: config_path)
+    snapshot = service_registry.load_config_snapshot()
+    assert snapshot.cache_scope("data_cleaning") == service_registry.CACHE_SCOPE_DATA_ONLY
+    assert snapshot.cache_scope("churn_prediction") == service_registry.CACHE_SCOPE_NONE
+    assert snapshot.cache_scope("cohort_analysis") == service_registry.CACHE_SCOPE_DATA_QUESTION
+    assert snapshot.cache_scope("unlisted") == service_registry.CACHE_SCOPE_DATA_QUESTION
+
+    config_path.write_text(config_path.read_text().replace("\"Cohorts\"", "\"Cohort Analysis\""), encoding="utf-8")
+    edited = service_registry.load_config_snapshot()
+    assert edited.agent_signatures["cohort_analysis"] != snapshot.agent_signatures["cohort_analysis"]
+    assert edited.agent_signatures["data_cleaning"] == snapshot.agent_signatures["data_cleaning"]
+
+    config_path.write_text(config_path.read_text() + "explanation:\n  mode: \"local\"\n", encoding="utf-8")
+    explained_locally = service_registry.load_config_snapshot()
+    assert explained_locally.agent_signatures["data_cleaning"] != edited.agent_signatures["data_cleaning"]
+
+
+def test_agent_cache_key_follows_scope():
+    from services.database_service import DatabaseService
+
+    key = DatabaseService.generate_agent_cache_key
+    data_only = service_registry.CACHE_SCOPE_DATA_ONLY
+    assert key("h", "Q1", "eda", data_only, "v1") == key("h", "another question", "eda", data_only, "v1")
+    assert key("h", "Q1", "eda", data_only, "v1") != key("h", "Q1", "eda", data_only, "v2")
+    assert key("h", "Q1", "eda") != key("h", "Q2", "eda")
+    assert key("h", "Q1", "eda", service_registry.CACHE_SCOPE_NONE) is None
+
+
+def test_data_only_prompts_leave_out_the_question(monkeypatch):
+    from services import langgraph_workflow
+    from services.claude_service import ClaudeService
+    from services.langgraph_workflow import LangGraphMultiAgentWorkflow
+
+    snapshot = service_registry.ConfigSnapshot(agent_cache_scopes={
+        "data_cleaning": service_registry.CACHE_SCOPE_DATA_ONLY,
+        "data_quality_audit": service_registry.CACHE_SCOPE_DATA_ONLY,
+    })
+    monkeypatch.setattr(langgraph_workflow, "get_config", lambda: snapshot)
+    previous = {"data_quality_audit": {"success": True}, "churn_prediction": {"success": True}}
+    assert LangGraphMultiAgentWorkflow._prompt_inputs("data_cleaning", "Why churn?", previous) == (
+        "", {"data_quality_audit": {"success": True}}
+    )
+    assert LangGraphMultiAgentWorkflow._prompt_inputs("churn_prediction", "Why churn?", previous) == (
+        "Why churn?", previous
+    )
+
+    service = ClaudeService()
+    assert "User Question" not in service._create_code_generation_prompt("data_cleaning", {}, {}, "")
+    assert '"Why churn?"' in service._create_code_generation_prompt("churn_prediction", {}, {}, "Why churn?")
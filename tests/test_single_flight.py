@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for single-flight coalescing of identical in-flight work
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from config import settings
+from services import langgraph_workflow
+from services.langgraph_workflow import LangGraphMultiAgentWorkflow
+from services.run_context import RunContext
+from services.single_flight import SingleFlight, ProgressFanout
+from utils.fingerprint import fingerprint_bytes
+
+
+class RecordingSink:
+    def __init__(self):
+        self.messages = []
+
+    async def send_progress(self, message):
+        self.messages.append(message)
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"value": 42}
+
+        results = await asyncio.gather(*[flights.do("same-key", work) for _ in range(5)])
+        return calls, results, flights
+
+    calls, results, flights = asyncio.run(scenario())
+    assert calls == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(result == {"value": 42} for result, _ in results)
+    assert flights.in_flight() == 0
+
+
+def test_leader_error_reaches_followers():
+    async def scenario():
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        return await asyncio.gather(
+            flights.do("k", work), flights.do("k", work), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_fanout_replays_and_retags_for_followers():
+    async def scenario():
+        sink = RecordingSink()
+        fanout = ProgressFanout(sink, "leader")
+        await fanout.send_progress({"type": "workflow_started", "workflow_id": "leader"})
+        await fanout.attach("follower")
+        await fanout.send_progress({"type": "workflow_completed", "workflow_id": "leader"})
+        return sink.messages
+
+    messages = asyncio.run(scenario())
+    follower_types = [m["type"] for m in messages if m["workflow_id"] == "follower"]
+    assert follower_types == ["workflow_started", "workflow_completed"]
+    assert len([m for m in messages if m["workflow_id"] == "leader"]) == 2
+
+
+class _StubAgents:
+    agents = {"exploratory_data_analysis": object()}
+
+    def agent_cache_version(self, agent_name):
+        return "v1"
+
+
+def test_agent_followers_get_their_own_copy_of_the_result(session_factory, monkeypatch):
+    monkeypatch.setattr(langgraph_workflow, "get_agent_service", lambda: _StubAgents())
+    monkeypatch.setattr(settings, "AGENT_MOCK", False)
+    workflow = LangGraphMultiAgentWorkflow()
+    runs = 0
+
+    async def generate_and_run(*args):
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return {"success": True, "code_result": {"code": "x"}, "execution_result": {"ui_summary": "local"}}
+
+    monkeypatch.setattr(workflow, "_generate_and_run_agent", generate_and_run)
+    content = b"a,b\n1,2\n"
+
+    def execute():
+        state = {"user_question": "q", "completed_steps": [], "agent_results": {}, "shared_insights": {}}
+        ctx = RunContext(session_factory=session_factory, fingerprint=fingerprint_bytes(content))
+        return workflow._execute_agent("exploratory_data_analysis", state, ctx)
+
+    async def scenario():
+        leader, follower = await asyncio.gather(execute(), execute())
+        # e.g. the leader's batched explanation arriving later
+        leader["execution_result"]["ui_summary"] = "explained"
+        return follower
+
+    follower = asyncio.run(scenario())
+    assert runs == 1
+    assert follower["execution_result"]["ui_summary"] == "local"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite engine profile, write gate and maintenance
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.database import Base
+from models import analysis  # noqa: F401  (registers the tables)
+from models.analysis import AgentPerformance
+from models.sqlite_profile import apply_sqlite_profile
+from services.sqlite_maintenance import SqliteMaintenance
+
+
+def _engine(tmp_path, **profile):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vds.db'}", connect_args={"check_same_thread": False})
+    gate = apply_sqlite_profile(engine, **profile)
+    Base.metadata.create_all(bind=engine)
+    return engine, gate
+
+
+def test_pragmas_are_applied_to_every_connection(tmp_path):
+    engine, _ = _engine(tmp_path, busy_timeout_ms=1234, cache_size_mb=8, mmap_size_mb=16)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -8 * 1024
+
+
+def test_concurrent_writers_queue_instead_of_failing(tmp_path):
+    engine, gate = _engine(tmp_path, busy_timeout_ms=200)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(AgentPerformance(agent_name="eda", total_runs=0))
+    db.commit()
+    db.close()
+
+    errors = []
+
+    def worker():
+        for _ in range(20):
+            session = factory()
+            try:
+                session.query(AgentPerformance).filter_by(agent_name="eda").one()
+                session.query(AgentPerformance).filter_by(agent_name="eda").update(
+                    {AgentPerformance.total_runs: AgentPerformance.total_runs + 1}
+                )
+                session.commit()
+            except Exception as e:
+                errors.append(e)
+                session.rollback()
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    db = factory()
+    assert db.query(AgentPerformance.total_runs).scalar() == 120
+    db.close()
+    stats = gate.stats()
+    assert stats["acquired"] >= 120 and stats["timeouts"] == 0 and not stats["held"]
+
+
+def test_checkpoint_and_vacuum(tmp_path):
+    engine, gate = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE filler (payload TEXT)"))
+        conn.execute(text("INSERT INTO filler VALUES (:p)"), [{"p": "x" * 4000} for _ in range(200)])
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM filler"))
+
+    maintenance = SqliteMaintenance(engine, write_gate=gate)
+    checkpoint = maintenance.checkpoint()
+    assert checkpoint["busy"] == 0
+    vacuum = maintenance.vacuum()
+    assert vacuum["pages_after"] < vacuum["pages_before"]
+    assert maintenance.stats()["checkpoints"] == 1 and not gate.stats()["held"]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind telemetry writer
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.analysis import AgentExecution, AgentPerformance, Analysis, CachedAnalysis
+from services.result_cache import TIER_ANALYSIS
+from services.telemetry_writer import TelemetryWriter
+
+
+def test_executions_and_performance_are_written_in_one_flush(session_factory, db):
+    db.add(Analysis(id="a1", filename="f.csv", user_question="q"))
+    db.commit()
+    writer = TelemetryWriter(session_factory, max_pending=1000)
+
+    first, _ = writer.record_execution_started("a1", "eda")
+    second, _ = writer.record_execution_started("a1", "eda")
+    writer.record_execution_completed(first, success=True, output="ok")
+    assert db.query(AgentExecution).count() == 0
+
+    assert writer.flush() == 4  # two inserts, one performance delta, one latency bucket
+    writer.record_execution_completed(second, success=False, error="boom")
+    writer.flush()
+
+    rows = {row.id: row for row in db.query(AgentExecution).all()}
+    assert rows[first].success and rows[first].output == "ok"
+    assert not rows[second].success and rows[second].error == "boom"
+    assert rows[second].completed_at is not None
+
+    perf = db.query(AgentPerformance).filter(AgentPerformance.agent_name == "eda").one()
+    assert (perf.total_runs, perf.successful_runs, perf.failed_runs) == (2, 1, 1)
+    assert perf.success_rate == 0.5
+
+
+def test_cache_hits_become_one_increment_update(session_factory, db):
+    db.add(CachedAnalysis(cache_key="k", data_hash="h", user_question="q", analysis_id="a", cached_result={}, access_count=3))
+    db.commit()
+    writer = TelemetryWriter(session_factory)
+
+    for _ in range(5):
+        writer.record_cache_access(TIER_ANALYSIS, "k")
+    assert writer.pending() == 1
+    writer.flush()
+    db.expire_all()
+    assert db.query(CachedAnalysis).one().access_count == 8
+
+
+def test_bounded_buffer_flushes_inline_and_stop_flushes(session_factory):
+    writer = TelemetryWriter(session_factory, flush_interval=60, max_pending=2)
+    writer.record_cache_access(TIER_ANALYSIS, "a")
+    writer.record_cache_access(TIER_ANALYSIS, "b")
+    assert writer.stats()["inline_flushes"] == 1 and writer.pending() == 0
+
+    async def run():
+        await writer.start()
+        writer.record_cache_access(TIER_ANALYSIS, "c")
+        await writer.stop()
+
+    asyncio.run(run())
+    assert writer.pending() == 0 and writer.stats()["flushes"] == 2
+
+
+def test_failed_flush_keeps_the_batch_for_the_next_flush(session_factory, db):
+    engine = session_factory.kw["bind"]
+    AgentPerformance.__table__.drop(engine)
+    db.add(Analysis(id="a1", filename="f.csv", user_question="q"))
+    db.commit()
+    writer = TelemetryWriter(session_factory, max_pending=1000)
+    execution_id, _ = writer.record_execution_started("a1", "eda")
+    writer.record_execution_completed(execution_id, success=True)
+
+    assert writer.flush() == 0
+    assert writer.pending() == 3 and db.query(AgentExecution).count() == 0
+    # Recorded while the batch was out: merged with it, not lost
+    second, _ = writer.record_execution_started("a1", "eda")
+    writer.record_execution_completed(second, success=False)
+
+    AgentPerformance.__table__.create(engine)
+    assert writer.flush() >= 4  # two inserts, one performance delta, latency bucket(s)
+    perf = db.query(AgentPerformance).one()
+    assert (perf.total_runs, perf.failed_runs) == (2, 1)
+    assert db.query(AgentExecution).count() == 2 and writer.stats()["dropped_items"] == 0
+
+
+def test_batch_is_dropped_after_repeated_failures(session_factory):
+    AgentPerformance.__table__.drop(session_factory.kw["bind"])
+    writer = TelemetryWriter(session_factory, max_pending=1000, max_retries=2)
+    execution_id, _ = writer.record_execution_started("a1", "eda")
+    writer.record_execution_completed(execution_id, success=True)
+
+    writer.flush()
+    assert writer.pending() == 3
+    writer.flush()
+    assert writer.pending() == 0 and writer.stats()["dropped_items"] == 3
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for token budgets, previous-results compression and usage accounting
+"""
+
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from services.token_budget import (
+    TokenUsageTracker, build_previous_results_context, estimate_tokens,
+    get_token_budget_config, max_tokens_for,
+)
+
+
+def _result(output: str, summary: str = "summary text"):
+    return {"execution_result": {
+        "success": True,
+        "output": output,
+        "ui_summary": summary,
+        "next_insights": {"rows": 100},
+        "output_files": [{"filename": "plot.png", "type": "image"}],
+    }}
+
+
+def test_config_overrides_and_fallback():
+    budget = get_token_budget_config({"token_budget": {"max_tokens": {"selection": 256}}}, fallback_max_tokens=32000)
+    assert max_tokens_for(budget, "selection") == 256
+    assert max_tokens_for(budget, "code_generation") == 8192
+    assert max_tokens_for(budget, "unknown") == 32000
+
+
+def test_small_context_is_not_compressed():
+    previous = {"eda": _result("x" * 100)}
+    context = build_previous_results_context(previous, budget_tokens=10000)
+    assert "Output: " + "x" * 100 in context
+    assert "Key Insights" in context
+
+
+def test_oldest_agents_are_compressed_first():
+    previous = {f"agent_{i}": _result("y" * 1000) for i in range(6)}
+    full = build_previous_results_context(previous, budget_tokens=10 ** 6)
+    budget = estimate_tokens(full) // 2
+    context = build_previous_results_context(previous, budget_tokens=budget)
+
+    assert estimate_tokens(context) <= budget
+    newest = context.split("--- Agent: agent_5 ---")[1]
+    oldest = context.split("--- Agent: agent_0 ---")[1].split("--- Agent:")[0]
+    assert "Output:" in newest
+    assert "Output:" not in oldest
+    # Every agent is still named
+    assert all(f"--- Agent: agent_{i} ---" in context for i in range(6))
+
+
+def test_usage_tracker_totals_and_truncation():
+    tracker = TokenUsageTracker()
+    tracker.record("selection", {"input_tokens": 100, "output_tokens": 20}, 1024, estimated_input_tokens=110)
+    tracker.record("code_generation", {"input_tokens": 50, "output_tokens": 8192,
+                                       "cache_read_input_tokens": 900}, 8192, stop_reason="max_tokens")
+    stats = tracker.stats()
+    assert stats["by_call_type"]["selection"]["output_tokens"] == 20
+    assert stats["by_call_type"]["code_generation"]["truncated"] == 1
+    assert stats["total"]["input_tokens"] == 150
+    assert stats["total"]["cache_read_input_tokens"] == 900
+    assert stats["total"]["calls"] == 2